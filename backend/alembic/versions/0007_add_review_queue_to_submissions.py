@@ -0,0 +1,58 @@
+"""Add review queue claim columns and partial index to submissions (idempotent)."""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = "0007_add_review_queue_to_submissions"
+down_revision = "0006_expand_avatar_url_to_text"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_submissions_review_queue"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "submissions" not in inspector.get_table_names():
+        return
+
+    columns = {col["name"] for col in inspector.get_columns("submissions")}
+    if "claimed_by_id" not in columns:
+        # SQLite cannot add a constraint to an existing table; the column goes in without one there
+        foreign_key = () if bind.dialect.name == "sqlite" else (sa.ForeignKey("users.id"),)
+        op.add_column("submissions", sa.Column("claimed_by_id", sa.Integer(), *foreign_key, nullable=True))
+    if "claim_expires_at" not in columns:
+        op.add_column("submissions", sa.Column("claim_expires_at", sa.DateTime(), nullable=True))
+
+    indexes = {index["name"] for index in inspector.get_indexes("submissions")}
+    if INDEX_NAME not in indexes:
+        op.create_index(
+            INDEX_NAME,
+            "submissions",
+            ["assignment_id", "submitted_at"],
+            postgresql_where=sa.text("status = 'submitted'"),
+            sqlite_where=sa.text("status = 'submitted'"),
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "submissions" not in inspector.get_table_names():
+        return
+
+    indexes = {index["name"] for index in inspector.get_indexes("submissions")}
+    if INDEX_NAME in indexes:
+        op.drop_index(INDEX_NAME, table_name="submissions")
+
+    columns = {col["name"] for col in inspector.get_columns("submissions")}
+    with op.batch_alter_table("submissions") as batch_op:
+        if "claim_expires_at" in columns:
+            batch_op.drop_column("claim_expires_at")
+        if "claimed_by_id" in columns:
+            batch_op.drop_column("claimed_by_id")
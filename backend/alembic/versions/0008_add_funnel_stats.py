@@ -0,0 +1,58 @@
+"""Add pre-aggregated course funnel tables (idempotent)."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0008_add_funnel_stats"
+down_revision = "0007_add_review_queue_to_submissions"
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    if not table_exists("course_funnel_stats"):
+        op.create_table(
+            "course_funnel_stats",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("course_id", sa.Integer(), nullable=False),
+            sa.Column("enrolled_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("stale", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+            sa.Column("refreshed_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["course_id"], ["courses.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("course_id"),
+        )
+        op.create_index("ix_course_funnel_stats_id", "course_funnel_stats", ["id"])
+    if not table_exists("lesson_funnel_stats"):
+        op.create_table(
+            "lesson_funnel_stats",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("course_id", sa.Integer(), nullable=False),
+            sa.Column("lesson_id", sa.Integer(), nullable=False),
+            sa.Column("position", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("submitted_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("completed_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("avg_score", sa.Float(), nullable=True),
+            sa.Column("stale", sa.Boolean(), nullable=False, server_default=sa.text("false")),
+            sa.Column("refreshed_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["course_id"], ["courses.id"]),
+            sa.ForeignKeyConstraint(["lesson_id"], ["lessons.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("lesson_id"),
+        )
+        op.create_index("ix_lesson_funnel_stats_id", "lesson_funnel_stats", ["id"])
+        op.create_index("ix_lesson_funnel_stats_course_id", "lesson_funnel_stats", ["course_id"])
+
+
+def downgrade() -> None:
+    if table_exists("lesson_funnel_stats"):
+        op.drop_table("lesson_funnel_stats")
+    if table_exists("course_funnel_stats"):
+        op.drop_table("course_funnel_stats")
@@ -0,0 +1,57 @@
+"""Add deadline and autosave draft columns to test attempts (idempotent)."""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = "0009_add_timed_attempts"
+down_revision = "0008_add_funnel_stats"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_test_attempts_open"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "test_attempts" not in inspector.get_table_names():
+        return
+
+    columns = {col["name"] for col in inspector.get_columns("test_attempts")}
+    if "deadline_at" not in columns:
+        op.add_column("test_attempts", sa.Column("deadline_at", sa.DateTime(), nullable=True))
+    if "draft_answers" not in columns:
+        op.add_column("test_attempts", sa.Column("draft_answers", sa.Text(), nullable=True))
+    if "draft_saved_at" not in columns:
+        op.add_column("test_attempts", sa.Column("draft_saved_at", sa.DateTime(), nullable=True))
+
+    indexes = {index["name"] for index in inspector.get_indexes("test_attempts")}
+    if INDEX_NAME not in indexes:
+        op.create_index(
+            INDEX_NAME,
+            "test_attempts",
+            ["deadline_at"],
+            postgresql_where=sa.text("finished_at IS NULL"),
+            sqlite_where=sa.text("finished_at IS NULL"),
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "test_attempts" not in inspector.get_table_names():
+        return
+
+    indexes = {index["name"] for index in inspector.get_indexes("test_attempts")}
+    if INDEX_NAME in indexes:
+        op.drop_index(INDEX_NAME, table_name="test_attempts")
+
+    columns = {col["name"] for col in inspector.get_columns("test_attempts")}
+    with op.batch_alter_table("test_attempts") as batch_op:
+        for name in ("draft_saved_at", "draft_answers", "deadline_at"):
+            if name in columns:
+                batch_op.drop_column(name)
@@ -0,0 +1,63 @@
+"""Add generated tsvector search columns with GIN indexes (idempotent).
+
+The expressions are spelled out here rather than imported from
+app.db.search_index, so later changes to the app do not rewrite this
+revision.
+"""
+
+from alembic import op
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = "0010_add_search_vectors"
+down_revision = "0009_add_timed_attempts"
+branch_labels = None
+depends_on = None
+
+
+def weighted(expression: str, weight: str) -> str:
+    return (
+        f"setweight(to_tsvector('russian', {expression}), '{weight}') || "
+        f"setweight(to_tsvector('english', {expression}), '{weight}')"
+    )
+
+
+VECTORS = {
+    "courses": " || ".join(
+        [
+            weighted("coalesce(title, '')", "A"),
+            weighted("replace(coalesce(tags, ''), ',', ' ')", "B"),
+            weighted("coalesce(short_description, '') || ' ' || coalesce(long_description, '')", "C"),
+        ]
+    ),
+    "lessons": " || ".join(
+        [
+            weighted("coalesce(title, '')", "A"),
+            weighted("coalesce(short_description, '')", "B"),
+            weighted("regexp_replace(coalesce(content_html, ''), '<[^>]*>', ' ', 'g')", "C"),
+        ]
+    ),
+    "chat_messages": weighted("coalesce(text, '')", "C"),
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    inspector = inspect(bind)
+    tables = set(inspector.get_table_names())
+    for table, vector in VECTORS.items():
+        if table not in tables or "search_vector" in {column["name"] for column in inspector.get_columns(table)}:
+            continue
+        # Adding a stored generated column rewrites the table once, which also backfills it.
+        op.execute(f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED")
+        op.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for table in VECTORS:
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
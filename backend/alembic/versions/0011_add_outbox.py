@@ -0,0 +1,66 @@
+"""Add the domain event outbox and its delivery log (idempotent)."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0011_add_outbox"
+down_revision = "0010_add_search_vectors"
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    if not table_exists("outbox_events"):
+        op.create_table(
+            "outbox_events",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("event_type", sa.String(), nullable=False),
+            sa.Column("payload", sa.Text(), nullable=False),
+            sa.Column(
+                "status",
+                sa.Enum("pending", "done", "failed", name="outboxstatus"),
+                nullable=False,
+                server_default="pending",
+            ),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("next_attempt_at", sa.DateTime(), nullable=True),
+            sa.Column("last_error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+            sa.Column("dispatched_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_outbox_events_id", "outbox_events", ["id"])
+        op.create_index(
+            "ix_outbox_events_pending",
+            "outbox_events",
+            ["id"],
+            postgresql_where=sa.text("status = 'pending'"),
+            sqlite_where=sa.text("status = 'pending'"),
+        )
+    if not table_exists("outbox_deliveries"):
+        op.create_table(
+            "outbox_deliveries",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("event_id", sa.Integer(), nullable=False),
+            sa.Column("handler", sa.String(), nullable=False),
+            sa.Column("delivered_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["event_id"], ["outbox_events.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("event_id", "handler", name="uq_outbox_deliveries_event_handler"),
+        )
+        op.create_index("ix_outbox_deliveries_id", "outbox_deliveries", ["id"])
+
+
+def downgrade() -> None:
+    if table_exists("outbox_deliveries"):
+        op.drop_table("outbox_deliveries")
+    if table_exists("outbox_events"):
+        op.drop_table("outbox_events")
+        sa.Enum(name="outboxstatus").drop(op.get_bind(), checkfirst=True)
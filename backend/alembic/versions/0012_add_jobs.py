@@ -0,0 +1,74 @@
+"""Add the background job queue table (idempotent)."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0012_add_jobs"
+down_revision = "0011_add_outbox"
+branch_labels = None
+depends_on = None
+
+ACTIVE = "status IN ('queued', 'running')"
+
+
+def table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    if table_exists("jobs"):
+        return
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("queued", "running", "succeeded", "failed", name="jobstatus"),
+            nullable=False,
+            server_default="queued",
+        ),
+        sa.Column("priority", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("dedupe_key", sa.String(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="3"),
+        sa.Column("run_after", sa.DateTime(), nullable=False),
+        sa.Column("locked_by", sa.String(), nullable=True),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("progress", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("progress_message", sa.String(), nullable=True),
+        sa.Column("result", sa.Text(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_by_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["created_by_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_jobs_id", "jobs", ["id"])
+    op.create_index(
+        "ix_jobs_claim",
+        "jobs",
+        ["priority", "run_after"],
+        postgresql_where=sa.text(ACTIVE),
+        sqlite_where=sa.text(ACTIVE),
+    )
+    op.create_index(
+        "uq_jobs_active_dedupe_key",
+        "jobs",
+        ["dedupe_key"],
+        unique=True,
+        postgresql_where=sa.text(f"{ACTIVE} AND dedupe_key IS NOT NULL"),
+        sqlite_where=sa.text(f"{ACTIVE} AND dedupe_key IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    if table_exists("jobs"):
+        op.drop_table("jobs")
+        sa.Enum(name="jobstatus").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,174 @@
+"""Add pre-rendered lesson renditions and render existing lessons (idempotent)."""
+
+import gzip
+import hashlib
+import re
+from datetime import datetime
+from html import escape
+from html.parser import HTMLParser
+from typing import Dict, List
+
+from alembic import op
+import sqlalchemy as sa
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip renditions are stored
+    brotli = None
+
+# revision identifiers, used by Alembic.
+revision = "0013_add_lesson_renditions"
+down_revision = "0012_add_jobs"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+# The sanitizer as of renderer version 1, frozen here so that this revision renders the same HTML whatever
+# app.services.lesson_content becomes; a later renderer version re-renders every lesson on its own.
+RENDERER_VERSION = 1
+ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "code", "div", "em", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img",
+    "li", "ol", "p", "pre", "span", "strong", "sub", "sup", "table", "tbody", "td", "th", "thead", "tr", "u", "ul",
+}
+VOID_TAGS = {"br", "hr", "img"}
+DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "template", "noscript"}
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "img": {"src", "alt", "title", "width", "height"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"},
+}
+URL_ATTRIBUTES = {"href", "src"}
+SAFE_URL = re.compile(r"^(https?:|mailto:|[^:/?#]*(?:[/?#]|$))", re.IGNORECASE)
+URL_NOISE = re.compile(r"[\x00-\x20]")
+BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "hr"}
+
+
+class Sanitizer(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.html: List[str] = []
+        self.text: List[str] = []
+        self.open: List[str] = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, ())
+        kept = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            value = value.strip()
+            if name in URL_ATTRIBUTES and not SAFE_URL.match(URL_NOISE.sub("", value)):
+                continue
+            kept.append(f' {name}="{escape(value)}"')
+        if tag == "a":
+            kept.append(' rel="noopener noreferrer nofollow"')
+        self.html.append(f"<{tag}{''.join(kept)}>")
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open:
+            return
+        while self.open:
+            current = self.open.pop()
+            self.html.append(f"</{current}>")
+            if current == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+
+def rendition_values(content_html: str) -> Dict[str, object]:
+    parser = Sanitizer()
+    parser.feed(content_html or "")
+    parser.close()
+    html = "".join(parser.html) + "".join(f"</{tag}>" for tag in reversed(parser.open))
+    lines = (" ".join(line.split()) for line in "".join(parser.text).splitlines())
+    body = html.encode()
+    return {
+        "source_hash": hashlib.sha256(f"{RENDERER_VERSION}:{content_html}".encode()).hexdigest(),
+        "html": html,
+        "html_gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        "html_br": brotli.compress(body, quality=11) if brotli is not None else None,
+        "plain_text": "\n".join(line for line in lines if line),
+        "rendered_at": datetime.utcnow(),
+    }
+
+
+def table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    if not table_exists("lesson_renditions"):
+        op.create_table(
+            "lesson_renditions",
+            sa.Column("lesson_id", sa.Integer(), nullable=False),
+            sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+            sa.Column("source_hash", sa.String(length=64), nullable=False),
+            sa.Column("html", sa.Text(), nullable=False),
+            sa.Column("html_gzip", sa.LargeBinary(), nullable=False),
+            sa.Column("html_br", sa.LargeBinary(), nullable=True),
+            sa.Column("plain_text", sa.Text(), nullable=False),
+            sa.Column("rendered_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["lesson_id"], ["lessons.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("lesson_id"),
+        )
+    backfill()
+
+
+def backfill() -> None:
+    """Render lessons that have no rendition, in batches so no statement holds everything in memory."""
+    bind = op.get_bind()
+    lessons = sa.table("lessons", sa.column("id", sa.Integer), sa.column("content_html", sa.Text))
+    columns = ("lesson_id", "version", "source_hash", "html", "html_gzip", "html_br", "plain_text", "rendered_at")
+    renditions = sa.table("lesson_renditions", *(sa.column(name) for name in columns))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(lessons.c.id, lessons.c.content_html)
+            .where(lessons.c.id > last_id)
+            .where(~sa.exists().where(renditions.c.lesson_id == lessons.c.id))
+            .order_by(lessons.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        bind.execute(
+            renditions.insert(),
+            [{"lesson_id": row.id, "version": 1, **rendition_values(row.content_html)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    if table_exists("lesson_renditions"):
+        op.drop_table("lesson_renditions")
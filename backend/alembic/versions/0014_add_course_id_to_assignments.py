@@ -0,0 +1,90 @@
+"""Denormalize course_id onto assignments and submissions and backfill it (idempotent)."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0014_add_course_id_to_assignments"
+down_revision = "0013_add_lesson_renditions"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10_000
+INDEXES = {
+    "assignments": (("ix_assignments_course_created", ["course_id", "created_at"]),),
+    "submissions": (
+        ("ix_submissions_student_course", ["student_id", "course_id"]),
+        ("ix_submissions_course", ["course_id"]),
+    ),
+}
+
+
+def columns(table_name: str) -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table_name)}
+
+
+def upgrade() -> None:
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if "assignments" not in tables or "submissions" not in tables:
+        return
+    bind = op.get_bind()
+    for table_name in INDEXES:
+        if "course_id" not in columns(table_name):
+            # SQLite cannot add a constraint to an existing table; the column goes in without one there
+            foreign_key = () if bind.dialect.name == "sqlite" else (sa.ForeignKey("courses.id"),)
+            op.add_column(table_name, sa.Column("course_id", sa.Integer(), *foreign_key, nullable=True))
+
+    assignments = sa.table("assignments", sa.column("id"), sa.column("lesson_id"), sa.column("course_id"))
+    submissions = sa.table("submissions", sa.column("id"), sa.column("assignment_id"), sa.column("course_id"))
+    lessons = sa.table("lessons", sa.column("id"), sa.column("module_id"))
+    modules = sa.table("modules", sa.column("id"), sa.column("course_id"))
+    # each batch commits on its own, so the backfill never holds locks on the whole table
+    with op.get_context().autocommit_block():
+        backfill(
+            assignments,
+            sa.select(modules.c.course_id)
+            .join(lessons, lessons.c.module_id == modules.c.id)
+            .where(lessons.c.id == assignments.c.lesson_id)
+            .scalar_subquery(),
+        )
+        backfill(
+            submissions,
+            sa.select(assignments.c.course_id).where(assignments.c.id == submissions.c.assignment_id).scalar_subquery(),
+        )
+
+    for table_name, indexes in INDEXES.items():
+        if bind.dialect.name != "sqlite":
+            # SQLite cannot alter a column; the ORM still never writes NULL there
+            op.alter_column(table_name, "course_id", nullable=False)
+        existing = {index["name"] for index in sa.inspect(bind).get_indexes(table_name)}
+        for name, indexed in indexes:
+            if name not in existing:
+                op.create_index(name, table_name, indexed)
+
+
+def backfill(table, course_id) -> None:
+    """Fill NULL course ids one id range at a time."""
+    bind = op.get_bind()
+    last_id = 0
+    max_id = bind.execute(sa.select(sa.func.max(table.c.id))).scalar() or 0
+    while last_id < max_id:
+        bind.execute(
+            table.update()
+            .where(table.c.id > last_id, table.c.id <= last_id + BATCH_SIZE, table.c.course_id.is_(None))
+            .values(course_id=course_id)
+        )
+        last_id += BATCH_SIZE
+
+
+def downgrade() -> None:
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    for table_name, indexes in INDEXES.items():
+        if table_name not in tables:
+            continue
+        existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table_name)}
+        for name, _ in indexes:
+            if name in existing:
+                op.drop_index(name, table_name=table_name)
+        if "course_id" in columns(table_name):
+            with op.batch_alter_table(table_name) as batch_op:
+                batch_op.drop_column("course_id")
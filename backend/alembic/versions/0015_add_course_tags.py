@@ -0,0 +1,100 @@
+"""Add normalized course tags and catalog indexes, split existing tag strings (idempotent)."""
+
+from typing import List, Optional
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0015_add_course_tags"
+down_revision = "0014_add_course_id_to_assignments"
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+MAX_TAG_LENGTH = 64
+COURSE_INDEXES = ("ix_courses_catalog_recent", "ix_courses_level", "ix_courses_title_prefix")
+
+
+def table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def parse_tags(raw: Optional[str]) -> List[str]:
+    """Distinct tag names as normalized when this revision was written: stripped, lower-cased, truncated."""
+    names: List[str] = []
+    for part in (raw or "").split(","):
+        name = part.strip().lower()[:MAX_TAG_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def upgrade() -> None:
+    if not table_exists("courses"):
+        return
+    if not table_exists("tags"):
+        op.create_table(
+            "tags",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(length=64), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("name"),
+        )
+    if not table_exists("course_tags"):
+        op.create_table(
+            "course_tags",
+            sa.Column("course_id", sa.Integer(), nullable=False),
+            sa.Column("tag_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["course_id"], ["courses.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["tag_id"], ["tags.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("course_id", "tag_id"),
+        )
+        op.create_index("ix_course_tags_tag_course", "course_tags", ["tag_id", "course_id"])
+
+    # expression indexes are not reflected, hence IF NOT EXISTS instead of the inspector
+    op.create_index("ix_courses_catalog_recent", "courses", ["is_published", "created_at", "id"], if_not_exists=True)
+    op.create_index("ix_courses_level", "courses", ["level"], if_not_exists=True)
+    opclass = " text_pattern_ops" if op.get_bind().dialect.name == "postgresql" else ""
+    op.create_index("ix_courses_title_prefix", "courses", [sa.text(f"lower(title){opclass}")], if_not_exists=True)
+    backfill()
+
+
+def backfill() -> None:
+    """Split ``courses.tags`` of courses without tag links, a batch of courses at a time."""
+    bind = op.get_bind()
+    courses = sa.table("courses", sa.column("id", sa.Integer), sa.column("tags", sa.String))
+    tags = sa.table("tags", sa.column("id", sa.Integer), sa.column("name", sa.String))
+    course_tags = sa.table("course_tags", sa.column("course_id", sa.Integer), sa.column("tag_id", sa.Integer))
+    tag_ids = dict(bind.execute(sa.select(tags.c.name, tags.c.id)).all())
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(courses.c.id, courses.c.tags)
+            .where(courses.c.id > last_id)
+            .where(~sa.exists().where(course_tags.c.course_id == courses.c.id))
+            .order_by(courses.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        parsed = [(row.id, parse_tags(row.tags)) for row in rows]
+        new_names = sorted({name for _, names in parsed for name in names} - tag_ids.keys())
+        if new_names:
+            bind.execute(tags.insert(), [{"name": name} for name in new_names])
+            tag_ids.update(bind.execute(sa.select(tags.c.name, tags.c.id).where(tags.c.name.in_(new_names))).all())
+        links = [{"course_id": course_id, "tag_id": tag_ids[name]} for course_id, names in parsed for name in names]
+        if links:
+            bind.execute(course_tags.insert(), links)
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    for name in COURSE_INDEXES:
+        op.drop_index(name, table_name="courses", if_exists=True)
+    if table_exists("course_tags"):
+        op.drop_table("course_tags")
+    if table_exists("tags"):
+        op.drop_table("tags")
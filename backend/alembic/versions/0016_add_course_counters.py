@@ -0,0 +1,139 @@
+"""Add sharded course counters and compacted course stats, backfill from enrollments (idempotent)."""
+
+from datetime import datetime, time, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0016_add_course_counters"
+down_revision = "0015_add_course_tags"
+branch_labels = None
+depends_on = None
+
+WINDOW_DAYS = 7
+
+
+def table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    if not table_exists("courses"):
+        return
+    created = False
+    if not table_exists("course_stats"):
+        op.create_table(
+            "course_stats",
+            sa.Column("course_id", sa.Integer(), nullable=False),
+            sa.Column("enrollments", sa.Integer(), nullable=False),
+            sa.Column("active_students_7d", sa.Integer(), nullable=False),
+            sa.Column("submissions_7d", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["course_id"], ["courses.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("course_id"),
+        )
+        op.create_index("ix_course_stats_popular", "course_stats", ["enrollments", "course_id"])
+        created = True
+    if not table_exists("course_counter_shards"):
+        op.create_table(
+            "course_counter_shards",
+            sa.Column("course_id", sa.Integer(), nullable=False),
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("shard", sa.Integer(), nullable=False),
+            sa.Column("enrollments", sa.Integer(), nullable=False),
+            sa.Column("submissions", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["course_id"], ["courses.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("course_id", "day", "shard"),
+        )
+    if not table_exists("course_activity"):
+        op.create_table(
+            "course_activity",
+            sa.Column("course_id", sa.Integer(), nullable=False),
+            sa.Column("student_id", sa.Integer(), nullable=False),
+            sa.Column("active_on", sa.Date(), nullable=False),
+            sa.ForeignKeyConstraint(["course_id"], ["courses.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["student_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("course_id", "student_id"),
+        )
+        op.create_index("ix_course_activity_active_on", "course_activity", ["active_on"])
+    if created:
+        backfill()
+
+
+def stub(name: str, *column_names: str) -> sa.TableClause:
+    return sa.table(name, *(sa.column(column_name) for column_name in column_names))
+
+
+def backfill() -> None:
+    """Counters as of today: enrollments per course plus the activity of the last seven days, one shard each."""
+    bind = op.get_bind()
+    enrollments = sa.table(
+        "enrollments", sa.column("course_id"), sa.column("student_id"), sa.column("enrolled_at", sa.DateTime)
+    )
+    submissions = sa.table(
+        "submissions", sa.column("course_id"), sa.column("student_id"), sa.column("submitted_at", sa.DateTime)
+    )
+    shards = stub("course_counter_shards", "course_id", "day", "shard", "enrollments", "submissions")
+    activity = stub("course_activity", "course_id", "student_id", "active_on")
+    stats = stub("course_stats", "course_id", "enrollments", "active_students_7d", "submissions_7d", "updated_at")
+    today = datetime.utcnow().date()
+    since = datetime.combine(today - timedelta(days=WINDOW_DAYS - 1), time.min)
+    until = datetime.combine(today + timedelta(days=1), time.min)
+
+    day = sa.func.date(submissions.c.submitted_at)
+    bind.execute(
+        shards.insert().from_select(
+            ["course_id", "day", "shard", "enrollments", "submissions"],
+            sa.select(submissions.c.course_id, day, sa.literal(0), sa.literal(0), sa.func.count())
+            .where(submissions.c.submitted_at >= since, submissions.c.submitted_at < until)
+            .group_by(submissions.c.course_id, day),
+        )
+    )
+    recent = sa.union_all(
+        sa.select(
+            enrollments.c.course_id, enrollments.c.student_id, sa.func.date(enrollments.c.enrolled_at).label("day")
+        ).where(enrollments.c.enrolled_at >= since, enrollments.c.enrolled_at < until),
+        sa.select(submissions.c.course_id, submissions.c.student_id, day.label("day")).where(
+            submissions.c.submitted_at >= since, submissions.c.submitted_at < until
+        ),
+    ).subquery()
+    bind.execute(
+        activity.insert().from_select(
+            ["course_id", "student_id", "active_on"],
+            sa.select(recent.c.course_id, recent.c.student_id, sa.func.max(recent.c.day)).group_by(
+                recent.c.course_id, recent.c.student_id
+            ),
+        )
+    )
+
+    enrolled = sa.select(enrollments.c.course_id, sa.func.count().label("n")).group_by(enrollments.c.course_id)
+    active = sa.select(activity.c.course_id, sa.func.count().label("n")).group_by(activity.c.course_id)
+    submitted = sa.select(shards.c.course_id, sa.func.sum(shards.c.submissions).label("n")).group_by(shards.c.course_id)
+    enrolled, active, submitted = enrolled.subquery(), active.subquery(), submitted.subquery()
+    course_ids = sa.union(
+        sa.select(enrolled.c.course_id), sa.select(active.c.course_id), sa.select(submitted.c.course_id)
+    ).subquery()
+    bind.execute(
+        stats.insert().from_select(
+            ["course_id", "enrollments", "active_students_7d", "submissions_7d", "updated_at"],
+            sa.select(
+                course_ids.c.course_id,
+                sa.func.coalesce(enrolled.c.n, 0),
+                sa.func.coalesce(active.c.n, 0),
+                sa.func.coalesce(submitted.c.n, 0),
+                sa.literal(datetime.utcnow(), sa.DateTime()),
+            )
+            .outerjoin(enrolled, enrolled.c.course_id == course_ids.c.course_id)
+            .outerjoin(active, active.c.course_id == course_ids.c.course_id)
+            .outerjoin(submitted, submitted.c.course_id == course_ids.c.course_id),
+        )
+    )
+
+
+def downgrade() -> None:
+    for table_name in ("course_activity", "course_counter_shards", "course_stats"):
+        if table_exists(table_name):
+            op.drop_table(table_name)
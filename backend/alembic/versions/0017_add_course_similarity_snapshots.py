@@ -0,0 +1,34 @@
+"""Add course similarity snapshots for recommendations (idempotent)."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0017_add_course_similarity_snapshots"
+down_revision = "0016_add_course_counters"
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    # filled by the background refresh, nothing to backfill
+    if not table_exists("course_similarity_snapshots"):
+        op.create_table(
+            "course_similarity_snapshots",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("built_at", sa.DateTime(), nullable=False),
+            sa.Column("course_count", sa.Integer(), nullable=False),
+            sa.Column("payload", sa.LargeBinary(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+        )
+
+
+def downgrade() -> None:
+    if table_exists("course_similarity_snapshots"):
+        op.drop_table("course_similarity_snapshots")
@@ -0,0 +1,114 @@
+"""Add per-course leaderboard entries and revisions, backfill from graded submissions (idempotent)."""
+
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0018_add_leaderboards"
+down_revision = "0017_add_course_similarity_snapshots"
+branch_labels = None
+depends_on = None
+
+
+def table_exists(table_name: str) -> bool:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    return table_name in inspector.get_table_names()
+
+
+def upgrade() -> None:
+    if not table_exists("courses"):
+        return
+    created = False
+    if not table_exists("course_leaderboards"):
+        op.create_table(
+            "course_leaderboards",
+            sa.Column("course_id", sa.Integer(), nullable=False),
+            sa.Column("revision", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["course_id"], ["courses.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("course_id"),
+        )
+        created = True
+    if not table_exists("leaderboard_entries"):
+        op.create_table(
+            "leaderboard_entries",
+            sa.Column("course_id", sa.Integer(), nullable=False),
+            sa.Column("student_id", sa.Integer(), nullable=False),
+            sa.Column("points", sa.Float(), nullable=False),
+            sa.Column("avg_score", sa.Float(), nullable=True),
+            sa.Column("graded_count", sa.Integer(), nullable=False),
+            sa.Column("revision", sa.Integer(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(["course_id"], ["courses.id"], ondelete="CASCADE"),
+            sa.ForeignKeyConstraint(["student_id"], ["users.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("course_id", "student_id"),
+        )
+        op.create_index("ix_leaderboard_entries_course_revision", "leaderboard_entries", ["course_id", "revision"])
+    if created:
+        backfill()
+
+
+def rounded(value):
+    # Postgres only rounds numerics to a number of places
+    return sa.cast(sa.func.round(sa.cast(value, sa.Numeric), 4), sa.Float)
+
+
+def backfill() -> None:
+    """Entries at revision 1 from the latest graded attempt of each assignment, one statement per table."""
+    bind = op.get_bind()
+    submissions = sa.table(
+        "submissions",
+        *(sa.column(name) for name in ("course_id", "student_id", "assignment_id", "attempt_number", "status")),
+        sa.column("score", sa.Float),
+    )
+    columns = ("course_id", "student_id", "points", "avg_score", "graded_count", "revision", "updated_at")
+    entries = sa.table("leaderboard_entries", *(sa.column(name) for name in columns))
+    boards = sa.table("course_leaderboards", sa.column("course_id"), sa.column("revision"))
+    graded = [submissions.c.status == "checked", submissions.c.score.isnot(None)]
+    latest = (
+        sa.select(
+            submissions.c.student_id,
+            submissions.c.assignment_id,
+            sa.func.max(submissions.c.attempt_number).label("attempt"),
+        )
+        .where(*graded)
+        .group_by(submissions.c.student_id, submissions.c.assignment_id)
+        .subquery()
+    )
+    bind.execute(
+        entries.insert().from_select(
+            list(columns),
+            sa.select(
+                submissions.c.course_id,
+                submissions.c.student_id,
+                rounded(sa.func.sum(submissions.c.score)),
+                rounded(sa.func.avg(submissions.c.score)),
+                sa.func.count(),
+                sa.literal(1),
+                sa.literal(datetime.utcnow(), sa.DateTime()),
+            )
+            .join(
+                latest,
+                sa.and_(
+                    submissions.c.student_id == latest.c.student_id,
+                    submissions.c.assignment_id == latest.c.assignment_id,
+                    submissions.c.attempt_number == latest.c.attempt,
+                ),
+            )
+            .where(*graded)
+            .group_by(submissions.c.course_id, submissions.c.student_id),
+        )
+    )
+    bind.execute(
+        boards.insert().from_select(
+            ["course_id", "revision"], sa.select(entries.c.course_id, sa.literal(1)).distinct()
+        )
+    )
+
+
+def downgrade() -> None:
+    for table_name in ("leaderboard_entries", "course_leaderboards"):
+        if table_exists(table_name):
+            op.drop_table(table_name)
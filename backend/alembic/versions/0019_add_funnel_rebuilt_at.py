@@ -0,0 +1,30 @@
+"""Record when each course funnel was last fully rebuilt (idempotent)."""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0019_add_funnel_rebuilt_at"
+down_revision = "0018_add_leaderboards"
+branch_labels = None
+depends_on = None
+
+
+def columns(table_name: str) -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table_name)}
+
+
+def upgrade() -> None:
+    if "course_funnel_stats" not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    # left NULL: the next scheduled rebuild stamps it
+    if "rebuilt_at" not in columns("course_funnel_stats"):
+        op.add_column("course_funnel_stats", sa.Column("rebuilt_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    if "course_funnel_stats" not in sa.inspect(op.get_bind()).get_table_names():
+        return
+    if "rebuilt_at" in columns("course_funnel_stats"):
+        with op.batch_alter_table("course_funnel_stats") as batch_op:
+            batch_op.drop_column("rebuilt_at")
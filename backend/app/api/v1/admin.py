@@ -0,0 +1,42 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.api.deps import require_admin
+from app.core.memory import memory_diagnostics, object_report
+from app.core.profiling import TimedRoute
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)], route_class=TimedRoute)
+
+
+@router.get("/memory")
+def memory_status():
+    """RSS now and over time, plus traced memory while diagnostics run (this worker only)."""
+    return memory_diagnostics.status()
+
+
+@router.post("/memory/start")
+def start_memory_diagnostics(frames: int = Query(1, ge=1, le=25)):
+    memory_diagnostics.start(frames)
+    return memory_diagnostics.status()
+
+
+@router.post("/memory/stop")
+def stop_memory_diagnostics():
+    memory_diagnostics.stop()
+    return memory_diagnostics.status()
+
+
+@router.post("/memory/snapshot")
+def take_memory_snapshot(
+    limit: int = Query(25, ge=1, le=200),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+):
+    """Top allocation sites and their growth since the previous snapshot."""
+    if not memory_diagnostics.enabled:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Start memory diagnostics first")
+    return memory_diagnostics.snapshot(limit, group_by)
+
+
+@router.get("/memory/objects")
+def memory_objects(limit: int = Query(30, ge=1, le=500)):
+    """Live objects by type, ORM instances per mapper and open sessions' identity maps; walks the whole heap."""
+    return object_report(limit)
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_teacher
+from app.core.profiling import TimedRoute
+from app.db.session import get_db
+from app.models.course import Course
+from app.schemas.analytics import CourseFunnelRead
+from app.services.funnel import read_course_funnel, refresh_course_funnel
+
+router = APIRouter(prefix="/analytics", tags=["analytics"], route_class=TimedRoute)
+
+
+@router.get("/courses/{course_id}/funnel", response_model=CourseFunnelRead, summary="Lesson-by-lesson course funnel (teacher)")
+def get_course_funnel(course_id: int, current_user=Depends(get_current_teacher), db: Session = Depends(get_db)):
+    course = db.query(Course).filter(Course.id == course_id).first()
+    if not course:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+    if course.owner_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not the course owner")
+    funnel = read_course_funnel(db, course_id)
+    if funnel is None:
+        # Aggregates for a course are built once on first access; afterwards the
+        # background refresh keeps them current.
+        refresh_course_funnel(db, course_id)
+        db.commit()
+        funnel = read_course_funnel(db, course_id)
+    return funnel
@@ -2,11 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_student
+from app.core.profiling import TimedRoute
 from app.db.session import get_db
 from app.models.assignment import Assignment, Submission
 from app.schemas.assignment import SubmissionListResponse
 
-router = APIRouter(prefix="/assignments", tags=["assignments"])
+router = APIRouter(prefix="/assignments", tags=["assignments"], route_class=TimedRoute)
 
 
 @router.get("/by-lesson/{lesson_id}", summary="Get assignment for a lesson")
@@ -4,12 +4,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
+from app.core.profiling import TimedRoute
 from app.db.session import get_db
 from app.models.chat import ChatMessage
 from app.models.course import Course, Enrollment
 from app.schemas.chat import ChatMessageRead, ChatMessageCreate, ChatMessageListResponse
 
-router = APIRouter(prefix="/courses/{course_id}/chat", tags=["chat"])
+router = APIRouter(prefix="/courses/{course_id}/chat", tags=["chat"], route_class=TimedRoute)
 
 
 def ensure_course_access(db: Session, course_id: int, user_id: int) -> None:
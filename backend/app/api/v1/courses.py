@@ -1,32 +1,121 @@
-from typing import Any, Dict, List
+import json
+from typing import Any, Dict, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import text
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import bindparam, func, select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_student
+from app.core.cache import CATALOG_TAG, cache, course_tag
+from app.core.profiling import TimedRoute
 from app.db.session import get_db
+from app.models.assignment import Assignment
 from app.models.course import Course, Enrollment, Lesson, Module
-from app.schemas.course import CourseDetail, CourseRead, ModuleRead
+from app.schemas.course import (
+    CatalogPage,
+    CatalogSort,
+    CourseDetail,
+    CourseRead,
+    CourseRecommendations,
+    ModuleRead,
+    TagMatch,
+)
+from app.services.catalog import InvalidCursor, catalog_page
+from app.services.events import ENROLLMENT_CREATED, publish
+from app.services.recommendations import CatalogRanking, current_index, rank_courses
 
-router = APIRouter(prefix="/courses", tags=["courses"])
+router = APIRouter(prefix="/courses", tags=["courses"], route_class=TimedRoute)
 
+ASSIGNMENTS_COUNT_STATEMENT = select(func.count(Assignment.id)).where(Assignment.course_id == bindparam("course_id"))
 
-@router.get("", response_model=Dict[str, List[CourseRead]], summary="Courses for current student")
-def list_courses(current_user=Depends(get_current_student), db: Session = Depends(get_db)):
+
+def load_course_lists(db: Session, student_id: int) -> Dict[str, List[CourseRead]]:
     enrolled_ids = [
-        enrollment.course_id for enrollment in db.query(Enrollment).filter(Enrollment.student_id == current_user.id).all()
+        enrollment.course_id for enrollment in db.query(Enrollment).filter(Enrollment.student_id == student_id).all()
     ]
     enrolled_courses = db.query(Course).filter(Course.id.in_(enrolled_ids)).all() if enrolled_ids else []
-    available_query = db.query(Course).filter(Course.is_published.is_(True))
-    if enrolled_ids:
-        available_query = available_query.filter(Course.id.notin_(enrolled_ids))
-    available_courses = available_query.all()
+    enrolled_set = set(enrolled_ids)
     return {
         "enrolled": [CourseRead.from_orm(course) for course in enrolled_courses],
-        "available": [CourseRead.from_orm(course) for course in available_courses],
+        "available": [course for course in published_catalog(db) if course.id not in enrolled_set],
+    }
+
+
+def published_catalog(db: Session) -> List[CourseRead]:
+    return cache.get_or_load(
+        "catalog:published",
+        lambda: [CourseRead.from_orm(course) for course in db.query(Course).filter(Course.is_published.is_(True)).all()],
+        tags=[CATALOG_TAG],
+    )
+
+
+def published_ranking(db: Session) -> CatalogRanking:
+    return cache.get_or_load(
+        "catalog:published:ranking", lambda: CatalogRanking.build(published_catalog(db)), tags=[CATALOG_TAG]
+    )
+
+
+@router.get("", response_model=Dict[str, List[CourseRead]], summary="Courses for current student")
+def list_courses(current_user=Depends(get_current_student), db: Session = Depends(get_db)):
+    return load_course_lists(db, current_user.id)
+
+
+@router.get("/catalog", response_model=CatalogPage, summary="Published courses: filter, sort and page through")
+def browse_catalog(
+    level: Optional[List[str]] = Query(None, description="Any of these levels; repeat the parameter"),
+    tag: Optional[List[str]] = Query(None, description="Tag names; repeat the parameter or separate with commas"),
+    tag_match: TagMatch = Query(TagMatch.any, description="Courses with any or with all of the tags"),
+    q: Optional[str] = Query(None, max_length=100, description="Title prefix, case-insensitive"),
+    sort: CatalogSort = Query(CatalogSort.popular),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, max_length=200, description="next_cursor of the previous page"),
+    current_user=Depends(get_current_student),
+    db: Session = Depends(get_db),
+):
+    params = {
+        "level": level or [],
+        "tag": tag or [],
+        "tag_match": tag_match.value,
+        "q": q,
+        "sort": sort.value,
+        "limit": limit,
+        "cursor": cursor,
     }
 
+    def load() -> Dict[str, Any]:
+        page = catalog_page(
+            db,
+            levels=level or (),
+            tags=tag or (),
+            tag_match=tag_match,
+            prefix=q,
+            sort=sort,
+            limit=limit,
+            cursor=cursor,
+        )
+        return page.dict()
+
+    try:
+        return cache.get_or_load(f"catalog:page:{json.dumps(params, sort_keys=True)}", load, tags=[CATALOG_TAG])
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+
+
+@router.get(
+    "/recommended", response_model=CourseRecommendations, summary="Available courses ranked for the current student"
+)
+def recommended_courses(
+    limit: int = Query(10, ge=1, le=50),
+    current_user=Depends(get_current_student),
+    db: Session = Depends(get_db),
+):
+    enrolled = db.execute(select(Enrollment.course_id).where(Enrollment.student_id == current_user.id)).scalars().all()
+    index = current_index(db)
+    return CourseRecommendations(
+        items=rank_courses(index, published_ranking(db), enrolled, limit),
+        built_at=index.built_at if index is not None else None,
+    )
+
 
 @router.post("/{course_id}/enroll", response_model=CourseRead, summary="Enroll current student into a course")
 def enroll_in_course(course_id: int, current_user=Depends(get_current_student), db: Session = Depends(get_db)):
@@ -42,7 +131,9 @@ def enroll_in_course(course_id: int, current_user=Depends(get_current_student),
         return CourseRead.from_orm(course)
     enrollment = Enrollment(course_id=course_id, student_id=current_user.id)
     db.add(enrollment)
+    publish(db, ENROLLMENT_CREATED, {"student_id": current_user.id, "course_id": course_id})
     db.commit()
+    cache.invalidate(tags=[course_tag(course_id)])
     return CourseRead.from_orm(course)
 
 
@@ -55,17 +146,7 @@ def get_course(course_id: int, current_user=Depends(get_current_student), db: Se
     lessons_count = (
         db.query(Lesson).join(Module).filter(Module.course_id == course_id).count()
     )
-    assignments_count = db.execute(
-        text(
-            """
-            SELECT COUNT(a.id) FROM assignments a
-            JOIN lessons l ON a.lesson_id = l.id
-            JOIN modules m ON l.module_id = m.id
-            WHERE m.course_id = :course_id
-            """
-        ),
-        {"course_id": course_id},
-    ).scalar() or 0
+    assignments_count = db.execute(ASSIGNMENTS_COUNT_STATEMENT, {"course_id": course_id}).scalar_one()
     course_detail = CourseDetail.from_orm(course)
     course_detail.modules = [ModuleRead.from_orm(m) for m in modules]  # type: ignore
     course_detail.lessons_count = lessons_count  # type: ignore
@@ -75,9 +156,16 @@ def get_course(course_id: int, current_user=Depends(get_current_student), db: Se
 
 @router.get("/{course_id}/structure", summary="Modules and lessons tree for navigation")
 def course_structure(course_id: int, current_user=Depends(get_current_student), db: Session = Depends(get_db)):
-    course = db.query(Course).filter(Course.id == course_id).first()
-    if not course:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+    def load() -> Dict[str, Any]:
+        course = db.query(Course).filter(Course.id == course_id).first()
+        if not course:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+        return build_course_structure(db, course_id)
+
+    return cache.get_or_load(f"course:{course_id}:structure", load, tags=[course_tag(course_id)])
+
+
+def build_course_structure(db: Session, course_id: int) -> Dict[str, Any]:
     modules = (
         db.query(Module)
         .filter(Module.course_id == course_id)
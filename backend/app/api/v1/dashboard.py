@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.api.deps import get_current_student
+from app.api.v1.courses import load_course_lists
+from app.api.v1.deadlines import collect_deadlines
+from app.api.v1.feed import collect_feed
+from app.api.v1.grades import collect_grades
+from app.api.v1.progress import list_progress
+from app.core.config import settings
+from app.core.profiling import TimedRoute
+from app.db.session import SessionLocal
+from app.schemas.dashboard import DashboardResponse
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/me", tags=["dashboard"], route_class=TimedRoute)
+
+SECTIONS = ("courses", "deadlines", "feed", "grades", "progress")
+
+# Every running section holds a pooled connection; without a bound a few concurrent
+# dashboards would take the whole pool from the rest of the worker's requests.
+section_slots = threading.BoundedSemaphore(settings.dashboard_max_concurrent_sections)
+
+
+def parse_sections(value: Optional[str]) -> Tuple[str, ...]:
+    if not value:
+        return SECTIONS
+    requested = tuple(dict.fromkeys(part.strip() for part in value.split(",") if part.strip()))
+    unknown = [name for name in requested if name not in SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown dashboard sections: {', '.join(unknown)}",
+        )
+    return requested
+
+
+def run_in_session(loader: Callable[[Session], Any]) -> Any:
+    """Run a section loader in its own session: sessions are not thread-safe.
+
+    Sections wait for one of the worker's ``section_slots`` first, so a busy
+    dashboard degrades to "timeout" instead of exhausting the pool.
+    """
+    with section_slots:
+        db = SessionLocal()
+        try:
+            return loader(db)
+        finally:
+            db.close()
+
+
+async def gather_sections(
+    loaders: Dict[str, Callable[[], Any]], timeout: float
+) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """Run blocking section loaders concurrently with a soft per-section timeout.
+
+    A section that times out or fails is reported in ``degraded`` instead of
+    failing the whole response. Timed out loaders keep running in the
+    threadpool until they finish; their results are discarded.
+    """
+    names = list(loaders)
+    outcomes = await asyncio.gather(
+        *(asyncio.wait_for(run_in_threadpool(loaders[name]), timeout=timeout) for name in names),
+        return_exceptions=True,
+    )
+    results: Dict[str, Any] = {}
+    degraded: Dict[str, str] = {}
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            degraded[name] = "timeout"
+        elif isinstance(outcome, Exception):
+            logger.exception("Dashboard section %s failed", name, exc_info=outcome)
+            degraded[name] = "error"
+        else:
+            results[name] = outcome
+    return results, degraded
+
+
+@router.get("/dashboard", response_model=DashboardResponse, summary="Student home page sections in one response")
+async def get_dashboard(
+    current_user=Depends(get_current_student),
+    sections: Optional[str] = Query(None, description="Comma-separated sections, e.g. courses,feed"),
+    feed_limit: int = Query(20, ge=1, le=100, description="Max number of feed items"),
+):
+    student_id = current_user.id
+    section_loaders: Dict[str, Callable[[Session], Any]] = {
+        "courses": lambda db: load_course_lists(db, student_id),
+        "deadlines": lambda db: collect_deadlines(db, student_id),
+        "feed": lambda db: collect_feed(db, student_id, feed_limit),
+        "grades": lambda db: collect_grades(db, student_id),
+        "progress": lambda db: list_progress(db, student_id),
+    }
+    loaders = {
+        name: (lambda loader=section_loaders[name]: run_in_session(loader))
+        for name in parse_sections(sections)
+    }
+    results, degraded = await gather_sections(loaders, settings.dashboard_section_timeout_seconds)
+    return DashboardResponse(**results, degraded=degraded)
@@ -2,15 +2,17 @@ from datetime import datetime, timedelta
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import DateTime, bindparam, or_, select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_student
+from app.core.profiling import TimedRoute
 from app.db.session import get_db
 from app.models.assignment import Assignment, Submission, SubmissionStatus
-from app.models.course import Course, Lesson, Module, Enrollment
+from app.models.course import Course, Lesson, Enrollment
 from app.schemas.deadline import DeadlineItem, DeadlineListResponse, DeadlineSeverity
 
-router = APIRouter(prefix="/deadlines", tags=["deadlines"])
+router = APIRouter(prefix="/deadlines", tags=["deadlines"], route_class=TimedRoute)
 
 
 def parse_date_param(value: Optional[str]) -> Optional[datetime]:
@@ -22,45 +24,52 @@ def parse_date_param(value: Optional[str]) -> Optional[datetime]:
         return None
 
 
-@router.get("/my", response_model=DeadlineListResponse, summary="Deadlines for current student")
-def get_my_deadlines(
-    current_user=Depends(get_current_student),
-    db: Session = Depends(get_db),
-    from_date: Optional[str] = Query(None, description="ISO date filter from"),
-    to_date: Optional[str] = Query(None, description="ISO date filter to"),
-):
-    from_dt = parse_date_param(from_date)
-    to_dt = parse_date_param(to_date)
-
-    assignments = (
-        db.query(Assignment, Course, Lesson)
-        .join(Lesson, Assignment.lesson_id == Lesson.id)
-        .join(Module, Lesson.module_id == Module.id)
-        .join(Course, Module.course_id == Course.id)
-        .join(Enrollment, Enrollment.course_id == Course.id)
-        .filter(Enrollment.student_id == current_user.id)
-        .all()
+_from_dt = bindparam("from_dt", type_=DateTime)
+_to_dt = bindparam("to_dt", type_=DateTime)
+_enrolled_courses = select(Enrollment.course_id).where(Enrollment.student_id == bindparam("student_id"))
+
+# Built once at import; see GRADES_STATEMENT in grades.py. Assignments without a due date
+# are always listed, whatever the range.
+DEADLINES_STATEMENT = (
+    select(Assignment, Course, Lesson)
+    .join(Lesson, Assignment.lesson_id == Lesson.id)
+    .join(Course, Assignment.course_id == Course.id)
+    .join(Enrollment, Enrollment.course_id == Assignment.course_id)
+    .where(Enrollment.student_id == bindparam("student_id"))
+    .where(or_(_from_dt.is_(None), Assignment.due_date.is_(None), Assignment.due_date >= _from_dt))
+    .where(or_(_to_dt.is_(None), Assignment.due_date.is_(None), Assignment.due_date <= _to_dt))
+)
+# every attempt of the student in enrolled courses, latest attempt of each assignment first
+SUBMISSIONS_STATEMENT = (
+    select(Submission)
+    .where(Submission.student_id == bindparam("student_id"))
+    .where(Submission.course_id.in_(_enrolled_courses))
+    .order_by(
+        Submission.assignment_id,
+        Submission.attempt_number.desc(),
+        Submission.submitted_at.desc().nullslast(),
+        Submission.id.desc(),
     )
+)
+
+
+def collect_deadlines(
+    db: Session,
+    student_id: int,
+    from_dt: Optional[datetime] = None,
+    to_dt: Optional[datetime] = None,
+) -> List[DeadlineItem]:
+    params = {"student_id": student_id, "from_dt": from_dt, "to_dt": to_dt}
+    assignments = db.execute(DEADLINES_STATEMENT, params).all()
+    latest_submissions = {}
+    for submission in db.execute(SUBMISSIONS_STATEMENT, {"student_id": student_id}).scalars():
+        latest_submissions.setdefault(submission.assignment_id, submission)
 
     items: List[DeadlineItem] = []
     today = datetime.utcnow().date()
 
     for assignment, course, lesson in assignments:
-        if from_dt and assignment.due_date and assignment.due_date < from_dt:
-            continue
-        if to_dt and assignment.due_date and assignment.due_date > to_dt:
-            continue
-
-        latest_submission = (
-            db.query(Submission)
-            .filter(Submission.assignment_id == assignment.id, Submission.student_id == current_user.id)
-            .order_by(
-                Submission.attempt_number.desc(),
-                Submission.submitted_at.desc().nullslast(),
-                Submission.id.desc(),
-            )
-            .first()
-        )
+        latest_submission = latest_submissions.get(assignment.id)
         if latest_submission is None:
             status = "not_submitted"
         elif latest_submission.status == SubmissionStatus.checked or latest_submission.checked_at or latest_submission.score is not None:
@@ -93,5 +102,15 @@ def get_my_deadlines(
             )
         )
 
-    items_sorted = sorted(items, key=lambda i: (i.due_date is None, i.due_date or datetime.max))
-    return DeadlineListResponse(items=items_sorted)
+    return sorted(items, key=lambda i: (i.due_date is None, i.due_date or datetime.max))
+
+
+@router.get("/my", response_model=DeadlineListResponse, summary="Deadlines for current student")
+def get_my_deadlines(
+    current_user=Depends(get_current_student),
+    db: Session = Depends(get_db),
+    from_date: Optional[str] = Query(None, description="ISO date filter from"),
+    to_date: Optional[str] = Query(None, description="ISO date filter to"),
+):
+    items = collect_deadlines(db, current_user.id, parse_date_param(from_date), parse_date_param(to_date))
+    return DeadlineListResponse(items=items)
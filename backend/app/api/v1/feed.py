@@ -2,44 +2,43 @@ from datetime import datetime, timedelta
 from typing import List, Set
 
 from fastapi import APIRouter, Depends, Query
+from sqlalchemy import bindparam, select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_student
+from app.core.profiling import TimedRoute
 from app.db.session import get_db
 from app.models.assignment import Assignment, Submission
-from app.models.course import Course, Lesson, Module, Enrollment
+from app.models.course import Course, Enrollment
 from app.schemas.feed import FeedItem, FeedItemType, FeedListResponse
 
-router = APIRouter(prefix="/feed", tags=["feed"])
+router = APIRouter(prefix="/feed", tags=["feed"], route_class=TimedRoute)
 
 
-@router.get("/my", response_model=FeedListResponse, summary="Recent feed for current student")
-def get_my_feed(
-    current_user=Depends(get_current_student),
-    db: Session = Depends(get_db),
-    limit: int = Query(20, ge=1, le=100, description="Max number of feed items"),
-):
-    window_start = datetime.utcnow() - timedelta(days=30)
+_enrolled_courses = select(Enrollment.course_id).where(Enrollment.student_id == bindparam("student_id"))
 
-    course_ids = [
-        c_id
-        for (c_id,) in db.query(Enrollment.course_id)
-        .filter(Enrollment.student_id == current_user.id)
-        .all()
-    ]
-    if not course_ids:
-        return FeedListResponse(items=[])
+# Built once at import; see GRADES_STATEMENT in grades.py.
+NEW_ASSIGNMENTS_STATEMENT = (
+    select(Assignment, Course)
+    .join(Course, Assignment.course_id == Course.id)
+    .where(Assignment.course_id.in_(_enrolled_courses))
+    .where(Assignment.created_at >= bindparam("window_start"))
+    .order_by(Assignment.created_at.desc())
+)
+GRADED_SUBMISSIONS_STATEMENT = (
+    select(Submission, Assignment, Course)
+    .join(Assignment, Submission.assignment_id == Assignment.id)
+    .join(Course, Submission.course_id == Course.id)
+    .where(Submission.student_id == bindparam("student_id"))
+    .where(Submission.checked_at.isnot(None))
+    .where(Submission.checked_at >= bindparam("window_start"))
+    .order_by(Submission.checked_at.desc())
+)
 
-    new_assignments = (
-        db.query(Assignment, Course)
-        .join(Lesson, Assignment.lesson_id == Lesson.id)
-        .join(Module, Lesson.module_id == Module.id)
-        .join(Course, Module.course_id == Course.id)
-        .filter(Course.id.in_(course_ids))
-        .filter(Assignment.created_at >= window_start)
-        .order_by(Assignment.created_at.desc())
-        .all()
-    )
+
+def collect_feed(db: Session, student_id: int, limit: int = 20) -> List[FeedItem]:
+    params = {"student_id": student_id, "window_start": datetime.utcnow() - timedelta(days=30)}
+    new_assignments = db.execute(NEW_ASSIGNMENTS_STATEMENT, params).all()
 
     feed_items: List[FeedItem] = []
     for assignment, course in new_assignments:
@@ -58,18 +57,7 @@ def get_my_feed(
             )
         )
 
-    submissions = (
-        db.query(Submission, Assignment, Course)
-        .join(Assignment, Submission.assignment_id == Assignment.id)
-        .join(Lesson, Assignment.lesson_id == Lesson.id)
-        .join(Module, Lesson.module_id == Module.id)
-        .join(Course, Module.course_id == Course.id)
-        .filter(Submission.student_id == current_user.id)
-        .filter(Submission.checked_at.isnot(None))
-        .filter(Submission.checked_at >= window_start)
-        .order_by(Submission.checked_at.desc())
-        .all()
-    )
+    submissions = db.execute(GRADED_SUBMISSIONS_STATEMENT, params).all()
     seen_assignments: Set[int] = set()
     for submission, assignment, course in submissions:
         if assignment.id in seen_assignments:
@@ -90,5 +78,13 @@ def get_my_feed(
             )
         )
 
-    feed_items_sorted = sorted(feed_items, key=lambda item: item.created_at, reverse=True)[:limit]
-    return FeedListResponse(items=feed_items_sorted)
+    return sorted(feed_items, key=lambda item: item.created_at, reverse=True)[:limit]
+
+
+@router.get("/my", response_model=FeedListResponse, summary="Recent feed for current student")
+def get_my_feed(
+    current_user=Depends(get_current_student),
+    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100, description="Max number of feed items"),
+):
+    return FeedListResponse(items=collect_feed(db, current_user.id, limit))
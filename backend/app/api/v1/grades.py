@@ -1,45 +1,46 @@
+from typing import List
+
 from fastapi import APIRouter, Depends
-from sqlalchemy import func
+from sqlalchemy import bindparam, func, select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_student
+from app.core.profiling import TimedRoute
 from app.db.session import get_db
 from app.models.assignment import Assignment, Submission
-from app.models.course import Course, Lesson, Module
+from app.models.course import Course
 from app.schemas.grade import GradeItem, GradeListResponse
 
-router = APIRouter(prefix="/grades", tags=["grades"])
+router = APIRouter(prefix="/grades", tags=["grades"], route_class=TimedRoute)
 
 
-@router.get("/my", response_model=GradeListResponse, summary="Latest grades per assignment for current student")
-def get_my_grades(current_user=Depends(get_current_student), db: Session = Depends(get_db)):
-    latest_attempts = (
-        db.query(
-            Submission.assignment_id,
-            func.max(Submission.attempt_number).label("max_attempt"),
-        )
-        .filter(Submission.student_id == current_user.id)
-        .group_by(Submission.assignment_id)
-        .subquery()
-    )
+_latest_attempts = (
+    select(Submission.assignment_id, func.max(Submission.attempt_number).label("max_attempt"))
+    .where(Submission.student_id == bindparam("student_id"))
+    .group_by(Submission.assignment_id)
+    .subquery()
+)
 
-    submissions = (
-        db.query(Submission, Assignment, Course)
-        .join(
-            latest_attempts,
-            (Submission.assignment_id == latest_attempts.c.assignment_id)
-            & (Submission.attempt_number == latest_attempts.c.max_attempt),
-        )
-        .join(Assignment, Submission.assignment_id == Assignment.id)
-        .join(Lesson, Assignment.lesson_id == Lesson.id)
-        .join(Module, Lesson.module_id == Module.id)
-        .join(Course, Module.course_id == Course.id)
-        .filter(Submission.student_id == current_user.id)
-        .order_by(Submission.checked_at.desc().nullslast(), Submission.submitted_at.desc())
-        .all()
+# Built once at import: executions only bind parameters and reuse the memoized cache key
+# and compiled SQL (see benchmarks/bench_statements.py).
+GRADES_STATEMENT = (
+    select(Submission, Assignment, Course)
+    .join(
+        _latest_attempts,
+        (Submission.assignment_id == _latest_attempts.c.assignment_id)
+        & (Submission.attempt_number == _latest_attempts.c.max_attempt),
     )
+    .join(Assignment, Submission.assignment_id == Assignment.id)
+    .join(Course, Submission.course_id == Course.id)
+    .where(Submission.student_id == bindparam("student_id"))
+    .order_by(Submission.checked_at.desc().nullslast(), Submission.submitted_at.desc())
+)
 
-    items = [
+
+def collect_grades(db: Session, student_id: int) -> List[GradeItem]:
+    submissions = db.execute(GRADES_STATEMENT, {"student_id": student_id}).all()
+
+    return [
         GradeItem(
             assignment_id=sub.assignment_id,
             assignment_title=assignment.title,
@@ -55,4 +56,8 @@ def get_my_grades(current_user=Depends(get_current_student), db: Session = Depen
         )
         for sub, assignment, course in submissions
     ]
-    return GradeListResponse(items=items)
+
+
+@router.get("/my", response_model=GradeListResponse, summary="Latest grades per assignment for current student")
+def get_my_grades(current_user=Depends(get_current_student), db: Session = Depends(get_db)):
+    return GradeListResponse(items=collect_grades(db, current_user.id))
@@ -0,0 +1,232 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Set
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import and_, case, exists, or_, select, update
+from sqlalchemy.orm import Session, aliased
+
+from app.api.deps import get_current_teacher
+from app.core.cache import cache, course_tag
+from app.core.config import settings
+from app.core.profiling import TimedRoute
+from app.db.session import get_db
+from app.models.assignment import Assignment, Submission, SubmissionStatus
+from app.models.course import Course
+from app.schemas.grading import (
+    BulkGradeRequest,
+    BulkGradeResponse,
+    ClaimedSubmission,
+    GradeUpdate,
+    RejectedGrade,
+    ReviewQueueClaimResponse,
+    ReviewQueueReleaseRequest,
+)
+from app.services.events import SUBMISSION_GRADED, publish_many
+
+router = APIRouter(prefix="/grading", tags=["grading"], route_class=TimedRoute)
+
+
+def newer_attempt_exists():
+    newer = aliased(Submission)
+    return exists().where(
+        newer.assignment_id == Submission.assignment_id,
+        newer.student_id == Submission.student_id,
+        newer.attempt_number > Submission.attempt_number,
+    )
+
+
+def apply_grades(db: Session, teacher_id: int, items: List[GradeUpdate]) -> BulkGradeResponse:
+    """Validate and apply a batch of grades with a single UPDATE.
+
+    Each grade carries the attempt number the teacher graded. It is rejected
+    as ``stale`` if that is no longer the submission's attempt or if the
+    student has submitted a newer attempt since.
+    """
+    rejected: List[RejectedGrade] = []
+    by_id: Dict[int, GradeUpdate] = {}
+    for item in items:
+        if item.submission_id in by_id:
+            rejected.append(RejectedGrade(submission_id=item.submission_id, reason="duplicate"))
+            continue
+        by_id[item.submission_id] = item
+
+    rows = db.execute(
+        select(
+            Submission.id,
+            Submission.attempt_number,
+            Submission.student_id,
+            Submission.assignment_id,
+            Assignment.max_score,
+            Course.id.label("course_id"),
+            Course.owner_id,
+            newer_attempt_exists().label("has_newer"),
+        )
+        .join(Assignment, Submission.assignment_id == Assignment.id)
+        .join(Course, Submission.course_id == Course.id)
+        .where(Submission.id.in_(list(by_id)))
+    ).all()
+    found = {row.id: row for row in rows}
+
+    valid: Dict[int, GradeUpdate] = {}
+    for submission_id, item in by_id.items():
+        row = found.get(submission_id)
+        if row is None:
+            reason = "not_found"
+        elif row.owner_id != teacher_id:
+            reason = "forbidden"
+        elif row.attempt_number != item.attempt_number or row.has_newer:
+            reason = "stale"
+        elif not 0 <= item.score <= row.max_score:
+            reason = "score_out_of_range"
+        else:
+            valid[submission_id] = item
+            continue
+        rejected.append(RejectedGrade(submission_id=submission_id, reason=reason))
+
+    updated: List[int] = []
+    if valid:
+        values = {
+            "score": case({sid: item.score for sid, item in valid.items()}, value=Submission.id),
+            "status": SubmissionStatus.checked,
+            "checked_at": datetime.utcnow(),
+            "claimed_by_id": None,
+            "claim_expires_at": None,
+        }
+        comments = {sid: item.teacher_comment for sid, item in valid.items() if item.teacher_comment is not None}
+        if comments:
+            values["teacher_comment"] = case(comments, value=Submission.id, else_=Submission.teacher_comment)
+        # The attempt checks are repeated here so that a submission landing between the
+        # SELECT above and this statement still makes the grade stale.
+        statement = (
+            update(Submission)
+            .where(
+                and_(
+                    Submission.id.in_(list(valid)),
+                    Submission.attempt_number == case(
+                        {sid: item.attempt_number for sid, item in valid.items()}, value=Submission.id
+                    ),
+                    ~newer_attempt_exists(),
+                )
+            )
+            .values(**values)
+            .returning(Submission.id)
+            .execution_options(synchronize_session=False)
+        )
+        updated = sorted(db.execute(statement).scalars().all())
+        for submission_id in sorted(set(valid) - set(updated)):
+            rejected.append(RejectedGrade(submission_id=submission_id, reason="stale"))
+
+    # Progress and funnel stats are recomputed by the event handlers, once per batch.
+    publish_many(
+        db,
+        SUBMISSION_GRADED,
+        [
+            {"submission_id": sid, "assignment_id": found[sid].assignment_id, "student_id": found[sid].student_id}
+            for sid in updated
+        ],
+    )
+    db.commit()
+
+    course_ids: Set[int] = {found[sid].course_id for sid in updated}
+    cache.invalidate(tags=[course_tag(course_id) for course_id in sorted(course_ids)])
+    return BulkGradeResponse(updated=updated, rejected=sorted(rejected, key=lambda r: r.submission_id))
+
+
+@router.post("/bulk", response_model=BulkGradeResponse, summary="Grade many submissions at once (teacher)")
+def bulk_grade(
+    payload: BulkGradeRequest,
+    current_user=Depends(get_current_teacher),
+    db: Session = Depends(get_db),
+):
+    return apply_grades(db, current_user.id, payload.items)
+
+
+def claim_submissions(db: Session, teacher_id: int, limit: int, lease_seconds: int) -> List[ClaimedSubmission]:
+    """Lease the next ungraded submissions of the teacher's courses.
+
+    Candidates are picked with ``FOR UPDATE SKIP LOCKED`` so concurrent graders
+    never wait on each other's rows; the conditional UPDATE re-checks the lease
+    so that databases without SKIP LOCKED (SQLite) still never double-claim.
+    """
+    now = datetime.utcnow()
+    claimable = or_(Submission.claim_expires_at.is_(None), Submission.claim_expires_at < now)
+    candidate_ids = (
+        db.execute(
+            select(Submission.id)
+            .join(Assignment, Submission.assignment_id == Assignment.id)
+            .join(Course, Submission.course_id == Course.id)
+            .where(Course.owner_id == teacher_id, Submission.status == SubmissionStatus.submitted, claimable)
+            .order_by(Assignment.due_date.asc().nullslast(), Submission.submitted_at.asc(), Submission.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True, of=Submission)
+        )
+        .scalars()
+        .all()
+    )
+    if not candidate_ids:
+        db.commit()
+        return []
+    expires_at = now + timedelta(seconds=lease_seconds)
+    claimed_ids = (
+        db.execute(
+            update(Submission)
+            .where(Submission.id.in_(candidate_ids), Submission.status == SubmissionStatus.submitted, claimable)
+            .values(claimed_by_id=teacher_id, claim_expires_at=expires_at)
+            .returning(Submission.id)
+            .execution_options(synchronize_session=False)
+        )
+        .scalars()
+        .all()
+    )
+    rows = db.execute(
+        select(Submission, Assignment.title, Assignment.due_date, Submission.course_id)
+        .join(Assignment, Submission.assignment_id == Assignment.id)
+        .where(Submission.id.in_(claimed_ids))
+        .order_by(Assignment.due_date.asc().nullslast(), Submission.submitted_at.asc(), Submission.id)
+    ).all()
+    items = [
+        ClaimedSubmission(
+            submission_id=submission.id,
+            assignment_id=submission.assignment_id,
+            assignment_title=title,
+            course_id=course_id,
+            student_id=submission.student_id,
+            attempt_number=submission.attempt_number,
+            submitted_at=submission.submitted_at,
+            due_date=due_date,
+            claim_expires_at=expires_at,
+        )
+        for submission, title, due_date, course_id in rows
+    ]
+    db.commit()
+    return items
+
+
+def release_claims(db: Session, teacher_id: int, submission_ids: List[int]) -> int:
+    released = db.execute(
+        update(Submission)
+        .where(Submission.id.in_(submission_ids), Submission.claimed_by_id == teacher_id)
+        .values(claimed_by_id=None, claim_expires_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return released
+
+
+@router.post("/queue/claim", response_model=ReviewQueueClaimResponse, summary="Claim next submissions to grade (teacher)")
+def claim_review_queue(
+    limit: int = Query(10, ge=1, le=100),
+    current_user=Depends(get_current_teacher),
+    db: Session = Depends(get_db),
+):
+    items = claim_submissions(db, current_user.id, limit, settings.review_claim_lease_seconds)
+    return ReviewQueueClaimResponse(items=items)
+
+
+@router.post("/queue/release", summary="Return claimed submissions to the queue (teacher)")
+def release_review_queue(
+    payload: ReviewQueueReleaseRequest,
+    current_user=Depends(get_current_teacher),
+    db: Session = Depends(get_db),
+):
+    return {"released": release_claims(db, current_user.id, payload.submission_ids)}
@@ -0,0 +1,49 @@
+import json
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.core.profiling import TimedRoute
+from app.db.session import get_db
+from app.models.job import Job
+from app.schemas.job import JobRead
+
+router = APIRouter(prefix="/jobs", tags=["jobs"], route_class=TimedRoute)
+
+
+def to_job_read(job: Job) -> JobRead:
+    return JobRead(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        priority=job.priority,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        progress=job.progress,
+        progress_message=job.progress_message,
+        result=json.loads(job.result) if job.result else None,
+        last_error=job.last_error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+
+@router.get("", response_model=List[JobRead], summary="Recent jobs started by the current user")
+def list_my_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    jobs = db.query(Job).filter(Job.created_by_id == current_user.id).order_by(Job.id.desc()).limit(limit).all()
+    return [to_job_read(job) for job in jobs]
+
+
+@router.get("/{job_id}", response_model=JobRead, summary="Status and progress of a job")
+def get_job(job_id: int, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
+    job = db.query(Job).filter(Job.id == job_id, Job.created_by_id == current_user.id).first()
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return to_job_read(job)
@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.core.profiling import TimedRoute
+from app.db.session import get_db
+from app.models.course import Course, Enrollment
+from app.schemas.leaderboard import LeaderboardMetric, LeaderboardRead
+from app.services.leaderboards import read_leaderboard
+
+router = APIRouter(prefix="/courses/{course_id}/leaderboard", tags=["leaderboards"], route_class=TimedRoute)
+
+
+@router.get("", response_model=LeaderboardRead, summary="Course leaderboard: top, own rank and neighbours")
+def get_leaderboard(
+    course_id: int,
+    metric: LeaderboardMetric = Query(LeaderboardMetric.points),
+    limit: int = Query(10, ge=1, le=100),
+    around: int = Query(2, ge=0, le=20, description="Rows above and below the current student"),
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    owner_id = db.execute(select(Course.owner_id).where(Course.id == course_id)).scalar()
+    if owner_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+    enrolled = db.execute(
+        select(Enrollment.id).where(Enrollment.course_id == course_id, Enrollment.student_id == current_user.id)
+    ).first()
+    if enrolled is None and owner_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enrolled in the course")
+    return read_leaderboard(db, course_id, current_user.id, metric, limit, around)
@@ -1,28 +1,141 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_student
+from app.core.cache import MISSING, cache
+from app.core.config import settings
+from app.core.profiling import TimedRoute
 from app.db.session import get_db
 from app.models.assignment import Assignment
-from app.models.course import Lesson
+from app.models.course import Lesson, LessonRendition
+from app.schemas.assignment import AssignmentRead
+from app.services.lesson_content import lesson_tag, preview, render_lesson
+
+router = APIRouter(prefix="/lessons", tags=["lessons"], route_class=TimedRoute)
+
+IMMUTABLE = "private, max-age=31536000, immutable"
+
 
-router = APIRouter(prefix="/lessons", tags=["lessons"])
+def content_path(lesson_id: int, version: int) -> str:
+    return f"/api/v1/lessons/{lesson_id}/content/{version}"
+
+
+def load_rendition(db: Session, lesson_id: int) -> Optional[LessonRendition]:
+    rendition = db.query(LessonRendition).filter(LessonRendition.lesson_id == lesson_id).first()
+    if rendition is None:
+        # written before renditions existed and not backfilled yet
+        lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+        if lesson is None:
+            return None
+        render_lesson(lesson)
+        db.commit()
+        rendition = lesson.rendition
+    return rendition
 
 
 @router.get("/{lesson_id}", summary="Lesson details for students")
 def get_lesson(lesson_id: int, current_user=Depends(get_current_student), db: Session = Depends(get_db)):
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
-    if not lesson:
+    def load():
+        row = (
+            db.query(
+                Lesson.id,
+                Lesson.title,
+                Lesson.short_description,
+                Lesson.order_index,
+                Lesson.module_id,
+                LessonRendition.version,
+                LessonRendition.html,
+                LessonRendition.plain_text,
+                Assignment,
+            )
+            .outerjoin(LessonRendition, LessonRendition.lesson_id == Lesson.id)
+            .outerjoin(Assignment, Assignment.lesson_id == Lesson.id)
+            .filter(Lesson.id == lesson_id)
+            .first()
+        )
+        if row is None:
+            return None
+        version, html, plain_text = row.version, row.html, row.plain_text
+        if version is None:
+            rendition = load_rendition(db, lesson_id)
+            version, html, plain_text = rendition.version, rendition.html, rendition.plain_text
+        return {
+            "lesson": {
+                "id": row.id,
+                "title": row.title,
+                "short_description": row.short_description,
+                "content_html": html,
+                "content_version": version,
+                "content_url": content_path(row.id, version),
+                "preview": preview(plain_text),
+                "order_index": row.order_index,
+                "module_id": row.module_id,
+            },
+            "assignment": AssignmentRead.from_orm(row.Assignment).dict() if row.Assignment is not None else None,
+        }
+
+    body = cache.get_or_load(f"lesson:{lesson_id}", load, tags=[lesson_tag(lesson_id)])
+    if body is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
-    assignment = db.query(Assignment).filter(Assignment.lesson_id == lesson_id).first()
-    return {
-        "lesson": {
-            "id": lesson.id,
-            "title": lesson.title,
-            "short_description": lesson.short_description,
-            "content_html": lesson.content_html,
-            "order_index": lesson.order_index,
-            "module_id": lesson.module_id,
-        },
-        "assignment": assignment,
-    }
+    return body
+
+
+def pick_encoding(accept_encoding: Optional[str], has_brotli: bool) -> Optional[str]:
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    if has_brotli and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+@router.get("/{lesson_id}/content/{version}", summary="Rendered lesson HTML, cacheable forever")
+def get_lesson_content(
+    lesson_id: int,
+    version: int,
+    request: Request,
+    accept_encoding: Optional[str] = Header(None),
+    current_user=Depends(get_current_student),
+    db: Session = Depends(get_db),
+):
+    def load():
+        rendition = (
+            db.query(LessonRendition)
+            .filter(LessonRendition.lesson_id == lesson_id, LessonRendition.version == version)
+            .first()
+        )
+        if rendition is None:
+            return None
+        return {"html": rendition.html.encode(), "gzip": rendition.html_gzip, "br": rendition.html_br}
+
+    # a version's content never changes, so the key needs no invalidation; misses are not
+    # cached because a version that does not exist yet may exist a moment later
+    key = f"lesson:{lesson_id}:content:{version}"
+    content = cache.get(key)
+    if content is MISSING:
+        content = load()
+        if content is not None:
+            cache.set(key, content, ttl=settings.lesson_content_cache_ttl_seconds)
+    if content is None:
+        rendition = load_rendition(db, lesson_id)
+        if rendition is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Lesson not found")
+        return RedirectResponse(content_path(lesson_id, rendition.version), status_code=status.HTTP_302_FOUND)
+
+    etag = f'"lesson-{lesson_id}-v{version}"'
+    headers = {"Cache-Control": IMMUTABLE, "ETag": etag, "Vary": "Accept-Encoding"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    encoding = pick_encoding(accept_encoding, content["br"] is not None)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    body = content[encoding] if encoding is not None else content["html"]
+    return Response(body, media_type="text/html; charset=utf-8", headers=headers)
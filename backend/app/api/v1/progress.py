@@ -1,62 +1,78 @@
+from datetime import datetime
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import bindparam, func, select
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_student
+from app.api.deps import get_current_student, get_current_teacher
+from app.api.v1.jobs import to_job_read
+from app.core.profiling import TimedRoute
 from app.db.session import get_db
 from app.models.assignment import Assignment, Submission, SubmissionStatus
 from app.models.course import Course, Lesson, Module
 from app.models.progress import ProgressSnapshot
+from app.schemas.job import JobRead
 from app.schemas.progress import ProgressSnapshotRead
+from app.services.jobs import enqueue
 
-router = APIRouter(prefix="/progress", tags=["progress"])
+router = APIRouter(prefix="/progress", tags=["progress"], route_class=TimedRoute)
+
+RECOMPUTE_COURSE_PROGRESS = "progress.recompute_course"
+
+
+# Built once at import; see GRADES_STATEMENT in grades.py.
+TOTAL_LESSONS_STATEMENT = (
+    select(func.count(Lesson.id))
+    .join(Module, Lesson.module_id == Module.id)
+    .where(Module.course_id == bindparam("course_id"))
+)
+COMPLETED_LESSONS_STATEMENT = (
+    select(func.count(func.distinct(Assignment.lesson_id)))
+    .join(Submission, Submission.assignment_id == Assignment.id)
+    .where(Submission.course_id == bindparam("course_id"), Submission.student_id == bindparam("student_id"))
+    .where(Submission.status.in_([SubmissionStatus.submitted, SubmissionStatus.checked]))
+)
+AVG_SCORE_STATEMENT = select(func.avg(Submission.score)).where(
+    Submission.course_id == bindparam("course_id"), Submission.student_id == bindparam("student_id")
+)
+SNAPSHOT_STATEMENT = select(ProgressSnapshot).where(
+    ProgressSnapshot.student_id == bindparam("student_id"), ProgressSnapshot.course_id == bindparam("course_id")
+)
+
+
+def refresh_progress(db: Session, student_id: int, course_id: int) -> ProgressSnapshot:
+    """Recompute the student's snapshot for a course in the current transaction."""
+    params = {"student_id": student_id, "course_id": course_id}
+    total_lessons = db.execute(TOTAL_LESSONS_STATEMENT, params).scalar_one()
+    completed_lessons = db.execute(COMPLETED_LESSONS_STATEMENT, params).scalar() or 0
+    avg_score = db.execute(AVG_SCORE_STATEMENT, params).scalar()
+    snapshot = db.execute(SNAPSHOT_STATEMENT, params).scalars().first()
+    if snapshot is None:
+        snapshot = ProgressSnapshot(student_id=student_id, course_id=course_id)
+        db.add(snapshot)
+    snapshot.completed_lessons_count = completed_lessons
+    snapshot.total_lessons_count = total_lessons
+    snapshot.avg_score = avg_score
+    snapshot.updated_at = datetime.utcnow()
+    return snapshot
 
 
 def calculate_progress(db: Session, student_id: int, course_id: int) -> ProgressSnapshot:
-    total_lessons = (
-        db.query(Lesson)
-        .join(Module, Lesson.module_id == Module.id)
-        .filter(Module.course_id == course_id)
-        .count()
-    )
-    completed_lessons = (
-        db.query(func.count(func.distinct(Lesson.id)))
-        .join(Module, Lesson.module_id == Module.id)
-        .join(Assignment, Assignment.lesson_id == Lesson.id, isouter=True)
-        .join(Submission, Submission.assignment_id == Assignment.id, isouter=True)
-        .filter(Module.course_id == course_id)
-        .filter(Submission.student_id == student_id)
-        .filter(Submission.status.in_([SubmissionStatus.submitted, SubmissionStatus.checked]))
-        .scalar()
-        or 0
-    )
-    avg_score = (
-        db.query(func.avg(Submission.score))
-        .join(Assignment, Submission.assignment_id == Assignment.id)
-        .join(Lesson, Assignment.lesson_id == Lesson.id)
-        .join(Module, Lesson.module_id == Module.id)
-        .filter(Module.course_id == course_id, Submission.student_id == student_id)
-        .scalar()
-    )
-    snapshot = ProgressSnapshot(
-        student_id=student_id,
-        course_id=course_id,
-        completed_lessons_count=completed_lessons,
-        total_lessons_count=total_lessons,
-        avg_score=avg_score,
-    )
-    db.add(snapshot)
+    snapshot = refresh_progress(db, student_id, course_id)
     db.commit()
     db.refresh(snapshot)
     return snapshot
 
 
+def list_progress(db: Session, student_id: int) -> List[ProgressSnapshotRead]:
+    snapshots = db.query(ProgressSnapshot).filter(ProgressSnapshot.student_id == student_id).all()
+    return [ProgressSnapshotRead.from_orm(snapshot) for snapshot in snapshots]
+
+
 @router.get("/my", response_model=List[ProgressSnapshotRead], summary="Progress snapshots across courses")
 def list_my_progress(current_user=Depends(get_current_student), db: Session = Depends(get_db)):
-    snapshots = db.query(ProgressSnapshot).filter(ProgressSnapshot.student_id == current_user.id).all()
-    return snapshots
+    return list_progress(db, current_user.id)
 
 
 @router.get("/my/{course_id}", response_model=ProgressSnapshotRead, summary="Progress snapshot for a specific course")
@@ -72,3 +88,26 @@ def get_progress(course_id: int, current_user=Depends(get_current_student), db:
     if snapshot:
         return snapshot
     return calculate_progress(db, current_user.id, course_id)
+
+
+@router.post(
+    "/courses/{course_id}/recompute",
+    response_model=JobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Recompute progress of every enrolled student in the background (teacher)",
+)
+def recompute_course_progress(course_id: int, current_user=Depends(get_current_teacher), db: Session = Depends(get_db)):
+    course = db.query(Course).filter(Course.id == course_id).first()
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if course.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not the course owner")
+    job = enqueue(
+        db,
+        RECOMPUTE_COURSE_PROGRESS,
+        {"course_id": course_id},
+        dedupe_key=f"progress:course:{course_id}",
+        created_by_id=current_user.id,
+    )
+    db.commit()
+    return to_job_read(job)
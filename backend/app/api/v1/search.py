@@ -0,0 +1,24 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.core.profiling import TimedRoute
+from app.db.session import get_db
+from app.schemas.search import SearchKind, SearchResponse
+from app.services.search import search
+
+router = APIRouter(prefix="/search", tags=["search"], route_class=TimedRoute)
+
+
+@router.get("", response_model=SearchResponse, summary="Search courses, lessons and course chat")
+def search_everything(
+    q: str = Query(..., min_length=2, max_length=200),
+    kind: Optional[List[SearchKind]] = Query(None, description="Restrict to these kinds; repeat the parameter"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    return search(db, current_user.id, q, kind, limit, offset)
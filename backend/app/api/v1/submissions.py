@@ -9,10 +9,13 @@ from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_student
 from app.core.config import settings
+from app.core.metrics import upload_bytes
+from app.core.profiling import TimedRoute
 from app.db.session import get_db
 from app.models.assignment import Assignment, Submission, SubmissionFile, SubmissionStatus
+from app.services.events import SUBMISSION_CREATED, publish
 
-router = APIRouter(prefix="/submissions", tags=["submissions"])
+router = APIRouter(prefix="/submissions", tags=["submissions"], route_class=TimedRoute)
 
 
 @router.get("/my", summary="List submissions of the current student")
@@ -49,6 +52,12 @@ async def submit_assignment(
         submitted_at=now,
     )
     db.add(submission)
+    db.flush()
+    publish(
+        db,
+        SUBMISSION_CREATED,
+        {"submission_id": submission.id, "assignment_id": assignment_id, "student_id": current_user.id},
+    )
     db.commit()
     db.refresh(submission)
     if files:
@@ -56,8 +65,10 @@ async def submit_assignment(
         os.makedirs(submission_dir, exist_ok=True)
         for upload in files:
             file_location = os.path.join(submission_dir, upload.filename)
+            content = await upload.read()
             with open(file_location, "wb") as f:
-                f.write(await upload.read())
+                f.write(content)
+            upload_bytes.inc(len(content), "submission")
             submission_file = SubmissionFile(
                 submission_id=submission.id,
                 file_path=file_location.replace(settings.media_root, "").lstrip(os.sep),
@@ -1,10 +1,14 @@
-from datetime import datetime
-from typing import List
+from datetime import datetime, timedelta
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, status
+from sqlalchemy import Boolean, DateTime, Integer, String, case, insert, literal, select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_student, get_current_teacher
+from app.core.cache import cache, course_tag, test_attempts_tag, test_tag
+from app.core.config import settings
+from app.core.profiling import TimedRoute
 from app.db.session import get_db
 from app.models.course import Course, Enrollment
 from app.models.test import (
@@ -12,8 +16,6 @@ from app.models.test import (
     TestAttempt,
     TestQuestion,
     TestOption,
-    TestAnswer,
-    QuestionType,
 )
 from app.schemas.test import (
     TestListResponse,
@@ -26,9 +28,28 @@ from app.schemas.test import (
     TestSubmitResult,
     TestCreate,
     TestQuestionCreate,
+    TestImport,
+    TestImportResult,
+    TestCloneRequest,
+    TestItemAnalysis,
+    TimedAttemptRead,
+    AutosaveResult,
+    QuestionAnswerPayload,
 )
+from app.services.attempts import (
+    Answers,
+    AttemptMeta,
+    attempt_meta_key,
+    autosave_buffer,
+    decode_answers,
+    finish_attempt,
+    load_attempt_meta,
+    open_attempt,
+    start_attempt,
+)
+from app.services.item_analysis import compute_item_analysis
 
-router = APIRouter(prefix="", tags=["tests"])
+router = APIRouter(prefix="", tags=["tests"], route_class=TimedRoute)
 
 
 def ensure_student_enrolled(db: Session, student_id: int, course_id: int) -> None:
@@ -64,12 +85,16 @@ def list_tests_for_course(course_id: int, current_user=Depends(get_current_stude
 
 @router.get("/tests/{test_id}", response_model=TestRead, summary="Получить тест с вопросами")
 def get_test(test_id: int, current_user=Depends(get_current_student), db: Session = Depends(get_db)):
-    test = db.query(Test).filter(Test.id == test_id, Test.is_published.is_(True)).first()
-    if not test:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тест не найден")
-    ensure_student_enrolled(db, current_user.id, test.course_id)
-    # options include only text/id in schema, так что флаги корректности не утекут
-    return TestRead.from_orm(test)
+    def load() -> TestRead:
+        test = db.query(Test).filter(Test.id == test_id, Test.is_published.is_(True)).first()
+        if not test:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тест не найден")
+        # options include only text/id in schema, так что флаги корректности не утекут
+        return TestRead.from_orm(test)
+
+    test_read = cache.get_or_load(f"test:{test_id}:read", load, tags=[test_tag(test_id)])
+    ensure_student_enrolled(db, current_user.id, test_read.course_id)
+    return test_read
 
 
 @router.get("/tests/{test_id}/attempts/my", response_model=TestAttemptListResponse, summary="Попытки теста текущего студента")
@@ -87,6 +112,17 @@ def get_my_attempts(test_id: int, current_user=Depends(get_current_student), db:
     return TestAttemptListResponse(items=[TestAttemptResult.from_orm(a) for a in attempts])
 
 
+def to_answers(payload: TestSubmitPayload) -> Answers:
+    return {answer.question_id: answer.selected_option_ids for answer in payload.answers}
+
+
+def to_payload(answers: Answers) -> List[QuestionAnswerPayload]:
+    return [
+        QuestionAnswerPayload(question_id=question_id, selected_option_ids=options)
+        for question_id, options in sorted(answers.items())
+    ]
+
+
 @router.post("/tests/{test_id}/submit", response_model=TestSubmitResult, summary="Отправить ответы на тест")
 def submit_test(
     test_id: int,
@@ -98,52 +134,88 @@ def submit_test(
     if not test:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тест не найден")
     ensure_student_enrolled(db, current_user.id, test.course_id)
-    questions: List[TestQuestion] = (
-        db.query(TestQuestion)
-        .filter(TestQuestion.test_id == test_id)
-        .order_by(TestQuestion.order_index)
-        .all()
-    )
-    if not questions:
+    if not db.query(TestQuestion.id).filter(TestQuestion.test_id == test_id).first():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="В тесте нет вопросов")
 
-    question_map = {q.id: q for q in questions}
-    attempt = TestAttempt(test_id=test_id, student_id=current_user.id, started_at=datetime.utcnow())
-    db.add(attempt)
-    db.flush()
+    now = datetime.utcnow()
+    # A submit closes an attempt started through the attempts API, so its deadline applies.
+    attempt = open_attempt(db, test_id, current_user.id)
+    if attempt is None:
+        attempt = TestAttempt(test_id=test_id, student_id=current_user.id, started_at=now)
+        db.add(attempt)
+        db.flush()
+    finish_attempt(db, attempt, to_answers(payload), now)
+    db.commit()
+    cache.invalidate(keys=[attempt_meta_key(attempt.id)], tags=[test_attempts_tag(test_id)])
+    return TestSubmitResult(attempt_id=attempt.id, score=attempt.score, max_score=attempt.max_score)
+
+
+@router.post("/tests/{test_id}/attempts", response_model=TimedAttemptRead, summary="Начать или продолжить попытку")
+def start_timed_attempt(test_id: int, current_user=Depends(get_current_student), db: Session = Depends(get_db)):
+    test = db.query(Test).filter(Test.id == test_id, Test.is_published.is_(True)).first()
+    if not test:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тест не найден")
+    ensure_student_enrolled(db, current_user.id, test.course_id)
+    now = datetime.utcnow()
+    attempt = start_attempt(db, test, current_user.id, now)
+    db.commit()
+    draft = autosave_buffer.peek(attempt.id)
+    return TimedAttemptRead(
+        id=attempt.id,
+        test_id=test_id,
+        started_at=attempt.started_at,
+        deadline_at=attempt.deadline_at,
+        server_time=now,
+        answers=to_payload(draft if draft is not None else decode_answers(attempt.draft_answers)),
+    )
+
+
+@router.put("/test-attempts/{attempt_id}/answers", response_model=AutosaveResult, summary="Автосохранение ответов")
+def autosave_answers(
+    attempt_id: int,
+    payload: TestSubmitPayload,
+    current_user=Depends(get_current_student),
+    db: Session = Depends(get_db),
+):
+    def load() -> AttemptMeta:
+        meta = load_attempt_meta(db, attempt_id)
+        if meta is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Попытка не найдена")
+        return meta
+
+    # Autosave is the hottest write path: it is validated from the cache and only
+    # buffered here, the database sees it on the next batched flush.
+    meta = cache.get_or_load(attempt_meta_key(attempt_id), load)
+    if meta.student_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Попытка не найдена")
+    if meta.finished:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Попытка уже завершена")
+    now = datetime.utcnow()
+    if meta.deadline_at and now > meta.deadline_at + timedelta(seconds=settings.attempt_grace_seconds):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Время попытки истекло")
+    autosave_buffer.put(attempt_id, to_answers(payload), now)
+    return AutosaveResult(saved_at=now, deadline_at=meta.deadline_at)
 
-    correct_score = 0
-    max_score = len(questions)
-
-    for answer_payload in payload.answers:
-        question = question_map.get(answer_payload.question_id)
-        if not question:
-            continue
-        selected_option_ids = set(answer_payload.selected_option_ids)
-        # сохраняем ответы
-        for option_id in selected_option_ids:
-            option = db.query(TestOption).filter(TestOption.id == option_id, TestOption.question_id == question.id).first()
-            if not option:
-                continue
-            db.add(TestAnswer(attempt_id=attempt.id, question_id=question.id, option_id=option.id))
-
-        correct_options = {
-            opt.id
-            for opt in db.query(TestOption).filter(TestOption.question_id == question.id, TestOption.is_correct.is_(True))
-        }
-        if question.type == QuestionType.single:
-            if len(selected_option_ids) == 1 and selected_option_ids == correct_options:
-                correct_score += 1
-        else:
-            if selected_option_ids == correct_options and len(correct_options) > 0:
-                correct_score += 1
-
-    attempt.finished_at = datetime.utcnow()
-    attempt.score = float(correct_score)
-    attempt.max_score = max_score
+
+@router.post("/test-attempts/{attempt_id}/finish", response_model=TestSubmitResult, summary="Завершить попытку")
+def finish_timed_attempt(
+    attempt_id: int,
+    payload: Optional[TestSubmitPayload] = Body(None),
+    current_user=Depends(get_current_student),
+    db: Session = Depends(get_db),
+):
+    attempt = (
+        db.query(TestAttempt)
+        .filter(TestAttempt.id == attempt_id, TestAttempt.student_id == current_user.id)
+        .with_for_update()
+        .first()
+    )
+    if not attempt:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Попытка не найдена")
+    finish_attempt(db, attempt, to_answers(payload) if payload else None, datetime.utcnow())
     db.commit()
-    db.refresh(attempt)
-    return TestSubmitResult(attempt_id=attempt.id, score=attempt.score, max_score=max_score)
+    cache.invalidate(keys=[attempt_meta_key(attempt_id)], tags=[test_attempts_tag(attempt.test_id)])
+    return TestSubmitResult(attempt_id=attempt.id, score=attempt.score, max_score=attempt.max_score)
 
 
 # --------- маршруты для преподавателя ---------
@@ -169,6 +241,7 @@ def create_test(
     db.add(test)
     db.commit()
     db.refresh(test)
+    cache.invalidate(tags=[course_tag(course_id)])
     return TestSummary.from_orm(test)
 
 
@@ -194,4 +267,147 @@ def add_question(
         db.add(TestOption(question_id=question.id, text=opt_payload.text, is_correct=opt_payload.is_correct))
     db.commit()
     db.refresh(test)
+    cache.invalidate(tags=[test_tag(test_id)])
     return TestRead.from_orm(test)
+
+
+def import_test(db: Session, course_id: int, payload: TestImport) -> TestImportResult:
+    """Create a test with all its questions and options in one transaction."""
+    for position, question in enumerate(payload.questions, start=1):
+        if not question.options:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Вопрос {position} не содержит вариантов ответа",
+            )
+    test = Test(
+        course_id=course_id,
+        title=payload.title,
+        description=payload.description,
+        time_limit_minutes=payload.time_limit_minutes,
+        is_published=payload.is_published,
+    )
+    db.add(test)
+    db.flush()
+    question_ids = db.scalars(
+        insert(TestQuestion).returning(TestQuestion.id, sort_by_parameter_order=True),
+        [
+            {"test_id": test.id, "text": q.text, "type": q.type, "order_index": q.order_index or position}
+            for position, q in enumerate(payload.questions, start=1)
+        ],
+    ).all()
+    option_rows = [
+        {"question_id": question_id, "text": option.text, "is_correct": option.is_correct}
+        for question_id, question in zip(question_ids, payload.questions)
+        for option in question.options
+    ]
+    db.execute(insert(TestOption), option_rows)
+    db.commit()
+    return TestImportResult(
+        id=test.id,
+        course_id=course_id,
+        title=test.title,
+        questions_count=len(question_ids),
+        options_count=len(option_rows),
+    )
+
+
+def clone_test(db: Session, source: Test, payload: TestCloneRequest) -> int:
+    """Copy a test; options are copied with INSERT ... SELECT without loading them into Python."""
+    now = datetime.utcnow()
+    course_id = payload.course_id or source.course_id
+    new_test_id = db.execute(
+        insert(Test)
+        .from_select(
+            ["course_id", "title", "description", "is_published", "time_limit_minutes", "created_at", "updated_at"],
+            select(
+                literal(course_id, Integer),
+                literal(payload.title, String) if payload.title else Test.title,
+                Test.description,
+                literal(payload.is_published, Boolean),
+                Test.time_limit_minutes,
+                literal(now, DateTime),
+                literal(now, DateTime),
+            ).where(Test.id == source.id),
+        )
+        .returning(Test.id)
+    ).scalar_one()
+    questions = db.execute(
+        select(TestQuestion.id, TestQuestion.text, TestQuestion.type, TestQuestion.order_index)
+        .where(TestQuestion.test_id == source.id)
+        .order_by(TestQuestion.id)
+    ).all()
+    if questions:
+        # RETURNING with sort_by_parameter_order yields the new ids in the order of the rows
+        # sent, whatever order the database assigns them in.
+        new_ids = db.scalars(
+            insert(TestQuestion).returning(TestQuestion.id, sort_by_parameter_order=True),
+            [
+                {"test_id": new_test_id, "text": text, "type": type_, "order_index": order_index}
+                for _, text, type_, order_index in questions
+            ],
+        ).all()
+        new_question_id = case(
+            {old_id: new_id for (old_id, *_), new_id in zip(questions, new_ids)}, value=TestOption.question_id
+        )
+        db.execute(
+            insert(TestOption).from_select(
+                ["question_id", "text", "is_correct"],
+                select(new_question_id, TestOption.text, TestOption.is_correct)
+                .where(TestOption.question_id.in_([row.id for row in questions]))
+                .order_by(TestOption.id),
+            )
+        )
+    db.commit()
+    return new_test_id
+
+
+@router.post(
+    "/courses/{course_id}/tests/import",
+    response_model=TestImportResult,
+    summary="Импортировать тест целиком (преподаватель)",
+)
+def import_whole_test(
+    course_id: int,
+    payload: TestImport,
+    current_user=Depends(get_current_teacher),
+    db: Session = Depends(get_db),
+):
+    course = db.query(Course).filter(Course.id == course_id).first()
+    if not course:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Курс не найден")
+    result = import_test(db, course_id, payload)
+    cache.invalidate(tags=[course_tag(course_id)])
+    return result
+
+
+@router.post("/tests/{test_id}/clone", response_model=TestSummary, summary="Клонировать тест (преподаватель)")
+def clone_whole_test(
+    test_id: int,
+    payload: TestCloneRequest,
+    current_user=Depends(get_current_teacher),
+    db: Session = Depends(get_db),
+):
+    source = db.query(Test).filter(Test.id == test_id).first()
+    if not source:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тест не найден")
+    if payload.course_id and not db.query(Course).filter(Course.id == payload.course_id).first():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Курс не найден")
+    new_test_id = clone_test(db, source, payload)
+    cache.invalidate(tags=[course_tag(payload.course_id or source.course_id)])
+    return TestSummary.from_orm(db.query(Test).filter(Test.id == new_test_id).one())
+
+
+@router.get(
+    "/tests/{test_id}/analytics",
+    response_model=TestItemAnalysis,
+    summary="Анализ вопросов теста (преподаватель)",
+)
+def get_item_analysis(test_id: int, current_user=Depends(get_current_teacher), db: Session = Depends(get_db)):
+    if not db.query(Test.id).filter(Test.id == test_id).first():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Тест не найден")
+    # Finished attempts drop the result through the attempts tag, question edits through the test tag.
+    return cache.get_or_load(
+        f"test:{test_id}:item-analysis",
+        lambda: compute_item_analysis(db, test_id),
+        tags=[test_tag(test_id), test_attempts_tag(test_id)],
+    )
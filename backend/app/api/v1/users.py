@@ -2,11 +2,12 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_user
+from app.core.profiling import TimedRoute
 from app.core.security import get_password_hash, verify_password
 from app.db.session import get_db
 from app.schemas.user import ChangePasswordRequest, UserRead, UserUpdate
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=TimedRoute)
 
 
 @router.get("/me", response_model=UserRead, summary="Get current user profile")
@@ -0,0 +1,213 @@
+"""Admission control: per-principal token buckets and global load shedding.
+
+Every request spends tokens from its client IP's bucket and, when it carries
+a valid bearer token, from its user's bucket. The number of tokens depends on
+the route: bcrypt logins and uploads cost more than reads. An empty bucket
+means 429 with ``Retry-After``.
+
+Independently, a worker that already has ``shed_max_in_flight`` requests in
+progress, or whose connection pool makes checkouts wait longer than
+``shed_pool_wait_seconds``, answers 503 right away instead of queueing more
+work behind the pool.
+
+State is per worker process, so the effective limits scale with the number
+of workers.
+"""
+
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+from starlette.responses import JSONResponse
+
+from app.core.config import settings
+from app.core.metrics import Family, gauge_family, registry
+from app.core.security import decode_access_token
+
+EXEMPT_PATHS = ("/health", "/ready", "/metrics")
+
+# (method, path pattern, cost); the first match wins, everything else costs 1
+ROUTE_COSTS: List[Tuple[str, Pattern[str], float]] = [
+    ("POST", re.compile(r"^/api/v1/auth/(login|login-json|register)$"), 10.0),
+    ("POST", re.compile(r"^/api/v1/submissions$"), 5.0),
+    ("POST", re.compile(r"^/api/v1/grading/bulk$"), 5.0),
+    ("POST", re.compile(r"^/api/v1/users/me/change-password$"), 10.0),
+    ("POST", re.compile(r"^/api/v1/courses/\d+/chat/messages$"), 3.0),
+    ("GET", re.compile(r"^/api/v1/search$"), 2.0),
+]
+
+
+def route_cost(method: str, path: str) -> float:
+    for route_method, pattern, cost in ROUTE_COSTS:
+        if method == route_method and pattern.match(path):
+            return cost
+    return 1.0
+
+
+class TokenBucketTable:
+    """Token buckets keyed by principal, refilled lazily; the least recently seen are evicted."""
+
+    def __init__(self, rate: float, burst: float, max_keys: int, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (tokens, updated_at)
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str, cost: float) -> float:
+        """Spend ``cost`` tokens; returns 0 when admitted, else seconds until enough tokens."""
+        now = self._clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (min(cost, self.burst) - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def refund(self, key: str, cost: float) -> None:
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated = self._buckets[key]
+                self._buckets[key] = (min(self.burst, tokens + cost), updated)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AdmissionController:
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.users = TokenBucketTable(
+            settings.rate_limit_user_rate, settings.rate_limit_user_burst, settings.rate_limit_max_principals, clock
+        )
+        self.ips = TokenBucketTable(
+            settings.rate_limit_ip_rate, settings.rate_limit_ip_burst, settings.rate_limit_max_principals, clock
+        )
+        self.pool_stats: Optional[Callable[[], Dict[str, float]]] = None
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.admitted = 0
+        self.limited = {"ip": 0, "user": 0}
+        self.shed = {"in_flight": 0, "pool_wait": 0}
+
+    def overloaded(self) -> Optional[str]:
+        if self.in_flight >= settings.shed_max_in_flight:
+            return "in_flight"
+        if self.pool_stats is not None:
+            pool = self.pool_stats()
+            waited = max(pool["wait_seconds_ewma"], pool["current_wait_seconds"])
+            if pool["waiting"] and waited >= settings.shed_pool_wait_seconds:
+                return "pool_wait"
+        return None
+
+    def check_rate(self, ip: str, user_id: Optional[str], cost: float) -> Optional[Tuple[str, float]]:
+        """None when admitted, else (which bucket, retry after seconds)."""
+        wait = self.ips.take(ip, cost)
+        if wait:
+            self.limited["ip"] += 1
+            return "ip", wait
+        if user_id is not None:
+            wait = self.users.take(user_id, cost)
+            if wait:
+                # the IP bucket should not pay for a request that was turned away
+                self.ips.refund(ip, cost)
+                self.limited["user"] += 1
+                return "user", wait
+        return None
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "admitted": self.admitted,
+            "limited": dict(self.limited),
+            "shed": dict(self.shed),
+            "tracked_users": len(self.users),
+            "tracked_ips": len(self.ips),
+            "pool": self.pool_stats() if self.pool_stats is not None else None,
+        }
+
+    def metric_families(self) -> List[Family]:
+        rejected = Family(
+            "admission_rejected_total", "counter", "Requests turned away by admission control", ("reason",)
+        )
+        for bucket, count in self.limited.items():
+            rejected.samples[(f"rate_limit_{bucket}",)] = float(count)
+        for reason, count in self.shed.items():
+            rejected.samples[(f"shed_{reason}",)] = float(count)
+        return [gauge_family("http_requests_in_flight", "Requests being served", self.in_flight), rejected]
+
+
+admission = AdmissionController()
+registry.register_collector("admission", admission.metric_families)
+
+
+def client_ip(scope) -> str:
+    if settings.rate_limit_trust_forwarded:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def bearer_subject(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                return decode_access_token(token)
+    return None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying ``admission``; health and metrics endpoints are never limited."""
+
+    def __init__(self, app, controller: AdmissionController = admission) -> None:
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+        controller = self.controller
+        reason = controller.overloaded()
+        if reason is not None:
+            controller.shed[reason] += 1
+            response = JSONResponse(
+                {"detail": "Server is overloaded, retry shortly"}, status_code=503, headers={"Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+        if settings.rate_limit_enabled:
+            limited = controller.check_rate(
+                client_ip(scope), bearer_subject(scope), route_cost(scope["method"], scope["path"])
+            )
+            if limited is not None:
+                bucket, wait = limited
+                response = JSONResponse(
+                    {"detail": "Too many requests", "limit": bucket},
+                    status_code=429,
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+                await response(scope, receive, send)
+                return
+
+        controller.admitted += 1
+        controller.in_flight += 1
+        controller.peak_in_flight = max(controller.peak_in_flight, controller.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.in_flight -= 1
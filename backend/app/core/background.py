@@ -0,0 +1,87 @@
+"""In-process periodic tasks.
+
+Every worker process runs its own copy of each registered task on a daemon
+thread. Tasks that should not run concurrently across workers take a Postgres
+advisory lock through ``try_exclusive``; other databases get no lock, so task
+bodies must stay idempotent.
+"""
+
+import logging
+import random
+import threading
+import zlib
+from typing import Callable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    def __init__(self, name: str, interval: float, func: Callable[[], None], jitter: float = 0.1) -> None:
+        self.name = name
+        self.interval = interval
+        self.func = func
+        # spreads the workers' runs so they do not all wake up at once
+        self.jitter = jitter
+        self.runs = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=f"task-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self) -> None:
+        try:
+            self.func()
+        except Exception:  # the next run retries; one failure must not kill the thread
+            self.failures += 1
+            logger.exception("Background task %s failed", self.name)
+        finally:
+            self.runs += 1
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval * (1 + random.uniform(0, self.jitter))):
+            self.run_once()
+
+
+_tasks: List[PeriodicTask] = []
+
+
+def register(task: PeriodicTask) -> PeriodicTask:
+    _tasks.append(task)
+    return task
+
+
+def registered_tasks() -> List[PeriodicTask]:
+    return list(_tasks)
+
+
+def start_background_tasks() -> None:
+    for task in _tasks:
+        task.start()
+
+
+def stop_background_tasks() -> None:
+    for task in _tasks:
+        task.stop()
+
+
+def try_exclusive(db: Session, name: str) -> bool:
+    """Take a transaction-scoped lock named ``name``; False if another worker holds it."""
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    key = zlib.crc32(name.encode())
+    return bool(db.execute(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": key}).scalar())
@@ -0,0 +1,354 @@
+"""Process-local LRU+TTL cache with cross-worker invalidation.
+
+Every uvicorn worker keeps its own ``LocalCache``. Writers invalidate by key
+or tag through ``cache.invalidate``; the change is applied locally right away
+and broadcast on an ``InvalidationBus`` so that the other workers drop their
+copies too. In production the bus is Postgres LISTEN/NOTIFY, tests and SQLite
+setups use the in-memory bus.
+"""
+
+import json
+import logging
+import select
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+
+def course_tag(course_id: int) -> str:
+    return f"course:{course_id}"
+
+
+def test_tag(test_id: int) -> str:
+    return f"test:{test_id}"
+
+
+def test_attempts_tag(test_id: int) -> str:
+    """Entries derived from a test's finished attempts; separate from ``test_tag`` so exams keep the read cache."""
+    return f"test:{test_id}:attempts"
+
+
+def leaderboard_tag(course_id: int) -> str:
+    return f"leaderboard:{course_id}"
+
+
+CATALOG_TAG = "catalog"
+
+
+class LocalCache:
+    """Thread-safe LRU cache with per-entry TTL and a tag index."""
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        default_ttl: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, Tuple[Any, float, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Any:
+        """Return the cached value or ``MISSING``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            value, expires_at, _ = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, self._clock() + (self.default_ttl if ttl is None else ttl), tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, keys: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    removed += 1
+            self.invalidations += removed
+        return removed
+
+    def delete_tags(self, tags: Iterable[str]) -> int:
+        with self._lock:
+            keys: Set[str] = set()
+            for tag in tags:
+                keys.update(self._tags.get(tag, ()))
+            return self.delete(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+            }
+
+    def _remove(self, key: str) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class InvalidationBus(ABC):
+    """Broadcasts invalidation messages to every subscribed worker."""
+
+    def __init__(self) -> None:
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        self._subscribers.append(callback)
+
+    @abstractmethod
+    def publish(self, message: Dict[str, Any]) -> None:
+        """Deliver ``message`` to the subscribers of every worker, this one included."""
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def _deliver(self, message: Dict[str, Any]) -> None:
+        for callback in list(self._subscribers):
+            try:
+                callback(message)
+            except Exception:  # pragma: no cover - a broken subscriber must not stop the others
+                logger.exception("Cache invalidation subscriber failed")
+
+
+class InMemoryBus(InvalidationBus):
+    """Synchronous bus for a single process (tests, SQLite, local dev)."""
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        self._deliver(message)
+
+
+class PostgresBus(InvalidationBus):
+    """Bus on top of Postgres LISTEN/NOTIFY.
+
+    Notifications are sent through the regular engine pool; a dedicated
+    connection, detached from the pool, listens in a daemon thread and
+    reconnects with backoff if the database goes away.
+    """
+
+    # NOTIFY payloads are limited to 8000 bytes, keep a safe margin.
+    max_payload_bytes = 7000
+
+    def __init__(self, engine: Engine, channel: str = "cache_invalidation", poll_interval: float = 1.0) -> None:
+        super().__init__()
+        self.engine = engine
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        with self.engine.begin() as connection:
+            for payload in self._split(message):
+                connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name="cache-invalidation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 2)
+            self._thread = None
+
+    def _split(self, message: Dict[str, Any]) -> List[str]:
+        payload = json.dumps(message)
+        if len(payload.encode()) <= self.max_payload_bytes:
+            return [payload]
+        # Too many keys/tags for one notification: fan out one item per message.
+        base = {k: v for k, v in message.items() if k not in ("keys", "tags")}
+        parts = [json.dumps({**base, "keys": [key], "tags": []}) for key in message.get("keys", [])]
+        parts += [json.dumps({**base, "keys": [], "tags": [tag]}) for tag in message.get("tags", [])]
+        return parts
+
+    def _listen_forever(self) -> None:
+        backoff = self.poll_interval
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                backoff = self.poll_interval
+            except Exception:
+                logger.exception("Cache invalidation listener lost its connection, reconnecting")
+                # Anything could have changed while we were not listening.
+                self._deliver({"origin": None, "keys": [], "tags": [], "clear": True})
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _listen(self) -> None:
+        pooled = self.engine.raw_connection()
+        pooled.detach()
+        connection = pooled.dbapi_connection
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            while not self._stop.is_set():
+                if select.select([connection], [], [], self.poll_interval) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    try:
+                        self._deliver(json.loads(notify.payload))
+                    except ValueError:
+                        logger.warning("Ignoring malformed cache invalidation payload")
+        finally:
+            connection.close()
+
+
+class Cache:
+    """Local cache tier wired to an invalidation bus."""
+
+    def __init__(self, local: LocalCache, bus: Optional[InvalidationBus] = None) -> None:
+        self.local = local
+        self.origin = uuid.uuid4().hex
+        self._generation = 0
+        self._generation_lock = threading.Lock()
+        self.bus: InvalidationBus = bus or InMemoryBus()
+        self.bus.subscribe(self._on_message)
+
+    def use_bus(self, bus: InvalidationBus) -> None:
+        self.bus.stop()
+        self.bus = bus
+        bus.subscribe(self._on_message)
+
+    def get(self, key: str) -> Any:
+        return self.local.get(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        self.local.set(key, value, ttl=ttl, tags=tags)
+
+    def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Any],
+        ttl: Optional[float] = None,
+        tags: Iterable[str] = (),
+    ) -> Any:
+        value = self.local.get(key)
+        if value is not MISSING:
+            return value
+        generation = self._generation
+        value = loader()
+        # An invalidation that raced with the load may concern this value: do not store it.
+        if generation == self._generation:
+            self.local.set(key, value, ttl=ttl, tags=tags)
+        return value
+
+    def invalidate(self, keys: Iterable[str] = (), tags: Iterable[str] = ()) -> None:
+        """Drop keys/tags here and in every other worker. Call after commit."""
+        keys, tags = list(keys), list(tags)
+        if not keys and not tags:
+            return
+        self._apply(keys, tags)
+        try:
+            self.bus.publish({"origin": self.origin, "keys": keys, "tags": tags})
+        except Exception:
+            logger.exception("Failed to publish cache invalidation for keys=%s tags=%s", keys, tags)
+
+    def stats(self) -> Dict[str, int]:
+        return self.local.stats()
+
+    def _on_message(self, message: Dict[str, Any]) -> None:
+        if message.get("origin") == self.origin:
+            return
+        if message.get("clear"):
+            self._bump_generation()
+            self.local.clear()
+            return
+        self._apply(message.get("keys") or [], message.get("tags") or [])
+
+    def _apply(self, keys: List[str], tags: List[str]) -> None:
+        self._bump_generation()
+        if keys:
+            self.local.delete(keys)
+        if tags:
+            self.local.delete_tags(tags)
+
+    def _bump_generation(self) -> None:
+        with self._generation_lock:
+            self._generation += 1
+
+
+def build_bus(engine: Engine) -> InvalidationBus:
+    backend = settings.cache_bus
+    if backend == "auto":
+        backend = "postgres" if engine.dialect.name == "postgresql" else "memory"
+    if backend == "postgres":
+        return PostgresBus(engine)
+    return InMemoryBus()
+
+
+cache = Cache(LocalCache(settings.cache_max_entries, settings.cache_default_ttl_seconds))
+
+
+def start_cache(engine: Engine) -> None:
+    """Attach the configured bus and start listening (app startup)."""
+    cache.use_bus(build_bus(engine))
+    cache.bus.start()
+
+
+def stop_cache() -> None:
+    cache.bus.stop()
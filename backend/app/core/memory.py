@@ -0,0 +1,179 @@
+"""On-demand memory diagnostics for a worker process.
+
+Nothing here runs until an operator calls ``start()``: tracemalloc is off and
+no sampler thread exists, so a disabled worker pays nothing. Once started,
+tracemalloc records allocation sites, ``snapshot()`` compares the heap with
+the previous snapshot, and a thread records RSS every
+``MEMORY_RSS_INTERVAL_SECONDS`` so growth can be followed over time.
+``object_report()`` counts live objects by type, ORM instances per mapper and,
+while diagnostics run, the identity map size of every open session that began
+a transaction since ``start()``; it walks the whole GC heap and is meant for
+occasional manual use.
+"""
+
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.base import Base
+
+try:
+    PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):  # not available on this platform
+    PAGE_SIZE = 4096
+
+
+# sessions that began a transaction while diagnostics run, for the identity map sizes in object_report()
+_sessions: "weakref.WeakSet[Session]" = weakref.WeakSet()
+
+
+def _track_session(session, transaction, connection) -> None:
+    _sessions.add(session)
+
+
+def rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as handle:
+            return int(handle.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _stat_row(stat) -> Dict[str, Any]:
+    frame = stat.traceback[0]
+    row = {"location": f"{frame.filename}:{frame.lineno}", "size_bytes": stat.size, "count": stat.count}
+    if hasattr(stat, "size_diff"):
+        row.update(size_diff_bytes=stat.size_diff, count_diff=stat.count_diff)
+    return row
+
+
+class MemoryDiagnostics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started_at: Optional[float] = None
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        # (unix time, rss bytes)
+        self.rss_history: Deque[Tuple[float, int]] = deque(maxlen=settings.memory_rss_history)
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.started_at is not None
+
+    def start(self, frames: int = 1) -> None:
+        with self._lock:
+            if self.enabled:
+                return
+            tracemalloc.start(frames)
+            self.started_at = time.time()
+            self._previous = tracemalloc.take_snapshot()
+            self.rss_history.clear()
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample_rss, name="memory-rss", daemon=True)
+            self._sampler.start()
+            # listened to only while running, so that transactions cost nothing otherwise
+            event.listen(Session, "after_begin", _track_session)
+
+    def stop(self) -> None:
+        with self._lock:
+            if not self.enabled:
+                return
+            event.remove(Session, "after_begin", _track_session)
+            _sessions.clear()
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+            self._previous = None
+            self.started_at = None
+            tracemalloc.stop()
+
+    def _sample_rss(self) -> None:
+        while True:
+            rss = rss_bytes()
+            if rss is not None:
+                self.rss_history.append((time.time(), rss))
+            if self._stop.wait(settings.memory_rss_interval_seconds):
+                return
+
+    def snapshot(self, limit: int = 25, group_by: str = "lineno") -> Dict[str, Any]:
+        """Top allocation sites now and their growth since the previous snapshot."""
+        with self._lock:
+            if not self.enabled:
+                raise RuntimeError("memory diagnostics are not running")
+            current = tracemalloc.take_snapshot().filter_traces(
+                (
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                )
+            )
+            previous, self._previous = self._previous, current
+        traced, peak = tracemalloc.get_traced_memory()
+        return {
+            "traced_bytes": traced,
+            "traced_peak_bytes": peak,
+            "top": [_stat_row(stat) for stat in current.statistics(group_by)[:limit]],
+            "growth": [_stat_row(stat) for stat in current.compare_to(previous, group_by)[:limit]],
+        }
+
+    def status(self) -> Dict[str, Any]:
+        body: Dict[str, Any] = {
+            "enabled": self.enabled,
+            "pid": os.getpid(),
+            "rss_bytes": rss_bytes(),
+            "rss_history": [{"at": at, "rss_bytes": rss} for at, rss in list(self.rss_history)],
+        }
+        if self.enabled:
+            traced, peak = tracemalloc.get_traced_memory()
+            body.update(started_at=self.started_at, traced_bytes=traced, traced_peak_bytes=peak)
+        return body
+
+
+def object_report(limit: int = 30) -> Dict[str, Any]:
+    """Live objects by type (count and shallow size), ORM instances per mapper, identity map sizes while running."""
+    mapped = {mapper.class_: mapper.class_.__name__ for mapper in Base.registry.mappers}
+    by_type: Dict[str, List[int]] = {}
+    per_mapper: Dict[str, int] = {}
+    largest_strings: List[int] = []
+    gc.collect()
+    for obj in gc.get_objects():
+        cls = type(obj)
+        name = f"{cls.__module__}.{cls.__qualname__}"
+        entry = by_type.setdefault(name, [0, 0])
+        entry[0] += 1
+        entry[1] += sys.getsizeof(obj, 0)
+        if cls in mapped:
+            per_mapper[mapped[cls]] = per_mapper.get(mapped[cls], 0) + 1
+            # wide columns (avatars) are str attributes of the instance dict, which the GC does not track
+            for value in obj.__dict__.values():
+                if isinstance(value, str) and len(value) > 4096:
+                    largest_strings.append(len(value))
+    types = sorted(by_type.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    report: Dict[str, Any] = {
+        "types": [{"type": name, "count": count, "shallow_bytes": size} for name, (count, size) in types],
+        "orm_instances": dict(sorted(per_mapper.items(), key=lambda item: item[1], reverse=True)),
+        "orm_large_strings": {"count": len(largest_strings), "total_bytes": sum(largest_strings)},
+        "sessions": None,
+    }
+    if memory_diagnostics.enabled:
+        # a closed session has neither a transaction nor instances left
+        sessions = [
+            len(session.identity_map)
+            for session in list(_sessions)
+            if session.in_transaction() or len(session.identity_map)
+        ]
+        report["sessions"] = {"open": len(sessions), "identity_map_sizes": sorted(sessions, reverse=True)[:limit]}
+    return report
+
+
+memory_diagnostics = MemoryDiagnostics()
@@ -0,0 +1,381 @@
+"""In-process metrics with Prometheus text exposition.
+
+Instrumented code updates ``Counter``/``Gauge``/``Histogram`` objects of the
+module ``registry``; state that already lives elsewhere (pool, caches,
+admission) is read at scrape time by collectors registered with
+``registry.register_collector``. ``register_cache_stats`` turns any
+``stats()`` dict of a cache-like object into labelled series.
+
+Every worker process has its own registry. With ``METRICS_MULTIPROCESS_DIR``
+set, each worker writes a JSON snapshot there (periodically and on every
+scrape it serves) and ``/metrics`` merges the snapshots of all workers:
+counters and histograms are summed, gauges are summed or maxed per metric.
+A worker deletes its snapshot on shutdown; snapshots of workers that died
+without doing so are skipped and deleted by the next scrape. Counters drop
+when a worker goes away, which Prometheus treats as a counter reset.
+"""
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+LabelValues = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Family:
+    """One metric with its samples: label values -> value, or -> [bucket counts..., sum] for histograms."""
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        help_text: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = (),
+        aggregate: str = "sum",
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # how gauges of several workers combine: "sum" or "max"
+        self.aggregate = aggregate
+        self.samples: Dict[LabelValues, object] = {}
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "help": self.help,
+            "labels": list(self.labels),
+            "buckets": list(self.buckets),
+            "aggregate": self.aggregate,
+            "samples": [[list(key), value] for key, value in self.samples.items()],
+        }
+
+    @classmethod
+    def from_dict(cls, name: str, data: dict) -> "Family":
+        family = cls(name, data["kind"], data["help"], data["labels"], data["buckets"], data["aggregate"])
+        family.samples = {tuple(key): value for key, value in data["samples"]}
+        return family
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), aggregate: str = "sum") -> None:
+        self.family = Family(name, self.kind, help_text, labels, aggregate=aggregate)
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Family:
+        with self._lock:
+            copy = Family(
+                self.family.name,
+                self.family.kind,
+                self.family.help,
+                self.family.labels,
+                self.family.buckets,
+                self.family.aggregate,
+            )
+            copy.samples = {
+                key: list(value) if isinstance(value, list) else value for key, value in self.family.samples.items()
+            }
+        return copy
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        with self._lock:
+            samples = self.family.samples
+            samples[labels] = samples.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self.family.samples[labels] = value
+
+    def inc(self, amount: float = 1.0, *labels: str) -> None:
+        with self._lock:
+            samples = self.family.samples
+            samples[labels] = samples.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, *labels: str) -> None:
+        self.inc(-amount, *labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, help_text, labels)
+        self.family.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.family.buckets, value)
+        with self._lock:
+            counts = self.family.samples.get(labels)
+            if counts is None:
+                # one count per bucket plus +Inf, then the sum
+                counts = self.family.samples[labels] = [0] * (len(self.family.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+
+Collector = Callable[[], Iterable[Family]]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: Dict[str, Collector] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.family.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.family.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = (), aggregate: str = "sum") -> Gauge:
+        return self._add(Gauge(name, help_text, labels, aggregate))
+
+    def histogram(
+        self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def register_collector(self, name: str, collector: Collector) -> None:
+        """Add (or replace) a function producing families at scrape time."""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def collect(self) -> List[Family]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        families = [metric.snapshot() for metric in metrics]
+        for name, collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception:  # one broken collector must not take the endpoint down
+                logger.exception("Metrics collector %s failed", name)
+        return families
+
+
+registry = Registry()
+
+
+def register_cache_stats(name: str, stats: Callable[[], Dict[str, float]]) -> None:
+    """Export a cache's ``stats()``: ``size``/``entries`` become gauges, every other key a counter."""
+
+    def collect() -> List[Family]:
+        families = []
+        for key, value in sorted(stats().items()):
+            gauge = key in ("size", "entries", "pending")
+            family = Family(
+                f"cache_{key}" if gauge else f"cache_{key}_total",
+                "gauge" if gauge else "counter",
+                f"Cache {key.replace('_', ' ')}",
+                ("cache",),
+            )
+            family.samples[(name,)] = float(value)
+            families.append(family)
+        return families
+
+    registry.register_collector(f"cache:{name}", collect)
+
+
+def gauge_family(name: str, help_text: str, value: float, kind: str = "gauge", aggregate: str = "sum") -> Family:
+    family = Family(name, kind, help_text, aggregate=aggregate)
+    family.samples[()] = float(value)
+    return family
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render(families: Iterable[Family]) -> str:
+    """Prometheus text exposition format 0.0.4."""
+    lines: List[str] = []
+    for family in sorted(families, key=lambda f: f.name):
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+        for key in sorted(family.samples):
+            value = family.samples[key]
+            if family.kind != "histogram":
+                lines.append(f"{family.name}{_labels(family.labels, key)} {_number(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(family.buckets) + [float("inf")], value[:-1]):
+                cumulative += count
+                le = ("le", _number(bound))
+                lines.append(f"{family.name}_bucket{_labels(family.labels, key, le)} {cumulative}")
+            lines.append(f"{family.name}_sum{_labels(family.labels, key)} {_number(value[-1])}")
+            lines.append(f"{family.name}_count{_labels(family.labels, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def merge(snapshots: Iterable[Dict[str, dict]]) -> List[Family]:
+    """Combine per-worker snapshots, each given as {name: family dict}."""
+    merged: Dict[str, Family] = {}
+    for families in snapshots:
+        for name, data in families.items():
+            family = Family.from_dict(name, data)
+            target = merged.setdefault(
+                name, Family(name, family.kind, family.help, family.labels, family.buckets, family.aggregate)
+            )
+            for key, value in family.samples.items():
+                current = target.samples.get(key)
+                if current is None:
+                    target.samples[key] = value
+                elif family.kind == "histogram":
+                    target.samples[key] = [a + b for a, b in zip(current, value)]
+                elif family.kind == "gauge" and family.aggregate == "max":
+                    target.samples[key] = max(current, value)
+                else:
+                    target.samples[key] = current + value
+    return list(merged.values())
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"worker-{pid}.json")
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def dump_snapshot(directory: Optional[str] = None) -> None:
+    directory = directory or settings.metrics_multiprocess_dir
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    data = {family.name: family.to_dict() for family in registry.collect()}
+    path = _snapshot_path(directory, os.getpid())
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as handle:
+        json.dump({"pid": os.getpid(), "written_at": time.time(), "families": data}, handle)
+    # atomic, so a concurrent scrape never reads half a file
+    os.replace(temporary, path)
+
+
+def remove_snapshot(directory: Optional[str] = None) -> None:
+    directory = directory or settings.metrics_multiprocess_dir
+    if directory:
+        _remove(_snapshot_path(directory, os.getpid()))
+
+
+def load_snapshots(directory: str) -> List[Dict[str, dict]]:
+    """Snapshots of the live workers; files left behind by dead ones are deleted."""
+    snapshots = []
+    for name in sorted(os.listdir(directory)):
+        if not (name.startswith("worker-") and name.endswith(".json")):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path) as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        if not _pid_alive(int(data["pid"])):
+            _remove(path)
+            continue
+        snapshots.append(data["families"])
+    return snapshots
+
+
+def exposition() -> str:
+    directory = settings.metrics_multiprocess_dir
+    if not directory:
+        return render(registry.collect())
+    dump_snapshot(directory)
+    return render(merge(load_snapshots(directory)))
+
+
+def dump_snapshot_job() -> None:
+    dump_snapshot()
+
+
+# Metrics shared across modules
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+)
+http_latency = registry.histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+upload_bytes = registry.counter("upload_bytes_total", "Bytes received in uploaded files", ("kind",))
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every request under its route template (never the raw path)."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_latency.observe(time.perf_counter() - started, method, template)
+            http_requests.inc(1.0, method, template, str(status[0]))
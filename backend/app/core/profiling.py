@@ -0,0 +1,276 @@
+"""Opt-in request profiling and the slow-request log.
+
+A request is profiled when it carries ``X-Profile: 1`` together with a valid
+``X-Admin-Token``, or when it is picked by ``PROFILING_SAMPLE_RATE``. While it
+runs, a sampler thread records the stacks of the threads working on it (the
+event loop and the threadpool threads its endpoint and SQL ran on) every
+``PROFILING_INTERVAL_MS``. Endpoints are timed by ``TimedRoute``, which the
+routers install as their ``route_class``. Once the response has been sent,
+the report is written from the threadpool to ``PROFILING_DIR`` as
+``<id>.folded`` (collapsed stacks, readable by flamegraph.pl, speedscope or
+inferno) plus ``<id>.json`` with the phases and the SQL statements grouped by
+text. Only the newest ``PROFILING_MAX_REPORTS`` reports are kept; the id is
+returned in ``X-Profile-Id``.
+
+Independently, every request slower than ``SLOW_REQUEST_THRESHOLD_MS`` is
+logged with the time spent authenticating, in SQL, in the endpoint and in
+serializing the response.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.request_stats import RequestStats, current_stats
+from app.core.security import is_admin_token
+
+logger = logging.getLogger("app.slow_requests")
+
+
+class StackSampler:
+    """Samples the Python stacks of a (growing) set of threads on a background thread."""
+
+    def __init__(self, threads: Set[int], interval: float) -> None:
+        self.threads = threads
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        frames = sys._current_frames()
+        for ident in list(self.threads):
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[tuple(stack)] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.samples.most_common())
+
+
+class ProfileStore:
+    """Directory holding the newest ``max_reports`` profiles; older ones are deleted on write."""
+
+    def __init__(self, directory: str, max_reports: int) -> None:
+        self.directory = directory
+        self.max_reports = max_reports
+
+    def write(self, report_id: str, folded: str, meta: Dict[str, object]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{report_id}.folded"), "w") as handle:
+            handle.write(folded)
+        with open(os.path.join(self.directory, f"{report_id}.json"), "w") as handle:
+            json.dump(meta, handle, indent=1)
+        self.prune()
+
+    def report_ids(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        # ids start with a timestamp, so name order is age order
+        return sorted(name[: -len(".json")] for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def prune(self) -> None:
+        ids = self.report_ids()
+        for report_id in ids[: max(len(ids) - self.max_reports, 0)]:
+            for suffix in (".folded", ".json"):
+                try:
+                    os.remove(os.path.join(self.directory, report_id + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+def new_report_id() -> str:
+    return f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+
+
+def phases(stats: RequestStats, finished: float) -> Dict[str, float]:
+    """Milliseconds per phase; auth includes its own query and handler includes SQL issued by the endpoint."""
+    result = {
+        "total_ms": (finished - stats.started) * 1000,
+        "auth_ms": stats.auth_time * 1000,
+        "db_ms": stats.db_time * 1000,
+        "queries": stats.queries,
+    }
+    if stats.handler_started is not None and stats.handler_finished is not None:
+        result["handler_ms"] = (stats.handler_finished - stats.handler_started) * 1000
+        if stats.response_started is not None:
+            result["serialization_ms"] = (stats.response_started - stats.handler_finished) * 1000
+    return {key: round(value, 2) for key, value in result.items()}
+
+
+def sql_summary(statements: List[Tuple[str, float]], limit: int = 50) -> List[Dict[str, object]]:
+    grouped: Dict[str, List[float]] = {}
+    for statement, seconds in statements:
+        grouped.setdefault(" ".join(statement.split()), []).append(seconds)
+    rows = [
+        {
+            "statement": text,
+            "count": len(times),
+            "total_ms": round(sum(times) * 1000, 2),
+            "max_ms": round(max(times) * 1000, 2),
+        }
+        for text, times in grouped.items()
+    ]
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows[:limit]
+
+
+def _timed_endpoint(call: Callable) -> Callable:
+    """Wrap an endpoint so that the request's stats know when it started and returned."""
+
+    def enter() -> Optional[RequestStats]:
+        stats = current_stats.get()
+        if stats is not None:
+            stats.handler_started = time.perf_counter()
+            if stats.threads is not None:
+                stats.threads.add(threading.get_ident())
+        return stats
+
+    def leave(stats: Optional[RequestStats]) -> None:
+        if stats is not None:
+            stats.handler_finished = time.perf_counter()
+
+    if asyncio.iscoroutinefunction(call):
+
+        @functools.wraps(call)
+        async def timed_async(*args, **kwargs):
+            stats = enter()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                leave(stats)
+
+        timed_async.request_timed = True
+        return timed_async
+
+    @functools.wraps(call)
+    def timed(*args, **kwargs):
+        stats = enter()
+        try:
+            return call(*args, **kwargs)
+        finally:
+            leave(stats)
+
+    timed.request_timed = True
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """Route class recording when the endpoint itself starts and returns; pass it as a router's ``route_class``."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs) -> None:
+        # include_router re-creates the route from the already wrapped endpoint
+        if not getattr(endpoint, "request_timed", False):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def wants_profile(scope) -> bool:
+    if _header(scope, b"x-profile") and is_admin_token(_header(scope, b"x-admin-token")):
+        return True
+    return settings.profiling_sample_rate > 0 and random.random() < settings.profiling_sample_rate
+
+
+class ProfilingMiddleware:
+    """ASGI middleware owning the request's ``RequestStats``: slow-request log and opt-in profiles."""
+
+    def __init__(self, app, store: Optional[ProfileStore] = None) -> None:
+        self.app = app
+        self.store = store or ProfileStore(settings.profiling_dir, settings.profiling_max_reports)
+
+    def save(self, report_id: str, sampler: StackSampler, meta: Dict[str, object], stats: RequestStats) -> None:
+        sampler.stop()
+        meta["samples"] = sum(sampler.samples.values())
+        meta["sql"] = sql_summary(stats.sql)
+        try:
+            self.store.write(report_id, sampler.folded(), meta)
+        except OSError:
+            logger.exception("Could not write profile %s", report_id)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        report_id = sampler = None
+        if wants_profile(scope):
+            report_id = new_report_id()
+            stats.sql = []
+            stats.threads = {threading.get_ident()}
+            sampler = StackSampler(stats.threads, settings.profiling_interval_ms / 1000).start()
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                stats.response_started = time.perf_counter()
+                status[0] = message["status"]
+                if report_id is not None:
+                    headers = [*message.get("headers", []), (b"x-profile-id", report_id.encode())]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_stats.reset(token)
+            finished = time.perf_counter()
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            if sampler is not None:
+                meta = {
+                    "id": report_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route,
+                    "status": status[0],
+                    "phases": phases(stats, finished),
+                }
+                # joining the sampler and writing the files both block
+                await run_in_threadpool(self.save, report_id, sampler, meta, stats)
+            if (finished - stats.started) * 1000 >= settings.slow_request_threshold_ms:
+                logger.warning(
+                    "Slow request %s %s -> %s %s",
+                    scope["method"],
+                    route,
+                    status[0],
+                    " ".join(f"{key}={value}" for key, value in phases(stats, finished).items()),
+                )
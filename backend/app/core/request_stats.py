@@ -0,0 +1,114 @@
+"""Per-request SQL statistics.
+
+A ``RequestStats`` object is stored in a context variable for the duration
+of a request. Sync endpoints and dependencies run in the threadpool with a
+copy of the context, so they see (and update) the same object. Engine
+events count statements and accumulate their time into it; the other fields
+are filled in by ``app.core.profiling`` for the slow-request log.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RequestStats:
+    __slots__ = (
+        "started",
+        "queries",
+        "db_time",
+        "auth_time",
+        "handler_started",
+        "handler_finished",
+        "response_started",
+        "sql",
+        "threads",
+    )
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.auth_time = 0.0
+        self.handler_started: Optional[float] = None
+        self.handler_finished: Optional[float] = None
+        self.response_started: Optional[float] = None
+        # only while profiling: (statement, seconds) and the threads that worked on the request
+        self.sql: Optional[List[Tuple[str, float]]] = None
+        self.threads: Optional[Set[int]] = None
+
+
+current_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+@contextmanager
+def timed_auth() -> Iterator[None]:
+    """Count the enclosed block as the authentication phase of the current request."""
+    stats = current_stats.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.auth_time += time.perf_counter() - started
+
+
+def install_query_counter(engine: Engine) -> None:
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats.get()
+    if stats is not None:
+        conn.info["query_started"] = time.perf_counter()
+        if stats.threads is not None:
+            stats.threads.add(threading.get_ident())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    started = conn.info.pop("query_started", None)
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        stats.db_time += elapsed
+        if stats.sql is not None:
+            stats.sql.append((statement, elapsed))
+
+
+class QueryCountMiddleware:
+    """ASGI middleware adding ``X-Query-Count`` and ``X-DB-Time-Ms`` response headers."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # reuse the object of an outer middleware (profiling) so that both see the same numbers
+        stats = current_stats.get() or RequestStats()
+        token = current_stats.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-count", str(stats.queries).encode()))
+                headers.append((b"x-db-time-ms", f"{stats.db_time * 1000:.2f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            current_stats.reset(token)
@@ -1,20 +1,52 @@
+import hmac
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from typing import Any, Iterator, Optional
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.metrics import registry
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is CPU-bound; beyond a few at once they only slow each other down
+_bcrypt_slots = threading.BoundedSemaphore(settings.bcrypt_max_concurrency)
+bcrypt_waiting = registry.gauge("bcrypt_queue_depth", "Password hash operations waiting for a bcrypt slot")
+bcrypt_running = registry.gauge("bcrypt_in_progress", "Password hash operations running")
+bcrypt_seconds = registry.histogram(
+    "bcrypt_duration_seconds", "Time spent hashing or verifying passwords, queueing included", ("operation",)
+)
+
+
+@contextmanager
+def _bcrypt_slot(operation: str) -> Iterator[None]:
+    started = time.perf_counter()
+    bcrypt_waiting.inc()
+    try:
+        _bcrypt_slots.acquire()
+    finally:
+        bcrypt_waiting.dec()
+    bcrypt_running.inc()
+    try:
+        yield
+    finally:
+        bcrypt_running.dec()
+        _bcrypt_slots.release()
+        bcrypt_seconds.observe(time.perf_counter() - started, operation)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with _bcrypt_slot("verify"):
+        return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with _bcrypt_slot("hash"):
+        return pwd_context.hash(password)
 
 
 def create_access_token(
@@ -31,3 +63,10 @@ def decode_access_token(token: str) -> Optional[str]:
         return payload.get("sub")
     except JWTError:
         return None
+
+
+def is_admin_token(value: Optional[str]) -> bool:
+    """Operator endpoints and headers authenticate with ``ADMIN_TOKEN``; unset disables them."""
+    if not settings.admin_token or not value:
+        return False
+    return hmac.compare_digest(value.encode(), settings.admin_token.encode())
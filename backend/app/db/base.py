@@ -5,3 +5,4 @@ Base = declarative_base()
 # Import models so that Alembic can discover them.
 # pylint: disable=unused-import
 from app import models  # noqa: E402,F401
+from app.db import search_index  # noqa: E402,F401  (registers strip_html for the SQLite search triggers)
@@ -2,18 +2,28 @@ from datetime import datetime, timedelta
 
 from app.core.security import get_password_hash
 from app.db.base import Base
+from app.db.search_index import install_search_index
 from app.db.session import SessionLocal, engine
+from app.models.analytics import CourseSimilaritySnapshot, CourseStat
 from app.models.assignment import Assignment, Submission, SubmissionStatus
 from app.models.course import Course, Enrollment, Lesson, Module
+from app.models.leaderboard import CourseLeaderboard
 from app.models.progress import ProgressSnapshot
 from app.models.user import User, UserRole
 from app.models.test import Test, TestQuestion, TestOption, QuestionType
 from app.models.chat import ChatMessage
+from app.services import session_hooks  # noqa: F401  (registers the session hooks)
+from app.services.course_counters import rebuild_course_counters
+from app.services.leaderboards import rebuild_leaderboards
+from app.services.lesson_content import render_stale_lessons
+from app.services.recommendations import refresh_recommendations
 
 
 def init_db() -> None:
     """Create tables and seed demo data if missing."""
     Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        install_search_index(connection)
     db = SessionLocal()
     try:
         teacher = db.query(User).filter(User.email == "teacher@example.com").first()
@@ -151,17 +161,13 @@ def init_db() -> None:
         else:
             assignment1 = (
                 db.query(Assignment)
-                .join(Lesson, Assignment.lesson_id == Lesson.id)
-                .join(Module, Lesson.module_id == Module.id)
-                .filter(Module.course_id == course.id)
+                .filter(Assignment.course_id == course.id)
                 .order_by(Assignment.id)
                 .first()
             )
             assignment2 = (
                 db.query(Assignment)
-                .join(Lesson, Assignment.lesson_id == Lesson.id)
-                .join(Module, Lesson.module_id == Module.id)
-                .filter(Module.course_id == course.id)
+                .filter(Assignment.course_id == course.id)
                 .order_by(Assignment.id.desc())
                 .first()
             )
@@ -228,6 +234,18 @@ def init_db() -> None:
             )
             db.add(msg)
             db.commit()
+        # lessons written before renditions existed, or by an older sanitizer
+        render_stale_lessons(db)
+        # the demo rows above were written without domain events
+        if db.query(CourseStat).first() is None:
+            rebuild_course_counters(db)
+            db.commit()
+        if db.query(CourseLeaderboard).first() is None:
+            rebuild_leaderboards(db)
+            db.commit()
+        if db.query(CourseSimilaritySnapshot).first() is None:
+            refresh_recommendations(db)
+            db.commit()
     finally:
         db.close()
 
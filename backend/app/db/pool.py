@@ -0,0 +1,85 @@
+"""Connection pool that measures how long checkouts wait.
+
+``QueuePool`` blocks a request thread when all ``pool_size + max_overflow``
+connections are out. ``TimedQueuePool`` records how long that takes and how
+many threads are waiting right now, which admission control uses to shed
+load before requests pile up behind the pool.
+"""
+
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy.pool import QueuePool
+
+from app.core.metrics import Family, gauge_family
+
+# weight of the newest sample in the moving average
+EWMA_ALPHA = 0.2
+
+
+class TimedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.waiting = 0
+        # waiter id -> when it started waiting
+        self._waiting_since: Dict[int, float] = {}
+        self._next_waiter = 0
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_ewma = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        with self._stats_lock:
+            self.waiting += 1
+            self._next_waiter += 1
+            waiter = self._next_waiter
+            self._waiting_since[waiter] = started
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.waiting -= 1
+                del self._waiting_since[waiter]
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+                self.wait_ewma += EWMA_ALPHA * (waited - self.wait_ewma)
+
+    def stats(self) -> Dict[str, float]:
+        with self._stats_lock:
+            oldest = min(self._waiting_since.values(), default=None)
+            return {
+                "size": self.size(),
+                "checked_out": self.checkedout(),
+                "overflow": max(self.overflow(), 0),
+                "max_overflow": self._max_overflow,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "wait_seconds_total": self.wait_total,
+                "wait_seconds_max": self.wait_max,
+                "wait_seconds_ewma": self.wait_ewma,
+                # checkouts still blocked do not show up in the average yet
+                "current_wait_seconds": time.perf_counter() - oldest if oldest is not None else 0.0,
+            }
+
+    def metric_families(self) -> List[Family]:
+        pool = self.stats()
+        return [
+            gauge_family("db_pool_size", "Configured pool size", pool["size"]),
+            gauge_family("db_pool_checked_out", "Connections checked out", pool["checked_out"]),
+            gauge_family("db_pool_overflow", "Overflow connections open", pool["overflow"]),
+            gauge_family("db_pool_waiting", "Threads waiting for a connection", pool["waiting"]),
+            gauge_family("db_pool_checkouts_total", "Connection checkouts", pool["checkouts"], "counter"),
+            gauge_family("db_pool_checkout_wait_seconds_total", "Total wait", pool["wait_seconds_total"], "counter"),
+            gauge_family(
+                "db_pool_checkout_wait_seconds_max", "Longest wait", pool["wait_seconds_max"], aggregate="max"
+            ),
+            gauge_family(
+                "db_pool_checkout_wait_seconds_ewma", "Average wait", pool["wait_seconds_ewma"], aggregate="max"
+            ),
+        ]
@@ -0,0 +1,139 @@
+"""Full-text search index DDL for Postgres (tsvector + GIN) and SQLite (FTS5).
+
+Postgres keeps a generated ``search_vector`` column on ``courses``, ``lessons``
+and ``chat_messages``, so every write maintains it without application code.
+Each text field is indexed with both the Russian and the English
+configuration; lesson HTML is stripped before indexing. The columns are not
+mapped on the models: only the search service reads them.
+
+SQLite has no tsvector, so tests and local databases get one FTS5 table
+filled by triggers. ``strip_html`` is registered on every SQLite connection
+because the lesson triggers call it.
+"""
+
+import re
+import sqlite3
+from typing import List, Optional
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+SEARCH_TABLE = "search_index"
+
+# kind -> offset of the FTS5 rowid (rowid = id * len(KINDS) + offset)
+KINDS = {"course": 0, "lesson": 1, "message": 2}
+
+_TAG_RE = re.compile(r"<[^>]*>")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def strip_html(value: Optional[str]) -> str:
+    if not value:
+        return ""
+    return _SPACE_RE.sub(" ", _TAG_RE.sub(" ", value)).strip()
+
+
+@event.listens_for(Engine, "connect")
+def _register_sqlite_functions(dbapi_connection, connection_record) -> None:
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function("strip_html", 1, strip_html, deterministic=True)
+
+
+def _weighted(expression: str, weight: str) -> str:
+    return (
+        f"setweight(to_tsvector('russian', {expression}), '{weight}') || "
+        f"setweight(to_tsvector('english', {expression}), '{weight}')"
+    )
+
+
+PG_HTML_TEXT = "regexp_replace(coalesce({column}, ''), '<[^>]*>', ' ', 'g')"
+
+# table -> tsvector expression of its generated column
+PG_VECTORS = {
+    "courses": " || ".join(
+        [
+            _weighted("coalesce(title, '')", "A"),
+            _weighted("replace(coalesce(tags, ''), ',', ' ')", "B"),
+            _weighted("coalesce(short_description, '') || ' ' || coalesce(long_description, '')", "C"),
+        ]
+    ),
+    "lessons": " || ".join(
+        [
+            _weighted("coalesce(title, '')", "A"),
+            _weighted("coalesce(short_description, '')", "B"),
+            _weighted(PG_HTML_TEXT.format(column="content_html"), "C"),
+        ]
+    ),
+    "chat_messages": _weighted("coalesce(text, '')", "C"),
+}
+
+
+def postgres_statements(existing_columns: dict) -> List[str]:
+    """DDL for the tables whose ``search_vector`` is missing; ``existing_columns`` maps table -> column names."""
+    statements = []
+    for table, vector in PG_VECTORS.items():
+        if table not in existing_columns or "search_vector" in existing_columns[table]:
+            continue
+        # Adding a stored generated column rewrites the table once, which also backfills it.
+        statements.append(
+            f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED"
+        )
+        statements.append(f"CREATE INDEX IF NOT EXISTS ix_{table}_search_vector ON {table} USING GIN (search_vector)")
+    return statements
+
+
+def _rowid(kind: str, id_column: str) -> str:
+    return f"{id_column} * {len(KINDS)} + {KINDS[kind]}"
+
+
+COURSE_BODY = "coalesce({t}.tags, '') || ' ' || {t}.short_description || ' ' || {t}.long_description"
+LESSON_BODY = "{t}.short_description || ' ' || strip_html({t}.content_html)"
+
+# kind -> (table, title expression, body expression), with {t} standing for the row alias
+SQLITE_SOURCES = {
+    "course": ("courses", "{t}.title", COURSE_BODY),
+    "lesson": ("lessons", "{t}.title", LESSON_BODY),
+    "message": ("chat_messages", "''", "{t}.text"),
+}
+
+
+def sqlite_statements() -> List[str]:
+    statements = [
+        f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+        "kind UNINDEXED, ref_id UNINDEXED, title, body, tokenize = 'unicode61 remove_diacritics 2')"
+    ]
+    for kind, (table, title, body) in SQLITE_SOURCES.items():
+        insert_row = (
+            f"INSERT INTO {SEARCH_TABLE} (rowid, kind, ref_id, title, body) "
+            f"VALUES ({_rowid(kind, 'new.id')}, '{kind}', new.id, {title.format(t='new')}, {body.format(t='new')});"
+        )
+        delete_row = f"DELETE FROM {SEARCH_TABLE} WHERE rowid = {_rowid(kind, 'old.id')};"
+        statements += [
+            f"CREATE TRIGGER {table}_search_ai AFTER INSERT ON {table} BEGIN {insert_row} END",
+            f"CREATE TRIGGER {table}_search_au AFTER UPDATE ON {table} BEGIN {delete_row} {insert_row} END",
+            f"CREATE TRIGGER {table}_search_ad AFTER DELETE ON {table} BEGIN {delete_row} END",
+            f"INSERT INTO {SEARCH_TABLE} (rowid, kind, ref_id, title, body) "
+            f"SELECT {_rowid(kind, 'r.id')}, '{kind}', r.id, {title.format(t='r')}, {body.format(t='r')} FROM {table} r",
+        ]
+    return statements
+
+
+def install_search_index(connection: Connection) -> None:
+    """Create whatever part of the search index is missing; safe to call on every start."""
+    inspector = inspect(connection)
+    tables = set(inspector.get_table_names())
+    if connection.dialect.name == "postgresql":
+        existing = {
+            table: {column["name"] for column in inspector.get_columns(table)}
+            for table in PG_VECTORS
+            if table in tables
+        }
+        statements = postgres_statements(existing)
+    elif connection.dialect.name == "sqlite":
+        if SEARCH_TABLE in tables or not {source[0] for source in SQLITE_SOURCES.values()} <= tables:
+            return
+        statements = sqlite_statements()
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
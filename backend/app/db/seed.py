@@ -0,0 +1,487 @@
+"""Synthetic data generator for load testing and query plan checks.
+
+Generates a realistic, deterministic dataset at a configurable scale and
+loads it with bulk INSERTs (COPY on Postgres)::
+
+    python -m app.db.seed --students 50000 --courses 500 \\
+        --submissions 5000000 --test-answers 20000000 --chat-messages 500000
+
+The same ``--seed`` and ``--anchor`` always produce the same rows. Ids are
+allocated after the current maximum of each table, so the tool can run on
+top of the demo data created by ``init_db``.
+"""
+
+import argparse
+import csv
+import io
+import itertools
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Table, func, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.core.security import get_password_hash
+from app.db.base import Base
+from app.db.search_index import install_search_index
+from app.services.course_counters import rebuild_course_counters
+from app.services.leaderboards import rebuild_leaderboards
+from app.services.lesson_content import rendition_values
+
+LEVELS = ("beginner", "intermediate", "advanced")
+TAGS = (
+    "python", "basics", "data", "sql", "web", "backend", "frontend", "ml", "statistics", "devops",
+    "security", "finance", "excel", "management", "english", "algorithms", "java", "go", "design", "testing",
+)
+WORDS = (
+    "введение", "основы", "практика", "проект", "анализ", "данные", "функции", "циклы", "модели", "отчёт",
+    "python", "sql", "api", "тесты", "архитектура", "алгоритмы", "структуры", "запросы", "интерфейс", "сервис",
+)
+
+RENDITION_COLUMNS = ("source_hash", "html", "html_gzip", "html_br", "plain_text", "rendered_at")
+
+
+@dataclass
+class SeedConfig:
+    students: int = 1000
+    teachers: int = 20
+    courses: int = 50
+    modules_per_course: int = 4
+    lessons_per_module: int = 5
+    assignment_ratio: float = 0.7
+    tests_per_course: int = 2
+    questions_per_test: int = 10
+    options_per_question: int = 4
+    enrollments_per_student: int = 6
+    submissions: int = 20000
+    test_answers: int = 50000
+    chat_messages: int = 5000
+    seed: int = 42
+    batch_size: int = 10000
+    anchor: Optional[datetime] = None
+
+
+class BulkWriter:
+    """Streams row tuples into a table in batches, with COPY on Postgres."""
+
+    def __init__(self, connection: Connection, batch_size: int) -> None:
+        self.connection = connection
+        self.batch_size = batch_size
+        self.use_copy = connection.dialect.name == "postgresql"
+        self.counts: Dict[str, int] = {}
+
+    def write(self, table: Table, columns: Sequence[str], rows: Iterable[tuple]) -> int:
+        total = 0
+        iterator = iter(rows)
+        while True:
+            chunk = list(itertools.islice(iterator, self.batch_size))
+            if not chunk:
+                break
+            if self.use_copy:
+                self._copy(table, columns, chunk)
+            else:
+                self.connection.execute(table.insert(), [dict(zip(columns, row)) for row in chunk])
+            total += len(chunk)
+        self.counts[table.name] = self.counts.get(table.name, 0) + total
+        return total
+
+    def _copy(self, table: Table, columns: Sequence[str], chunk: List[tuple]) -> None:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in chunk:
+            writer.writerow(["" if value is None else _copy_value(value) for value in row])
+        buffer.seek(0)
+        cursor = self.connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+
+def _copy_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, bytes):
+        return "\\x" + value.hex()
+    if hasattr(value, "value"):  # enums
+        return value.value
+    return value
+
+
+def next_id(connection: Connection, table: Table) -> int:
+    return (connection.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+
+def reset_sequences(connection: Connection, tables: Iterable[Table]) -> None:
+    if connection.dialect.name != "postgresql":
+        return
+    for table in tables:
+        if "id" not in table.c:
+            continue
+        connection.execute(
+            text(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+            )
+        )
+
+
+class DatasetGenerator:
+    def __init__(self, config: SeedConfig, connection: Connection) -> None:
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.anchor = config.anchor or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.tables = Base.metadata.tables
+        self.ids = {name: next_id(connection, table) for name, table in self.tables.items() if "id" in table.c}
+        tags = self.tables["tags"]
+        self.tag_ids: Dict[str, int] = dict(connection.execute(select(tags.c.name, tags.c.id)).all())
+        self.hashed_password = get_password_hash("password")
+        self.new_tags: List[Tuple[int, str]] = []
+        self.course_tag_rows: List[Tuple[int, int]] = []
+
+    def allocate(self, table: str) -> int:
+        value = self.ids[table]
+        self.ids[table] += 1
+        return value
+
+    def past(self, max_days: int) -> datetime:
+        return self.anchor - timedelta(seconds=self.rng.randint(0, max_days * 86400))
+
+    def phrase(self, words: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(words)).capitalize()
+
+    # --- catalog -------------------------------------------------------------------------
+
+    def users(self, role: str, count: int, out: List[int]) -> Iterator[tuple]:
+        for _ in range(count):
+            user_id = self.allocate("users")
+            out.append(user_id)
+            yield (
+                user_id,
+                f"{role}{user_id}@seed.example.com",
+                f"{role.capitalize()} {user_id}",
+                None,
+                role,
+                self.hashed_password,
+                self.past(720),
+            )
+
+    def generate(self, writer: BulkWriter) -> Dict[str, int]:
+        cfg = self.config
+        user_columns = ("id", "email", "full_name", "avatar_url", "role", "hashed_password", "created_at")
+        teacher_ids: List[int] = []
+        student_ids: List[int] = []
+        writer.write(self.tables["users"], user_columns, self.users("teacher", cfg.teachers, teacher_ids))
+        writer.write(self.tables["users"], user_columns, self.users("student", cfg.students, student_ids))
+
+        courses: List[Tuple[int, bool]] = []
+        writer.write(
+            self.tables["courses"],
+            ("id", "title", "short_description", "long_description", "level", "tags", "estimated_hours",
+             "is_published", "owner_id", "created_at"),
+            self._courses(teacher_ids, courses),
+        )
+        # the ORM hook that fills course_tags does not see bulk inserts
+        writer.write(self.tables["tags"], ("id", "name"), self.new_tags)
+        writer.write(self.tables["course_tags"], ("course_id", "tag_id"), self.course_tag_rows)
+        # course_id -> [(assignment_id, max_score, due_date)]
+        assignments: Dict[int, List[Tuple[int, int, Optional[datetime]]]] = {}
+        modules, lessons, assignment_rows = self._structure(courses, assignments)
+        writer.write(self.tables["modules"], ("id", "course_id", "title", "order_index"), modules)
+        writer.write(
+            self.tables["lessons"],
+            ("id", "module_id", "title", "short_description", "content_html", "order_index"),
+            lessons,
+        )
+        writer.write(
+            self.tables["lesson_renditions"], ("lesson_id", "version") + RENDITION_COLUMNS, self._renditions(lessons)
+        )
+        writer.write(
+            self.tables["assignments"],
+            ("id", "lesson_id", "course_id", "title", "description", "max_score", "due_date", "created_at"),
+            assignment_rows,
+        )
+        # course_id -> [(test_id, [(question_id, [option_ids], {correct})])]
+        tests: Dict[int, List[Tuple[int, List[Tuple[int, List[int], set]]]]] = {}
+        test_rows, question_rows, option_rows = self._tests(courses, tests)
+        writer.write(
+            self.tables["tests"],
+            ("id", "course_id", "title", "description", "is_published", "time_limit_minutes", "created_at", "updated_at"),
+            test_rows,
+        )
+        writer.write(self.tables["test_questions"], ("id", "test_id", "text", "type", "order_index"), question_rows)
+        writer.write(self.tables["test_options"], ("id", "question_id", "text", "is_correct"), option_rows)
+
+        published = [course_id for course_id, is_published in courses if is_published]
+        enrollments: Dict[int, List[int]] = {}
+        enrollments_by_course: Dict[int, List[int]] = {}
+        writer.write(
+            self.tables["enrollments"],
+            ("id", "student_id", "course_id", "enrolled_at"),
+            self._enrollments(student_ids, published, enrollments, enrollments_by_course),
+        )
+        writer.write(
+            self.tables["progress_snapshots"],
+            ("id", "student_id", "course_id", "completed_lessons_count", "total_lessons_count", "avg_score", "updated_at"),
+            self._progress(enrollments, assignments),
+        )
+        writer.write(
+            self.tables["submissions"],
+            ("id", "assignment_id", "student_id", "course_id", "attempt_number", "status", "score",
+             "student_comment", "teacher_comment", "submitted_at", "checked_at"),
+            self._submissions(student_ids, enrollments, assignments),
+        )
+        attempts: List[tuple] = []
+        answers = self._test_answers(student_ids, enrollments, tests, attempts)
+        self._write_attempts_and_answers(writer, answers, attempts)
+        writer.write(
+            self.tables["chat_messages"],
+            ("id", "course_id", "author_id", "text", "created_at", "is_teacher"),
+            self._chat(courses, teacher_ids, enrollments_by_course),
+        )
+        return writer.counts
+
+    def _courses(self, teacher_ids: List[int], out: List[Tuple[int, bool]]) -> Iterator[tuple]:
+        for index in range(self.config.courses):
+            course_id = self.allocate("courses")
+            is_published = self.rng.random() < 0.9
+            out.append((course_id, is_published))
+            names = self.rng.sample(TAGS, self.rng.randint(1, 4))
+            self.course_tag_rows.extend((course_id, self.tag_id(name)) for name in names)
+            tags = ",".join(names)
+            yield (
+                course_id,
+                f"{self.phrase(2)} #{index + 1}",
+                self.phrase(8),
+                " ".join(self.phrase(12) for _ in range(4)),
+                self.rng.choice(LEVELS),
+                tags,
+                self.rng.randint(4, 80),
+                is_published,
+                self.rng.choice(teacher_ids),
+                self.past(540),
+            )
+
+    def tag_id(self, name: str) -> int:
+        if name not in self.tag_ids:
+            self.tag_ids[name] = self.allocate("tags")
+            self.new_tags.append((self.tag_ids[name], name))
+        return self.tag_ids[name]
+
+    def _structure(self, courses, assignments) -> Tuple[List[tuple], List[tuple], List[tuple]]:
+        cfg = self.config
+        modules, lessons, assignment_rows = [], [], []
+        for course_id, _ in courses:
+            course_assignments = assignments.setdefault(course_id, [])
+            for module_index in range(cfg.modules_per_course):
+                module_id = self.allocate("modules")
+                modules.append((module_id, course_id, self.phrase(3), module_index + 1))
+                for lesson_index in range(cfg.lessons_per_module):
+                    lesson_id = self.allocate("lessons")
+                    paragraphs = "".join(f"<p>{self.phrase(25)}</p>" for _ in range(self.rng.randint(3, 12)))
+                    lessons.append((lesson_id, module_id, self.phrase(3), self.phrase(10), paragraphs, lesson_index + 1))
+                    if self.rng.random() < cfg.assignment_ratio:
+                        assignment_id = self.allocate("assignments")
+                        max_score = self.rng.choice((5, 10, 15, 20, 100))
+                        due = self.anchor + timedelta(days=self.rng.randint(-60, 60)) if self.rng.random() < 0.85 else None
+                        course_assignments.append((assignment_id, max_score, due))
+                        assignment_rows.append(
+                            (
+                                assignment_id, lesson_id, course_id, self.phrase(3), self.phrase(20), max_score, due,
+                                self.past(90),
+                            )
+                        )
+        return modules, lessons, assignment_rows
+
+    def _renditions(self, lessons: List[tuple]) -> Iterator[tuple]:
+        # the ORM hook that renders lessons does not see bulk inserts
+        for lesson_id, _, _, _, content_html, _ in lessons:
+            values = rendition_values(content_html)
+            yield (lesson_id, 1) + tuple(values[column] for column in RENDITION_COLUMNS)
+
+    def _tests(self, courses, tests) -> Tuple[List[tuple], List[tuple], List[tuple]]:
+        cfg = self.config
+        test_rows, question_rows, option_rows = [], [], []
+        for course_id, _ in courses:
+            for _ in range(cfg.tests_per_course):
+                test_id = self.allocate("tests")
+                created = self.past(180)
+                test_rows.append(
+                    (test_id, course_id, self.phrase(3), self.phrase(10), True, self.rng.choice((None, 15, 30, 60)), created, created)
+                )
+                questions = []
+                for order in range(cfg.questions_per_test):
+                    question_id = self.allocate("test_questions")
+                    question_type = "multiple" if self.rng.random() < 0.3 else "single"
+                    question_rows.append((question_id, test_id, self.phrase(8) + "?", question_type, order + 1))
+                    option_ids = [self.allocate("test_options") for _ in range(cfg.options_per_question)]
+                    correct_count = self.rng.randint(1, max(1, len(option_ids) - 1)) if question_type == "multiple" else 1
+                    correct = set(self.rng.sample(option_ids, correct_count))
+                    for option_id in option_ids:
+                        option_rows.append((option_id, question_id, self.phrase(3), option_id in correct))
+                    questions.append((question_id, option_ids, correct))
+                tests.setdefault(course_id, []).append((test_id, questions))
+        return test_rows, question_rows, option_rows
+
+    # --- activity ------------------------------------------------------------------------
+
+    def _enrollments(self, student_ids, published, enrollments, by_course) -> Iterator[tuple]:
+        if not published:
+            return
+        # Zipf-like popularity: a few courses get most of the students.
+        weights = list(itertools.accumulate(1.0 / (rank + 1) ** 0.8 for rank in range(len(published))))
+        per_student = min(self.config.enrollments_per_student, len(published))
+        for student_id in student_ids:
+            wanted = max(1, int(self.rng.gauss(per_student, per_student / 3)))
+            chosen: List[int] = []
+            while len(chosen) < min(wanted, len(published)):
+                course_id = self.rng.choices(published, cum_weights=weights)[0]
+                if course_id not in chosen:
+                    chosen.append(course_id)
+            enrollments[student_id] = chosen
+            for course_id in chosen:
+                by_course.setdefault(course_id, []).append(student_id)
+                yield (self.allocate("enrollments"), student_id, course_id, self.past(365))
+
+    def _progress(self, enrollments, assignments) -> Iterator[tuple]:
+        cfg = self.config
+        total = cfg.modules_per_course * cfg.lessons_per_module
+        for student_id, course_ids in enrollments.items():
+            for course_id in course_ids:
+                completed = self.rng.randint(0, total)
+                avg = round(self.rng.uniform(3, 10), 2) if completed and assignments.get(course_id) else None
+                yield (self.allocate("progress_snapshots"), student_id, course_id, completed, total, avg, self.past(30))
+
+    def _quota(self, total: int, students: int, index: int) -> int:
+        base, remainder = divmod(total, max(students, 1))
+        return base + (1 if index < remainder else 0)
+
+    def _submissions(self, student_ids, enrollments, assignments) -> Iterator[tuple]:
+        for index, student_id in enumerate(student_ids):
+            quota = self._quota(self.config.submissions, len(student_ids), index)
+            candidates = [
+                (course_id, *a) for course_id in enrollments.get(student_id, []) for a in assignments.get(course_id, [])
+            ]
+            self.rng.shuffle(candidates)
+            for course_id, assignment_id, max_score, due in candidates:
+                if quota <= 0:
+                    break
+                attempts = min(quota, self.rng.choices((1, 2, 3, 4), weights=(70, 20, 7, 3))[0])
+                submitted = (due or self.anchor) - timedelta(days=self.rng.randint(1, 20))
+                for attempt in range(1, attempts + 1):
+                    submitted += timedelta(hours=self.rng.randint(1, 72))
+                    checked = attempt < attempts or self.rng.random() < 0.7
+                    yield (
+                        self.allocate("submissions"),
+                        assignment_id,
+                        student_id,
+                        course_id,
+                        attempt,
+                        "checked" if checked else "submitted",
+                        round(self.rng.uniform(0, max_score), 1) if checked else None,
+                        self.phrase(6) if self.rng.random() < 0.4 else None,
+                        self.phrase(10) if checked and self.rng.random() < 0.6 else None,
+                        submitted,
+                        submitted + timedelta(hours=self.rng.randint(1, 96)) if checked else None,
+                    )
+                quota -= attempts
+
+    def _test_answers(self, student_ids, enrollments, tests, attempts: List[tuple]) -> Iterator[tuple]:
+        for index, student_id in enumerate(student_ids):
+            quota = self._quota(self.config.test_answers, len(student_ids), index)
+            candidates = [t for course_id in enrollments.get(student_id, []) for t in tests.get(course_id, [])]
+            while quota > 0 and candidates:
+                test_id, questions = self.rng.choice(candidates)
+                attempt_id = self.allocate("test_attempts")
+                started = self.past(120)
+                ability = self.rng.random()
+                score = 0
+                selections = []
+                for question_id, option_ids, correct in questions:
+                    if self.rng.random() < 0.5 + ability / 2:
+                        selected = sorted(correct)
+                    else:
+                        selected = [self.rng.choice(option_ids)]
+                    score += int(set(selected) == correct)
+                    selections.extend((question_id, option_id) for option_id in selected)
+                # The attempt is registered before its answers so it is always flushed first.
+                attempts.append(
+                    (attempt_id, test_id, student_id, started, started + timedelta(minutes=self.rng.randint(3, 60)),
+                     float(score), len(questions))
+                )
+                for question_id, option_id in selections:
+                    quota -= 1
+                    yield (self.allocate("test_answers"), attempt_id, question_id, option_id)
+
+    def _write_attempts_and_answers(self, writer: BulkWriter, answers: Iterator[tuple], attempts: List[tuple]) -> None:
+        """Answers reference attempts, so each answer batch is preceded by the attempts it created."""
+        attempt_columns = ("id", "test_id", "student_id", "started_at", "finished_at", "score", "max_score")
+        answer_columns = ("id", "attempt_id", "question_id", "option_id")
+        while True:
+            chunk = list(itertools.islice(answers, writer.batch_size))
+            if attempts:
+                writer.write(self.tables["test_attempts"], attempt_columns, attempts)
+                attempts.clear()
+            if not chunk:
+                break
+            writer.write(self.tables["test_answers"], answer_columns, chunk)
+
+    def _chat(self, courses, teacher_ids, by_course) -> Iterator[tuple]:
+        active = [course_id for course_id, _ in courses if by_course.get(course_id)]
+        if not active:
+            return
+        weights = [len(by_course[course_id]) for course_id in active]
+        for _ in range(self.config.chat_messages):
+            course_id = self.rng.choices(active, weights=weights)[0]
+            is_teacher = self.rng.random() < 0.15
+            author = self.rng.choice(teacher_ids) if is_teacher else self.rng.choice(by_course[course_id])
+            yield (self.allocate("chat_messages"), course_id, author, self.phrase(self.rng.randint(3, 30)), self.past(90), is_teacher)
+
+
+def seed(engine: Engine, config: SeedConfig) -> Dict[str, int]:
+    """Create tables if needed and load one synthetic dataset in a single transaction."""
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        install_search_index(connection)
+        writer = BulkWriter(connection, config.batch_size)
+        generator = DatasetGenerator(config, connection)
+        counts = generator.generate(writer)
+        # the event handlers that keep course counters and leaderboards do not see bulk inserts
+        rebuild_course_counters(connection, generator.anchor.date())
+        with Session(bind=connection) as session:
+            rebuild_leaderboards(session)
+        reset_sequences(connection, Base.metadata.tables.values())
+    return counts
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> SeedConfig:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = SeedConfig()
+    for field_name, value in vars(defaults).items():
+        if field_name == "anchor":
+            continue
+        parser.add_argument(f"--{field_name.replace('_', '-')}", type=type(value), default=value)
+    parser.add_argument("--anchor", type=datetime.fromisoformat, default=None, help="ISO datetime used as 'now'")
+    return SeedConfig(**vars(parser.parse_args(argv)))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    from app.db.session import engine
+
+    config = parse_args(argv)
+    started = time.perf_counter()
+    counts = seed(engine, config)
+    elapsed = time.perf_counter() - started
+    for table_name, count in counts.items():
+        print(f"{table_name:>20}: {count}")
+    print(f"Seeded {sum(counts.values())} rows in {elapsed:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
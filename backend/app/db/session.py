@@ -1,9 +1,27 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import registry
+from app.db.pool import TimedQueuePool
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+
+def engine_options(database_url: str) -> dict:
+    if make_url(database_url).database in (None, "", ":memory:"):
+        # in-memory SQLite keeps SQLAlchemy's default single-connection pool
+        return {}
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+    }
+
+
+engine = create_engine(settings.database_url, pool_pre_ping=True, **engine_options(settings.database_url))
+if isinstance(engine.pool, TimedQueuePool):
+    registry.register_collector("db_pool", engine.pool.metric_families)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -0,0 +1,11 @@
+"""``INSERT .. ON CONFLICT`` for the databases the app runs on."""
+
+from sqlalchemy import Table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+
+def upsert(db: Session, table: Table):
+    """Insert statement of the session's dialect; Postgres and SQLite both have ``on_conflict_do_update``."""
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    return dialect.insert(table)
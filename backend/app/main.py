@@ -5,6 +5,7 @@ from app.core.version_check import verify_dependencies
 verify_dependencies()
 
 from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1 import (
@@ -20,10 +21,34 @@ from app.api.v1 import (
     feed,
     tests,
     chat,
+    dashboard,
+    grading,
+    analytics,
+    search,
+    jobs,
+    admin,
+    leaderboards,
 )
+from app.core.admission import AdmissionMiddleware, admission
+from app.core.background import PeriodicTask, register, start_background_tasks, stop_background_tasks
+from app.core.cache import cache, start_cache, stop_cache
 from app.core.config import settings
+from app.core.memory import memory_diagnostics
+from app.core.metrics import MetricsMiddleware, dump_snapshot_job, exposition, register_cache_stats, remove_snapshot
+from app.core.profiling import ProfilingMiddleware, TimedRoute
+from app.core.request_stats import QueryCountMiddleware, install_query_counter
+from app.db.pool import TimedQueuePool
+from app.db.session import SessionLocal, engine
+from app.services import event_handlers, job_handlers, session_hooks  # noqa: F401  (register the handlers and hooks)
+from app.services.attempts import autosave_buffer, flush_autosaves_job, sweep_expired_attempts_job
+from app.services.course_counters import compact_course_counters_job
+from app.services.events import dispatch_events_job, dispatcher, prune_outbox_job
+from app.services.funnel import rebuild_funnels_job, refresh_stale_funnels_job
+from app.services.jobs import job_runner
+from app.services.recommendations import refresh_recommendations_job
+from app.warmup import readiness, warmup
 
-api_router = APIRouter(prefix="/api/v1")
+api_router = APIRouter(prefix="/api/v1", route_class=TimedRoute)
 api_router.include_router(auth.router)
 api_router.include_router(users.router)
 api_router.include_router(courses.router)
@@ -36,6 +61,29 @@ api_router.include_router(deadlines.router)
 api_router.include_router(feed.router)
 api_router.include_router(tests.router)
 api_router.include_router(chat.router)
+api_router.include_router(dashboard.router)
+api_router.include_router(grading.router)
+api_router.include_router(analytics.router)
+api_router.include_router(search.router)
+api_router.include_router(jobs.router)
+api_router.include_router(admin.router)
+api_router.include_router(leaderboards.router)
+
+register(PeriodicTask("funnel-refresh", settings.funnel_refresh_interval_seconds, refresh_stale_funnels_job))
+register(PeriodicTask("funnel-rebuild", settings.funnel_rebuild_interval_seconds, rebuild_funnels_job))
+register(
+    PeriodicTask("course-counters", settings.course_counter_compact_interval_seconds, compact_course_counters_job)
+)
+register(
+    PeriodicTask("recommendations", settings.recommendations_refresh_interval_seconds, refresh_recommendations_job)
+)
+register(PeriodicTask("autosave-flush", settings.autosave_flush_interval_seconds, flush_autosaves_job))
+register(PeriodicTask("attempt-sweep", settings.attempt_sweep_interval_seconds, sweep_expired_attempts_job))
+register(PeriodicTask("outbox-dispatch", settings.outbox_dispatch_interval_seconds, dispatch_events_job))
+register(PeriodicTask("outbox-prune", 3600.0, prune_outbox_job))
+if settings.metrics_enabled and settings.metrics_multiprocess_dir:
+    register(PeriodicTask("metrics-dump", settings.metrics_dump_interval_seconds, dump_snapshot_job))
+register_cache_stats("response", cache.stats)
 
 
 def create_app() -> FastAPI:
@@ -44,6 +92,10 @@ def create_app() -> FastAPI:
         description="Student track API for PSB Learn hackathon prototype.",
         version="0.1.0",
     )
+    # inside CORS, so that 429/503 responses still carry the CORS headers
+    app.add_middleware(AdmissionMiddleware)
+    if isinstance(engine.pool, TimedQueuePool):
+        admission.pool_stats = engine.pool.stats
     app.add_middleware(
         CORSMiddleware,
         allow_origins=["*"],
@@ -51,15 +103,84 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    install_query_counter(engine)
+    if settings.expose_query_count:
+        app.add_middleware(QueryCountMiddleware)
+    app.add_middleware(ProfilingMiddleware)
+    if settings.metrics_enabled:
+        # outermost, so rejected and failed requests are timed too
+        app.add_middleware(MetricsMiddleware)
 
     @app.on_event("startup")
     def ensure_media_folder() -> None:
         os.makedirs(settings.media_root, exist_ok=True)
 
+    @app.on_event("startup")
+    def connect_cache_bus() -> None:
+        start_cache(engine)
+
+    @app.on_event("startup")
+    def warm_up_worker() -> None:
+        warmup()
+
+    @app.on_event("startup")
+    def run_background_tasks() -> None:
+        if settings.background_tasks_enabled:
+            start_background_tasks()
+        if settings.jobs_in_process:
+            job_runner.start()
+
+    @app.on_event("shutdown")
+    def start_draining() -> None:
+        readiness.mark_draining()
+
+    @app.on_event("shutdown")
+    def stop_periodic_tasks() -> None:
+        stop_background_tasks()
+        job_runner.stop()
+        memory_diagnostics.stop()
+        # buffered autosaves of this worker would otherwise be lost
+        autosave_buffer.flush()
+
+    @app.on_event("shutdown")
+    def disconnect_cache_bus() -> None:
+        stop_cache()
+
+    @app.on_event("shutdown")
+    def drop_metrics_snapshot() -> None:
+        # the other workers would otherwise keep serving this worker's last numbers
+        if settings.metrics_enabled:
+            remove_snapshot()
+
     @app.get("/health", tags=["health"])
     def health_check():
         return {"status": "ok"}
 
+    @app.get("/ready", tags=["health"])
+    def readiness_check():
+        body = {"status": "ready" if readiness.ready else "warming_up", "timings": readiness.timings}
+        if readiness.error:
+            body["warning"] = readiness.error
+        return JSONResponse(body, status_code=200 if readiness.ready else 503)
+
+    @app.get("/health/admission", tags=["health"])
+    def admission_health():
+        return admission.stats()
+
+    @app.get("/health/outbox", tags=["health"])
+    def outbox_health():
+        db = SessionLocal()
+        try:
+            return dispatcher.stats(db)
+        finally:
+            db.close()
+
+    if settings.metrics_enabled:
+
+        @app.get("/metrics", include_in_schema=False)
+        def metrics():
+            return PlainTextResponse(exposition(), media_type="text/plain; version=0.0.4")
+
     app.include_router(api_router)
     return app
 
@@ -1,16 +1,30 @@
 from app.models.user import User, UserRole
-from app.models.course import Course, Module, Lesson, Enrollment
+from app.models.course import Course, CourseTag, Module, Lesson, LessonRendition, Enrollment, Tag
 from app.models.assignment import Assignment, Submission, SubmissionFile, SubmissionStatus
 from app.models.progress import ProgressSnapshot
 from app.models.test import Test, TestQuestion, TestOption, TestAttempt, TestAnswer, QuestionType
 from app.models.chat import ChatMessage
+from app.models.analytics import (
+    CourseActivity,
+    CourseCounterShard,
+    CourseFunnelStat,
+    CourseSimilaritySnapshot,
+    CourseStat,
+    LessonFunnelStat,
+)
+from app.models.job import Job, JobStatus
+from app.models.leaderboard import CourseLeaderboard, LeaderboardEntry
+from app.models.outbox import OutboxDelivery, OutboxEvent, OutboxStatus
 
 __all__ = [
     "User",
     "UserRole",
     "Course",
+    "CourseTag",
+    "Tag",
     "Module",
     "Lesson",
+    "LessonRendition",
     "Enrollment",
     "Assignment",
     "Submission",
@@ -24,4 +38,17 @@ __all__ = [
     "TestAnswer",
     "QuestionType",
     "ChatMessage",
+    "CourseFunnelStat",
+    "CourseStat",
+    "CourseCounterShard",
+    "CourseActivity",
+    "CourseSimilaritySnapshot",
+    "LessonFunnelStat",
+    "OutboxEvent",
+    "OutboxDelivery",
+    "OutboxStatus",
+    "Job",
+    "JobStatus",
+    "CourseLeaderboard",
+    "LeaderboardEntry",
 ]
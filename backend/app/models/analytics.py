@@ -0,0 +1,91 @@
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, LargeBinary
+from sqlalchemy.orm import relationship
+
+from app.db.base import Base
+from app.models.course import Course, Lesson
+
+
+class CourseFunnelStat(Base):
+    """Pre-aggregated course funnel header; ``stale`` marks it for the next refresh."""
+
+    __tablename__ = "course_funnel_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False, unique=True)
+    enrolled_count = Column(Integer, default=0, nullable=False)
+    stale = Column(Boolean, default=False, nullable=False)
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # last full recompute; refreshes of flagged lessons leave it alone
+    rebuilt_at = Column(DateTime, nullable=True)
+
+    course = relationship(Course)
+
+
+class LessonFunnelStat(Base):
+    __tablename__ = "lesson_funnel_stats"
+
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False, index=True)
+    lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False, unique=True)
+    # position of the lesson in the course (module order, then lesson order)
+    position = Column(Integer, default=0, nullable=False)
+    submitted_count = Column(Integer, default=0, nullable=False)
+    completed_count = Column(Integer, default=0, nullable=False)
+    avg_score = Column(Float, nullable=True)
+    stale = Column(Boolean, default=False, nullable=False)
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    lesson = relationship(Lesson)
+
+
+class CourseStat(Base):
+    """Compacted per-course counters shown on catalog cards, see ``app.services.course_counters``."""
+
+    __tablename__ = "course_stats"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    enrollments = Column(Integer, default=0, nullable=False)
+    # distinct students who enrolled or submitted in the last 7 days, today included
+    active_students_7d = Column(Integer, default=0, nullable=False)
+    submissions_7d = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("ix_course_stats_popular", "enrollments", "course_id"),)
+
+
+class CourseCounterShard(Base):
+    """Not yet compacted counter deltas; writers pick a random ``shard`` to spread row locks."""
+
+    __tablename__ = "course_counter_shards"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    enrollments = Column(Integer, default=0, nullable=False)
+    submissions = Column(Integer, default=0, nullable=False)
+
+
+class CourseActivity(Base):
+    """Last day a student enrolled in or submitted to a course; pruned past the 7-day window."""
+
+    __tablename__ = "course_activity"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    student_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    active_on = Column(Date, nullable=False)
+
+    __table_args__ = (Index("ix_course_activity_active_on", "active_on"),)
+
+
+class CourseSimilaritySnapshot(Base):
+    """Top-k similar courses of every published course, as arrays, see ``app.services.recommendations``."""
+
+    __tablename__ = "course_similarity_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    built_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    course_count = Column(Integer, nullable=False)
+    # np.savez_compressed archive
+    payload = Column(LargeBinary, nullable=False)
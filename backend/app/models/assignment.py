@@ -7,14 +7,16 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    text,
 )
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
-from app.models.course import Lesson
+from app.models.course import Course, Lesson
 from app.models.user import User
 
 
@@ -29,6 +31,8 @@ class Assignment(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     lesson_id = Column(Integer, ForeignKey("lessons.id"), nullable=False)
+    # copy of lesson.module.course_id, kept in sync by app.services.course_scope
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
     title = Column(String, nullable=False)
     description = Column(Text, nullable=False)
     max_score = Column(Integer, nullable=False)
@@ -36,8 +40,11 @@ class Assignment(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     lesson = relationship(Lesson, back_populates="assignment")
+    course = relationship(Course)
     submissions = relationship("Submission", back_populates="assignment", cascade="all, delete")
 
+    __table_args__ = (Index("ix_assignments_course_created", "course_id", "created_at"),)
+
 
 class Submission(Base):
     __tablename__ = "submissions"
@@ -45,6 +52,8 @@ class Submission(Base):
     id = Column(Integer, primary_key=True, index=True)
     assignment_id = Column(Integer, ForeignKey("assignments.id"), nullable=False)
     student_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # copy of assignment.course_id, kept in sync by app.services.course_scope
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
     attempt_number = Column(Integer, nullable=False, default=1)
     status = Column(Enum(SubmissionStatus), default=SubmissionStatus.draft, nullable=False)
     score = Column(Float, nullable=True)
@@ -52,11 +61,29 @@ class Submission(Base):
     teacher_comment = Column(Text, nullable=True)
     submitted_at = Column(DateTime, nullable=True)
     checked_at = Column(DateTime, nullable=True)
+    # review queue lease: who is grading this submission and until when
+    claimed_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    claim_expires_at = Column(DateTime, nullable=True)
 
     assignment = relationship(Assignment, back_populates="submissions")
-    student = relationship(User, backref="submissions")
+    course = relationship(Course)
+    student = relationship(User, backref="submissions", foreign_keys=[student_id])
+    claimed_by = relationship(User, foreign_keys=[claimed_by_id])
     files = relationship("SubmissionFile", back_populates="submission", cascade="all, delete")
 
+    __table_args__ = (
+        # Only ungraded rows are indexed, so the review queue stays small as graded history grows.
+        Index(
+            "ix_submissions_review_queue",
+            "assignment_id",
+            "submitted_at",
+            postgresql_where=text("status = 'submitted'"),
+            sqlite_where=text("status = 'submitted'"),
+        ),
+        Index("ix_submissions_student_course", "student_id", "course_id"),
+        Index("ix_submissions_course", "course_id"),
+    )
+
 
 class SubmissionFile(Base):
     __tablename__ = "submission_files"
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, LargeBinary, String, Text, func
 from sqlalchemy.orm import relationship
 
 from app.db.base import Base
@@ -15,6 +15,7 @@ class Course(Base):
     short_description = Column(String, nullable=False)
     long_description = Column(Text, nullable=False)
     level = Column(String, nullable=False)
+    # comma-separated as entered; split into course_tags by app.services.course_tags
     tags = Column(String, nullable=True)
     estimated_hours = Column(Integer, nullable=True)
     is_published = Column(Boolean, default=False, nullable=False)
@@ -24,6 +25,52 @@ class Course(Base):
     owner = relationship(User, backref="owned_courses")
     modules = relationship("Module", back_populates="course", cascade="all, delete")
     enrollments = relationship("Enrollment", back_populates="course", cascade="all, delete")
+    tag_links = relationship("CourseTag", cascade="all, delete-orphan")
+    # compacted counters, joined so that serializing a course costs no extra query
+    stats = relationship("CourseStat", uselist=False, lazy="joined", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_courses_catalog_recent", "is_published", "created_at", "id"),
+        Index("ix_courses_level", "level"),
+        # serves lower(title) LIKE 'prefix%'; Postgres needs the pattern opclass for that under non-C collations
+        Index(
+            "ix_courses_title_prefix",
+            func.lower(title).label("title_lower"),
+            postgresql_ops={"title_lower": "text_pattern_ops"},
+        ),
+    )
+
+    @property
+    def enrollments_count(self) -> int:
+        return self.stats.enrollments if self.stats else 0
+
+    @property
+    def active_students_7d(self) -> int:
+        return self.stats.active_students_7d if self.stats else 0
+
+    @property
+    def submissions_7d(self) -> int:
+        return self.stats.submissions_7d if self.stats else 0
+
+
+class Tag(Base):
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True)
+    # normalized: stripped and lower-cased
+    name = Column(String(64), nullable=False, unique=True)
+
+
+class CourseTag(Base):
+    __tablename__ = "course_tags"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+
+    tag = relationship(Tag)
+
+    # the primary key serves "tags of a course"; this one "courses with a tag"
+    __table_args__ = (Index("ix_course_tags_tag_course", "tag_id", "course_id"),)
 
 
 class Module(Base):
@@ -55,6 +102,31 @@ class Lesson(Base):
         back_populates="lesson",
         cascade="all, delete",
     )
+    rendition = relationship(
+        "LessonRendition",
+        uselist=False,
+        back_populates="lesson",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+class LessonRendition(Base):
+    """Sanitized, precompressed ``Lesson.content_html``; see app.services.lesson_content."""
+
+    __tablename__ = "lesson_renditions"
+
+    lesson_id = Column(Integer, ForeignKey("lessons.id", ondelete="CASCADE"), primary_key=True)
+    # bumped whenever the rendered content changes; part of the content URL
+    version = Column(Integer, nullable=False, default=1)
+    source_hash = Column(String(64), nullable=False)
+    html = Column(Text, nullable=False)
+    html_gzip = Column(LargeBinary, nullable=False)
+    html_br = Column(LargeBinary, nullable=True)
+    plain_text = Column(Text, nullable=False)
+    rendered_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    lesson = relationship(Lesson, back_populates="rendition")
 
 
 class Enrollment(Base):
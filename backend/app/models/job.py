@@ -0,0 +1,59 @@
+import enum
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Enum, Float, ForeignKey, Index, Integer, String, Text, text
+
+from app.db.base import Base
+
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class Job(Base):
+    """Unit of background work, claimed by a worker with ``SKIP LOCKED``."""
+
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    status = Column(Enum(JobStatus), default=JobStatus.queued, nullable=False)
+    # higher runs first
+    priority = Column(Integer, default=0, nullable=False)
+    # at most one queued or running job per key
+    dedupe_key = Column(String, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # a running job whose lease ran out belongs to a dead worker and is claimed again
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
+    progress = Column(Float, default=0.0, nullable=False)
+    progress_message = Column(String, nullable=True)
+    result = Column(Text, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_by_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_jobs_claim",
+            "priority",
+            "run_after",
+            postgresql_where=text("status IN ('queued', 'running')"),
+            sqlite_where=text("status IN ('queued', 'running')"),
+        ),
+        Index(
+            "uq_jobs_active_dedupe_key",
+            "dedupe_key",
+            unique=True,
+            postgresql_where=text("status IN ('queued', 'running') AND dedupe_key IS NOT NULL"),
+            sqlite_where=text("status IN ('queued', 'running') AND dedupe_key IS NOT NULL"),
+        ),
+    )
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Index, Integer
+
+from app.db.base import Base
+
+
+class CourseLeaderboard(Base):
+    """Revision of a course's leaderboard; bumped in the transaction of every change to its entries."""
+
+    __tablename__ = "course_leaderboards"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    revision = Column(Integer, default=0, nullable=False)
+
+
+class LeaderboardEntry(Base):
+    """A student's standing in a course; rows without graded work stay as tombstones."""
+
+    __tablename__ = "leaderboard_entries"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    student_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    # over the latest graded attempt of each assignment
+    points = Column(Float, default=0, nullable=False)
+    avg_score = Column(Float, nullable=True)
+    graded_count = Column(Integer, default=0, nullable=False)
+    # course revision of the last change, so workers can fetch only what changed
+    revision = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (Index("ix_leaderboard_entries_course_revision", "course_id", "revision"),)
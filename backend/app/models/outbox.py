@@ -0,0 +1,51 @@
+import enum
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, Integer, String, Text, UniqueConstraint, text
+
+from app.db.base import Base
+
+
+class OutboxStatus(str, enum.Enum):
+    pending = "pending"
+    done = "done"
+    # gave up after the maximum number of attempts; kept for inspection
+    failed = "failed"
+
+
+class OutboxEvent(Base):
+    """Domain event written in the transaction of the change it describes."""
+
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    status = Column(Enum(OutboxStatus), default=OutboxStatus.pending, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    dispatched_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index(
+            "ix_outbox_events_pending",
+            "id",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+    )
+
+
+class OutboxDelivery(Base):
+    """One handler has processed one event; written with the handler's own changes."""
+
+    __tablename__ = "outbox_deliveries"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(Integer, ForeignKey("outbox_events.id", ondelete="CASCADE"), nullable=False)
+    handler = Column(String, nullable=False)
+    delivered_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (UniqueConstraint("event_id", "handler", name="uq_outbox_deliveries_event_handler"),)
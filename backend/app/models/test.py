@@ -8,6 +8,7 @@ from sqlalchemy import (
     Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -77,11 +78,27 @@ class TestAttempt(Base):
     finished_at = Column(DateTime, nullable=True)
     score = Column(Float, nullable=True)
     max_score = Column(Integer, nullable=True)
+    # set for timed attempts started through the attempts API
+    deadline_at = Column(DateTime, nullable=True)
+    # JSON {question_id: [option_ids]} written by autosave until the attempt is finished
+    draft_answers = Column(Text, nullable=True)
+    draft_saved_at = Column(DateTime, nullable=True)
 
     test = relationship(Test, back_populates="attempts")
     student = relationship(User, backref="test_attempts")
     answers = relationship("TestAnswer", back_populates="attempt", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Only open attempts are indexed; there are few of them at any time, so the same
+        # small index serves the expiry sweep and looking up an attempt to resume.
+        Index(
+            "ix_test_attempts_open",
+            "deadline_at",
+            postgresql_where=finished_at.is_(None),
+            sqlite_where=finished_at.is_(None),
+        ),
+    )
+
 
 class TestAnswer(Base):
     __tablename__ = "test_answers"
@@ -1,5 +1,10 @@
 from app.schemas.user import UserBase, UserCreate, UserRead, UserLogin, UserRoleEnum
 from app.schemas.course import (
+    CatalogPage,
+    CatalogSort,
+    TagMatch,
+    CourseRecommendations,
+    RecommendedCourse,
     CourseBase,
     CourseCreate,
     CourseRead,
@@ -19,7 +24,11 @@ from app.schemas.assignment import (
     SubmissionListResponse,
 )
 from app.schemas.progress import ProgressSnapshotRead
+from app.schemas.analytics import CourseFunnelRead, LessonFunnelRead
+from app.schemas.job import JobRead
+from app.schemas.search import SearchHit, SearchKind, SearchResponse
 from app.schemas.grade import GradeItem, GradeListResponse
+from app.schemas.leaderboard import LeaderboardMetric, LeaderboardRead, LeaderboardRow
 from app.schemas.deadline import DeadlineItem, DeadlineListResponse, DeadlineSeverity
 from app.schemas.feed import FeedItem, FeedListResponse, FeedItemType
 from app.schemas.test import (
@@ -36,8 +45,26 @@ from app.schemas.test import (
     TestCreate,
     TestQuestionCreate,
     TestOptionCreate,
+    TestImport,
+    TestImportResult,
+    TestCloneRequest,
+    ItemAnalysisOption,
+    ItemAnalysisQuestion,
+    TestItemAnalysis,
+    TimedAttemptRead,
+    AutosaveResult,
 )
 from app.schemas.chat import ChatMessageRead, ChatMessageCreate, ChatMessageListResponse
+from app.schemas.dashboard import DashboardResponse
+from app.schemas.grading import (
+    BulkGradeRequest,
+    BulkGradeResponse,
+    ClaimedSubmission,
+    GradeUpdate,
+    RejectedGrade,
+    ReviewQueueClaimResponse,
+    ReviewQueueReleaseRequest,
+)
 
 __all__ = [
     "UserBase",
@@ -45,6 +72,11 @@ __all__ = [
     "UserRead",
     "UserLogin",
     "UserRoleEnum",
+    "CatalogPage",
+    "CatalogSort",
+    "TagMatch",
+    "CourseRecommendations",
+    "RecommendedCourse",
     "CourseBase",
     "CourseCreate",
     "CourseRead",
@@ -61,8 +93,17 @@ __all__ = [
     "SubmissionStatusEnum",
     "SubmissionListResponse",
     "ProgressSnapshotRead",
+    "CourseFunnelRead",
+    "LessonFunnelRead",
+    "JobRead",
+    "SearchHit",
+    "SearchKind",
+    "SearchResponse",
     "GradeItem",
     "GradeListResponse",
+    "LeaderboardMetric",
+    "LeaderboardRead",
+    "LeaderboardRow",
     "DeadlineItem",
     "DeadlineListResponse",
     "DeadlineSeverity",
@@ -82,7 +123,23 @@ __all__ = [
     "TestCreate",
     "TestQuestionCreate",
     "TestOptionCreate",
+    "TestImport",
+    "TestImportResult",
+    "TestCloneRequest",
+    "ItemAnalysisOption",
+    "ItemAnalysisQuestion",
+    "TestItemAnalysis",
+    "TimedAttemptRead",
+    "AutosaveResult",
     "ChatMessageRead",
     "ChatMessageCreate",
     "ChatMessageListResponse",
+    "DashboardResponse",
+    "BulkGradeRequest",
+    "BulkGradeResponse",
+    "GradeUpdate",
+    "RejectedGrade",
+    "ClaimedSubmission",
+    "ReviewQueueClaimResponse",
+    "ReviewQueueReleaseRequest",
 ]
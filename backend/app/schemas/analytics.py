@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class LessonFunnelRead(BaseModel):
+    lesson_id: int
+    lesson_title: str
+    position: int
+    # distinct students with a submitted or checked attempt / with a checked attempt
+    submitted_count: int
+    completed_count: int
+    submission_rate: Optional[float]
+    completion_rate: Optional[float]
+    avg_score: Optional[float]
+
+
+class CourseFunnelRead(BaseModel):
+    course_id: int
+    enrolled_count: int
+    refreshed_at: datetime
+    # a refresh is pending; numbers lag behind the latest submissions
+    stale: bool
+    lessons: List[LessonFunnelRead]
@@ -1,3 +1,4 @@
+import enum
 from datetime import datetime
 from typing import List, Optional
 
@@ -43,11 +44,42 @@ class LessonRead(BaseModel):
 class CourseRead(CourseBase):
     id: int
     created_at: datetime
+    # compacted counters; they trail enrollments and submissions by up to one compaction interval
+    enrollments_count: int = 0
+    active_students_7d: int = 0
+    submissions_7d: int = 0
 
     class Config:
         orm_mode = True
 
 
+class CatalogSort(str, enum.Enum):
+    popular = "popular"
+    recent = "recent"
+
+
+class TagMatch(str, enum.Enum):
+    any = "any"
+    all = "all"
+
+
+class CatalogPage(BaseModel):
+    items: List[CourseRead]
+    # pass back as ``cursor`` for the next page; null on the last page
+    next_cursor: Optional[str] = None
+
+
+class RecommendedCourse(CourseRead):
+    # sum of the similarities to the student's courses; 0 for popularity fill-ins
+    score: float = 0.0
+
+
+class CourseRecommendations(BaseModel):
+    items: List[RecommendedCourse]
+    # build time of the similarity snapshot; null before the first background refresh
+    built_at: Optional[datetime] = None
+
+
 class CourseDetail(BaseModel):
     id: int
     title: str
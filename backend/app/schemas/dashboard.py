@@ -0,0 +1,19 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.course import CourseRead
+from app.schemas.deadline import DeadlineItem
+from app.schemas.feed import FeedItem
+from app.schemas.grade import GradeItem
+from app.schemas.progress import ProgressSnapshotRead
+
+
+class DashboardResponse(BaseModel):
+    courses: Optional[Dict[str, List[CourseRead]]] = None
+    deadlines: Optional[List[DeadlineItem]] = None
+    feed: Optional[List[FeedItem]] = None
+    grades: Optional[List[GradeItem]] = None
+    progress: Optional[List[ProgressSnapshotRead]] = None
+    # section name -> "timeout" | "error" for sections that did not make it in time
+    degraded: Dict[str, str] = {}
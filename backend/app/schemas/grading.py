@@ -0,0 +1,46 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, conlist
+
+
+class GradeUpdate(BaseModel):
+    submission_id: int
+    # attempt the teacher was looking at; grades for superseded attempts are rejected
+    attempt_number: int
+    score: float
+    teacher_comment: Optional[str] = None
+
+
+class BulkGradeRequest(BaseModel):
+    items: conlist(GradeUpdate, min_items=1, max_items=1000)  # type: ignore[valid-type]
+
+
+class RejectedGrade(BaseModel):
+    submission_id: int
+    reason: str
+
+
+class BulkGradeResponse(BaseModel):
+    updated: List[int]
+    rejected: List[RejectedGrade]
+
+
+class ClaimedSubmission(BaseModel):
+    submission_id: int
+    assignment_id: int
+    assignment_title: str
+    course_id: int
+    student_id: int
+    attempt_number: int
+    submitted_at: Optional[datetime]
+    due_date: Optional[datetime]
+    claim_expires_at: datetime
+
+
+class ReviewQueueClaimResponse(BaseModel):
+    items: List[ClaimedSubmission]
+
+
+class ReviewQueueReleaseRequest(BaseModel):
+    submission_ids: List[int]
@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from app.models.job import JobStatus
+
+
+class JobRead(BaseModel):
+    id: int
+    kind: str
+    status: JobStatus
+    priority: int
+    attempts: int
+    max_attempts: int
+    # 0..1
+    progress: float
+    progress_message: Optional[str]
+    result: Optional[Any]
+    last_error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
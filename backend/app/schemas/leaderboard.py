@@ -0,0 +1,31 @@
+import enum
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class LeaderboardMetric(str, enum.Enum):
+    points = "points"
+    avg_score = "avg_score"
+
+
+class LeaderboardRow(BaseModel):
+    # competition ranking: equal values share the best rank and are listed by student id
+    rank: int
+    student_id: int
+    full_name: str
+    value: float
+
+
+class LeaderboardRead(BaseModel):
+    course_id: int
+    metric: LeaderboardMetric
+    # students with graded work in the course
+    total: int
+    top: List[LeaderboardRow]
+    # the current student's row; null until they have graded work
+    me: Optional[LeaderboardRow] = None
+    # share of the other ranked students with a strictly lower value, 0..100
+    percentile: Optional[float] = None
+    # rows around ``me``, itself included
+    around: List[LeaderboardRow] = []
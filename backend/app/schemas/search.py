@@ -0,0 +1,29 @@
+import enum
+from typing import List
+
+from pydantic import BaseModel
+
+
+class SearchKind(str, enum.Enum):
+    course = "course"
+    lesson = "lesson"
+    message = "message"
+
+
+class SearchHit(BaseModel):
+    kind: SearchKind
+    id: int
+    course_id: int
+    # plain title; for chat messages the course title
+    title: str
+    # HTML-escaped text with matches wrapped in <mark>
+    title_highlight: str
+    snippet: str
+    rank: float
+
+
+class SearchResponse(BaseModel):
+    items: List[SearchHit]
+    total: int
+    limit: int
+    offset: int
@@ -2,7 +2,7 @@ import enum
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, conlist
 
 
 class QuestionType(str, enum.Enum):
@@ -91,6 +91,25 @@ class TestCreate(BaseModel):
     is_published: bool = True
 
 
+class TestImport(TestCreate):
+    questions: conlist(TestQuestionCreate, min_items=1, max_items=1000)  # type: ignore[valid-type]
+
+
+class TestImportResult(BaseModel):
+    id: int
+    course_id: int
+    title: str
+    questions_count: int
+    options_count: int
+
+
+class TestCloneRequest(BaseModel):
+    # defaults to the source test's course and title
+    course_id: Optional[int] = None
+    title: Optional[str] = None
+    is_published: bool = False
+
+
 class QuestionAnswerPayload(BaseModel):
     question_id: int
     selected_option_ids: List[int]
@@ -100,7 +119,49 @@ class TestSubmitPayload(BaseModel):
     answers: List[QuestionAnswerPayload]
 
 
+class TimedAttemptRead(BaseModel):
+    id: int
+    test_id: int
+    started_at: datetime
+    deadline_at: Optional[datetime]
+    # lets the client correct its countdown for clock skew
+    server_time: datetime
+    # last autosaved answers, for resuming after a reload
+    answers: List[QuestionAnswerPayload]
+
+
+class AutosaveResult(BaseModel):
+    saved_at: datetime
+    deadline_at: Optional[datetime]
+
+
 class TestSubmitResult(BaseModel):
     attempt_id: int
     score: float
     max_score: int
+
+
+class ItemAnalysisOption(BaseModel):
+    option_id: int
+    is_correct: bool
+    # share of attempts selecting the option: overall, in the top and in the bottom 27% by score
+    selection_rate: Optional[float]
+    upper_group_rate: Optional[float]
+    lower_group_rate: Optional[float]
+
+
+class ItemAnalysisQuestion(BaseModel):
+    question_id: int
+    # share of attempts answering correctly
+    difficulty: Optional[float]
+    # point-biserial correlation with the rest of the test; None when undefined
+    discrimination: Optional[float]
+    omitted_rate: Optional[float]
+    options: List[ItemAnalysisOption]
+
+
+class TestItemAnalysis(BaseModel):
+    test_id: int
+    attempts_count: int
+    mean_score: float
+    questions: List[ItemAnalysisQuestion]
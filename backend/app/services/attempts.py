@@ -0,0 +1,260 @@
+"""Timed test attempts: scoring, write-behind autosave and the expiry sweep.
+
+Autosaves only land in a per-worker ``AutosaveBuffer`` that keeps the latest
+draft of each attempt; a periodic flush writes all buffered drafts with one
+executemany UPDATE. Finishing on the worker that holds the newest draft uses
+it directly; otherwise the persisted draft lags by at most one flush interval.
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy import bindparam, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache, test_attempts_tag
+from app.core.config import settings
+from app.core.metrics import Family, gauge_family, registry
+from app.db.session import SessionLocal
+from app.models.test import QuestionType, Test, TestAnswer, TestAttempt, TestOption, TestQuestion
+
+logger = logging.getLogger(__name__)
+
+# question_id -> selected option ids
+Answers = Dict[int, List[int]]
+
+
+def attempt_meta_key(attempt_id: int) -> str:
+    return f"attempt:{attempt_id}:meta"
+
+
+class AttemptMeta(NamedTuple):
+    """What autosave needs to validate a request without touching the database."""
+
+    student_id: int
+    deadline_at: Optional[datetime]
+    finished: bool
+
+
+def load_attempt_meta(db: Session, attempt_id: int) -> Optional[AttemptMeta]:
+    row = db.execute(
+        select(TestAttempt.student_id, TestAttempt.deadline_at, TestAttempt.finished_at).where(TestAttempt.id == attempt_id)
+    ).first()
+    return AttemptMeta(row.student_id, row.deadline_at, row.finished_at is not None) if row else None
+
+
+def encode_answers(answers: Answers) -> str:
+    return json.dumps({str(question_id): sorted(set(options)) for question_id, options in answers.items()})
+
+
+def decode_answers(raw: Optional[str]) -> Answers:
+    if not raw:
+        return {}
+    return {int(question_id): options for question_id, options in json.loads(raw).items()}
+
+
+class AutosaveBuffer:
+    def __init__(self, session_factory: Callable[[], Session], max_entries: int) -> None:
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # attempt_id -> (encoded answers, saved_at); only the newest draft is kept
+        self._pending: Dict[int, Tuple[str, datetime]] = {}
+        self.saves = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def put(self, attempt_id: int, answers: Answers, saved_at: datetime) -> None:
+        with self._lock:
+            self._pending[attempt_id] = (encode_answers(answers), saved_at)
+            self.saves += 1
+            full = len(self._pending) >= self.max_entries
+        if full:
+            try:
+                self.flush()
+            except Exception:  # drafts stay buffered for the periodic flush
+                logger.exception("Autosave flush failed")
+
+    def take(self, attempt_id: int) -> Optional[Answers]:
+        """Remove and return the buffered draft of an attempt that is being finished."""
+        with self._lock:
+            entry = self._pending.pop(attempt_id, None)
+        return decode_answers(entry[0]) if entry else None
+
+    def peek(self, attempt_id: int) -> Optional[Answers]:
+        with self._lock:
+            entry = self._pending.get(attempt_id)
+        return decode_answers(entry[0]) if entry else None
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        table = TestAttempt.__table__
+        statement = (
+            table.update()
+            .where(
+                table.c.id == bindparam("attempt_id"),
+                table.c.finished_at.is_(None),
+                # another worker may already have written a newer draft
+                or_(table.c.draft_saved_at.is_(None), table.c.draft_saved_at <= bindparam("saved_at")),
+            )
+            .values(draft_answers=bindparam("answers"), draft_saved_at=bindparam("saved_at"))
+        )
+        rows = [
+            {"attempt_id": attempt_id, "answers": answers, "saved_at": saved_at}
+            for attempt_id, (answers, saved_at) in sorted(batch.items())
+        ]
+        db = self.session_factory()
+        try:
+            db.execute(statement, rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                for attempt_id, entry in batch.items():
+                    self._pending.setdefault(attempt_id, entry)
+            raise
+        finally:
+            db.close()
+        self.flushes += 1
+        self.rows_written += len(rows)
+        return len(rows)
+
+    def metric_families(self) -> List[Family]:
+        return [
+            gauge_family("autosave_buffer_pending", "Autosaves buffered in memory", self.pending()),
+            gauge_family("autosave_rows_written_total", "Buffered autosaves written", self.rows_written, "counter"),
+        ]
+
+
+autosave_buffer = AutosaveBuffer(SessionLocal, settings.autosave_buffer_max_entries)
+registry.register_collector("autosave", autosave_buffer.metric_families)
+
+
+def grade_answers(db: Session, test_id: int, answers: Answers) -> Tuple[int, int, List[Tuple[int, int]]]:
+    """Score answers with the submission rules; returns (score, max_score, [(question_id, option_id)])."""
+    questions = db.execute(select(TestQuestion.id, TestQuestion.type).where(TestQuestion.test_id == test_id)).all()
+    question_types = {question_id: kind for question_id, kind in questions}
+    options: Dict[int, Set[int]] = {}
+    correct: Dict[int, Set[int]] = {}
+    for option_id, question_id, is_correct in db.execute(
+        select(TestOption.id, TestOption.question_id, TestOption.is_correct)
+        .join(TestQuestion, TestOption.question_id == TestQuestion.id)
+        .where(TestQuestion.test_id == test_id)
+    ):
+        options.setdefault(question_id, set()).add(option_id)
+        if is_correct:
+            correct.setdefault(question_id, set()).add(option_id)
+
+    score = 0
+    selections: List[Tuple[int, int]] = []
+    for question_id, selected in answers.items():
+        if question_id not in question_types:
+            continue
+        chosen = set(selected) & options.get(question_id, set())
+        selections.extend((question_id, option_id) for option_id in sorted(chosen))
+        right = correct.get(question_id, set())
+        if question_types[question_id] == QuestionType.single:
+            score += int(len(set(selected)) == 1 and set(selected) == right)
+        else:
+            score += int(set(selected) == right and len(right) > 0)
+    return score, len(questions), selections
+
+
+def open_attempt(db: Session, test_id: int, student_id: int) -> Optional[TestAttempt]:
+    return (
+        db.query(TestAttempt)
+        .filter(TestAttempt.test_id == test_id, TestAttempt.student_id == student_id, TestAttempt.finished_at.is_(None))
+        .order_by(TestAttempt.id.desc())
+        .first()
+    )
+
+
+def is_expired(attempt: TestAttempt, now: datetime) -> bool:
+    return attempt.deadline_at is not None and now > attempt.deadline_at + timedelta(seconds=settings.attempt_grace_seconds)
+
+
+def start_attempt(db: Session, test: Test, student_id: int, now: datetime) -> TestAttempt:
+    """Return the student's open attempt, or start a new one with a deadline from the test's limit."""
+    attempt = open_attempt(db, test.id, student_id)
+    if attempt is not None and not is_expired(attempt, now):
+        return attempt
+    if attempt is not None:
+        finish_attempt(db, attempt, None, now)
+    deadline = now + timedelta(minutes=test.time_limit_minutes) if test.time_limit_minutes else None
+    attempt = TestAttempt(test_id=test.id, student_id=student_id, started_at=now, deadline_at=deadline)
+    db.add(attempt)
+    db.flush()
+    return attempt
+
+
+def finish_attempt(db: Session, attempt: TestAttempt, answers: Optional[Answers], now: datetime) -> TestAttempt:
+    """Score and close an attempt in the current transaction.
+
+    Answers sent after the deadline (plus grace) are ignored in favour of the
+    last draft saved in time. Finishing an already finished attempt is a no-op.
+    """
+    if attempt.finished_at is not None:
+        return attempt
+    buffered = autosave_buffer.take(attempt.id)
+    expired = is_expired(attempt, now)
+    if answers is None or expired:
+        answers = buffered if buffered is not None else decode_answers(attempt.draft_answers)
+    score, max_score, selections = grade_answers(db, attempt.test_id, answers)
+    if selections:
+        db.execute(
+            insert(TestAnswer),
+            [{"attempt_id": attempt.id, "question_id": q, "option_id": o} for q, o in selections],
+        )
+    attempt.finished_at = min(now, attempt.deadline_at) if expired else now
+    attempt.score = float(score)
+    attempt.max_score = max_score
+    attempt.draft_answers = encode_answers(answers)
+    attempt.draft_saved_at = now
+    return attempt
+
+
+def finish_expired_attempts(db: Session, now: Optional[datetime] = None, limit: int = 500) -> int:
+    """Auto-finish attempts whose deadline (plus grace) has passed; returns how many were closed."""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.attempt_grace_seconds)
+    attempts = (
+        db.query(TestAttempt)
+        .filter(TestAttempt.finished_at.is_(None), TestAttempt.deadline_at < cutoff)
+        .order_by(TestAttempt.deadline_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for attempt in attempts:
+        finish_attempt(db, attempt, None, now)
+    db.commit()
+    if attempts:
+        cache.invalidate(
+            keys=[attempt_meta_key(attempt.id) for attempt in attempts],
+            tags=[test_attempts_tag(test_id) for test_id in sorted({attempt.test_id for attempt in attempts})],
+        )
+    return len(attempts)
+
+
+def flush_autosaves_job() -> None:
+    autosave_buffer.flush()
+
+
+def sweep_expired_attempts_job() -> None:
+    # Drafts still buffered in this worker must reach the database before their attempts are closed.
+    autosave_buffer.flush()
+    db = SessionLocal()
+    try:
+        finish_expired_attempts(db)
+    finally:
+        db.close()
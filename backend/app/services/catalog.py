@@ -0,0 +1,100 @@
+"""Published course catalog: filters, sorting and keyset pagination.
+
+Filters are level (any of), tags (any or all of, through ``course_tags``) and
+a case-insensitive title prefix. Popularity is the compacted enrollment count
+of ``course_stats``. Pages are ordered by a sort key and then by id, both
+descending, and the cursor carries the last row's key and id, so a page
+costs the same however deep it is and rows added meanwhile do not shift
+later pages.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session, contains_eager
+
+from app.models.analytics import CourseStat
+from app.models.course import Course, CourseTag, Tag
+from app.schemas.course import CatalogPage, CatalogSort, CourseRead, TagMatch
+from app.services.course_tags import parse_tags
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort: CatalogSort, key: Any, course_id: int) -> str:
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    raw = json.dumps([sort.value, key, course_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: CatalogSort) -> Tuple[Any, int]:
+    try:
+        cursor_sort, key, course_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if cursor_sort != sort.value or not isinstance(course_id, int):
+            raise InvalidCursor("cursor belongs to another sort order")
+        return (datetime.fromisoformat(key) if sort == CatalogSort.recent else int(key)), course_id
+    except (binascii.Error, ValueError, TypeError) as exc:
+        raise InvalidCursor("malformed cursor") from exc
+
+
+def escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def catalog_page(
+    db: Session,
+    *,
+    levels: Sequence[str] = (),
+    tags: Sequence[str] = (),
+    tag_match: TagMatch = TagMatch.any,
+    prefix: Optional[str] = None,
+    sort: CatalogSort = CatalogSort.popular,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> CatalogPage:
+    """One page of published courses; raises ``InvalidCursor`` for a cursor it did not issue."""
+    after = decode_cursor(cursor, sort) if cursor else None
+    # the explicit join replaces the eager one, so the sort key and CourseRead share it
+    statement = (
+        select(Course)
+        .outerjoin(CourseStat, CourseStat.course_id == Course.id)
+        .options(contains_eager(Course.stats))
+        .where(Course.is_published.is_(True))
+    )
+    if levels:
+        statement = statement.where(Course.level.in_(sorted(set(levels))))
+
+    names = {name for raw in tags for name in parse_tags(raw)}
+    if names:
+        tag_ids = db.execute(select(Tag.id).where(Tag.name.in_(sorted(names)))).scalars().all()
+        if not tag_ids or (tag_match == TagMatch.all and len(tag_ids) < len(names)):
+            return CatalogPage(items=[])
+        tagged = select(CourseTag.course_id).where(CourseTag.tag_id.in_(tag_ids))
+        if tag_match == TagMatch.all:
+            tagged = tagged.group_by(CourseTag.course_id).having(func.count() == len(tag_ids))
+        statement = statement.where(Course.id.in_(tagged))
+
+    prefix = (prefix or "").strip().lower()
+    if prefix:
+        statement = statement.where(func.lower(Course.title).like(escape_like(prefix) + "%", escape="\\"))
+
+    key = Course.created_at if sort == CatalogSort.recent else func.coalesce(CourseStat.enrollments, 0)
+    if after is not None:
+        statement = statement.where(or_(key < after[0], and_(key == after[0], Course.id < after[1])))
+
+    rows = db.execute(
+        statement.add_columns(key.label("sort_key")).order_by(key.desc(), Course.id.desc()).limit(limit + 1)
+    ).all()
+    items: List[CourseRead] = [CourseRead.from_orm(row.Course) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        next_cursor = encode_cursor(sort, last.sort_key, last.Course.id)
+    return CatalogPage(items=items, next_cursor=next_cursor)
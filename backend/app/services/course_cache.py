@@ -0,0 +1,39 @@
+"""Drops cached catalog and course payloads when courses change.
+
+Courses are written by admin tools and bulk scripts rather than by the API,
+so the invalidation hangs off the session: ids of courses inserted, updated
+or deleted are collected at flush and invalidated once the transaction
+commits.
+"""
+
+from typing import Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.cache import CATALOG_TAG, cache, course_tag
+from app.models.course import Course
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_courses(session, flush_context) -> None:
+    changed = [
+        obj
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+        if isinstance(obj, Course) and (obj not in session.dirty or session.is_modified(obj))
+    ]
+    if changed:
+        ids: Set[int] = session.info.setdefault("changed_courses", set())
+        ids.update(course.id for course in changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_courses(session) -> None:
+    changed = session.info.pop("changed_courses", None)
+    if changed:
+        cache.invalidate(tags=[CATALOG_TAG, *(course_tag(course_id) for course_id in sorted(changed))])
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_courses(session) -> None:
+    session.info.pop("changed_courses", None)
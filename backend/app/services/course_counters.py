@@ -0,0 +1,279 @@
+"""Per-course enrollment and activity counters, kept incrementally from domain events.
+
+Counting ``enrollments`` and ``submissions`` per course on every catalog
+request does not scale, so the ``course-counters`` event handler maintains
+the numbers instead:
+
+* each batch of events adds its deltas to a ``course_counter_shards`` row
+  keyed by (course, day, shard) with a random shard, so dispatchers working
+  in parallel do not queue behind one row of a popular course;
+* ``course_activity`` keeps the last day each student was active in a
+  course, written at most once per student, course and day.
+
+``compact_course_counters`` runs periodically: it folds enrollment deltas
+into ``course_stats``, merges the submission shards of each day into shard
+0, drops days that left the 7-day window and recounts the windowed figures.
+Readers only see ``course_stats``, so the numbers trail by at most one
+compaction interval. ``rebuild_course_counters`` recomputes everything from
+the source tables (migration backfill, bulk seeding, repairs).
+"""
+
+import random
+from collections import Counter, defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from sqlalchemy import bindparam, delete, func, insert, or_, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.core.background import try_exclusive
+from app.core.cache import CATALOG_TAG, cache, course_tag
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.db.upsert import upsert
+from app.models.analytics import CourseActivity, CourseCounterShard, CourseStat
+from app.models.assignment import Submission
+from app.models.course import Enrollment
+
+WINDOW_DAYS = 7
+
+# (course_id, student_id, day)
+Activity = Tuple[int, int, date]
+
+shards = CourseCounterShard.__table__
+activity = CourseActivity.__table__
+stats = CourseStat.__table__
+
+
+def window_start(today: date) -> date:
+    return today - timedelta(days=WINDOW_DAYS - 1)
+
+
+def record_activity(db: Session, enrollments: Iterable[Activity], submissions: Iterable[Activity]) -> None:
+    """Add enrollments and submissions to the counter shards and the activity log."""
+    deltas: Dict[Tuple[int, date], List[int]] = defaultdict(lambda: [0, 0])
+    last_active: Dict[Tuple[int, int], date] = {}
+    for column, rows in enumerate((enrollments, submissions)):
+        for course_id, student_id, day in rows:
+            deltas[course_id, day][column] += 1
+            last_active[course_id, student_id] = max(day, last_active.get((course_id, student_id), day))
+    if not deltas:
+        return
+
+    statement = upsert(db, shards)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[shards.c.course_id, shards.c.day, shards.c.shard],
+            set_={
+                "enrollments": shards.c.enrollments + statement.excluded.enrollments,
+                "submissions": shards.c.submissions + statement.excluded.submissions,
+            },
+        ),
+        [
+            {
+                "course_id": course_id,
+                "day": day,
+                "shard": random.randrange(settings.course_counter_shards),
+                "enrollments": enrolled,
+                "submissions": submitted,
+            }
+            for (course_id, day), (enrolled, submitted) in sorted(deltas.items())
+        ],
+    )
+    statement = upsert(db, activity)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[activity.c.course_id, activity.c.student_id],
+            set_={"active_on": statement.excluded.active_on},
+            # a student already seen that day costs no write
+            where=activity.c.active_on < statement.excluded.active_on,
+        ),
+        [
+            {"course_id": course_id, "student_id": student_id, "active_on": day}
+            for (course_id, student_id), day in sorted(last_active.items())
+        ],
+    )
+
+
+def compact_course_counters(db: Session, today: Optional[date] = None) -> Set[int]:
+    """Fold the shards into ``course_stats``; returns the ids of the courses whose stats changed.
+
+    Deltas are subtracted by the amount read rather than zeroed, so increments
+    committed meanwhile survive until the next run.
+    """
+    today = today or datetime.utcnow().date()
+    start = window_start(today)
+    folded = db.execute(
+        select(shards).where(or_(shards.c.enrollments != 0, shards.c.shard != 0, shards.c.day < start))
+    ).all()
+
+    enrolled: Counter = Counter()
+    merged: Counter = Counter()
+    subtract = []
+    for row in folded:
+        enrolled[row.course_id] += row.enrollments
+        moved = 0
+        if row.shard != 0 or row.day < start:
+            moved = row.submissions
+            if row.day >= start:
+                merged[row.course_id, row.day] += row.submissions
+        subtract.append(
+            {
+                "b_course_id": row.course_id,
+                "b_day": row.day,
+                "b_shard": row.shard,
+                "b_enrollments": row.enrollments,
+                "b_submissions": moved,
+            }
+        )
+    if subtract:
+        db.execute(
+            update(shards)
+            .where(
+                shards.c.course_id == bindparam("b_course_id"),
+                shards.c.day == bindparam("b_day"),
+                shards.c.shard == bindparam("b_shard"),
+            )
+            .values(
+                enrollments=shards.c.enrollments - bindparam("b_enrollments"),
+                submissions=shards.c.submissions - bindparam("b_submissions"),
+            ),
+            subtract,
+        )
+    if merged:
+        statement = upsert(db, shards)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[shards.c.course_id, shards.c.day, shards.c.shard],
+                set_={"submissions": shards.c.submissions + statement.excluded.submissions},
+            ),
+            [
+                {"course_id": course_id, "day": day, "shard": 0, "enrollments": 0, "submissions": submitted}
+                for (course_id, day), submitted in sorted(merged.items())
+            ],
+        )
+    db.execute(delete(shards).where(shards.c.enrollments == 0, shards.c.submissions == 0))
+    db.execute(delete(activity).where(activity.c.active_on < start))
+
+    submitted = dict(
+        db.execute(
+            select(shards.c.course_id, func.sum(shards.c.submissions))
+            .where(shards.c.day >= start)
+            .group_by(shards.c.course_id)
+        ).all()
+    )
+    active = dict(db.execute(select(activity.c.course_id, func.count()).group_by(activity.c.course_id)).all())
+    current = {
+        row.course_id: (row.active_students_7d, row.submissions_7d)
+        for row in db.execute(select(stats.c.course_id, stats.c.active_students_7d, stats.c.submissions_7d))
+    }
+    changed = {
+        course_id
+        for course_id in set(enrolled) | set(submitted) | set(active) | set(current)
+        if enrolled[course_id]
+        or current.get(course_id, (0, 0)) != (active.get(course_id, 0), submitted.get(course_id, 0))
+    }
+    if changed:
+        statement = upsert(db, stats)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[stats.c.course_id],
+                set_={
+                    "enrollments": stats.c.enrollments + statement.excluded.enrollments,
+                    "active_students_7d": statement.excluded.active_students_7d,
+                    "submissions_7d": statement.excluded.submissions_7d,
+                    "updated_at": statement.excluded.updated_at,
+                },
+            ),
+            [
+                {
+                    "course_id": course_id,
+                    "enrollments": enrolled[course_id],
+                    "active_students_7d": active.get(course_id, 0),
+                    "submissions_7d": submitted.get(course_id, 0),
+                    "updated_at": datetime.utcnow(),
+                }
+                for course_id in sorted(changed)
+            ],
+        )
+    return changed
+
+
+def rebuild_course_counters(db: Union[Session, Connection], today: Optional[date] = None) -> None:
+    """Recompute every counter from ``enrollments`` and ``submissions``, discarding pending shards."""
+    today = today or datetime.utcnow().date()
+    since = datetime.combine(window_start(today), time.min)
+    until = datetime.combine(today + timedelta(days=1), time.min)
+    for table in (shards, activity, stats):
+        db.execute(delete(table))
+
+    enrolled = dict(db.execute(select(Enrollment.course_id, func.count()).group_by(Enrollment.course_id)).all())
+    recent_enrollments = db.execute(
+        select(Enrollment.course_id, Enrollment.student_id, Enrollment.enrolled_at).where(
+            Enrollment.enrolled_at >= since, Enrollment.enrolled_at < until
+        )
+    ).all()
+    recent_submissions = db.execute(
+        select(Submission.course_id, Submission.student_id, Submission.submitted_at).where(
+            Submission.submitted_at >= since, Submission.submitted_at < until
+        )
+    ).all()
+
+    submitted: Counter = Counter()
+    last_active: Dict[Tuple[int, int], date] = {}
+    for rows, counts in ((recent_enrollments, None), (recent_submissions, submitted)):
+        for course_id, student_id, at in rows:
+            if counts is not None:
+                counts[course_id, at.date()] += 1
+            last_active[course_id, student_id] = max(at.date(), last_active.get((course_id, student_id), at.date()))
+    active: Counter = Counter(course_id for course_id, _ in last_active)
+    submitted_7d: Counter = Counter()
+    for (course_id, _), count in submitted.items():
+        submitted_7d[course_id] += count
+
+    if submitted:
+        db.execute(
+            insert(shards),
+            [
+                {"course_id": course_id, "day": day, "shard": 0, "enrollments": 0, "submissions": count}
+                for (course_id, day), count in sorted(submitted.items())
+            ],
+        )
+    if last_active:
+        db.execute(
+            insert(activity),
+            [
+                {"course_id": course_id, "student_id": student_id, "active_on": day}
+                for (course_id, student_id), day in sorted(last_active.items())
+            ],
+        )
+    course_ids = set(enrolled) | set(active) | set(submitted_7d)
+    if course_ids:
+        now = datetime.utcnow()
+        db.execute(
+            insert(stats),
+            [
+                {
+                    "course_id": course_id,
+                    "enrollments": enrolled.get(course_id, 0),
+                    "active_students_7d": active[course_id],
+                    "submissions_7d": submitted_7d[course_id],
+                    "updated_at": now,
+                }
+                for course_id in sorted(course_ids)
+            ],
+        )
+
+
+def compact_course_counters_job() -> None:
+    db = SessionLocal()
+    try:
+        if not try_exclusive(db, "course-counters"):
+            return
+        changed = compact_course_counters(db)
+        db.commit()
+    finally:
+        db.close()
+    if changed:
+        cache.invalidate(tags=[CATALOG_TAG, *(course_tag(course_id) for course_id in sorted(changed))])
@@ -0,0 +1,124 @@
+"""Keeps the denormalized ``course_id`` of assignments and submissions correct.
+
+``Assignment.course_id`` copies ``lesson.module.course_id`` and
+``Submission.course_id`` copies ``assignment.course_id``, so that student and
+teacher queries can filter by course without walking
+lessons -> modules. The ``before_flush`` hook below fills the column on every
+new row and on rows whose parent changed; when a module moves to another
+course, a lesson to another module or an assignment to another lesson, the
+already stored descendants are rewritten with two UPDATEs after the flush.
+
+Bulk loaders that bypass the ORM (``app.db.seed``) write the column
+themselves.
+"""
+
+from typing import Set
+
+from sqlalchemy import event, inspect, or_, select, update
+from sqlalchemy.orm import Session, attributes
+
+from app.models.assignment import Assignment, Submission
+from app.models.course import Lesson, Module
+
+
+def _changed(obj, *keys: str) -> bool:
+    return any(attributes.get_history(obj, key).has_changes() for key in keys)
+
+
+def _parent(session: Session, obj, relation: str, cls, key: str):
+    foreign_key = getattr(obj, key)
+    # a foreign key set directly is newer than a loaded relationship, and pending rows built
+    # with a bare foreign key do not lazy-load at all
+    if foreign_key is not None and (relation not in inspect(obj).dict or _changed(obj, key)):
+        return session.get(cls, foreign_key)
+    return getattr(obj, relation)
+
+
+def _copy_course(target, source) -> None:
+    """Point ``target`` at the course of ``source``, by id when the id is already known."""
+    if "course" in inspect(source).dict or source.course_id is None:
+        target.course = source.course
+    else:
+        target.course_id = source.course_id
+
+
+def fill_course(session: Session, obj) -> None:
+    if isinstance(obj, Assignment):
+        lesson = _parent(session, obj, "lesson", Lesson, "lesson_id")
+        module = _parent(session, lesson, "module", Module, "module_id") if lesson is not None else None
+        if module is not None:
+            _copy_course(obj, module)
+    elif isinstance(obj, Submission):
+        assignment = _parent(session, obj, "assignment", Assignment, "assignment_id")
+        if assignment is not None:
+            _copy_course(obj, assignment)
+
+
+def rescope(session: Session, module_ids: Set[int], lesson_ids: Set[int], assignment_ids: Set[int]) -> None:
+    """Rewrite ``course_id`` below moved modules, lessons and assignments."""
+    moved_lessons = or_(
+        Assignment.lesson_id.in_(sorted(lesson_ids)),
+        Assignment.lesson_id.in_(select(Lesson.id).where(Lesson.module_id.in_(sorted(module_ids)))),
+    )
+    session.execute(
+        update(Assignment)
+        .where(moved_lessons)
+        .values(
+            course_id=select(Module.course_id)
+            .join(Lesson, Lesson.module_id == Module.id)
+            .where(Lesson.id == Assignment.lesson_id)
+            .scalar_subquery()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    moved_assignments = select(Assignment.id).where(or_(moved_lessons, Assignment.id.in_(sorted(assignment_ids))))
+    session.execute(
+        update(Submission)
+        .where(Submission.assignment_id.in_(moved_assignments))
+        .values(
+            course_id=select(Assignment.course_id)
+            .where(Assignment.id == Submission.assignment_id)
+            .scalar_subquery()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, (Assignment, Submission)):
+            session.expire(obj, ["course_id", "course"])
+
+
+@event.listens_for(Session, "before_flush")
+def _fill_course_ids(session, flush_context, instances) -> None:
+    modules: Set[int] = set()
+    lessons: Set[int] = set()
+    assignments: Set[int] = set()
+    pending = list(session.new)
+    for obj in session.dirty:
+        if isinstance(obj, Module) and _changed(obj, "course_id", "course"):
+            modules.add(obj.id)
+        elif isinstance(obj, Lesson) and _changed(obj, "module_id", "module"):
+            lessons.add(obj.id)
+        elif isinstance(obj, Assignment) and _changed(obj, "lesson_id", "lesson"):
+            assignments.add(obj.id)
+            pending.append(obj)
+        elif isinstance(obj, Submission) and _changed(obj, "assignment_id", "assignment"):
+            pending.append(obj)
+    # assignments first: a new submission may belong to an assignment added in the same flush
+    for obj in sorted(pending, key=lambda item: not isinstance(item, Assignment)):
+        fill_course(session, obj)
+    if modules or lessons or assignments:
+        moved = session.info.setdefault("course_scope_moved", (set(), set(), set()))
+        for ids, new_ids in zip(moved, (modules, lessons, assignments)):
+            ids.update(new_ids)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _rescope_moved_rows(session, flush_context) -> None:
+    moved = session.info.pop("course_scope_moved", None)
+    if moved is not None:
+        rescope(session, *moved)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_moved_rows(session) -> None:
+    session.info.pop("course_scope_moved", None)
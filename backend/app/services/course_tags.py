@@ -0,0 +1,74 @@
+"""Normalized course tags.
+
+``Course.tags`` stays the comma-separated string teachers type and the API
+returns; the catalog filters on ``course_tags`` instead, which the
+``before_flush`` hook below rewrites whenever a course is inserted or its
+``tags`` change. Tag names are stripped and lower-cased, so "Python" and
+" python" are one tag.
+
+Bulk loaders that bypass the ORM (``app.db.seed``) fill both tables
+themselves.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, attributes
+
+from app.db.upsert import upsert
+from app.models.course import Course, CourseTag, Tag
+
+MAX_TAG_LENGTH = 64
+
+tags_table = Tag.__table__
+
+
+def parse_tags(raw: Optional[str]) -> List[str]:
+    """Distinct normalized tag names, in the order given."""
+    names: List[str] = []
+    for part in (raw or "").split(","):
+        name = part.strip().lower()[:MAX_TAG_LENGTH]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def resolve_tags(session: Session, names: Iterable[str]) -> Dict[str, Tag]:
+    """Tags by name, inserting the missing ones.
+
+    Two transactions may introduce the same tag at once, so missing names are
+    inserted with ``ON CONFLICT DO NOTHING`` and then read back, rather than
+    added to the session where the second flush would hit the unique name.
+    """
+    wanted = set(names)
+    found = {obj.name: obj for obj in session.new if isinstance(obj, Tag) and obj.name in wanted}
+    missing = sorted(wanted - found.keys())
+    if missing:
+        stored = session.execute(select(Tag).where(Tag.name.in_(missing))).scalars()
+        found.update((tag.name, tag) for tag in stored)
+    missing = sorted(wanted - found.keys())
+    if missing:
+        statement = upsert(session, tags_table).on_conflict_do_nothing(index_elements=[tags_table.c.name])
+        session.execute(statement, [{"name": name} for name in missing])
+        stored = session.execute(select(Tag).where(Tag.name.in_(missing))).scalars()
+        found.update((tag.name, tag) for tag in stored)
+    return found
+
+
+def sync_course_tags(session: Session, courses: Iterable[Course]) -> None:
+    parsed = {course: parse_tags(course.tags) for course in courses}
+    tags = resolve_tags(session, {name for names in parsed.values() for name in names})
+    for course, names in parsed.items():
+        # links with an unchanged primary key are turned into no-ops by the unit of work
+        course.tag_links = [CourseTag(tag=tags[name]) for name in names]
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_changed_course_tags(session, flush_context, instances) -> None:
+    changed = [
+        obj
+        for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, Course) and (obj in session.new or attributes.get_history(obj, "tags").has_changes())
+    ]
+    if changed:
+        sync_course_tags(session, changed)
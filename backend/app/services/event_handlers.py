@@ -0,0 +1,73 @@
+"""Handlers that keep derived data in step with domain events.
+
+Importing this module registers them on the dispatcher; the app does it at
+startup. Events carry ids only; handlers re-read current rows, so a late or
+retried delivery still computes from the latest state.
+"""
+
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.api.v1.progress import refresh_progress
+from app.core.cache import leaderboard_tag
+from app.models.assignment import Assignment
+from app.services.course_counters import record_activity
+from app.services.events import ENROLLMENT_CREATED, SUBMISSION_CREATED, SUBMISSION_GRADED, Event, subscribe
+from app.services.funnel import mark_assignments_stale, mark_course_stale
+from app.services.leaderboards import update_leaderboards
+
+
+def assignment_courses(db: Session, assignment_ids: Set[int]):
+    rows = db.execute(select(Assignment.id, Assignment.course_id).where(Assignment.id.in_(sorted(assignment_ids))))
+    return dict(rows.all())
+
+
+@subscribe(ENROLLMENT_CREATED, SUBMISSION_CREATED, SUBMISSION_GRADED, name="progress")
+def refresh_student_progress(db: Session, events: List[Event]) -> None:
+    """Recompute each affected (student, course) snapshot once per batch."""
+    courses = assignment_courses(db, {e.payload["assignment_id"] for e in events if "assignment_id" in e.payload})
+    pairs: Set[Tuple[int, int]] = set()
+    for event in events:
+        if event.type == ENROLLMENT_CREATED:
+            pairs.add((event.payload["student_id"], event.payload["course_id"]))
+        elif event.payload["assignment_id"] in courses:
+            pairs.add((event.payload["student_id"], courses[event.payload["assignment_id"]]))
+    for student_id, course_id in sorted(pairs):
+        refresh_progress(db, student_id, course_id)
+
+
+@subscribe(ENROLLMENT_CREATED, SUBMISSION_CREATED, SUBMISSION_GRADED, name="funnel")
+def flag_funnel_stats(db: Session, events: List[Event]) -> None:
+    mark_assignments_stale(db, {e.payload["assignment_id"] for e in events if "assignment_id" in e.payload})
+    for course_id in sorted({e.payload["course_id"] for e in events if e.type == ENROLLMENT_CREATED}):
+        mark_course_stale(db, course_id)
+
+
+@subscribe(ENROLLMENT_CREATED, SUBMISSION_CREATED, name="course-counters")
+def count_course_activity(db: Session, events: List[Event]) -> None:
+    """Counted on the day the event was published, so a late delivery lands in the right window."""
+    courses = assignment_courses(db, {e.payload["assignment_id"] for e in events if e.type == SUBMISSION_CREATED})
+    enrollments = [
+        (e.payload["course_id"], e.payload["student_id"], e.created_at.date())
+        for e in events
+        if e.type == ENROLLMENT_CREATED
+    ]
+    submissions = [
+        (courses[e.payload["assignment_id"]], e.payload["student_id"], e.created_at.date())
+        for e in events
+        if e.type == SUBMISSION_CREATED and e.payload["assignment_id"] in courses
+    ]
+    record_activity(db, enrollments, submissions)
+
+
+@subscribe(SUBMISSION_GRADED, name="leaderboards")
+def update_course_leaderboards(db: Session, events: List[Event]) -> List[str]:
+    courses = assignment_courses(db, {e.payload["assignment_id"] for e in events})
+    students: Dict[int, Set[int]] = {}
+    for event in events:
+        if event.payload["assignment_id"] in courses:
+            students.setdefault(courses[event.payload["assignment_id"]], set()).add(event.payload["student_id"])
+    update_leaderboards(db, students)
+    return [leaderboard_tag(course_id) for course_id in sorted(students)]
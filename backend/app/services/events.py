@@ -0,0 +1,266 @@
+"""Domain events through a transactional outbox.
+
+Writers call ``publish`` inside the transaction of the change, so an event
+exists exactly when its change was committed. ``EventDispatcher`` claims
+pending events in id order (``FOR UPDATE SKIP LOCKED`` lets several workers
+share the backlog), hands each registered handler all of its events of the
+batch at once and commits the handlers' writes with the event status.
+
+Handlers run in savepoints and every successful (event, handler) pair is
+recorded in ``outbox_deliveries`` in the same savepoint, so a retried event
+is never processed twice by a handler that already succeeded. A failing
+batch is retried event by event to isolate the bad one, which is then
+retried with exponential backoff until ``outbox_max_attempts``.
+
+Handlers may return cache tags; they are invalidated after the commit.
+"""
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.metrics import Family, gauge_family, registry
+from app.db.session import SessionLocal
+from app.models.outbox import OutboxDelivery, OutboxEvent, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+ENROLLMENT_CREATED = "enrollment.created"
+SUBMISSION_CREATED = "submission.created"
+SUBMISSION_GRADED = "submission.graded"
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    type: str
+    payload: Dict[str, Any]
+    created_at: datetime
+
+
+Handler = Callable[[Session, List[Event]], Optional[Iterable[str]]]
+
+
+def publish(db: Session, event_type: str, payload: Dict[str, Any]) -> None:
+    publish_many(db, event_type, [payload])
+
+
+def publish_many(db: Session, event_type: str, payloads: Sequence[Dict[str, Any]]) -> None:
+    """Queue events in the current transaction; they are dispatched only if it commits."""
+    if not payloads:
+        return
+    now = datetime.utcnow()
+    db.execute(
+        insert(OutboxEvent),
+        [
+            {
+                "event_type": event_type,
+                "payload": json.dumps(payload, sort_keys=True),
+                "status": OutboxStatus.pending,
+                "attempts": 0,
+                "created_at": now,
+            }
+            for payload in payloads
+        ],
+    )
+
+
+class EventDispatcher:
+    def __init__(self, session_factory: Callable[[], Session]) -> None:
+        self.session_factory = session_factory
+        self._handlers: Dict[str, Dict[str, Handler]] = {}
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self.last_batch_seconds = 0.0
+        # created -> dispatched delay of the newest event delivered, and the worst one seen
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+
+    def subscribe(self, *event_types: str, name: Optional[str] = None) -> Callable[[Handler], Handler]:
+        """Register a handler; ``name`` identifies it in the delivery log, so keep it stable."""
+
+        def decorator(func: Handler) -> Handler:
+            handler_name = name or f"{func.__module__}.{func.__name__}"
+            for event_type in event_types:
+                self._handlers.setdefault(event_type, {})[handler_name] = func
+            return func
+
+        return decorator
+
+    def handlers(self, event_type: str) -> Dict[str, Handler]:
+        return dict(self._handlers.get(event_type, {}))
+
+    def dispatch_batch(self, db: Session, limit: Optional[int] = None, now: Optional[datetime] = None) -> int:
+        """Deliver one batch of due events and commit; returns how many events were claimed."""
+        started = time.perf_counter()
+        now = now or datetime.utcnow()
+        rows = (
+            db.query(OutboxEvent)
+            .filter(
+                OutboxEvent.status == OutboxStatus.pending,
+                (OutboxEvent.next_attempt_at.is_(None)) | (OutboxEvent.next_attempt_at <= now),
+            )
+            .order_by(OutboxEvent.id)
+            .limit(limit or settings.outbox_batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not rows:
+            db.commit()
+            return 0
+        events = {row.id: Event(row.id, row.event_type, json.loads(row.payload), row.created_at) for row in rows}
+        done = {
+            (event_id, handler)
+            for event_id, handler in db.execute(
+                select(OutboxDelivery.event_id, OutboxDelivery.handler).where(OutboxDelivery.event_id.in_(list(events)))
+            )
+        }
+        errors: Dict[int, str] = {}
+        tags: Set[str] = set()
+        by_type: Dict[str, List[Event]] = {}
+        for event in events.values():
+            by_type.setdefault(event.type, []).append(event)
+        for event_type, typed in by_type.items():
+            for handler_name, handler in self.handlers(event_type).items():
+                todo = [event for event in typed if (event.id, handler_name) not in done]
+                if not todo:
+                    continue
+                try:
+                    tags.update(self._deliver(db, handler_name, handler, todo))
+                except Exception:
+                    # find the bad event(s); the others still go through
+                    for event in todo:
+                        try:
+                            tags.update(self._deliver(db, handler_name, handler, [event]))
+                        except Exception as exc:
+                            logger.exception("Event handler %s failed on event %s", handler_name, event.id)
+                            errors[event.id] = f"{handler_name}: {exc!r}"
+
+        lag = 0.0
+        for row in rows:
+            if row.id in errors:
+                row.attempts += 1
+                row.last_error = errors[row.id][:2000]
+                if row.attempts >= settings.outbox_max_attempts:
+                    row.status = OutboxStatus.failed
+                    self.failed += 1
+                else:
+                    backoff = settings.outbox_retry_base_seconds * 2 ** (row.attempts - 1)
+                    row.next_attempt_at = now + timedelta(seconds=min(backoff, settings.outbox_retry_max_seconds))
+                    self.retried += 1
+            else:
+                row.status = OutboxStatus.done
+                row.dispatched_at = now
+                lag = max(lag, (now - row.created_at).total_seconds())
+        db.commit()
+        if tags:
+            cache.invalidate(tags=sorted(tags))
+
+        with self._lock:
+            self.batches += 1
+            self.delivered += len(rows) - len(errors)
+            self.last_batch_seconds = time.perf_counter() - started
+            if len(rows) > len(errors):
+                self.last_lag_seconds = lag
+                self.max_lag_seconds = max(self.max_lag_seconds, lag)
+        return len(rows)
+
+    def _deliver(self, db: Session, handler_name: str, handler: Handler, events: List[Event]) -> Set[str]:
+        with db.begin_nested():
+            tags = handler(db, events)
+            db.execute(
+                insert(OutboxDelivery),
+                [{"event_id": event.id, "handler": handler_name, "delivered_at": datetime.utcnow()} for event in events],
+            )
+        return set(tags or ())
+
+    def dispatch_pending(self, db: Session, max_batches: int = 100) -> int:
+        """Drain due events batch by batch; returns how many were claimed."""
+        total = 0
+        for _ in range(max_batches):
+            claimed = self.dispatch_batch(db)
+            total += claimed
+            if not claimed:
+                break
+        return total
+
+    def stats(self, db: Session) -> Dict[str, Any]:
+        pending, oldest = db.execute(
+            select(func.count(OutboxEvent.id), func.min(OutboxEvent.created_at)).where(
+                OutboxEvent.status == OutboxStatus.pending
+            )
+        ).one()
+        failed = db.execute(
+            select(func.count(OutboxEvent.id)).where(OutboxEvent.status == OutboxStatus.failed)
+        ).scalar_one()
+        with self._lock:
+            return {
+                "pending": pending,
+                "failed": failed,
+                # how far the dispatcher is behind right now
+                "oldest_pending_age_seconds": (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0,
+                "batches": self.batches,
+                "delivered": self.delivered,
+                "retried": self.retried,
+                "gave_up": self.failed,
+                "last_batch_seconds": round(self.last_batch_seconds, 4),
+                "last_lag_seconds": round(self.last_lag_seconds, 3),
+                "max_lag_seconds": round(self.max_lag_seconds, 3),
+            }
+
+    def metric_families(self) -> List[Family]:
+        return [
+            gauge_family("outbox_delivered_total", "Outbox events delivered", self.delivered, "counter"),
+            gauge_family("outbox_retried_total", "Outbox events scheduled for retry", self.retried, "counter"),
+            gauge_family("outbox_failed_total", "Outbox events given up on", self.failed, "counter"),
+            gauge_family(
+                "outbox_lag_seconds", "Age of the newest event at dispatch", self.last_lag_seconds, aggregate="max"
+            ),
+        ]
+
+
+dispatcher = EventDispatcher(SessionLocal)
+subscribe = dispatcher.subscribe
+registry.register_collector("outbox", dispatcher.metric_families)
+
+
+def prune_outbox(db: Session, now: Optional[datetime] = None) -> int:
+    """Delete delivered events older than the retention window; failed ones are kept."""
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=settings.outbox_retention_hours)
+    old = select(OutboxEvent.id).where(OutboxEvent.status == OutboxStatus.done, OutboxEvent.dispatched_at < cutoff)
+    db.execute(delete(OutboxDelivery).where(OutboxDelivery.event_id.in_(old)).execution_options(synchronize_session=False))
+    removed = db.execute(
+        delete(OutboxEvent)
+        .where(OutboxEvent.status == OutboxStatus.done, OutboxEvent.dispatched_at < cutoff)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return removed
+
+
+def dispatch_events_job() -> None:
+    db = dispatcher.session_factory()
+    try:
+        dispatcher.dispatch_pending(db)
+    finally:
+        db.close()
+
+
+def prune_outbox_job() -> None:
+    db = SessionLocal()
+    try:
+        prune_outbox(db)
+    finally:
+        db.close()
@@ -0,0 +1,255 @@
+"""Course funnel analytics served from pre-aggregated tables.
+
+The domain event handlers only flag aggregate rows as stale, with one cheap
+UPDATE per batch of events. ``refresh_stale_funnels`` recomputes the flagged lessons with
+one grouped query per course. ``rebuild_funnels`` recomputes everything on a
+slower schedule, which picks up new lessons and edits that were never flagged.
+Readers only ever see the aggregate tables.
+"""
+
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, case, distinct, func, select, union, update
+from sqlalchemy.orm import Session
+
+from app.core.background import try_exclusive
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.analytics import CourseFunnelStat, LessonFunnelStat
+from app.models.assignment import Assignment, Submission, SubmissionStatus
+from app.models.course import Course, Enrollment, Lesson, Module
+from app.schemas.analytics import CourseFunnelRead, LessonFunnelRead
+
+COUNTED_STATUSES = (SubmissionStatus.submitted, SubmissionStatus.checked)
+
+
+def mark_assignments_stale(db: Session, assignment_ids: Iterable[int]) -> None:
+    """Flag the lessons of these assignments for the next refresh."""
+    assignment_ids = sorted(set(assignment_ids))
+    if not assignment_ids:
+        return
+    db.execute(
+        update(LessonFunnelStat)
+        .where(
+            LessonFunnelStat.lesson_id.in_(select(Assignment.lesson_id).where(Assignment.id.in_(assignment_ids))),
+            # rows already flagged are left alone, so a busy lesson is not a lock hot spot
+            LessonFunnelStat.stale.is_(False),
+        )
+        .values(stale=True)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def mark_course_stale(db: Session, course_id: int) -> None:
+    db.execute(
+        update(CourseFunnelStat)
+        .where(CourseFunnelStat.course_id == course_id, CourseFunnelStat.stale.is_(False))
+        .values(stale=True)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def refresh_course_funnel(db: Session, course_id: int, lesson_ids: Optional[Iterable[int]] = None) -> CourseFunnelStat:
+    """Recompute the course header and the given lessons (all lessons when omitted).
+
+    Flags are cleared with an UPDATE before aggregating, so this transaction
+    holds the row locks: a writer flagging a lesson after the aggregate query
+    waits for the commit and flags it again.
+    """
+    ordered = (
+        db.execute(
+            select(Lesson.id)
+            .join(Module, Lesson.module_id == Module.id)
+            .where(Module.course_id == course_id)
+            .order_by(Module.order_index, Module.id, Lesson.order_index, Lesson.id)
+        )
+        .scalars()
+        .all()
+    )
+    now = datetime.utcnow()
+    db.execute(
+        update(CourseFunnelStat)
+        .where(CourseFunnelStat.course_id == course_id)
+        .values(stale=False)
+        .execution_options(synchronize_session=False)
+    )
+    # Rows of lessons that moved in from another course are matched by lesson id.
+    rows = {
+        row.lesson_id: row
+        for row in db.query(LessonFunnelStat).filter(
+            (LessonFunnelStat.course_id == course_id) | LessonFunnelStat.lesson_id.in_(ordered)
+        )
+    }
+    requested = set(ordered) if lesson_ids is None else set(lesson_ids) & set(ordered)
+    targets = sorted(requested | (set(ordered) - set(rows)))
+    if targets:
+        db.execute(
+            update(LessonFunnelStat)
+            .where(LessonFunnelStat.lesson_id.in_(targets))
+            .values(stale=False)
+            .execution_options(synchronize_session=False)
+        )
+
+    # scores count the latest graded attempt of each student, like progress and leaderboards
+    latest = (
+        select(Submission.student_id, Submission.assignment_id, func.max(Submission.attempt_number).label("attempt"))
+        .join(Assignment, Submission.assignment_id == Assignment.id)
+        .where(
+            Assignment.lesson_id.in_(targets),
+            Submission.status == SubmissionStatus.checked,
+            Submission.score.isnot(None),
+        )
+        .group_by(Submission.student_id, Submission.assignment_id)
+        .subquery()
+    )
+    student = Submission.student_id
+    aggregates = {
+        row.lesson_id: row
+        for row in db.execute(
+            select(
+                Assignment.lesson_id,
+                func.count(distinct(case((Submission.status.in_(COUNTED_STATUSES), student)))).label("submitted"),
+                func.count(distinct(case((Submission.status == SubmissionStatus.checked, student)))).label("completed"),
+                func.avg(case((Submission.attempt_number == latest.c.attempt, Submission.score))).label("avg_score"),
+            )
+            .join(Submission, Submission.assignment_id == Assignment.id)
+            .outerjoin(
+                latest,
+                and_(Submission.student_id == latest.c.student_id, Submission.assignment_id == latest.c.assignment_id),
+            )
+            .where(Assignment.lesson_id.in_(targets))
+            .group_by(Assignment.lesson_id)
+        )
+    }
+
+    positions = {lesson_id: position for position, lesson_id in enumerate(ordered, start=1)}
+    for lesson_id in set(rows) - set(positions):
+        db.delete(rows.pop(lesson_id))
+    for lesson_id in targets:
+        if lesson_id not in rows:
+            rows[lesson_id] = LessonFunnelStat(lesson_id=lesson_id, stale=False)
+            db.add(rows[lesson_id])
+        aggregate = aggregates.get(lesson_id)
+        row = rows[lesson_id]
+        row.submitted_count = aggregate.submitted if aggregate else 0
+        row.completed_count = aggregate.completed if aggregate else 0
+        row.avg_score = aggregate.avg_score if aggregate else None
+        row.stale = False
+        row.refreshed_at = now
+    for lesson_id, row in rows.items():
+        row.course_id = course_id
+        row.position = positions[lesson_id]
+
+    header = db.query(CourseFunnelStat).filter(CourseFunnelStat.course_id == course_id).first()
+    if header is None:
+        header = CourseFunnelStat(course_id=course_id)
+        db.add(header)
+    header.stale = False
+    header.enrolled_count = db.query(func.count(Enrollment.id)).filter(Enrollment.course_id == course_id).scalar() or 0
+    header.refreshed_at = now
+    db.flush()
+    return header
+
+
+def stale_course_ids(db: Session, limit: int) -> List[int]:
+    flagged = union(
+        select(LessonFunnelStat.course_id).where(LessonFunnelStat.stale.is_(True)),
+        select(CourseFunnelStat.course_id).where(CourseFunnelStat.stale.is_(True)),
+    ).subquery()
+    return db.execute(select(flagged.c.course_id).order_by(flagged.c.course_id).limit(limit)).scalars().all()
+
+
+def refresh_stale_funnels(db: Session, limit: int = 100) -> int:
+    """Recompute flagged lessons, one course per transaction; returns the number of courses done."""
+    refreshed = 0
+    for course_id in stale_course_ids(db, limit):
+        if not try_exclusive(db, f"course-funnel:{course_id}"):
+            db.rollback()
+            continue
+        lesson_ids = (
+            db.execute(
+                select(LessonFunnelStat.lesson_id).where(
+                    LessonFunnelStat.course_id == course_id, LessonFunnelStat.stale.is_(True)
+                )
+            )
+            .scalars()
+            .all()
+        )
+        refresh_course_funnel(db, course_id, lesson_ids)
+        db.commit()
+        refreshed += 1
+    return refreshed
+
+
+def rebuild_funnels(db: Session) -> int:
+    refreshed = 0
+    for course_id in db.execute(select(Course.id).order_by(Course.id)).scalars().all():
+        if not try_exclusive(db, f"course-funnel:{course_id}"):
+            db.rollback()
+            continue
+        header = refresh_course_funnel(db, course_id)
+        header.rebuilt_at = header.refreshed_at
+        db.commit()
+        refreshed += 1
+    return refreshed
+
+
+def refresh_stale_funnels_job() -> None:
+    db = SessionLocal()
+    try:
+        refresh_stale_funnels(db)
+    finally:
+        db.close()
+
+
+def rebuild_funnels_job() -> None:
+    db = SessionLocal()
+    try:
+        if not try_exclusive(db, "funnel-rebuild"):
+            return
+        # every worker runs the task; the first one of each interval does the work. The lock is
+        # held until the first course commits, which stamps rebuilt_at for the others to see.
+        latest = db.execute(select(func.max(CourseFunnelStat.rebuilt_at))).scalar()
+        fresh_for = timedelta(seconds=settings.funnel_rebuild_interval_seconds / 2)
+        if latest is not None and datetime.utcnow() - latest < fresh_for:
+            return
+        rebuild_funnels(db)
+    finally:
+        db.close()
+
+
+def read_course_funnel(db: Session, course_id: int) -> Optional[CourseFunnelRead]:
+    header = db.query(CourseFunnelStat).filter(CourseFunnelStat.course_id == course_id).first()
+    if header is None:
+        return None
+    rows = db.execute(
+        select(LessonFunnelStat, Lesson.title)
+        .join(Lesson, LessonFunnelStat.lesson_id == Lesson.id)
+        .where(LessonFunnelStat.course_id == course_id)
+        .order_by(LessonFunnelStat.position)
+    ).all()
+    enrolled = header.enrolled_count
+
+    def rate(count: int) -> Optional[float]:
+        return round(count / enrolled, 4) if enrolled else None
+
+    return CourseFunnelRead(
+        course_id=course_id,
+        enrolled_count=enrolled,
+        refreshed_at=header.refreshed_at,
+        stale=header.stale or any(stat.stale for stat, _ in rows),
+        lessons=[
+            LessonFunnelRead(
+                lesson_id=stat.lesson_id,
+                lesson_title=title,
+                position=stat.position,
+                submitted_count=stat.submitted_count,
+                completed_count=stat.completed_count,
+                submission_rate=rate(stat.submitted_count),
+                completion_rate=rate(stat.completed_count),
+                avg_score=stat.avg_score,
+            )
+            for stat, title in rows
+        ],
+    )
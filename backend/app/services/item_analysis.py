@@ -0,0 +1,185 @@
+"""Classical item analysis of a test: difficulty, discrimination, distractors.
+
+All answers of a test are read with one query into flat NumPy arrays and
+turned into an attempt x option selection matrix; every statistic is then a
+handful of vectorized operations over that matrix instead of per-row Python.
+"""
+
+from dataclasses import dataclass
+from itertools import chain
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import literal, select, union_all
+from sqlalchemy.orm import Session
+
+from app.models.test import QuestionType, TestAnswer, TestAttempt, TestOption, TestQuestion
+from app.schemas.test import ItemAnalysisOption, ItemAnalysisQuestion, TestItemAnalysis
+
+# Share of attempts forming the upper and lower groups for distractor analysis.
+GROUP_FRACTION = 0.27
+FETCH_SIZE = 50_000
+
+
+@dataclass
+class OptionKey:
+    """Option metadata in option-id order, aligned with the selection matrix columns."""
+
+    option_ids: np.ndarray
+    question_index: np.ndarray
+    is_correct: np.ndarray
+    question_ids: np.ndarray
+    question_single: np.ndarray
+
+    @property
+    def membership(self) -> np.ndarray:
+        """Option x question 0/1 matrix; multiplying by it sums option columns per question."""
+        matrix = np.zeros((len(self.option_ids), len(self.question_ids)), dtype=np.float32)
+        matrix[np.arange(len(self.option_ids)), self.question_index] = 1
+        return matrix
+
+
+def load_option_key(db: Session, test_id: int) -> OptionKey:
+    rows = db.execute(
+        select(TestOption.id, TestOption.question_id, TestOption.is_correct, TestQuestion.type)
+        .join(TestQuestion, TestOption.question_id == TestQuestion.id)
+        .where(TestQuestion.test_id == test_id)
+        .order_by(TestOption.id)
+    ).all()
+    option_ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    option_questions = np.fromiter((row[1] for row in rows), dtype=np.int64, count=len(rows))
+    question_ids, question_index = np.unique(option_questions, return_inverse=True)
+    single = {row[1]: row[3] == QuestionType.single for row in rows}
+    return OptionKey(
+        option_ids=option_ids,
+        question_index=question_index,
+        is_correct=np.fromiter((bool(row[2]) for row in rows), dtype=bool, count=len(rows)),
+        question_ids=question_ids,
+        question_single=np.array([single[qid] for qid in question_ids], dtype=bool),
+    )
+
+
+def load_selections(db: Session, test_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return parallel (attempt_id, option_id) arrays; every attempt also gets one (id, -1) row."""
+    finished = (TestAttempt.test_id == test_id, TestAttempt.finished_at.isnot(None))
+    statement = union_all(
+        select(TestAnswer.attempt_id, TestAnswer.option_id)
+        .join(TestAttempt, TestAnswer.attempt_id == TestAttempt.id)
+        .where(*finished),
+        # keeps attempts without any answer in the denominators
+        select(TestAttempt.id, literal(-1)).where(*finished),
+    )
+    result = db.connection().execute(statement)
+    # Rows are read straight from the DBAPI cursor: building a Row object per
+    # answer costs more than all of the statistics together.
+    chunks = [np.empty((0, 2), dtype=np.int64)]
+    try:
+        while rows := result.cursor.fetchmany(FETCH_SIZE):
+            chunks.append(np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=2 * len(rows)).reshape(-1, 2))
+    finally:
+        result.close()
+    pairs = np.concatenate(chunks)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def selection_matrix(key: OptionKey, attempt_ids: np.ndarray, option_ids: np.ndarray) -> np.ndarray:
+    """Boolean matrix with one row per attempt and one column per option of the test."""
+    # Every attempt has exactly one placeholder row, so only those need sorting.
+    attempts = np.sort(attempt_ids[option_ids < 0])
+    rows = np.searchsorted(attempts, attempt_ids)
+    matrix = np.zeros((len(attempts), len(key.option_ids)), dtype=bool)
+    if not len(key.option_ids):
+        return matrix
+    columns = np.searchsorted(key.option_ids, option_ids).clip(max=len(key.option_ids) - 1)
+    # Drops the -1 placeholders of attempts without answers.
+    known = key.option_ids[columns] == option_ids
+    matrix[rows[known], columns[known]] = True
+    return matrix
+
+
+def score_questions(key: OptionKey, selected: np.ndarray, membership: np.ndarray) -> np.ndarray:
+    """Per-attempt, per-question correctness with the same rules as test submission.
+
+    A question is correct when the selected options are exactly the correct
+    ones; single-choice questions additionally need exactly one selection.
+    """
+    # float32 so that the products run through BLAS; the counts are small integers
+    mistakes = (selected != key.is_correct).astype(np.float32) @ membership
+    picked = selected.astype(np.float32) @ membership
+    correct_options = key.is_correct.astype(np.float32) @ membership
+    correct = (mistakes == 0) & (correct_options > 0)
+    correct &= ~key.question_single | (picked == 1)
+    return correct
+
+
+def point_biserial(correct: np.ndarray) -> np.ndarray:
+    """Correlation of each item with the rest score (total without that item)."""
+    items = correct.astype(np.float64)
+    rest = items.sum(axis=1, keepdims=True) - items
+    items_centered = items - items.mean(axis=0)
+    rest_centered = rest - rest.mean(axis=0)
+    covariance = (items_centered * rest_centered).mean(axis=0)
+    spread = items_centered.std(axis=0) * rest_centered.std(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(spread > 0, covariance / np.where(spread > 0, spread, 1), np.nan)
+
+
+def _rounded(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def analyze(key: OptionKey, selected: np.ndarray) -> Tuple[List[ItemAnalysisQuestion], float]:
+    n_attempts = selected.shape[0]
+    membership = key.membership
+    correct = score_questions(key, selected, membership)
+    totals = correct.sum(axis=1)
+    difficulty = correct.mean(axis=0) if n_attempts else np.full(len(key.question_ids), np.nan)
+    discrimination = point_biserial(correct) if n_attempts > 1 else np.full(len(key.question_ids), np.nan)
+
+    answered = (selected.astype(np.float32) @ membership) > 0
+    omitted = 1 - answered.mean(axis=0) if n_attempts else np.full(len(key.question_ids), np.nan)
+
+    group_size = max(int(round(n_attempts * GROUP_FRACTION)), 1) if n_attempts else 0
+    order = np.argsort(totals, kind="stable")
+    lower, upper = selected[order[:group_size]], selected[order[n_attempts - group_size :]]
+    with np.errstate(invalid="ignore"):
+        rates = selected.mean(axis=0) if n_attempts else np.full(len(key.option_ids), np.nan)
+        upper_rates = upper.mean(axis=0) if group_size else rates
+        lower_rates = lower.mean(axis=0) if group_size else rates
+
+    questions = []
+    for index, question_id in enumerate(key.question_ids):
+        columns = np.flatnonzero(key.question_index == index)
+        questions.append(
+            ItemAnalysisQuestion(
+                question_id=int(question_id),
+                difficulty=_rounded(difficulty[index]),
+                discrimination=_rounded(discrimination[index]),
+                omitted_rate=_rounded(omitted[index]),
+                options=[
+                    ItemAnalysisOption(
+                        option_id=int(key.option_ids[column]),
+                        is_correct=bool(key.is_correct[column]),
+                        selection_rate=_rounded(rates[column]),
+                        upper_group_rate=_rounded(upper_rates[column]),
+                        lower_group_rate=_rounded(lower_rates[column]),
+                    )
+                    for column in columns
+                ],
+            )
+        )
+    mean_score = float(totals.mean()) if n_attempts else 0.0
+    return questions, mean_score
+
+
+def compute_item_analysis(db: Session, test_id: int) -> TestItemAnalysis:
+    key = load_option_key(db, test_id)
+    attempt_ids, option_ids = load_selections(db, test_id)
+    selected = selection_matrix(key, attempt_ids, option_ids)
+    questions, mean_score = analyze(key, selected)
+    return TestItemAnalysis(
+        test_id=test_id,
+        attempts_count=selected.shape[0],
+        mean_score=round(mean_score, 4),
+        questions=questions,
+    )
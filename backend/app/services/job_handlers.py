@@ -0,0 +1,30 @@
+"""Background job handlers; importing this module registers them."""
+
+from typing import Any, Dict
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.api.v1.progress import RECOMPUTE_COURSE_PROGRESS, refresh_progress
+from app.models.course import Enrollment
+from app.services.jobs import JobContext, job_handler
+
+RECOMPUTE_CHUNK = 200
+
+
+@job_handler(RECOMPUTE_COURSE_PROGRESS)
+def recompute_course_progress(db: Session, ctx: JobContext, payload: Dict[str, Any]) -> Dict[str, int]:
+    """Refresh every enrolled student's snapshot, committing chunk by chunk."""
+    course_id = payload["course_id"]
+    student_ids = (
+        db.execute(select(Enrollment.student_id).where(Enrollment.course_id == course_id).order_by(Enrollment.student_id))
+        .scalars()
+        .all()
+    )
+    for start in range(0, len(student_ids), RECOMPUTE_CHUNK):
+        chunk = student_ids[start : start + RECOMPUTE_CHUNK]
+        for student_id in chunk:
+            refresh_progress(db, student_id, course_id)
+        db.commit()
+        ctx.report(start + len(chunk), len(student_ids), f"{start + len(chunk)}/{len(student_ids)} students")
+    return {"course_id": course_id, "students": len(student_ids)}
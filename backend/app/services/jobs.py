@@ -0,0 +1,284 @@
+"""Persistent background jobs.
+
+``enqueue`` writes a job row in the caller's transaction. Workers claim the
+highest-priority due job with ``FOR UPDATE SKIP LOCKED`` and lease it for
+``job_lease_seconds``. Progress reports extend the lease, and a job whose
+lease runs out (its worker died) is claimed again. Failed runs are retried
+with exponential backoff until ``max_attempts``.
+
+Jobs run either in ``python -m app.worker`` next to the web workers, or,
+with ``JOBS_IN_PROCESS`` (tests, local dev), on a thread of the API process.
+Handlers are registered with ``@job_handler(kind)`` and receive their own
+session, a ``JobContext`` and the decoded payload. The JSON-serialisable
+value they return is stored as the job result.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import event, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import Family, registry
+from app.db.session import SessionLocal
+from app.models.job import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = (JobStatus.queued, JobStatus.running)
+
+JobHandler = Callable[[Session, "JobContext", Dict[str, Any]], Any]
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    def decorator(func: JobHandler) -> JobHandler:
+        _handlers[kind] = func
+        return func
+
+    return decorator
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Optional[Dict[str, Any]] = None,
+    priority: int = 0,
+    dedupe_key: Optional[str] = None,
+    created_by_id: Optional[int] = None,
+    max_attempts: int = 3,
+    run_after: Optional[datetime] = None,
+) -> Job:
+    """Queue a job in the current transaction.
+
+    With a ``dedupe_key``, a queued or running job with the same key is
+    returned instead of creating a second one.
+    """
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+    if dedupe_key is not None:
+        existing = active_job(db, dedupe_key)
+        if existing is not None:
+            return existing
+    job = Job(
+        kind=kind,
+        payload=json.dumps(payload or {}, sort_keys=True),
+        priority=priority,
+        dedupe_key=dedupe_key,
+        max_attempts=max_attempts,
+        run_after=run_after or datetime.utcnow(),
+        created_by_id=created_by_id,
+    )
+    try:
+        with db.begin_nested():
+            db.add(job)
+    except IntegrityError:
+        # a concurrent request queued the same key first
+        return active_job(db, dedupe_key)
+    # wake the in-process runner once the job is visible
+    event.listen(db, "after_commit", lambda session: job_runner.notify(), once=True)
+    return job
+
+
+def active_job(db: Session, dedupe_key: str) -> Optional[Job]:
+    return db.query(Job).filter(Job.dedupe_key == dedupe_key, Job.status.in_(ACTIVE_STATUSES)).first()
+
+
+class JobContext:
+    def __init__(self, runner: "JobRunner", job_id: int, attempt: int) -> None:
+        self.runner = runner
+        self.job_id = job_id
+        self.attempt = attempt
+
+    def report(self, done: float, total: Optional[float] = None, message: Optional[str] = None) -> None:
+        """Publish progress (``done / total``, or a 0..1 fraction) and extend the lease."""
+        fraction = done / total if total else done
+        self.runner.update_lease(self.job_id, min(max(fraction, 0.0), 1.0), message)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    seconds = settings.job_retry_base_seconds * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.job_retry_max_seconds))
+
+
+class JobRunner:
+    def __init__(self, session_factory: Callable[[], Session], name: Optional[str] = None, concurrency: int = 1) -> None:
+        self.session_factory = session_factory
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.succeeded = 0
+        self.failed = 0
+
+    def claim(self, db: Session, worker: str, now: Optional[datetime] = None) -> Optional[Job]:
+        """Lease the next due job to ``worker`` and commit; None when there is nothing to run."""
+        now = now or datetime.utcnow()
+        while True:
+            job = (
+                db.query(Job)
+                .filter(
+                    or_(
+                        (Job.status == JobStatus.queued) & (Job.run_after <= now),
+                        (Job.status == JobStatus.running) & (Job.locked_until < now),
+                    )
+                )
+                .order_by(Job.priority.desc(), Job.run_after, Job.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if job is None:
+                db.commit()
+                return None
+            if job.status == JobStatus.running and job.attempts >= job.max_attempts:
+                job.status = JobStatus.failed
+                job.last_error = f"lease expired on {job.locked_by}"
+                job.finished_at = now
+                job.locked_by = job.locked_until = None
+                db.commit()
+                continue
+            # Guarded on the state read above, so databases without SKIP LOCKED never double-claim.
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == job.id, Job.status == job.status, Job.attempts == job.attempts)
+                .values(
+                    status=JobStatus.running,
+                    attempts=Job.attempts + 1,
+                    locked_by=worker,
+                    locked_until=now + timedelta(seconds=settings.job_lease_seconds),
+                    started_at=now,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            if claimed:
+                db.refresh(job)
+                return job
+
+    def update_lease(self, job_id: int, progress: float, message: Optional[str]) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == JobStatus.running)
+                .values(
+                    progress=progress,
+                    progress_message=message,
+                    locked_until=datetime.utcnow() + timedelta(seconds=settings.job_lease_seconds),
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def run_next(self, worker: Optional[str] = None) -> bool:
+        """Claim and run one job; False when the queue had nothing due."""
+        worker = worker or self.name
+        db = self.session_factory()
+        try:
+            job = self.claim(db, worker)
+            if job is None:
+                return False
+            job_id, kind, attempt, payload = job.id, job.kind, job.attempts, json.loads(job.payload)
+            outcome: Dict[str, Any] = {}
+            try:
+                handler = _handlers.get(kind)
+                if handler is None:
+                    raise LookupError(f"No handler for job kind {kind}")
+                result = handler(db, JobContext(self, job_id, attempt), payload)
+                db.commit()
+                outcome = {"result": json.dumps(result) if result is not None else None}
+            except Exception as exc:
+                db.rollback()
+                logger.exception("Job %s (%s) failed on attempt %s", job_id, kind, attempt)
+                outcome = {"error": f"{type(exc).__name__}: {exc}"[:2000]}
+        finally:
+            db.close()
+        self._finish(job_id, worker, outcome)
+        return True
+
+    def _finish(self, job_id: int, worker: str, outcome: Dict[str, Any]) -> None:
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            job = db.query(Job).filter(Job.id == job_id, Job.locked_by == worker).first()
+            if job is None or job.status != JobStatus.running:
+                # the lease expired and another worker owns the job now
+                db.commit()
+                return
+            job.locked_by = job.locked_until = None
+            if "error" not in outcome:
+                job.status = JobStatus.succeeded
+                job.result = outcome["result"]
+                job.progress = 1.0
+                job.finished_at = now
+                self.succeeded += 1
+            else:
+                job.last_error = outcome["error"]
+                if job.attempts >= job.max_attempts:
+                    job.status = JobStatus.failed
+                    job.finished_at = now
+                    self.failed += 1
+                else:
+                    job.status = JobStatus.queued
+                    job.run_after = now + retry_delay(job.attempts)
+            db.commit()
+        finally:
+            db.close()
+
+    def run_until_idle(self, max_jobs: int = 1000) -> int:
+        """Run due jobs on the calling thread until none is left; returns how many ran."""
+        ran = 0
+        while ran < max_jobs and self.run_next():
+            ran += 1
+        return ran
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self._loop, args=(f"{self.name}:{index}",), name=f"jobs-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop claiming; jobs already running get ``timeout`` seconds to finish."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _loop(self, worker: str) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.run_next(worker):
+                    continue
+            except Exception:  # database hiccup; back off like an empty queue
+                logger.exception("Job runner %s failed to claim", worker)
+            self._wake.wait(settings.job_poll_interval_seconds)
+            self._wake.clear()
+
+    def metric_families(self) -> List[Family]:
+        finished = Family("jobs_finished_total", "counter", "Jobs finished by this process", ("status",))
+        finished.samples[("succeeded",)] = float(self.succeeded)
+        finished.samples[("failed",)] = float(self.failed)
+        return [finished]
+
+
+job_runner = JobRunner(SessionLocal)
+registry.register_collector("jobs", job_runner.metric_families)
@@ -0,0 +1,288 @@
+"""Per-course leaderboards by points and by average score.
+
+``leaderboard_entries`` holds one compact row per (course, student): the sum
+and the mean of the latest graded attempt of each assignment. The
+``leaderboards`` event handler recomputes the rows of the students whose work
+was graded and bumps the course's ``course_leaderboards.revision`` in the same
+transaction. The revision row's lock serializes the writers of a course, so
+revisions commit in order.
+
+Every worker keeps a ``CourseBoard`` per course in memory: per metric, a
+sorted list of ``(-value, student_id)`` keys, so a rank, the rows around a
+student and a percentile are ``bisect`` lookups. A board is built from the
+table once and then only applies the entries with a newer revision. The
+handler's cache tag tells the workers that a course has a new revision, so a
+read in between makes no query at all.
+
+Ties use competition ranking ("1224"): equal values share the best rank and
+are listed by student id.
+"""
+
+import math
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache, leaderboard_tag
+from app.core.config import settings
+from app.db.upsert import upsert
+from app.models.assignment import Submission, SubmissionStatus
+from app.models.leaderboard import CourseLeaderboard, LeaderboardEntry
+from app.models.user import User
+from app.schemas.leaderboard import LeaderboardMetric, LeaderboardRead, LeaderboardRow
+
+boards_table = CourseLeaderboard.__table__
+entries_table = LeaderboardEntry.__table__
+
+# (points, avg_score, graded_count) by (course_id, student_id)
+Standings = Dict[Tuple[int, int], Tuple[float, Optional[float], int]]
+
+
+class RankedList:
+    """Students by one metric, best first."""
+
+    def __init__(self, values: Optional[Mapping[int, float]] = None) -> None:
+        self.values: Dict[int, float] = dict(values or {})
+        self.keys: List[Tuple[float, int]] = sorted((-value, student_id) for student_id, value in self.values.items())
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def set(self, student_id: int, value: Optional[float]) -> None:
+        """Move a student to ``value``; None takes them off the list."""
+        old = self.values.pop(student_id, None)
+        if old is not None:
+            del self.keys[bisect_left(self.keys, (-old, student_id))]
+        if value is not None:
+            self.values[student_id] = value
+            insort(self.keys, (-value, student_id))
+
+    def rank(self, value: float) -> int:
+        # (-value,) sorts before every (-value, student_id)
+        return bisect_left(self.keys, (-value,)) + 1
+
+    def below(self, value: float) -> int:
+        return len(self.keys) - bisect_right(self.keys, (-value, math.inf))
+
+    def rows(self, start: int, stop: int) -> List[Tuple[int, int, float]]:
+        """(rank, student_id, value) of the list positions ``start:stop``."""
+        return [(self.rank(-key), student_id, -key) for key, student_id in self.keys[max(start, 0) : stop]]
+
+    def position(self, student_id: int) -> Optional[int]:
+        value = self.values.get(student_id)
+        return None if value is None else bisect_left(self.keys, (-value, student_id))
+
+
+class CourseBoard:
+    """Both rankings of a course as of ``revision``; readers and ``apply`` hold ``lock``."""
+
+    def __init__(self, revision: int, rows: Iterable = ()) -> None:
+        self.revision = revision
+        self.lock = threading.Lock()
+        rows = [row for row in rows if row.graded_count > 0]
+        self.lists = {
+            LeaderboardMetric.points: RankedList({row.student_id: row.points for row in rows}),
+            LeaderboardMetric.avg_score: RankedList({row.student_id: row.avg_score for row in rows}),
+        }
+
+    def apply(self, rows: Iterable) -> None:
+        for row in rows:
+            graded = row.graded_count > 0
+            self.lists[LeaderboardMetric.points].set(row.student_id, row.points if graded else None)
+            self.lists[LeaderboardMetric.avg_score].set(row.student_id, row.avg_score if graded else None)
+            self.revision = max(self.revision, row.revision)
+
+
+def current_revision(db: Session, course_id: int) -> int:
+    return db.execute(select(CourseLeaderboard.revision).where(CourseLeaderboard.course_id == course_id)).scalar() or 0
+
+
+class LeaderboardRegistry:
+    """In-memory boards of the most recently read courses."""
+
+    def __init__(self, max_courses: int) -> None:
+        self.max_courses = max_courses
+        self._boards: "OrderedDict[int, CourseBoard]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def board(self, db: Session, course_id: int) -> CourseBoard:
+        revision = cache.get_or_load(
+            f"leaderboard:revision:{course_id}",
+            lambda: current_revision(db, course_id),
+            tags=[leaderboard_tag(course_id)],
+        )
+        with self._lock:
+            board = self._boards.get(course_id)
+            if board is not None:
+                self._boards.move_to_end(course_id)
+        if board is None:
+            # the revision is read first: entries committed in between are applied again later, which is harmless
+            loaded = current_revision(db, course_id)
+            rows = db.execute(select(entries_table).where(entries_table.c.course_id == course_id)).all()
+            board = CourseBoard(loaded, rows)
+            with self._lock:
+                self._boards[course_id] = board
+                while len(self._boards) > self.max_courses:
+                    self._boards.popitem(last=False)
+        elif board.revision < revision:
+            with board.lock:
+                if board.revision < revision:
+                    board.apply(
+                        db.execute(
+                            select(entries_table)
+                            .where(entries_table.c.course_id == course_id, entries_table.c.revision > board.revision)
+                            .order_by(entries_table.c.revision)
+                        ).all()
+                    )
+        return board
+
+    def clear(self) -> None:
+        with self._lock:
+            self._boards.clear()
+
+
+leaderboards = LeaderboardRegistry(settings.leaderboard_max_courses)
+
+
+def compute_standings(db: Session, course_id: Optional[int] = None, student_ids: Iterable[int] = ()) -> Standings:
+    """Points, average and graded count over the latest graded attempt of each assignment."""
+    graded = [Submission.status == SubmissionStatus.checked, Submission.score.isnot(None)]
+    if course_id is not None:
+        graded.append(Submission.course_id == course_id)
+    student_ids = sorted(set(student_ids))
+    if student_ids:
+        graded.append(Submission.student_id.in_(student_ids))
+    latest = (
+        select(Submission.student_id, Submission.assignment_id, func.max(Submission.attempt_number).label("attempt"))
+        .where(*graded)
+        .group_by(Submission.student_id, Submission.assignment_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            Submission.course_id,
+            Submission.student_id,
+            func.sum(Submission.score),
+            func.avg(Submission.score),
+            func.count(),
+        )
+        .join(
+            latest,
+            and_(
+                Submission.student_id == latest.c.student_id,
+                Submission.assignment_id == latest.c.assignment_id,
+                Submission.attempt_number == latest.c.attempt,
+            ),
+        )
+        .where(*graded)
+        .group_by(Submission.course_id, Submission.student_id)
+    ).all()
+    # rounded so that equal grades compare equal after float summation
+    return {
+        (course, student): (round(points, 4), round(average, 4), count)
+        for course, student, points, average, count in rows
+    }
+
+
+def _bump_revision(db: Session, course_id: int) -> int:
+    statement = upsert(db, boards_table).values(course_id=course_id, revision=1)
+    return db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[boards_table.c.course_id], set_={"revision": boards_table.c.revision + 1}
+        ).returning(boards_table.c.revision)
+    ).scalar_one()
+
+
+def _write_entries(db: Session, course_id: int, student_ids: Iterable[int], standings: Standings) -> None:
+    revision = _bump_revision(db, course_id)
+    now = datetime.utcnow()
+    rows = []
+    for student_id in sorted(student_ids):
+        points, average, count = standings.get((course_id, student_id), (0.0, None, 0))
+        rows.append(
+            {
+                "course_id": course_id,
+                "student_id": student_id,
+                "points": points,
+                "avg_score": average,
+                "graded_count": count,
+                "revision": revision,
+                "updated_at": now,
+            }
+        )
+    statement = upsert(db, entries_table)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[entries_table.c.course_id, entries_table.c.student_id],
+            set_={
+                column: statement.excluded[column]
+                for column in ("points", "avg_score", "graded_count", "revision", "updated_at")
+            },
+        ),
+        rows,
+    )
+
+
+def update_leaderboards(db: Session, students_by_course: Mapping[int, Set[int]]) -> None:
+    """Recompute the entries of these students; courses go in id order so writers never deadlock."""
+    for course_id in sorted(students_by_course):
+        students = students_by_course[course_id]
+        if students:
+            _write_entries(db, course_id, students, compute_standings(db, course_id, students))
+
+
+def rebuild_leaderboards(db: Session) -> None:
+    """Recompute every entry from ``submissions``.
+
+    Entries whose graded work is gone are zeroed rather than deleted, like in
+    ``update_leaderboards``, so that in-memory boards see them go.
+    """
+    standings = compute_standings(db)
+    students: Dict[int, Set[int]] = {}
+    for course_id, student_id in standings:
+        students.setdefault(course_id, set()).add(student_id)
+    for course_id, student_id in db.execute(
+        select(entries_table.c.course_id, entries_table.c.student_id).where(entries_table.c.graded_count > 0)
+    ):
+        students.setdefault(course_id, set()).add(student_id)
+    for course_id in sorted(students):
+        _write_entries(db, course_id, students[course_id], standings)
+
+
+def read_leaderboard(
+    db: Session, course_id: int, student_id: int, metric: LeaderboardMetric, limit: int, around: int
+) -> LeaderboardRead:
+    board = leaderboards.board(db, course_id)
+    with board.lock:
+        ranked = board.lists[metric]
+        total = len(ranked)
+        top = ranked.rows(0, limit)
+        position = ranked.position(student_id)
+        nearby, percentile = [], None
+        if position is not None:
+            nearby = ranked.rows(position - around, position + around + 1)
+            value = ranked.values[student_id]
+            percentile = round(100 * ranked.below(value) / (total - 1), 1) if total > 1 else 100.0
+
+    ids = {row[1] for row in top} | {row[1] for row in nearby}
+    names = dict(db.execute(select(User.id, User.full_name).where(User.id.in_(sorted(ids)))).all()) if ids else {}
+
+    def to_row(rank: int, row_student_id: int, value: float) -> LeaderboardRow:
+        full_name = names.get(row_student_id, "")
+        return LeaderboardRow(rank=rank, student_id=row_student_id, full_name=full_name, value=value)
+
+    around_rows = [to_row(*row) for row in nearby]
+    return LeaderboardRead(
+        course_id=course_id,
+        metric=metric,
+        total=total,
+        top=[to_row(*row) for row in top],
+        me=next((row for row in around_rows if row.student_id == student_id), None),
+        percentile=percentile,
+        around=around_rows,
+    )
@@ -0,0 +1,214 @@
+"""Lesson renditions: sanitized HTML rendered once per content change.
+
+Lesson content is written rarely and read on every lesson view, so the work
+happens at write time. Whenever a flush inserts a lesson or changes its
+``content_html``, the ``before_flush`` hook below writes the lesson's
+``LessonRendition``: HTML reduced to an allowlist of tags and attributes,
+the same bytes gzip- and (when the ``brotli`` package is installed)
+brotli-compressed, and plain text for previews. The rendition ``version`` is
+bumped on every change, so URLs that embed it can be cached forever.
+
+Bulk loaders that bypass the ORM call ``rendition_values`` themselves.
+"""
+
+import gzip
+import hashlib
+import re
+from datetime import datetime
+from html import escape
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, attributes, selectinload
+
+from app.core.cache import cache
+from app.models.course import Lesson, LessonRendition
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip renditions are stored
+    brotli = None
+
+# bump when the sanitizer output changes, so that every lesson is rendered again
+RENDERER_VERSION = 1
+PREVIEW_CHARS = 280
+
+ALLOWED_TAGS = {
+    "a", "b", "blockquote", "br", "code", "div", "em", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "i", "img",
+    "li", "ol", "p", "pre", "span", "strong", "sub", "sup", "table", "tbody", "td", "th", "thead", "tr", "u", "ul",
+}
+VOID_TAGS = {"br", "hr", "img"}
+# dropped together with everything inside them
+DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "template", "noscript"}
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "img": {"src", "alt", "title", "width", "height"},
+    "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"},
+}
+URL_ATTRIBUTES = {"href", "src"}
+# absolute http(s)/mailto URLs or relative ones (no scheme before the first / ? #)
+SAFE_URL = re.compile(r"^(https?:|mailto:|[^:/?#]*(?:[/?#]|$))", re.IGNORECASE)
+# browsers ignore these inside a scheme ("java\tscript:")
+URL_NOISE = re.compile(r"[\x00-\x20]")
+BLOCK_TAGS = {"p", "div", "br", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "hr"}
+
+
+def lesson_tag(lesson_id: int) -> str:
+    return f"lesson:{lesson_id}"
+
+
+class _Sanitizer(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.html: List[str] = []
+        self.text: List[str] = []
+        self.open: List[str] = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        allowed = ALLOWED_ATTRIBUTES.get(tag, ())
+        kept = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            value = value.strip()
+            if name in URL_ATTRIBUTES and not SAFE_URL.match(URL_NOISE.sub("", value)):
+                continue
+            kept.append(f' {name}="{escape(value)}"')
+        if tag == "a":
+            kept.append(' rel="noopener noreferrer nofollow"')
+        self.html.append(f"<{tag}{''.join(kept)}>")
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            return
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open:
+            return
+        # close whatever the author left open inside this element
+        while self.open:
+            current = self.open.pop()
+            self.html.append(f"</{current}>")
+            if current == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self.text.append("\n")
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def result(self) -> Tuple[str, str]:
+        self.close()
+        html = "".join(self.html) + "".join(f"</{tag}>" for tag in reversed(self.open))
+        lines = (" ".join(line.split()) for line in "".join(self.text).splitlines())
+        return html, "\n".join(line for line in lines if line)
+
+
+def sanitize_html(source: str) -> Tuple[str, str]:
+    """(safe html, plain text) of untrusted lesson HTML."""
+    parser = _Sanitizer()
+    parser.feed(source or "")
+    return parser.result()
+
+
+def source_hash(content_html: str) -> str:
+    return hashlib.sha256(f"{RENDERER_VERSION}:{content_html}".encode()).hexdigest()
+
+
+def preview(plain_text: str) -> str:
+    text = " ".join(plain_text.split())
+    return text if len(text) <= PREVIEW_CHARS else text[: PREVIEW_CHARS - 1].rstrip() + "…"
+
+
+def rendition_values(content_html: str) -> Dict[str, object]:
+    html, plain_text = sanitize_html(content_html)
+    body = html.encode()
+    return {
+        "source_hash": source_hash(content_html),
+        "html": html,
+        "html_gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        "html_br": brotli.compress(body, quality=11) if brotli is not None else None,
+        "plain_text": plain_text,
+        "rendered_at": datetime.utcnow(),
+    }
+
+
+def render_lesson(lesson: Lesson) -> bool:
+    """Bring the lesson's rendition up to date; returns whether anything changed."""
+    rendition: Optional[LessonRendition] = lesson.rendition
+    digest = source_hash(lesson.content_html)
+    if rendition is not None and rendition.source_hash == digest:
+        return False
+    values = rendition_values(lesson.content_html)
+    if rendition is None:
+        lesson.rendition = LessonRendition(version=1, **values)
+    else:
+        for key, value in values.items():
+            setattr(rendition, key, value)
+        rendition.version += 1
+    return True
+
+
+def render_stale_lessons(session: Session, batch_size: int = 500) -> int:
+    """Render lessons without an up-to-date rendition (new deployments, sanitizer changes)."""
+    rendered = 0
+    last_id = 0
+    while True:
+        lessons = (
+            session.query(Lesson)
+            .options(selectinload(Lesson.rendition))
+            .filter(Lesson.id > last_id)
+            .order_by(Lesson.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not lessons:
+            return rendered
+        for lesson in lessons:
+            rendered += render_lesson(lesson)
+        last_id = lessons[-1].id
+        session.commit()
+
+
+@event.listens_for(Session, "before_flush")
+def _render_changed_lessons(session, flush_context, instances) -> None:
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Lesson):
+            continue
+        if obj in session.new or attributes.get_history(obj, "content_html").has_changes():
+            if render_lesson(obj) and obj.id is not None:
+                changed: Set[int] = session.info.setdefault("rendered_lessons", set())
+                changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_rendered_lessons(session) -> None:
+    changed: Iterable[int] = session.info.pop("rendered_lessons", ())
+    if changed:
+        cache.invalidate(tags=[lesson_tag(lesson_id) for lesson_id in sorted(changed)])
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rendered_lessons(session) -> None:
+    session.info.pop("rendered_lessons", None)
@@ -0,0 +1,324 @@
+"""Course recommendations from tag and co-enrollment similarity.
+
+``refresh_recommendations`` runs in the background. It reads the published
+courses, their tags and all enrollments into flat NumPy arrays and scores
+every pair of courses as
+
+    tag_weight * cosine(tags) + (1 - tag_weight) * cosine(co-enrollment)
+
+a block of rows at a time, so the dense course x course matrix never exists
+in full. Co-enrollment counts come from the enrollment pairs of each student,
+counted with ``np.unique``, which keeps them sparse. Only the
+``recommendations_neighbours`` most similar courses of each course are kept,
+stored as one compressed ``course_similarity_snapshots`` row.
+
+Workers keep the newest snapshot in the process cache. A student's
+candidates are scored with one ``bincount`` over the neighbour lists of the
+courses they are enrolled in; without enrollments, or without enough scored
+candidates, the most popular courses fill the list. The published courses by
+id and in popularity order are cached next to the catalog as a
+``CatalogRanking``, so a request does not rebuild either.
+"""
+
+import io
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+
+from app.core.background import try_exclusive
+from app.core.cache import cache
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.analytics import CourseSimilaritySnapshot, CourseStat
+from app.models.course import Course, CourseTag, Enrollment
+from app.schemas.course import CourseRead, RecommendedCourse
+
+RECOMMENDATIONS_TAG = "recommendations"
+INDEX_KEY = "recommendations:index"
+FETCH_SIZE = 50_000
+# similarity rows computed at once: 512 x 5,000 courses is a 10 MB float32 block
+BLOCK_ROWS = 512
+# enrollment pairs materialized at once while counting co-enrollments
+PAIR_BATCH = 4_000_000
+
+
+@dataclass
+class SimilarityIndex:
+    """Neighbour lists of one snapshot; rows are positions in the sorted ``course_ids``."""
+
+    course_ids: np.ndarray
+    neighbours: np.ndarray
+    scores: np.ndarray
+    # rows by enrollments, most popular first
+    popular: np.ndarray
+    built_at: datetime
+
+    def to_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(
+            buffer, course_ids=self.course_ids, neighbours=self.neighbours, scores=self.scores, popular=self.popular
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload: bytes, built_at: datetime) -> "SimilarityIndex":
+        with np.load(io.BytesIO(payload)) as arrays:
+            return cls(
+                course_ids=arrays["course_ids"],
+                neighbours=arrays["neighbours"],
+                scores=arrays["scores"],
+                popular=arrays["popular"],
+                built_at=built_at,
+            )
+
+    def recommend(self, enrolled_ids: Iterable[int], limit: int) -> List[Tuple[int, float]]:
+        """(course_id, score) of the best ``limit`` courses the student is not enrolled in."""
+        n_courses = len(self.course_ids)
+        if not n_courses or limit <= 0:
+            return []
+        rows, _ = course_rows(self.course_ids, np.fromiter(enrolled_ids, dtype=np.int64))
+        scores = np.bincount(
+            self.neighbours[rows].ravel(), weights=self.scores[rows].ravel(), minlength=n_courses
+        )
+        scores[rows] = 0
+        ranked = np.flatnonzero(scores > 0)
+        if len(ranked) > limit:
+            ranked = ranked[np.argpartition(-scores[ranked], limit - 1)[:limit]]
+        # best first, ties by course id
+        ranked = ranked[np.lexsort((ranked, -scores[ranked]))]
+        picks = [(int(self.course_ids[row]), float(scores[row])) for row in ranked]
+        if len(picks) < limit:
+            taken = np.zeros(n_courses, dtype=bool)
+            taken[rows] = True
+            taken[ranked] = True
+            fill = self.popular[~taken[self.popular]][: limit - len(picks)]
+            picks.extend((int(self.course_ids[row]), 0.0) for row in fill)
+        return picks
+
+
+def course_rows(course_ids: np.ndarray, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Rows of ``values`` in the sorted ``course_ids`` and the mask of values found there."""
+    if not len(course_ids):
+        return np.empty(0, dtype=np.int64), np.zeros(len(values), dtype=bool)
+    rows = np.searchsorted(course_ids, values).clip(max=len(course_ids) - 1)
+    found = course_ids[rows] == values
+    return rows[found], found
+
+
+def tag_factors(n_courses: int, rows: np.ndarray, tag_ids: np.ndarray) -> np.ndarray:
+    """Row-normalized course x tag matrix; its product with its transpose is the tag cosine."""
+    columns = np.unique(tag_ids, return_inverse=True)[1]
+    matrix = np.zeros((n_courses, int(columns.max()) + 1 if len(columns) else 0), dtype=np.float32)
+    matrix[rows, columns] = 1
+    norms = np.sqrt(matrix.sum(axis=1, keepdims=True))
+    return np.divide(matrix, norms, out=matrix, where=norms > 0)
+
+
+def _pair_keys(courses: np.ndarray, sizes: np.ndarray, n_courses: int) -> np.ndarray:
+    """``a * n_courses + b`` for every ordered pair a != b of courses sharing a student.
+
+    ``courses`` holds whole students back to back, ``sizes`` their course counts.
+    """
+    per_item = np.repeat(sizes, sizes)
+    first = np.repeat(np.cumsum(sizes) - sizes, sizes)
+    left = np.repeat(np.arange(len(courses)), per_item)
+    offsets = np.arange(len(left)) - np.repeat(np.cumsum(per_item) - per_item, per_item)
+    right = np.repeat(first, per_item) + offsets
+    distinct = left != right
+    return courses[left[distinct]] * n_courses + courses[right[distinct]]
+
+
+def co_enrollment(
+    n_courses: int, student_ids: np.ndarray, rows: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Co-enrollment cosine as sparse (row, column, value) arrays sorted by row and column."""
+    order = np.lexsort((rows, student_ids))
+    students, courses = student_ids[order], rows[order]
+    distinct = np.r_[True, (students[1:] != students[:-1]) | (courses[1:] != courses[:-1])]
+    students, courses = students[distinct], courses[distinct]
+    if not len(students):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    degree = np.bincount(courses, minlength=n_courses)
+    starts = np.flatnonzero(np.r_[True, students[1:] != students[:-1]])
+    sizes = np.diff(np.r_[starts, len(students)])
+
+    # students are cut into batches of about PAIR_BATCH pairs to bound memory
+    cost = np.cumsum(sizes.astype(np.int64) ** 2)
+    cuts = np.searchsorted(cost, np.arange(PAIR_BATCH, cost[-1], PAIR_BATCH), side="right")
+    bounds = np.unique(np.r_[0, cuts, len(sizes)])
+    keys, counts = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        begin, end = starts[lo], starts[hi] if hi < len(starts) else len(courses)
+        pair_keys = _pair_keys(courses[begin:end], sizes[lo:hi], n_courses)
+        batch_keys, batch_counts = np.unique(pair_keys, return_counts=True)
+        keys.append(batch_keys)
+        counts.append(batch_counts)
+    keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    shared = np.bincount(inverse, weights=np.concatenate(counts))
+    left, right = keys // n_courses, keys % n_courses
+    values = shared / np.sqrt(degree[left].astype(np.float64) * degree[right])
+    return left, right, values.astype(np.float32)
+
+
+def top_neighbours(
+    factors: np.ndarray,
+    co_rows: np.ndarray,
+    co_columns: np.ndarray,
+    co_values: np.ndarray,
+    k: int,
+    tag_weight: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(neighbours, scores) of the ``k`` most similar courses of every course, best first."""
+    n_courses = factors.shape[0]
+    k = max(min(k, n_courses - 1), 0)
+    neighbours = np.zeros((n_courses, k), dtype=np.uint16 if n_courses <= 2**16 else np.int32)
+    scores = np.zeros((n_courses, k), dtype=np.float16)
+    if not k:
+        return neighbours, scores
+    for lo in range(0, n_courses, BLOCK_ROWS):
+        hi = min(lo + BLOCK_ROWS, n_courses)
+        block = factors[lo:hi] @ factors.T
+        block *= tag_weight
+        begin, end = np.searchsorted(co_rows, [lo, hi])
+        block[co_rows[begin:end] - lo, co_columns[begin:end]] += (1 - tag_weight) * co_values[begin:end]
+        block[np.arange(hi - lo), np.arange(lo, hi)] = -np.inf
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.lexsort((top, -top_scores))
+        neighbours[lo:hi] = np.take_along_axis(top, order, axis=1)
+        scores[lo:hi] = np.take_along_axis(top_scores, order, axis=1)
+    return neighbours, scores
+
+
+def _int_pairs(db: Session, statement) -> Tuple[np.ndarray, np.ndarray]:
+    result = db.connection().execute(statement)
+    # straight from the DBAPI cursor, see app.services.item_analysis.load_selections
+    chunks = [np.empty((0, 2), dtype=np.int64)]
+    try:
+        while rows := result.cursor.fetchmany(FETCH_SIZE):
+            chunks.append(np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=2 * len(rows)).reshape(-1, 2))
+    finally:
+        result.close()
+    pairs = np.concatenate(chunks)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def build_index(
+    course_ids: np.ndarray,
+    tag_pairs: Tuple[np.ndarray, np.ndarray],
+    enrollment_pairs: Tuple[np.ndarray, np.ndarray],
+    enrollments: np.ndarray,
+    k: Optional[int] = None,
+    tag_weight: Optional[float] = None,
+) -> SimilarityIndex:
+    """Index over the sorted ``course_ids``.
+
+    ``tag_pairs`` are (course_id, tag_id) arrays, ``enrollment_pairs``
+    (student_id, course_id) arrays and ``enrollments`` the popularity of each
+    course, aligned with ``course_ids``. Ids outside ``course_ids`` are ignored.
+    """
+    k = settings.recommendations_neighbours if k is None else k
+    tag_weight = settings.recommendations_tag_weight if tag_weight is None else tag_weight
+    n_courses = len(course_ids)
+    tagged_rows, found = course_rows(course_ids, tag_pairs[0])
+    factors = tag_factors(n_courses, tagged_rows, tag_pairs[1][found])
+    enrolled_rows, found = course_rows(course_ids, enrollment_pairs[1])
+    co_rows, co_columns, co_values = co_enrollment(n_courses, enrollment_pairs[0][found], enrolled_rows)
+    neighbours, scores = top_neighbours(factors, co_rows, co_columns, co_values, k, tag_weight)
+    popular = np.lexsort((np.arange(n_courses), -enrollments)).astype(neighbours.dtype)
+    return SimilarityIndex(course_ids, neighbours, scores, popular, datetime.utcnow())
+
+
+def load_index_inputs(db: Session):
+    """Arguments of ``build_index`` for the published courses."""
+    course_ids = np.array(
+        db.execute(select(Course.id).where(Course.is_published.is_(True)).order_by(Course.id)).scalars().all(),
+        dtype=np.int64,
+    )
+    tag_pairs = _int_pairs(db, select(CourseTag.course_id, CourseTag.tag_id))
+    enrollment_pairs = _int_pairs(db, select(Enrollment.student_id, Enrollment.course_id))
+    stat_courses, stat_enrollments = _int_pairs(db, select(CourseStat.course_id, CourseStat.enrollments))
+    enrollments = np.zeros(len(course_ids), dtype=np.int64)
+    rows, found = course_rows(course_ids, stat_courses)
+    enrollments[rows] = stat_enrollments[found]
+    return course_ids, tag_pairs, enrollment_pairs, enrollments
+
+
+def refresh_recommendations(db: Session) -> CourseSimilaritySnapshot:
+    """Rebuild the index and replace the stored snapshot; the caller commits."""
+    index = build_index(*load_index_inputs(db))
+    snapshot = CourseSimilaritySnapshot(
+        built_at=index.built_at, course_count=len(index.course_ids), payload=index.to_bytes()
+    )
+    db.execute(delete(CourseSimilaritySnapshot))
+    db.add(snapshot)
+    db.flush()
+    return snapshot
+
+
+def refresh_recommendations_job() -> None:
+    db = SessionLocal()
+    try:
+        if not try_exclusive(db, "course-recommendations"):
+            return
+        # every worker runs the task; the first one of each interval does the work
+        latest = db.execute(select(func.max(CourseSimilaritySnapshot.built_at))).scalar()
+        fresh_for = timedelta(seconds=settings.recommendations_refresh_interval_seconds / 2)
+        if latest is not None and datetime.utcnow() - latest < fresh_for:
+            return
+        refresh_recommendations(db)
+        db.commit()
+    finally:
+        db.close()
+    cache.invalidate(tags=[RECOMMENDATIONS_TAG])
+
+
+def load_index(db: Session) -> Optional[SimilarityIndex]:
+    snapshot = db.query(CourseSimilaritySnapshot).order_by(CourseSimilaritySnapshot.id.desc()).first()
+    return SimilarityIndex.from_bytes(snapshot.payload, snapshot.built_at) if snapshot else None
+
+
+def current_index(db: Session) -> Optional[SimilarityIndex]:
+    return cache.get_or_load(
+        INDEX_KEY,
+        lambda: load_index(db),
+        ttl=settings.recommendations_refresh_interval_seconds,
+        tags=[RECOMMENDATIONS_TAG],
+    )
+
+
+@dataclass
+class CatalogRanking:
+    """The published catalog by id and by enrollments, most popular first."""
+
+    by_id: Dict[int, CourseRead]
+    popular: List[CourseRead]
+
+    @classmethod
+    def build(cls, catalog: Sequence[CourseRead]) -> "CatalogRanking":
+        popular = sorted(catalog, key=lambda course: (-course.enrollments_count, course.id))
+        return cls(by_id={course.id: course for course in catalog}, popular=popular)
+
+
+def rank_courses(
+    index: Optional[SimilarityIndex], catalog: CatalogRanking, enrolled_ids: Iterable[int], limit: int
+) -> List[RecommendedCourse]:
+    """The best ``limit`` catalog courses the student is not enrolled in."""
+    enrolled = set(enrolled_ids)
+    # courses unpublished since the snapshot are dropped, hence the slack
+    picks = index.recommend(enrolled, 2 * limit) if index is not None else []
+    ranked = [(catalog.by_id[course_id], score) for course_id, score in picks if course_id in catalog.by_id]
+    if len(ranked) < limit:
+        # no snapshot yet, or courses published after it
+        seen = enrolled | {course.id for course, _ in ranked}
+        for course in catalog.popular:
+            if len(ranked) == limit:
+                break
+            if course.id not in seen:
+                ranked.append((course, 0.0))
+    return [RecommendedCourse(**course.dict(), score=round(score, 4)) for course, score in ranked[:limit]]
@@ -0,0 +1,248 @@
+"""Ranked full-text search over courses, lessons and course chat.
+
+A user sees published courses plus everything (lessons, chat) of the courses
+they are enrolled in or own. Matching and ranking run over all kinds in one
+UNION ALL; highlights are computed afterwards for the returned page only,
+because ``ts_headline`` re-parses the whole document.
+"""
+
+import html
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, literal, literal_column, or_, select, union_all
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import column, table
+
+from app.db.search_index import KINDS, SEARCH_TABLE
+from app.models.chat import ChatMessage
+from app.models.course import Course, Enrollment, Lesson, Module
+from app.schemas.search import SearchHit, SearchKind, SearchResponse
+
+START, STOP = "\x02", "\x03"
+HEADLINE_OPTIONS = f"StartSel={START}, StopSel={STOP}, MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter= … "
+SNIPPET_TOKENS = 24
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def render_highlight(raw: Optional[str]) -> str:
+    """Escape indexed text for HTML and turn the match markers into <mark> tags."""
+    escaped = html.escape(raw or "", quote=False)
+    return escaped.replace(START, "<mark>").replace(STOP, "</mark>")
+
+
+def accessible_course_ids(user_id: int):
+    return union_all(
+        select(Enrollment.course_id).where(Enrollment.student_id == user_id),
+        select(Course.id).where(Course.owner_id == user_id),
+    )
+
+
+def fts5_query(q: str) -> str:
+    """All words of the query as quoted prefix terms, so user input cannot inject FTS5 syntax."""
+    return " ".join(f'"{word}"*' for word in _WORD_RE.findall(q))
+
+
+class PostgresBackend:
+    def __init__(self, q: str) -> None:
+        self.query = func.websearch_to_tsquery("russian", q).op("||")(func.websearch_to_tsquery("english", q))
+
+    def _vector(self, table_name: str):
+        return literal_column(f"{table_name}.search_vector")
+
+    def _match(self, table_name: str):
+        return self._vector(table_name).op("@@")(self.query)
+
+    def _rank(self, table_name: str):
+        return func.ts_rank_cd(self._vector(table_name), self.query)
+
+    def hits(self, user_id: int, kinds: Sequence[SearchKind]):
+        accessible = accessible_course_ids(user_id)
+        parts = []
+        if SearchKind.course in kinds:
+            parts.append(
+                select(
+                    literal("course").label("kind"),
+                    Course.id.label("ref_id"),
+                    Course.id.label("course_id"),
+                    Course.title.label("title"),
+                    self._rank("courses").label("rank"),
+                ).where(self._match("courses"), or_(Course.is_published.is_(True), Course.id.in_(accessible)))
+            )
+        if SearchKind.lesson in kinds:
+            parts.append(
+                select(
+                    literal("lesson").label("kind"),
+                    Lesson.id.label("ref_id"),
+                    Module.course_id.label("course_id"),
+                    Lesson.title.label("title"),
+                    self._rank("lessons").label("rank"),
+                )
+                .join(Module, Lesson.module_id == Module.id)
+                .where(self._match("lessons"), Module.course_id.in_(accessible))
+            )
+        if SearchKind.message in kinds:
+            parts.append(
+                select(
+                    literal("message").label("kind"),
+                    ChatMessage.id.label("ref_id"),
+                    ChatMessage.course_id.label("course_id"),
+                    Course.title.label("title"),
+                    self._rank("chat_messages").label("rank"),
+                )
+                .join(Course, ChatMessage.course_id == Course.id)
+                .where(self._match("chat_messages"), ChatMessage.course_id.in_(accessible))
+            )
+        return parts
+
+    def _headline(self, document):
+        return func.ts_headline("russian", document, self.query, HEADLINE_OPTIONS)
+
+    def highlights(self, db: Session, page: Dict[str, List[int]]) -> Dict[Tuple[str, int], Tuple[str, str]]:
+        """(kind, id) -> (raw title highlight, raw snippet) for the page rows."""
+        found: Dict[Tuple[str, int], Tuple[str, str]] = {}
+        if page.get("course"):
+            body = func.coalesce(Course.short_description, "") + " " + func.coalesce(Course.long_description, "")
+            for row in db.execute(
+                select(Course.id, self._headline(Course.title), self._headline(body)).where(Course.id.in_(page["course"]))
+            ):
+                found[("course", row[0])] = (row[1], row[2])
+        if page.get("lesson"):
+            stripped = func.regexp_replace(func.coalesce(Lesson.content_html, ""), "<[^>]*>", " ", "g")
+            body = func.coalesce(Lesson.short_description, "") + " " + stripped
+            for row in db.execute(
+                select(Lesson.id, self._headline(Lesson.title), self._headline(body)).where(Lesson.id.in_(page["lesson"]))
+            ):
+                found[("lesson", row[0])] = (row[1], row[2])
+        if page.get("message"):
+            for row in db.execute(
+                select(ChatMessage.id, self._headline(ChatMessage.text)).where(ChatMessage.id.in_(page["message"]))
+            ):
+                found[("message", row[0])] = ("", row[1])
+        return found
+
+
+class SqliteBackend:
+    """FTS5 fallback used by tests and local SQLite databases."""
+
+    def __init__(self, q: str) -> None:
+        self.query = fts5_query(q)
+        self.fts = table(SEARCH_TABLE, column("rowid"), column("kind"), column("ref_id"))
+        self.document = literal_column(SEARCH_TABLE)
+
+    def _match(self, kind: str):
+        return self.document.op("MATCH")(self.query), self.fts.c.kind == kind
+
+    def _rank(self):
+        # bm25 is "lower is better"; weights follow the column order: kind, ref_id, title, body
+        return (-func.bm25(self.document, 0.0, 0.0, 10.0, 1.0)).label("rank")
+
+    def hits(self, user_id: int, kinds: Sequence[SearchKind]):
+        if not self.query:
+            return []
+        accessible = accessible_course_ids(user_id)
+        parts = []
+        if SearchKind.course in kinds:
+            parts.append(
+                select(
+                    literal("course").label("kind"),
+                    Course.id.label("ref_id"),
+                    Course.id.label("course_id"),
+                    Course.title.label("title"),
+                    self._rank(),
+                )
+                .select_from(self.fts)
+                .join(Course, Course.id == self.fts.c.ref_id)
+                .where(*self._match("course"), or_(Course.is_published.is_(True), Course.id.in_(accessible)))
+            )
+        if SearchKind.lesson in kinds:
+            parts.append(
+                select(
+                    literal("lesson").label("kind"),
+                    Lesson.id.label("ref_id"),
+                    Module.course_id.label("course_id"),
+                    Lesson.title.label("title"),
+                    self._rank(),
+                )
+                .select_from(self.fts)
+                .join(Lesson, Lesson.id == self.fts.c.ref_id)
+                .join(Module, Lesson.module_id == Module.id)
+                .where(*self._match("lesson"), Module.course_id.in_(accessible))
+            )
+        if SearchKind.message in kinds:
+            parts.append(
+                select(
+                    literal("message").label("kind"),
+                    ChatMessage.id.label("ref_id"),
+                    ChatMessage.course_id.label("course_id"),
+                    Course.title.label("title"),
+                    self._rank(),
+                )
+                .select_from(self.fts)
+                .join(ChatMessage, ChatMessage.id == self.fts.c.ref_id)
+                .join(Course, ChatMessage.course_id == Course.id)
+                .where(*self._match("message"), ChatMessage.course_id.in_(accessible))
+            )
+        return parts
+
+    def highlights(self, db: Session, page: Dict[str, List[int]]) -> Dict[Tuple[str, int], Tuple[str, str]]:
+        rowids = [ref_id * len(KINDS) + KINDS[kind] for kind, ids in page.items() for ref_id in ids]
+        if not rowids:
+            return {}
+        rows = db.execute(
+            select(
+                self.fts.c.kind,
+                self.fts.c.ref_id,
+                func.highlight(self.document, 2, START, STOP),
+                func.snippet(self.document, 3, START, STOP, " … ", SNIPPET_TOKENS),
+            ).where(self.document.op("MATCH")(self.query), self.fts.c.rowid.in_(rowids))
+        )
+        return {(kind, int(ref_id)): (title, snippet) for kind, ref_id, title, snippet in rows}
+
+
+def search(
+    db: Session,
+    user_id: int,
+    q: str,
+    kinds: Optional[Sequence[SearchKind]] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> SearchResponse:
+    kinds = list(kinds or SearchKind)
+    backend = PostgresBackend(q) if db.get_bind().dialect.name == "postgresql" else SqliteBackend(q)
+    parts = backend.hits(user_id, kinds)
+    if not parts:
+        return SearchResponse(items=[], total=0, limit=limit, offset=offset)
+    hits = (parts[0] if len(parts) == 1 else union_all(*parts)).subquery("hits")
+    rows = db.execute(
+        select(hits, func.count().over().label("total"))
+        # ids break rank ties so pages are stable
+        .order_by(hits.c.rank.desc(), hits.c.kind, hits.c.ref_id)
+        .limit(limit)
+        .offset(offset)
+    ).all()
+    if not rows:
+        # past the last page the window total is not available; count separately
+        total = db.execute(select(func.count()).select_from(hits)).scalar_one() if offset else 0
+        return SearchResponse(items=[], total=total, limit=limit, offset=offset)
+
+    page: Dict[str, List[int]] = {}
+    for row in rows:
+        page.setdefault(row.kind, []).append(row.ref_id)
+    highlights = backend.highlights(db, page)
+    items = []
+    for row in rows:
+        title_raw, snippet_raw = highlights.get((row.kind, row.ref_id), ("", ""))
+        items.append(
+            SearchHit(
+                kind=row.kind,
+                id=row.ref_id,
+                course_id=row.course_id,
+                title=row.title,
+                title_highlight=render_highlight(title_raw) if title_raw else html.escape(row.title, quote=False),
+                snippet=render_highlight(snippet_raw),
+                rank=float(row.rank),
+            )
+        )
+    return SearchResponse(items=items, total=rows[0].total, limit=limit, offset=offset)
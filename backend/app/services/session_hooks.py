@@ -0,0 +1,15 @@
+"""Session hooks that keep derived rows and caches in step with ORM writes.
+
+Importing this module registers them on every ``Session``. Entry points that
+write through the ORM (the API app, the job worker, ``init_db`` and the
+tests) import it once at startup; migrations must not depend on it.
+"""
+
+# keeps the denormalized course_id of assignments and submissions in step with their lessons
+from app.services import course_scope  # noqa: F401
+# keeps course_tags in step with Course.tags
+from app.services import course_tags  # noqa: F401
+# drops the cached catalog when a course is created, edited or published
+from app.services import course_cache  # noqa: F401
+# keeps lesson renditions in step with content_html
+from app.services import lesson_content  # noqa: F401
@@ -0,0 +1,85 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.admission import AdmissionController, AdmissionMiddleware, TokenBucketTable, route_cost
+from app.core.config import settings
+from app.core.security import create_access_token
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket_refills_and_evicts_idle_principals():
+    clock = FakeClock()
+    table = TokenBucketTable(rate=2.0, burst=4.0, max_keys=2, clock=clock)
+    assert [table.take("a", 1) for _ in range(4)] == [0, 0, 0, 0]
+    assert table.take("a", 1) == 0.5
+    clock.now = 1.0
+    assert table.take("a", 2) == 0 and table.take("a", 1) == 0.5
+    table.take("b", 1)
+    table.take("c", 1)
+    assert len(table) == 2
+    # "a" was evicted and starts over with a full bucket
+    assert table.take("a", 4) == 0
+
+
+def test_route_costs():
+    assert route_cost("POST", "/api/v1/auth/login-json") == 10
+    assert route_cost("POST", "/api/v1/courses/12/chat/messages") == 3
+    assert route_cost("GET", "/api/v1/courses/12/chat/messages") == 1
+
+
+def test_middleware_limits_per_principal_and_sheds_load(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_ip_burst", 33.0)
+    monkeypatch.setattr(settings, "rate_limit_user_burst", 2.0)
+    clock = FakeClock()
+    controller = AdmissionController(clock)
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    pool = {"waiting": 0, "wait_seconds_ewma": 0.0, "current_wait_seconds": 0.0}
+    controller.pool_stats = lambda: pool
+
+    @app.get("/api/v1/ping")
+    def ping():
+        return {"in_flight": controller.in_flight}
+
+    @app.post("/api/v1/auth/login-json")
+    def login():
+        return {}
+
+    @app.get("/health")
+    def health():
+        return {}
+
+    client = TestClient(app)
+    alice = {"Authorization": f"Bearer {create_access_token('1')}"}
+    bob = {"Authorization": f"Bearer {create_access_token('2')}"}
+    assert client.get("/api/v1/ping", headers=alice).json() == {"in_flight": 1}
+    assert client.get("/api/v1/ping", headers=alice).status_code == 200
+    limited = client.get("/api/v1/ping", headers=alice)
+    assert limited.status_code == 429 and limited.json()["limit"] == "user"
+    assert limited.headers["Retry-After"] == "1"
+    # another user behind the same address is unaffected
+    assert client.get("/api/v1/ping", headers=bob).status_code == 200
+
+    # three logins at cost 10 drain what is left of the address for everybody on it
+    assert [client.post("/api/v1/auth/login-json").status_code for _ in range(4)] == [200, 200, 200, 429]
+    assert client.get("/api/v1/ping", headers=bob).status_code == 429
+    assert client.get("/health").status_code == 200
+    clock.now = 60.0
+
+    pool.update(waiting=3, current_wait_seconds=settings.shed_pool_wait_seconds * 2)
+    shed = client.get("/api/v1/ping", headers=bob)
+    assert shed.status_code == 503 and shed.headers["Retry-After"] == "1"
+    pool.update(waiting=0)
+    assert client.get("/api/v1/ping", headers=bob).status_code == 200
+
+    stats = controller.stats()
+    assert stats["limited"] == {"ip": 2, "user": 1}
+    assert stats["shed"] == {"in_flight": 0, "pool_wait": 1}
+    assert stats["in_flight"] == 0 and stats["peak_in_flight"] == 1
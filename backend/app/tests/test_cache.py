@@ -0,0 +1,127 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from app.core.cache import CATALOG_TAG, MISSING, Cache, InMemoryBus, LocalCache, PostgresBus, cache, course_tag
+from app.models import Course, User, UserRole
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_local_cache_lru_ttl_and_counters():
+    clock = FakeClock()
+    local = LocalCache(max_entries=2, default_ttl=10, clock=clock)
+    local.set("a", 1)
+    local.set("b", 2)
+    assert local.get("a") == 1  # "a" becomes most recently used
+    local.set("c", 3)  # evicts "b"
+    assert local.get("b") is MISSING
+    clock.now = 11
+    assert local.get("a") is MISSING
+    assert local.stats() == {
+        "hits": 1,
+        "misses": 2,
+        "evictions": 1,
+        "expirations": 1,
+        "invalidations": 0,
+        "size": 1,
+    }
+
+
+def test_tag_invalidation_reaches_other_workers():
+    bus = InMemoryBus()
+    worker_a = Cache(LocalCache(), bus)
+    worker_b = Cache(LocalCache(), bus)
+    for worker in (worker_a, worker_b):
+        worker.set("course:1:structure", "tree", tags=["course:1"])
+        worker.set("course:2:structure", "tree", tags=["course:2"])
+
+    worker_a.invalidate(tags=["course:1"])
+
+    for worker in (worker_a, worker_b):
+        assert worker.get("course:1:structure") is MISSING
+        assert worker.get("course:2:structure") == "tree"
+
+
+def test_get_or_load_does_not_store_value_raced_by_invalidation():
+    worker = Cache(LocalCache(), InMemoryBus())
+
+    def loader():
+        worker.invalidate(tags=["test:1"])  # a write lands while we are loading
+        return "stale"
+
+    assert worker.get_or_load("test:1:read", loader, tags=["test:1"]) == "stale"
+    assert worker.get("test:1:read") is MISSING
+    assert worker.get_or_load("test:1:read", lambda: "fresh", tags=["test:1"]) == "fresh"
+    assert worker.get("test:1:read") == "fresh"
+
+
+def test_course_writes_drop_the_cached_catalog(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    db.add(course)
+    db.commit()
+    cache.set("catalog:published", [], tags=[CATALOG_TAG])
+    cache.set(f"course:{course.id}:structure", "tree", tags=[course_tag(course.id)])
+
+    db.refresh(course)  # a flush without changes keeps the entries
+    db.commit()
+    assert cache.get("catalog:published") == []
+
+    course.is_published = True
+    db.flush()
+    db.rollback()
+    assert cache.get("catalog:published") == []
+
+    course.is_published = True
+    db.commit()
+    assert cache.get("catalog:published") is MISSING
+    assert cache.get(f"course:{course.id}:structure") is MISSING
+
+
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+
+def _postgres_worker(url, ready, results):
+    from sqlalchemy import create_engine
+
+    bus = PostgresBus(create_engine(url), poll_interval=0.1)
+    worker = Cache(LocalCache(), bus)
+    bus.start()
+    time.sleep(0.5)  # let LISTEN settle
+    worker.set("course:7:structure", "tree", tags=["course:7"])
+    ready.put(os.getpid())
+    deadline = time.monotonic() + 10
+    while worker.get("course:7:structure") is not MISSING and time.monotonic() < deadline:
+        time.sleep(0.05)
+    results.put(worker.get("course:7:structure") is MISSING)
+    bus.stop()
+
+
+@pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+def test_invalidation_is_consistent_across_processes():
+    from sqlalchemy import create_engine
+
+    ctx = multiprocessing.get_context("spawn")
+    ready, results = ctx.Queue(), ctx.Queue()
+    workers = [ctx.Process(target=_postgres_worker, args=(POSTGRES_URL, ready, results)) for _ in range(3)]
+    for process in workers:
+        process.start()
+    for _ in workers:
+        ready.get(timeout=30)
+
+    writer = Cache(LocalCache(), PostgresBus(create_engine(POSTGRES_URL)))
+    writer.invalidate(tags=["course:7"])
+
+    outcomes = [results.get(timeout=30) for _ in workers]
+    for process in workers:
+        process.join(timeout=10)
+    assert outcomes == [True, True, True]
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_student
+from app.api.v1 import courses
+from app.core.cache import CATALOG_TAG, cache
+from app.db.session import get_db
+from app.models import Course, CourseTag, Enrollment, Tag, User, UserRole
+from app.schemas.course import CatalogSort, TagMatch
+from app.services.catalog import catalog_page
+from app.services.course_counters import rebuild_course_counters
+from app.services.course_tags import parse_tags
+
+
+def titles(page):
+    return [course.title for course in page.items]
+
+
+def test_tags_are_normalized_and_follow_the_tags_string(db):
+    assert parse_tags(" Python,SQL ,, python,") == ["python", "sql"]
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher, tags="A,b")
+    db.add(course)
+    db.commit()
+    course.tags = "b, C"
+    db.commit()
+    linked = db.query(Tag.name).join(CourseTag, CourseTag.tag_id == Tag.id).filter(CourseTag.course_id == course.id)
+    assert sorted(name for (name,) in linked) == ["b", "c"]
+    assert db.query(Tag).count() == 3
+
+
+def test_catalog_filters_sorts_and_pages_by_keyset(db):
+    now = datetime.utcnow()
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    specs = [
+        ("Python 101", "beginner", "python,basics", 3),
+        ("Python for data", "intermediate", "python,data", 1),
+        ("SQL 100%", "beginner", "sql,data", 2),
+        ("Pythonic design", "advanced", "python,design", 0),
+        ("Draft python", "beginner", "python", 5),
+    ]
+    students = [User(email=f"s{i}@x.io", full_name="S", role=UserRole.student, hashed_password="x") for i in range(5)]
+    for index, (title, level, tags, enrolled) in enumerate(specs):
+        course = Course(
+            title=title,
+            short_description="s",
+            long_description="l",
+            level=level,
+            tags=tags,
+            owner=teacher,
+            is_published=not title.startswith("Draft"),
+            created_at=now - timedelta(days=index),
+        )
+        db.add_all([course, *(Enrollment(course=course, student=student) for student in students[:enrolled])])
+    db.commit()
+    # enrollments written without events; popularity reads the compacted counters
+    rebuild_course_counters(db)
+    db.commit()
+
+    assert titles(catalog_page(db)) == ["Python 101", "SQL 100%", "Python for data", "Pythonic design"]
+    assert titles(catalog_page(db, sort=CatalogSort.recent, levels=["beginner"])) == ["Python 101", "SQL 100%"]
+    assert titles(catalog_page(db, tags=["data,Design"])) == ["SQL 100%", "Python for data", "Pythonic design"]
+    assert titles(catalog_page(db, tags=["python", "data"], tag_match=TagMatch.all)) == ["Python for data"]
+    assert titles(catalog_page(db, tags=["python", "unknown"], tag_match=TagMatch.all)) == []
+    assert titles(catalog_page(db, prefix="PYTHON")) == ["Python 101", "Python for data", "Pythonic design"]
+    assert titles(catalog_page(db, prefix="sql 100%")) == ["SQL 100%"]
+    assert titles(catalog_page(db, prefix="sql 1000")) == []
+
+    for sort in CatalogSort:
+        seen, cursor = [], None
+        while True:
+            page = catalog_page(db, sort=sort, limit=3, cursor=cursor)
+            seen += titles(page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        assert seen == titles(catalog_page(db, sort=sort, limit=100))
+
+    app = FastAPI()
+    app.include_router(courses.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_student] = lambda: students[0]
+    client = TestClient(app)
+    cache.invalidate(tags=[CATALOG_TAG])
+    body = client.get("/api/v1/courses/catalog", params={"tag": "python", "limit": 2}).json()
+    assert [item["title"] for item in body["items"]] == ["Python 101", "Python for data"]
+    response = client.get("/api/v1/courses/catalog", params={"sort": "recent", "cursor": body["next_cursor"]})
+    assert response.status_code == 400
+    assert client.get("/api/v1/courses/catalog", params={"cursor": "garbage"}).status_code == 400
@@ -0,0 +1,66 @@
+from datetime import date, datetime, timedelta
+
+from app.models import Assignment, Course, CourseCounterShard, CourseStat, Enrollment, Lesson, Module, User, UserRole
+from app.schemas.course import CourseRead
+from app.services import course_counters, event_handlers  # noqa: F401
+from app.services.course_counters import compact_course_counters, rebuild_course_counters, record_activity
+from app.services.events import ENROLLMENT_CREATED, SUBMISSION_CREATED, dispatcher, publish
+
+
+def stats_of(db, course):
+    db.expire_all()
+    row = db.get(CourseStat, course.id)
+    return (row.enrollments, row.active_students_7d, row.submissions_7d)
+
+
+def test_shards_compact_into_stats_and_match_a_rebuild(db, monkeypatch):
+    today = date(2024, 5, 20)
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    students = [User(email=f"s{i}@x.io", full_name="S", role=UserRole.student, hashed_password="x") for i in range(4)]
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    db.add_all([course, *students])
+    db.commit()
+    ids = [student.id for student in students]
+
+    shard = iter(range(100))
+    monkeypatch.setattr(course_counters.random, "randrange", lambda n: next(shard) % n)
+    record_activity(db, [(course.id, ids[0], today - timedelta(days=9))], [])
+    record_activity(db, [(course.id, student_id, today) for student_id in ids[1:]], [(course.id, ids[1], today)])
+    record_activity(db, [], [(course.id, ids[1], today), (course.id, ids[2], today - timedelta(days=2))])
+    assert db.query(CourseCounterShard).count() == 4
+
+    assert compact_course_counters(db, today) == {course.id}
+    assert stats_of(db, course) == (4, 3, 3)
+    # only one merged row per day in the window survives
+    assert sorted((row.day, row.shard, row.submissions) for row in db.query(CourseCounterShard)) == [
+        (today - timedelta(days=2), 0, 1),
+        (today, 0, 2),
+    ]
+    assert compact_course_counters(db, today) == set()
+
+    # a week later the window is empty but the enrollments stay
+    assert compact_course_counters(db, today + timedelta(days=7)) == {course.id}
+    assert stats_of(db, course) == (4, 0, 0)
+    assert db.query(CourseCounterShard).count() == 0
+    assert CourseRead.from_orm(db.get(Course, course.id)).enrollments_count == 4
+
+
+def test_events_feed_the_counters(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    student = User(email="s@x.io", full_name="S", role=UserRole.student, hashed_password="x")
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    lesson = Lesson(module=Module(course=course, title="M"), title="L", short_description="s", content_html="")
+    assignment = Assignment(lesson=lesson, title="A", description="d", max_score=10)
+    db.add_all([student, assignment, Enrollment(course=course, student=student)])
+    db.commit()
+
+    publish(db, ENROLLMENT_CREATED, {"student_id": student.id, "course_id": course.id})
+    publish(db, SUBMISSION_CREATED, {"submission_id": 1, "assignment_id": assignment.id, "student_id": student.id})
+    db.commit()
+    dispatcher.dispatch_pending(db)
+    compact_course_counters(db)
+    db.commit()
+    assert stats_of(db, course) == (1, 1, 1)
+
+    rebuild_course_counters(db, datetime.utcnow().date())
+    assert stats_of(db, course) == (1, 1, 0)  # the submission row itself was never written
@@ -0,0 +1,45 @@
+from datetime import datetime
+
+from app.models import Assignment, Course, Lesson, Module, Submission, SubmissionStatus, User, UserRole
+
+
+def test_course_id_is_filled_on_insert_and_follows_moves(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    student = User(email="s@x.io", full_name="S", role=UserRole.student, hashed_password="x")
+    first, second = (
+        Course(title=title, short_description="s", long_description="l", level="beginner", owner=teacher)
+        for title in ("first", "second")
+    )
+    module = Module(course=first, title="M", order_index=1)
+    target = Module(course=second, title="M2", order_index=1)
+    lesson = Lesson(module=module, title="L", short_description="s", content_html="", order_index=1)
+    assignment = Assignment(lesson=lesson, title="A", description="d", max_score=10)
+    db.add_all([student, target, assignment])
+    db.flush()
+    # built from bare foreign keys, the way the routers do
+    submission = Submission(
+        assignment_id=assignment.id,
+        student_id=student.id,
+        status=SubmissionStatus.submitted,
+        submitted_at=datetime.utcnow(),
+    )
+    db.add(submission)
+    db.commit()
+    assert (assignment.course_id, submission.course_id) == (first.id, first.id)
+
+    module.course = second
+    db.commit()
+    assert (assignment.course_id, submission.course_id) == (second.id, second.id)
+
+    lesson.module_id = db.query(Module.id).filter(Module.title == "M2").scalar()
+    module.course_id = first.id
+    db.commit()
+    assert (assignment.course_id, submission.course_id) == (second.id, second.id)
+
+    other_lesson = Lesson(module=module, title="L2", short_description="s", content_html="", order_index=2)
+    db.add(other_lesson)
+    db.flush()
+    assert assignment.lesson is lesson
+    assignment.lesson_id = other_lesson.id
+    db.commit()
+    assert (assignment.course_id, submission.course_id) == (first.id, first.id)
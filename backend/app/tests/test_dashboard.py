@@ -0,0 +1,82 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from app.api.v1 import dashboard
+from app.api.v1.dashboard import SECTIONS, gather_sections, parse_sections
+
+
+def test_parse_sections_defaults_and_validation():
+    assert parse_sections(None) == SECTIONS
+    assert parse_sections("feed, grades,feed") == ("feed", "grades")
+    with pytest.raises(HTTPException):
+        parse_sections("feed,unknown")
+
+
+def test_gather_sections_runs_concurrently_and_degrades():
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+    released = threading.Event()
+
+    def track(func):
+        def wrapper():
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+            try:
+                return func()
+            finally:
+                with lock:
+                    running["now"] -= 1
+
+        return wrapper
+
+    # both fast sections must be inside at the same time for the barrier to open
+    barrier = threading.Barrier(2, timeout=5)
+
+    def fast():
+        barrier.wait()
+        return "fast"
+
+    def slow():
+        released.wait(5)
+        return "slow"
+
+    def broken():
+        raise RuntimeError("boom")
+
+    try:
+        results, degraded = asyncio.run(
+            gather_sections({"a": track(fast), "b": track(fast), "c": track(slow), "d": broken}, timeout=0.5)
+        )
+    finally:
+        released.set()
+
+    assert results == {"a": "fast", "b": "fast"}
+    assert degraded == {"c": "timeout", "d": "error"}
+    assert running["max"] >= 2
+
+
+def test_run_in_session_bounds_concurrent_sessions(monkeypatch):
+    monkeypatch.setattr(dashboard, "section_slots", threading.BoundedSemaphore(2))
+    monkeypatch.setattr(dashboard, "SessionLocal", Session)
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def loader(db):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.05)
+        with lock:
+            running["now"] -= 1
+        return "ok"
+
+    with ThreadPoolExecutor(6) as pool:
+        assert list(pool.map(lambda _: dashboard.run_in_session(loader), range(6))) == ["ok"] * 6
+    assert running["max"] <= 2
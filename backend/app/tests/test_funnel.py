@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from app.models import (
+    Assignment,
+    Course,
+    CourseFunnelStat,
+    Enrollment,
+    Lesson,
+    Module,
+    Submission,
+    SubmissionStatus,
+    User,
+    UserRole,
+)
+from app.services.funnel import (
+    mark_assignments_stale,
+    read_course_funnel,
+    rebuild_funnels,
+    refresh_course_funnel,
+    refresh_stale_funnels,
+)
+
+
+def test_funnel_is_served_from_aggregates_and_refreshed_from_stale_flags(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    students = [User(email=f"s{i}@x.io", full_name="S", role=UserRole.student, hashed_password="x") for i in range(4)]
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    second = Module(course=course, title="M2", order_index=2)
+    first = Module(course=course, title="M1", order_index=1)
+    lessons = [
+        Lesson(module=first, title="Intro", short_description="s", content_html="x", order_index=1),
+        Lesson(module=second, title="Final", short_description="s", content_html="x", order_index=1),
+    ]
+    assignments = [Assignment(lesson=lesson, title="A", description="d", max_score=10) for lesson in lessons]
+    db.add_all(students + assignments + [Enrollment(course=course, student=s) for s in students])
+    db.flush()
+
+    def submit(assignment, student, status, score=None, attempt=1):
+        db.add(
+            Submission(
+                assignment=assignment,
+                student=student,
+                attempt_number=attempt,
+                status=status,
+                score=score,
+                submitted_at=datetime.utcnow(),
+            )
+        )
+
+    submit(assignments[0], students[0], SubmissionStatus.checked, 8)
+    submit(assignments[0], students[0], SubmissionStatus.checked, 10, attempt=2)
+    submit(assignments[0], students[1], SubmissionStatus.submitted)
+    submit(assignments[0], students[2], SubmissionStatus.draft)
+    submit(assignments[1], students[0], SubmissionStatus.checked, 4)
+    db.commit()
+
+    assert read_course_funnel(db, course.id) is None
+    refresh_course_funnel(db, course.id)
+    db.commit()
+    funnel = read_course_funnel(db, course.id)
+    assert funnel.enrolled_count == 4 and not funnel.stale
+    assert [(l.lesson_title, l.submitted_count, l.completed_count, l.avg_score) for l in funnel.lessons] == [
+        ("Intro", 2, 1, 10.0),
+        ("Final", 1, 1, 4.0),
+    ]
+    assert funnel.lessons[0].submission_rate == 0.5
+
+    submit(assignments[1], students[3], SubmissionStatus.submitted)
+    mark_assignments_stale(db, [assignments[1].id])
+    db.commit()
+    funnel = read_course_funnel(db, course.id)
+    assert funnel.stale and funnel.lessons[1].submitted_count == 1
+
+    assert refresh_stale_funnels(db) == 1
+    funnel = read_course_funnel(db, course.id)
+    assert not funnel.stale and funnel.lessons[1].submitted_count == 2
+    assert refresh_stale_funnels(db) == 0
+
+    # refreshing flagged lessons is not a full rebuild
+    header = db.query(CourseFunnelStat).filter(CourseFunnelStat.course_id == course.id).one()
+    assert header.rebuilt_at is None
+    assert rebuild_funnels(db) == 1
+    assert header.rebuilt_at == header.refreshed_at
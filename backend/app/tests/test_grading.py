@@ -0,0 +1,85 @@
+from datetime import datetime
+
+from app.api.v1.grading import apply_grades
+from app.models import Assignment, Course, Lesson, Module, ProgressSnapshot, Submission, SubmissionStatus, User, UserRole
+from app.schemas.grading import GradeUpdate
+from app.services import event_handlers  # noqa: F401
+from app.services.events import dispatcher
+
+
+def make_course(db, owner):
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=owner, is_published=True)
+    module = Module(course=course, title="M", order_index=1)
+    lesson = Lesson(module=module, title="L", short_description="s", content_html="<p>x</p>", order_index=1)
+    assignment = Assignment(lesson=lesson, title="A", description="d", max_score=10)
+    db.add_all([course, module, lesson, assignment])
+    db.flush()
+    return course, assignment
+
+
+def submit(db, assignment, student, attempt):
+    submission = Submission(
+        assignment=assignment,
+        student=student,
+        attempt_number=attempt,
+        status=SubmissionStatus.submitted,
+        submitted_at=datetime.utcnow(),
+    )
+    db.add(submission)
+    db.flush()
+    return submission
+
+
+def test_bulk_grading_applies_valid_grades_and_rejects_the_rest(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    other_teacher = User(email="o@x.io", full_name="O", role=UserRole.teacher, hashed_password="x")
+    student = User(email="s@x.io", full_name="S", role=UserRole.student, hashed_password="x")
+    db.add_all([teacher, other_teacher, student])
+    db.flush()
+    course, assignment = make_course(db, teacher)
+    _, foreign_assignment = make_course(db, other_teacher)
+    superseded = submit(db, assignment, student, 1)
+    latest = submit(db, assignment, student, 2)
+    foreign = submit(db, foreign_assignment, student, 1)
+    db.commit()
+
+    result = apply_grades(
+        db,
+        teacher.id,
+        [
+            GradeUpdate(submission_id=superseded.id, attempt_number=1, score=5),
+            GradeUpdate(submission_id=latest.id, attempt_number=2, score=8, teacher_comment="ok"),
+            GradeUpdate(submission_id=latest.id, attempt_number=2, score=9),
+            GradeUpdate(submission_id=foreign.id, attempt_number=1, score=5),
+            GradeUpdate(submission_id=999, attempt_number=1, score=5),
+        ],
+    )
+
+    assert result.updated == [latest.id]
+    assert {(r.submission_id, r.reason) for r in result.rejected} == {
+        (superseded.id, "stale"),
+        (latest.id, "duplicate"),
+        (foreign.id, "forbidden"),
+        (999, "not_found"),
+    }
+    db.expire_all()
+    assert (latest.status, latest.score, latest.teacher_comment) == (SubmissionStatus.checked, 8, "ok")
+    assert superseded.score is None
+    dispatcher.dispatch_pending(db)
+    snapshots = db.query(ProgressSnapshot).filter(ProgressSnapshot.student_id == student.id).all()
+    assert [(s.course_id, s.completed_lessons_count) for s in snapshots] == [(course.id, 1)]
+
+
+def test_bulk_grading_rejects_scores_outside_range(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    student = User(email="s@x.io", full_name="S", role=UserRole.student, hashed_password="x")
+    db.add_all([teacher, student])
+    db.flush()
+    _, assignment = make_course(db, teacher)
+    submission = submit(db, assignment, student, 1)
+    db.commit()
+
+    result = apply_grades(db, teacher.id, [GradeUpdate(submission_id=submission.id, attempt_number=1, score=11)])
+
+    assert result.updated == []
+    assert result.rejected[0].reason == "score_out_of_range"
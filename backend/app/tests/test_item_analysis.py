@@ -0,0 +1,91 @@
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app import models
+from app.api.v1.tests import get_item_analysis
+from app.core import cache as cache_module
+from app.core.cache import cache
+from app.models import Course, QuestionType, User, UserRole
+from app.services.attempts import finish_expired_attempts
+
+
+def build_exam(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    student = User(email="s@x.io", full_name="S", role=UserRole.student, hashed_password="x")
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    exam = models.Test(course=course, title="Exam")
+    questions = []
+    for index, kind in enumerate([QuestionType.single, QuestionType.single, QuestionType.multiple, QuestionType.single]):
+        question = models.TestQuestion(test=exam, text=f"Q{index}", type=kind, order_index=index)
+        correct = {0, 2} if kind == QuestionType.multiple else {index % 3}
+        question.options = [models.TestOption(text=str(o), is_correct=o in correct) for o in range(3)]
+        questions.append(question)
+    db.add_all([student, exam])
+    db.commit()
+    return student, exam, questions
+
+
+def add_attempts(db, student, exam, questions, count, rng):
+    for _ in range(count):
+        attempt = models.TestAttempt(test=exam, student=student, finished_at=datetime.utcnow())
+        db.add(attempt)
+        for question in questions:
+            # Occasionally skip a question to exercise attempts without answers.
+            if rng.random() < 0.1:
+                continue
+            for option in rng.sample(question.options, rng.choice([1, 1, 2])):
+                db.add(models.TestAnswer(attempt=attempt, question=question, option=option))
+    db.commit()
+
+
+def reference(db, exam, questions):
+    """Straightforward per-row computation to check the vectorized one against."""
+    attempts = db.query(models.TestAttempt).filter(models.TestAttempt.test_id == exam.id).order_by(models.TestAttempt.id).all()
+    scored = []
+    for attempt in attempts:
+        chosen = {answer.option_id for answer in attempt.answers}
+        row = []
+        for question in questions:
+            picked = {o.id for o in question.options if o.id in chosen}
+            right = {o.id for o in question.options if o.is_correct}
+            row.append(picked == right and (question.type == QuestionType.multiple or len(picked) == 1))
+        scored.append(row)
+    matrix = np.array(scored, dtype=float)
+    difficulty = matrix.mean(axis=0)
+    rest = matrix.sum(axis=1, keepdims=True) - matrix
+    discrimination = [np.corrcoef(matrix[:, i], rest[:, i])[0, 1] for i in range(len(questions))]
+    rates = {
+        option.id: sum(option.id in {a.option_id for a in attempt.answers} for attempt in attempts) / len(attempts)
+        for question in questions
+        for option in question.options
+    }
+    return difficulty, discrimination, rates
+
+
+def test_item_analysis_matches_reference_and_refreshes_on_new_attempts(db):
+    cache.local.clear()
+    rng = random.Random(7)
+    student, exam, questions = build_exam(db)
+    add_attempts(db, student, exam, questions, 60, rng)
+
+    analysis = get_item_analysis(exam.id, current_user=None, db=db)
+    difficulty, discrimination, rates = reference(db, exam, questions)
+    assert analysis.attempts_count == 60
+    assert [q.question_id for q in analysis.questions] == [q.id for q in questions]
+    for question, p, r in zip(analysis.questions, difficulty, discrimination):
+        assert abs(question.difficulty - p) < 1e-4
+        assert abs(question.discrimination - r) < 1e-4
+        for option in question.options:
+            assert abs(option.selection_rate - rates[option.option_id]) < 1e-4
+
+    assert get_item_analysis(exam.id, current_user=None, db=db) is analysis
+    # finishing an attempt drops the cached result, but not the student-facing test
+    cache.set(f"test:{exam.id}:read", "read", tags=[cache_module.test_tag(exam.id)])
+    started = datetime.utcnow() - timedelta(hours=2)
+    db.add(models.TestAttempt(test=exam, student=student, started_at=started, deadline_at=started + timedelta(hours=1)))
+    db.commit()
+    assert finish_expired_attempts(db) == 1
+    assert get_item_analysis(exam.id, current_user=None, db=db).attempts_count == 61
+    assert cache.get(f"test:{exam.id}:read") == "read"
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models import Course, Enrollment, Job, JobStatus, ProgressSnapshot, User, UserRole
+from app.services import job_handlers, jobs  # noqa: F401  (job_handlers registers the real handlers)
+from app.services.jobs import JobRunner, enqueue, retry_delay
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Registers a "test.record" handler for one test; monkeypatch takes it out of the registry again."""
+    recorded = []
+
+    def record(db, ctx, payload):
+        recorded.append(payload["name"])
+        if payload.get("fail_times", 0) >= ctx.attempt:
+            raise RuntimeError("try again")
+        ctx.report(1, 2, "halfway")
+        return {"name": payload["name"], "attempt": ctx.attempt}
+
+    monkeypatch.setitem(jobs._handlers, "test.record", record)
+    return recorded
+
+
+def test_jobs_run_by_priority_with_dedupe_and_retries(engine, db, calls):
+    runner = JobRunner(sessionmaker(bind=engine, autoflush=False), name="w1")
+    low = enqueue(db, "test.record", {"name": "low"})
+    high = enqueue(db, "test.record", {"name": "high"}, priority=10, dedupe_key="k")
+    assert enqueue(db, "test.record", {"name": "again"}, dedupe_key="k").id == high.id
+    flaky = enqueue(db, "test.record", {"name": "flaky", "fail_times": 1})
+    db.commit()
+
+    assert runner.run_until_idle() == 3
+    assert calls == ["high", "low", "flaky"]
+    db.expire_all()
+    assert (high.status, high.progress, high.result) == (JobStatus.succeeded, 1.0, '{"name": "high", "attempt": 1}')
+    assert (flaky.status, flaky.attempts, flaky.last_error) == (JobStatus.queued, 1, "RuntimeError: try again")
+    assert flaky.run_after > datetime.utcnow() + retry_delay(1) - timedelta(seconds=5)
+
+    # a finished job frees its dedupe key
+    assert enqueue(db, "test.record", {"name": "high2"}, dedupe_key="k").id != high.id
+    flaky.run_after = datetime.utcnow()
+    db.commit()
+    runner.run_until_idle()
+    db.expire_all()
+    assert (flaky.status, flaky.attempts) == (JobStatus.succeeded, 2)
+    assert low.status == JobStatus.succeeded
+
+
+def test_expired_lease_is_claimed_again_until_attempts_run_out(engine, db, calls):
+    runner = JobRunner(sessionmaker(bind=engine, autoflush=False))
+    job = enqueue(db, "test.record", {"name": "stuck"}, max_attempts=2)
+    db.commit()
+    now = datetime.utcnow()
+
+    assert runner.claim(db, "dead-worker", now).id == job.id
+    assert runner.claim(db, "other", now) is None, "the lease is still valid"
+    later = now + timedelta(seconds=settings.job_lease_seconds + 1)
+    reclaimed = runner.claim(db, "other", later)
+    assert (reclaimed.id, reclaimed.attempts, reclaimed.locked_by) == (job.id, 2, "other")
+    assert runner.claim(db, "third", later + timedelta(seconds=settings.job_lease_seconds + 1)) is None
+    db.expire_all()
+    assert (job.status, job.last_error) == (JobStatus.failed, "lease expired on other")
+
+
+def test_course_progress_recompute_job(engine, db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    students = [User(email=f"s{i}@x.io", full_name="S", role=UserRole.student, hashed_password="x") for i in range(3)]
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    db.add_all(students + [Enrollment(course=course, student=student) for student in students])
+    db.flush()
+    job = enqueue(db, "progress.recompute_course", {"course_id": course.id}, created_by_id=teacher.id)
+    db.commit()
+
+    JobRunner(sessionmaker(bind=engine, autoflush=False)).run_until_idle()
+    db.expire_all()
+    assert job.status == JobStatus.succeeded and job.progress_message == "3/3 students"
+    assert db.query(ProgressSnapshot).filter(ProgressSnapshot.course_id == course.id).count() == 3
+    assert db.query(Job).count() == 1
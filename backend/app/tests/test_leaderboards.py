@@ -0,0 +1,105 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_user
+from app.api.v1 import leaderboards as leaderboards_api
+from app.core.cache import cache, leaderboard_tag
+from app.db.session import get_db
+from app.models import Assignment, Course, Enrollment, Lesson, Module, Submission, SubmissionStatus, User, UserRole
+from app.services import event_handlers  # noqa: F401
+from app.services.events import SUBMISSION_GRADED, dispatcher, publish
+from app.services.leaderboards import RankedList, leaderboards, rebuild_leaderboards
+
+
+def test_ranked_list_ties_share_the_best_rank_in_student_order():
+    ranked = RankedList({5: 10.0, 3: 7.0, 9: 7.0, 1: 4.0})
+    assert ranked.rows(0, 4) == [(1, 5, 10.0), (2, 3, 7.0), (2, 9, 7.0), (4, 1, 4.0)]
+    assert (ranked.position(9), ranked.below(7.0)) == (2, 1)
+    ranked.set(1, 8.0)
+    ranked.set(5, None)
+    assert ranked.rows(0, 10) == [(1, 1, 8.0), (2, 3, 7.0), (2, 9, 7.0)]
+    assert ranked.position(5) is None and len(ranked) == 3
+
+
+def test_grading_events_keep_the_leaderboard_current(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    students = [
+        User(email=f"s{i}@x.io", full_name=f"S{i}", role=UserRole.student, hashed_password="x") for i in range(5)
+    ]
+    outsider = User(email="o@x.io", full_name="O", role=UserRole.student, hashed_password="x")
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    lesson = Lesson(module=Module(course=course, title="M"), title="L", short_description="s", content_html="")
+    first, second = (Assignment(lesson=lesson, title=title, description="d", max_score=10) for title in "AB")
+    db.add_all([first, second, outsider, *(Enrollment(course=course, student=student) for student in students)])
+    db.commit()
+    leaderboards.clear()
+    cache.invalidate(tags=[leaderboard_tag(course.id)])
+
+    def grade(student, assignment, score, attempt=1):
+        submission = Submission(
+            assignment=assignment,
+            student=student,
+            course_id=course.id,
+            attempt_number=attempt,
+            status=SubmissionStatus.checked,
+            score=score,
+        )
+        db.add(submission)
+        db.flush()
+        payload = {"submission_id": submission.id, "assignment_id": assignment.id, "student_id": student.id}
+        publish(db, SUBMISSION_GRADED, payload)
+        db.commit()
+        dispatcher.dispatch_pending(db)
+
+    for student, scores in zip(students, [(9, 9), (10, 5), (5, 10), (6, 6)]):
+        for assignment, score in zip((first, second), scores):
+            grade(student, assignment, score)
+
+    app = FastAPI()
+    app.include_router(leaderboards_api.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = lambda: db
+    current = {"user": students[1]}
+    app.dependency_overrides[get_current_user] = lambda: current["user"]
+    client = TestClient(app)
+    url = f"/api/v1/courses/{course.id}/leaderboard"
+
+    body = client.get(url, params={"limit": 3, "around": 1}).json()
+    assert body["total"] == 4
+    assert [(row["rank"], row["full_name"], row["value"]) for row in body["top"]] == [
+        (1, "S0", 18.0),
+        (2, "S1", 15.0),
+        (2, "S2", 15.0),
+    ]
+    assert body["me"]["rank"] == 2 and body["percentile"] == 33.3
+    assert [row["full_name"] for row in body["around"]] == ["S0", "S1", "S2"]
+
+    # a better retake moves S3 up without rebuilding the board
+    board = leaderboards.board(db, course.id)
+    revision = board.revision
+    grade(students[3], first, 10, attempt=2)
+    body = client.get(url, params={"limit": 2}).json()
+    assert leaderboards.board(db, course.id) is board and board.revision > revision
+    assert [(row["rank"], row["full_name"], row["value"]) for row in body["top"]] == [(1, "S0", 18.0), (2, "S3", 16.0)]
+    assert body["me"]["rank"] == 3 and body["percentile"] == 0.0
+
+    body = client.get(url, params={"metric": "avg_score"}).json()
+    assert [(row["rank"], row["value"]) for row in body["top"]] == [(1, 9.0), (2, 8.0), (3, 7.5), (3, 7.5)]
+
+    # the teacher sees the board without a rank; others are turned away
+    current["user"] = teacher
+    body = client.get(url).json()
+    assert body["me"] is None and body["percentile"] is None and body["around"] == []
+    current["user"] = students[4]
+    assert client.get(url).json()["percentile"] is None
+    current["user"] = outsider
+    assert client.get(url).status_code == 403
+    assert client.get("/api/v1/courses/999/leaderboard").status_code == 404
+
+    # a rebuild from the submissions agrees with the incremental entries
+    current["user"] = students[1]
+    before = client.get(url, params={"limit": 5}).json()
+    leaderboards.clear()
+    rebuild_leaderboards(db)
+    db.commit()
+    cache.invalidate(tags=[leaderboard_tag(course.id)])
+    assert client.get(url, params={"limit": 5}).json() == before
@@ -0,0 +1,78 @@
+import gzip
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_student
+from app.api.v1 import lessons
+from app.core.cache import cache
+from app.db.session import get_db
+from app.models import Assignment, Course, Lesson, Module, User, UserRole
+from app.services.lesson_content import sanitize_html
+
+
+def test_sanitizer_keeps_allowed_markup_only():
+    html, text = sanitize_html(
+        '<h2 onclick="x()">Intro</h2><p>See <a href="javascript:alert(1)">this</a> and '
+        '<a href="/docs?a=1&amp;b=2" target="_blank">docs</a><script>alert(1)</script>'
+        '<img src="java\tscript:x" alt="a &quot;b&quot;"><style>p{}</style><ul><li>one<li>two</ul>'
+    )
+    assert html == (
+        '<h2>Intro</h2><p>See <a rel="noopener noreferrer nofollow">this</a> and '
+        '<a href="/docs?a=1&amp;b=2" rel="noopener noreferrer nofollow">docs</a>'
+        '<img alt="a &quot;b&quot;"><ul><li>one<li>two</li></li></ul></p>'
+    )
+    assert text == "Intro\nSee this and docs\none\ntwo"
+    assert sanitize_html("1 < 2 & <b>bold") == ("1 &lt; 2 &amp; <b>bold</b>", "1 < 2 & bold")
+
+
+def test_renditions_are_versioned_on_write_and_served_with_immutable_headers(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    student = User(email="s@x.io", full_name="S", role=UserRole.student, hashed_password="x")
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    lesson = Lesson(
+        module=Module(course=course, title="M"),
+        title="L",
+        short_description="d",
+        content_html="<p>Hello <b>world</b></p><script>x</script>" * 50,
+    )
+    db.add_all([student, lesson, Assignment(lesson=lesson, title="A", description="do it", max_score=10)])
+    db.commit()
+    assert lesson.rendition.version == 1
+    lesson.title = "renamed"
+    db.commit()
+    assert lesson.rendition.version == 1, "only content changes re-render"
+
+    app = FastAPI()
+    app.include_router(lessons.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_student] = lambda: student
+    client = TestClient(app)
+
+    body = client.get(f"/api/v1/lessons/{lesson.id}").json()
+    assert body["lesson"]["content_version"] == 1 and "<script>" not in body["lesson"]["content_html"]
+    assert body["lesson"]["preview"].startswith("Hello world Hello world")
+    assert body["assignment"]["title"] == "A"
+
+    url = body["lesson"]["content_url"]
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["cache-control"] == "private, max-age=31536000, immutable"
+    assert response.text == lesson.rendition.html
+    assert gzip.decompress(lesson.rendition.html_gzip).decode() == response.text
+    plain = client.get(url, headers={"Accept-Encoding": "identity, gzip;q=0"})
+    assert "content-encoding" not in plain.headers and plain.text == response.text
+    assert client.get(url, headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+    lesson.content_html = "<p>Updated</p>"
+    db.commit()
+    assert lesson.rendition.version == 2
+    # the commit invalidated the cached lesson view
+    assert client.get(f"/api/v1/lessons/{lesson.id}").json()["lesson"]["content_url"].endswith("/content/2")
+    # a cached old version is still what its URL promised; once evicted it redirects
+    assert "Hello" in client.get(url).text
+    cache.invalidate(keys=[f"lesson:{lesson.id}:content:1"])
+    stale = client.get(url, follow_redirects=False)
+    assert stale.status_code == 302 and stale.headers["location"].endswith("/content/2")
+    assert client.get(f"/api/v1/lessons/{lesson.id}/content/9").text == "<p>Updated</p>"
+    cache.invalidate(tags=[f"lesson:{lesson.id}"])
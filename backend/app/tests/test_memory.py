@@ -0,0 +1,50 @@
+import tracemalloc
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.api.v1 import admin
+from app.core import memory
+from app.core.config import settings
+from app.models import User, UserRole
+
+
+def test_memory_diagnostics_require_admin_and_report_growth(db, monkeypatch):
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/api/v1")
+    client = TestClient(app)
+    assert client.get("/api/v1/admin/memory").status_code == 404
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    assert client.get("/api/v1/admin/memory", headers={"X-Admin-Token": "nope"}).status_code == 403
+    headers = {"X-Admin-Token": "s3cret"}
+
+    assert not tracemalloc.is_tracing()
+    assert client.post("/api/v1/admin/memory/snapshot", headers=headers).status_code == 409
+    started = client.post("/api/v1/admin/memory/start", headers=headers).json()
+    try:
+        assert started["enabled"] and tracemalloc.is_tracing()
+        hoard = [bytearray(1024) for _ in range(2000)]
+        report = client.post("/api/v1/admin/memory/snapshot", headers=headers, params={"limit": 5}).json()
+        growth = [row for row in report["growth"] if "test_memory.py" in row["location"]]
+        assert growth and growth[0]["size_diff_bytes"] > 1_000_000
+
+        users = [
+            User(email=f"u{i}@x.io", full_name="U", role=UserRole.student, hashed_password="x", avatar_url="a" * 10000)
+            for i in range(3)
+        ]
+        db.add_all(users)
+        db.flush()
+        objects = client.get("/api/v1/admin/memory/objects", headers=headers).json()
+        assert objects["orm_instances"]["User"] >= 3
+        assert objects["orm_large_strings"]["count"] >= 3
+        assert max(objects["sessions"]["identity_map_sizes"]) >= 3
+        assert client.get("/api/v1/admin/memory", headers=headers).json()["rss_history"]
+    finally:
+        client.post("/api/v1/admin/memory/stop", headers=headers)
+    assert not tracemalloc.is_tracing()
+    # stopped diagnostics leave no session listener behind and report no sessions
+    assert not event.contains(Session, "after_begin", memory._track_session)
+    assert client.get("/api/v1/admin/memory/objects", headers=headers).json()["sessions"] is None
+    del hoard
@@ -0,0 +1,73 @@
+import json
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import metrics
+from app.core.metrics import Registry, dump_snapshot, load_snapshots, merge, remove_snapshot, render
+
+
+def test_render_counters_gauges_and_cumulative_histograms():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ("route",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    registry.gauge("queue_depth", "Queue").set(3)
+    requests.inc(1, 'say "hi"')
+    requests.inc(2, 'say "hi"')
+    for value in (0.05, 0.5, 0.5, 7.0):
+        latency.observe(value)
+
+    text = render(registry.collect())
+    assert '# TYPE requests_total counter\nrequests_total{route="say \\"hi\\""} 3\n' in text
+    assert "queue_depth 3\n" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1\n' in text
+    assert 'latency_seconds_bucket{le="1"} 3\n' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 4\n' in text
+    assert "latency_seconds_sum 8.05\nlatency_seconds_count 4\n" in text
+
+
+def test_middleware_labels_requests_by_route_template():
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {}
+
+    client = TestClient(app)
+    before = metrics.http_requests.snapshot().samples
+    for path in ("/items/1", "/items/2", "/items/x", "/missing/3"):
+        client.get(path)
+    after = metrics.http_requests.snapshot().samples
+
+    def delta(*key):
+        return after.get(key, 0) - before.get(key, 0)
+
+    assert delta("GET", "/items/{item_id}", "200") == 2
+    assert delta("GET", "/items/{item_id}", "422") == 1
+    assert delta("GET", "unmatched", "404") == 1
+
+
+def test_workers_are_merged_and_dead_workers_are_pruned(tmp_path):
+    dump_snapshot(str(tmp_path))
+    assert len(load_snapshots(str(tmp_path))) == 1
+
+    registry = Registry()
+    registry.counter("c_total", "c").inc(5)
+    registry.gauge("g", "g").set(2)
+    registry.gauge("g_max", "g", aggregate="max").set(7)
+    registry.histogram("h", "h", buckets=(1.0,)).observe(0.5)
+    worker = {family.name: family.to_dict() for family in registry.collect()}
+
+    merged = {family.name: family.samples[()] for family in merge([worker, worker])}
+    assert merged == {"c_total": 10, "g": 4, "g_max": 7, "h": [2, 0, 1.0]}
+
+    # a pid that is certainly gone: its snapshot is skipped and deleted
+    dead = {"pid": 999999999, "written_at": 0, "families": {"c_total": worker["c_total"]}}
+    (tmp_path / "worker-999999999.json").write_text(json.dumps(dead))
+    assert len(load_snapshots(str(tmp_path))) == 1
+    assert not os.path.exists(tmp_path / "worker-999999999.json")
+
+    remove_snapshot(str(tmp_path))
+    assert load_snapshots(str(tmp_path)) == []
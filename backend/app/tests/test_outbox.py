@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.models import CourseFunnelStat, Course, OutboxEvent, OutboxStatus, ProgressSnapshot, User, UserRole
+from app.services import event_handlers  # noqa: F401
+from app.services.events import ENROLLMENT_CREATED, EventDispatcher, dispatcher, prune_outbox, publish
+
+
+def test_events_are_delivered_once_per_handler_with_retries(db):
+    local = EventDispatcher(lambda: db)
+    seen = {"counter": [], "flaky": []}
+    broken = {2}
+
+    @local.subscribe("thing.happened", name="counter")
+    def counter(session, events):
+        seen["counter"].append([event.payload["n"] for event in events])
+        return ["thing"]
+
+    @local.subscribe("thing.happened", name="flaky")
+    def flaky(session, events):
+        if any(event.payload["n"] in broken for event in events):
+            raise RuntimeError("boom")
+        seen["flaky"].append([event.payload["n"] for event in events])
+
+    for n in (1, 2, 3):
+        publish(db, "thing.happened", {"n": n})
+    db.rollback()
+    assert local.dispatch_pending(db) == 0, "events of a rolled back transaction are never dispatched"
+
+    for n in (1, 2, 3):
+        publish(db, "thing.happened", {"n": n})
+    db.commit()
+    now = datetime.utcnow()
+    assert local.dispatch_batch(db, now=now) == 3
+    # the batch failed as a whole, then went event by event
+    assert seen == {"counter": [[1, 2, 3]], "flaky": [[1], [3]]}
+    failing = db.query(OutboxEvent).filter(OutboxEvent.status == OutboxStatus.pending).one()
+    assert failing.attempts == 1 and "boom" in failing.last_error
+    assert failing.next_attempt_at == now + timedelta(seconds=settings.outbox_retry_base_seconds)
+
+    assert local.dispatch_batch(db, now=now) == 0, "not due before the backoff"
+    broken.clear()
+    assert local.dispatch_batch(db, now=failing.next_attempt_at) == 1
+    # the counter already handled event 2 and is not called again
+    assert seen == {"counter": [[1, 2, 3]], "flaky": [[1], [3], [2]]}
+    assert {row.status for row in db.query(OutboxEvent)} == {OutboxStatus.done}
+    stats = local.stats(db)
+    assert (stats["pending"], stats["delivered"], stats["retried"]) == (0, 3, 1)
+
+    assert prune_outbox(db, now=now + timedelta(hours=settings.outbox_retention_hours + 1)) == 3
+    assert db.query(OutboxEvent).count() == 0
+
+
+def test_events_that_keep_failing_are_parked(db, monkeypatch):
+    monkeypatch.setattr(settings, "outbox_max_attempts", 2)
+    local = EventDispatcher(lambda: db)
+
+    @local.subscribe("thing.happened")
+    def always_fails(session, events):
+        raise ValueError("nope")
+
+    publish(db, "thing.happened", {})
+    db.commit()
+    local.dispatch_batch(db)
+    local.dispatch_batch(db, now=datetime.utcnow() + timedelta(hours=1))
+    event = db.query(OutboxEvent).one()
+    assert (event.status, event.attempts) == (OutboxStatus.failed, 2)
+    assert local.stats(db)["failed"] == 1
+
+
+def test_enrollment_event_updates_progress_and_funnel(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    student = User(email="s@x.io", full_name="S", role=UserRole.student, hashed_password="x")
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    db.add_all([student, course, CourseFunnelStat(course=course)])
+    db.commit()
+
+    publish(db, ENROLLMENT_CREATED, {"student_id": student.id, "course_id": course.id})
+    db.commit()
+    assert db.query(ProgressSnapshot).count() == 0
+    dispatcher.dispatch_pending(db)
+    assert db.query(ProgressSnapshot).filter(ProgressSnapshot.student_id == student.id).one().course_id == course.id
+    assert db.query(CourseFunnelStat).one().stale
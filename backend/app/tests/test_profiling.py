@@ -0,0 +1,58 @@
+import logging
+import os
+import time
+
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.profiling import ProfileStore, ProfilingMiddleware, TimedRoute
+
+
+def busy_endpoint_work():
+    deadline = time.perf_counter() + 0.03
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_admin_header_profiles_into_bounded_store_and_slow_requests_are_logged(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "admin_token", "s3cret")
+    monkeypatch.setattr(settings, "slow_request_threshold_ms", 20.0)
+    monkeypatch.setattr(settings, "profiling_interval_ms", 1.0)
+    store = ProfileStore(str(tmp_path), max_reports=2)
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware, store=store)
+    router = APIRouter(route_class=TimedRoute)
+
+    @router.get("/items/{item_id}")
+    def item(item_id: int):
+        busy_endpoint_work()
+        return {"id": item_id}
+
+    @router.get("/fast")
+    async def fast():
+        return {}
+
+    app.include_router(router)
+    client = TestClient(app)
+
+    assert "x-profile-id" not in client.get("/items/1", headers={"X-Profile": "1", "X-Admin-Token": "nope"}).headers
+    assert os.listdir(tmp_path) == []
+    ids = []
+    for item_id in range(3):
+        response = client.get(f"/items/{item_id}", headers={"X-Profile": "1", "X-Admin-Token": "s3cret"})
+        ids.append(response.headers["x-profile-id"])
+    assert store.report_ids() == ids[1:]
+
+    with open(tmp_path / f"{ids[-1]}.folded") as handle:
+        lines = handle.read().splitlines()
+    assert any("test_profiling:busy_endpoint_work" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+        client.get("/items/5")
+        client.get("/fast")
+    [record] = caplog.records
+    assert "GET /items/{item_id} -> 200" in record.getMessage()
+    assert "handler_ms=" in record.getMessage() and "serialization_ms=" in record.getMessage()
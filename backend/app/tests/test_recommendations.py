@@ -0,0 +1,93 @@
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_student
+from app.api.v1 import courses
+from app.core.cache import CATALOG_TAG, cache
+from app.db.session import get_db
+from app.models import Course, Enrollment, User, UserRole
+from app.services.course_counters import rebuild_course_counters
+from app.services.recommendations import (
+    RECOMMENDATIONS_TAG,
+    SimilarityIndex,
+    build_index,
+    refresh_recommendations,
+)
+
+
+def test_index_matches_brute_force_similarity():
+    rng = np.random.default_rng(7)
+    course_ids = np.arange(10, 70, dtype=np.int64)
+    tag_pairs = (rng.choice(course_ids, 120), rng.integers(100, 110, 120))
+    students = rng.integers(0, 300, 900)
+    # ids of unknown courses are ignored
+    enrollment_pairs = (np.r_[students, 5], np.r_[rng.choice(course_ids, 900), 999])
+    index = build_index(course_ids, tag_pairs, enrollment_pairs, np.zeros(60, dtype=np.int64), k=5, tag_weight=0.4)
+
+    tags = np.zeros((60, 10))
+    tags[tag_pairs[0] - 10, tag_pairs[1] - 100] = 1
+    enrolled = np.zeros((300, 60))
+    enrolled[students, enrollment_pairs[1][:-1] - 10] = 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        tag_cos = np.nan_to_num(tags @ tags.T / np.sqrt(np.outer(tags.sum(1), tags.sum(1))))
+        co_cos = np.nan_to_num(enrolled.T @ enrolled / np.sqrt(np.outer(enrolled.sum(0), enrolled.sum(0))))
+    expected = 0.4 * tag_cos + 0.6 * co_cos
+    np.fill_diagonal(expected, -np.inf)
+    best = np.sort(expected, axis=1)[:, ::-1][:, :5]
+    np.testing.assert_allclose(index.scores.astype(np.float64), best, atol=2e-3)
+    picked = np.take_along_axis(expected, index.neighbours.astype(np.int64), axis=1)
+    np.testing.assert_allclose(picked, best, atol=1e-6)
+
+    restored = SimilarityIndex.from_bytes(index.to_bytes(), index.built_at)
+    assert restored.recommend([10, 11], 4) == index.recommend([10, 11], 4)
+
+
+def test_recommendations_rank_similar_courses_and_fall_back_to_popular(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    students = [User(email=f"s{i}@x.io", full_name="S", role=UserRole.student, hashed_password="x") for i in range(6)]
+    specs = {"Python": "python", "Data": "python,data", "SQL": "sql,data", "Art": "art", "Music": "art,music"}
+    catalog = {
+        title: Course(
+            title=title,
+            short_description="s",
+            long_description="l",
+            level="beginner",
+            tags=tags,
+            owner=teacher,
+            is_published=True,
+        )
+        for title, tags in specs.items()
+    }
+    enrolled = [["Python", "Data"], ["Python", "Data"], ["Python", "SQL"], ["Art"], ["Art"], ["Music"]]
+    db.add_all([*catalog.values(), *students])
+    db.add_all(
+        Enrollment(course=catalog[title], student=student) for student, titles in zip(students, enrolled) for title in titles
+    )
+    db.commit()
+    rebuild_course_counters(db)
+
+    app = FastAPI()
+    app.include_router(courses.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = lambda: db
+    current = {"user": students[0]}
+    app.dependency_overrides[get_current_student] = lambda: current["user"]
+    client = TestClient(app)
+    cache.invalidate(tags=[CATALOG_TAG, RECOMMENDATIONS_TAG])
+
+    # before the first refresh: the most enrolled courses the student is not in
+    body = client.get("/api/v1/courses/recommended", params={"limit": 2}).json()
+    assert body["built_at"] is None
+    assert [item["title"] for item in body["items"]] == ["Art", "SQL"]
+
+    refresh_recommendations(db)
+    db.commit()
+    cache.invalidate(tags=[RECOMMENDATIONS_TAG])
+    body = client.get("/api/v1/courses/recommended", params={"limit": 3}).json()
+    assert body["built_at"] is not None
+    assert [item["title"] for item in body["items"]] == ["SQL", "Art", "Music"]
+    assert body["items"][0]["score"] > 0 and body["items"][1]["score"] == 0
+
+    current["user"] = students[3]
+    titles = [item["title"] for item in client.get("/api/v1/courses/recommended").json()["items"]]
+    assert titles[0] == "Music" and "Art" not in titles and len(titles) == 4
@@ -0,0 +1,93 @@
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.api.v1.grading import claim_submissions, release_claims
+from app.db.base import Base
+from app.models import Assignment, Course, Lesson, Module, Submission, SubmissionStatus, User, UserRole
+
+
+def file_engine(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 30, "check_same_thread": False})
+
+    # SQLite has no SKIP LOCKED: take the write lock up front so that concurrent
+    # claimers serialize instead of failing to upgrade their read locks.
+    @event.listens_for(engine, "connect")
+    def disable_pysqlite_begin(dbapi_connection, _):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def begin_immediate(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def populate(session, submissions):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    student = User(email="s@x.io", full_name="S", role=UserRole.student, hashed_password="x")
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    module = Module(course=course, title="M")
+    now = datetime.utcnow()
+    for index in range(submissions):
+        lesson = Lesson(module=module, title=f"L{index}", short_description="s", content_html="")
+        assignment = Assignment(lesson=lesson, title="A", description="d", max_score=10, due_date=now + timedelta(days=index % 5))
+        session.add(
+            Submission(
+                assignment=assignment,
+                student=student,
+                attempt_number=1,
+                status=SubmissionStatus.checked if index % 4 == 0 else SubmissionStatus.submitted,
+                submitted_at=now - timedelta(minutes=index),
+            )
+        )
+    session.add(teacher)
+    session.commit()
+    return teacher.id
+
+
+def test_concurrent_workers_never_claim_the_same_submission(tmp_path):
+    engine = file_engine(tmp_path / "queue.db")
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        teacher_id = populate(session, 80)
+        expected = {s.id for s in session.query(Submission).filter(Submission.status == SubmissionStatus.submitted)}
+
+    claims = []
+    lock = threading.Lock()
+
+    def worker():
+        with Session() as session:
+            while True:
+                batch = claim_submissions(session, teacher_id, limit=4, lease_seconds=60)
+                if not batch:
+                    return
+                with lock:
+                    claims.extend(item.submission_id for item in batch)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(claims) == len(set(claims))
+    assert set(claims) == expected
+
+
+def test_claims_follow_due_date_and_can_be_released(tmp_path):
+    engine = file_engine(tmp_path / "queue.db")
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        teacher_id = populate(session, 10)
+        first = claim_submissions(session, teacher_id, limit=3, lease_seconds=60)
+        assert [item.due_date for item in first] == sorted(item.due_date for item in first)
+        assert release_claims(session, teacher_id, [first[0].submission_id]) == 1
+        again = claim_submissions(session, teacher_id, limit=1, lease_seconds=60)
+        assert again[0].submission_id == first[0].submission_id
+        # expired leases go back to the queue
+        assert claim_submissions(session, teacher_id, limit=100, lease_seconds=-1)
+        assert claim_submissions(session, teacher_id, limit=100, lease_seconds=60)
@@ -0,0 +1,76 @@
+from app.db.search_index import install_search_index
+from app.models import ChatMessage, Course, Enrollment, Lesson, Module, User, UserRole
+from app.schemas.search import SearchKind
+from app.services.search import search
+
+
+def test_search_is_ranked_highlighted_and_scoped_by_access(engine, db):
+    with engine.begin() as connection:
+        install_search_index(connection)
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    student = User(email="s@x.io", full_name="S", role=UserRole.student, hashed_password="x")
+    outsider = User(email="o@x.io", full_name="O", role=UserRole.student, hashed_password="x")
+    joined = Course(
+        title="Python basics",
+        short_description="Variables and loops",
+        long_description="Lists, dictionaries and generators",
+        level="beginner",
+        tags="python,basics",
+        is_published=True,
+        owner=teacher,
+    )
+    other = Course(
+        title="Data analysis",
+        short_description="Pandas for python users",
+        long_description="Tables",
+        level="advanced",
+        is_published=True,
+        owner=teacher,
+    )
+    draft = Course(title="Python internals", short_description="s", long_description="l", level="advanced", owner=teacher)
+    module = Module(course=joined, title="M", order_index=1)
+    lesson = Lesson(
+        module=module,
+        title="Generators",
+        short_description="Lazy sequences",
+        content_html='<p class="python">Use <strong>yield</strong> inside a function</p>',
+        order_index=1,
+    )
+    db.add_all([student, outsider, other, draft, lesson, Enrollment(course=joined, student=student)])
+    db.flush()
+    db.add(ChatMessage(course_id=joined.id, author_id=student.id, text="How does <yield> work?", is_teacher=False))
+    db.commit()
+
+    result = search(db, student.id, "python")
+    assert result.total == 2
+    # the title match outranks the description match; the draft course stays hidden
+    assert [(hit.kind, hit.id) for hit in result.items] == [(SearchKind.course, joined.id), (SearchKind.course, other.id)]
+    assert result.items[0].title_highlight == "<mark>Python</mark> basics"
+    assert "<mark>python</mark>" in result.items[1].snippet
+
+    # HTML is stripped before indexing: tags and attributes never match
+    assert search(db, student.id, "strong").total == 0
+    hits = search(db, student.id, "yield").items
+    assert {(hit.kind, hit.course_id) for hit in hits} == {(SearchKind.lesson, joined.id), (SearchKind.message, joined.id)}
+    message = next(hit for hit in hits if hit.kind == SearchKind.message)
+    assert message.title == "Python basics"
+    assert message.snippet == "How does &lt;<mark>yield</mark>&gt; work?"
+
+    # lessons and chat need an enrollment; the owner sees the drafts too
+    assert search(db, outsider.id, "yield").total == 0
+    assert search(db, teacher.id, "internals").items[0].id == draft.id
+    assert [hit.kind for hit in search(db, student.id, "yield", kinds=[SearchKind.lesson]).items] == [SearchKind.lesson]
+
+    page = search(db, student.id, "python", limit=1, offset=1)
+    assert page.total == 2 and [hit.id for hit in page.items] == [other.id]
+    assert search(db, student.id, "python", limit=1, offset=5).total == 2
+
+    # the index follows writes
+    lesson.content_html = "<p>Coroutines</p>"
+    db.delete(other)
+    db.commit()
+    assert search(db, student.id, "yield", kinds=[SearchKind.lesson]).total == 0
+    assert search(db, student.id, "coroutines").items[0].id == lesson.id
+    assert search(db, student.id, "pandas").total == 0
+    # FTS5 syntax in the query is treated as plain words
+    assert search(db, student.id, 'python" OR "x').total == 0
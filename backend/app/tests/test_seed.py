@@ -0,0 +1,54 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+from app.db.seed import SeedConfig, seed
+
+SMALL = dict(
+    students=40,
+    teachers=3,
+    courses=6,
+    submissions=300,
+    test_answers=800,
+    chat_messages=50,
+    batch_size=64,
+    anchor=datetime(2025, 1, 1),
+)
+
+
+def dump(engine, table):
+    with engine.connect() as connection:
+        return connection.execute(text(f"SELECT * FROM {table} ORDER BY id")).fetchall()
+
+
+def test_seed_is_deterministic_and_consistent():
+    first, second = create_engine("sqlite://"), create_engine("sqlite://")
+    counts = seed(first, SeedConfig(**SMALL))
+    seed(second, SeedConfig(**SMALL))
+
+    assert counts["users"] == 43
+    assert counts["submissions"] == 300
+    assert counts["test_answers"] >= 800
+    for table in ("courses", "submissions", "test_answers", "chat_messages"):
+        assert dump(first, table) == dump(second, table)
+
+    with first.connect() as connection:
+        duplicated_attempts = connection.execute(
+            text(
+                "SELECT COUNT(*) FROM (SELECT assignment_id, student_id, attempt_number FROM submissions "
+                "GROUP BY 1, 2, 3 HAVING COUNT(*) > 1)"
+            )
+        ).scalar()
+        orphan_answers = connection.execute(
+            text("SELECT COUNT(*) FROM test_answers a LEFT JOIN test_attempts t ON t.id = a.attempt_id WHERE t.id IS NULL")
+        ).scalar()
+        misplaced = connection.execute(
+            text(
+                "SELECT COUNT(*) FROM submissions s JOIN assignments a ON a.id = s.assignment_id "
+                "JOIN lessons l ON l.id = a.lesson_id JOIN modules m ON m.id = l.module_id "
+                "WHERE s.course_id != m.course_id OR a.course_id != m.course_id"
+            )
+        ).scalar()
+    assert duplicated_attempts == 0
+    assert orphan_answers == 0
+    assert misplaced == 0
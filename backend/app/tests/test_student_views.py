@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from app.api.v1.deadlines import collect_deadlines
+from app.api.v1.feed import collect_feed
+from app.api.v1.grades import collect_grades
+from app.api.v1.progress import refresh_progress
+from app.models import Assignment, Course, Enrollment, Lesson, Module, Submission, SubmissionStatus, User, UserRole
+
+
+def add_assignment(db, module, title, due_date=None):
+    lesson = Lesson(module=module, title=title, short_description="s", content_html="<p>x</p>", order_index=1)
+    assignment = Assignment(lesson=lesson, title=title, description="d", max_score=10, due_date=due_date)
+    db.add(assignment)
+    return assignment
+
+
+def test_statements_bind_per_student_and_pick_latest_attempts(db):
+    now = datetime.utcnow()
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    student = User(email="s@x.io", full_name="S", role=UserRole.student, hashed_password="x")
+    other = User(email="o@x.io", full_name="O", role=UserRole.student, hashed_password="x")
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    module = Module(course=course, title="M", order_index=1)
+    soon = add_assignment(db, module, "soon", now + timedelta(days=2))
+    later = add_assignment(db, module, "later", now + timedelta(days=40))
+    undated = add_assignment(db, module, "undated")
+    db.add_all([student, other, Enrollment(student=student, course=course), Enrollment(student=other, course=course)])
+    db.flush()
+    for attempt, score in ((1, 4.0), (2, 9.0)):
+        db.add(
+            Submission(
+                assignment=soon,
+                student=student,
+                attempt_number=attempt,
+                status=SubmissionStatus.checked,
+                score=score,
+                submitted_at=now,
+                checked_at=now - timedelta(minutes=attempt),
+            )
+        )
+    db.add(Submission(assignment=later, student=other, status=SubmissionStatus.submitted, submitted_at=now))
+    db.commit()
+
+    deadlines = collect_deadlines(db, student.id, to_dt=now + timedelta(days=7))
+    assert [(item.assignment_title, item.status) for item in deadlines] == [
+        ("soon", "checked"),
+        ("undated", "not_submitted"),
+    ]
+    assert (deadlines[1].assignment_id, deadlines[1].due_date) == (undated.id, None)
+    assert [item.assignment_title for item in collect_deadlines(db, other.id)] == ["soon", "later", "undated"]
+    assert collect_deadlines(db, other.id)[1].status == "submitted"
+
+    grades = collect_grades(db, student.id)
+    assert [(item.assignment_title, item.attempt_number, item.score) for item in grades] == [("soon", 2, 9.0)]
+
+    feed = collect_feed(db, student.id)
+    assert len([item for item in feed if item.assignment_id == soon.id and item.score is not None]) == 1
+    assert len(feed) == 4 and collect_feed(db, teacher.id) == []
+
+    snapshot = refresh_progress(db, student.id, course.id)
+    assert (snapshot.total_lessons_count, snapshot.completed_lessons_count, snapshot.avg_score) == (3, 1, 6.5)
@@ -0,0 +1,46 @@
+from app import models
+from app.api.v1.tests import clone_test, import_test
+from app.models import Course, User, UserRole
+from app.schemas import test as test_schemas
+
+
+def import_payload(questions):
+    return test_schemas.TestImport(
+        title="Экзамен",
+        time_limit_minutes=30,
+        questions=[
+            {
+                "text": f"Вопрос {index}",
+                "type": "multiple" if index % 3 == 0 else "single",
+                "options": [{"text": f"{index}-{option}", "is_correct": option == index % 4} for option in range(4)],
+            }
+            for index in range(questions)
+        ],
+    )
+
+
+def test_import_then_clone_copies_questions_and_options(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    other_course = Course(title="D", short_description="s", long_description="l", level="beginner", owner=teacher)
+    db.add_all([course, other_course])
+    db.commit()
+
+    imported = import_test(db, course.id, import_payload(150))
+    assert (imported.questions_count, imported.options_count) == (150, 600)
+
+    source = db.get(models.Test, imported.id)
+    clone_id = clone_test(db, source, test_schemas.TestCloneRequest(course_id=other_course.id, title="Копия"))
+
+    def snapshot(test_id):
+        questions = (
+            db.query(models.TestQuestion)
+            .filter(models.TestQuestion.test_id == test_id)
+            .order_by(models.TestQuestion.id)
+        )
+        return [(q.order_index, q.text, q.type, sorted((o.text, o.is_correct) for o in q.options)) for q in questions]
+
+    clone = db.get(models.Test, clone_id)
+    assert (clone.course_id, clone.title, clone.is_published) == (other_course.id, "Копия", False)
+    assert snapshot(clone_id) == snapshot(imported.id)
+    assert db.query(models.TestOption).count() == 1200
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.models import Course, QuestionType, User, UserRole
+from app.services.attempts import AutosaveBuffer, decode_answers, finish_attempt, finish_expired_attempts, start_attempt
+
+
+def build_test(db):
+    teacher = User(email="t@x.io", full_name="T", role=UserRole.teacher, hashed_password="x")
+    student = User(email="s@x.io", full_name="S", role=UserRole.student, hashed_password="x")
+    course = Course(title="C", short_description="s", long_description="l", level="beginner", owner=teacher)
+    test = models.Test(course=course, title="Timed", time_limit_minutes=10)
+    for index in range(2):
+        question = models.TestQuestion(test=test, text=f"Q{index}", type=QuestionType.single, order_index=index)
+        question.options = [models.TestOption(text="yes", is_correct=True), models.TestOption(text="no", is_correct=False)]
+    db.add_all([student, test])
+    db.commit()
+    correct = {q.id: [o.id for o in q.options if o.is_correct] for q in test.questions}
+    return student, test, correct
+
+
+def test_autosaves_are_coalesced_and_expired_attempts_finish_from_the_draft(engine, db):
+    student, test, correct = build_test(db)
+    started = datetime(2026, 1, 1, 12, 0)
+    attempt = start_attempt(db, test, student.id, started)
+    db.commit()
+    assert attempt.deadline_at == started + timedelta(minutes=10)
+    assert start_attempt(db, test, student.id, started + timedelta(minutes=1)).id == attempt.id
+
+    buffer = AutosaveBuffer(sessionmaker(bind=engine), max_entries=100)
+    first_question = min(correct)
+    buffer.put(attempt.id, {first_question: correct[first_question]}, started + timedelta(minutes=1))
+    buffer.put(attempt.id, correct, started + timedelta(minutes=2))
+    assert buffer.pending() == 1
+    assert buffer.flush() == 1
+    db.refresh(attempt)
+    assert decode_answers(attempt.draft_answers) == correct
+
+    assert finish_expired_attempts(db, now=started + timedelta(minutes=9)) == 0
+    assert finish_expired_attempts(db, now=started + timedelta(minutes=11)) == 1
+    db.refresh(attempt)
+    assert (attempt.score, attempt.max_score, attempt.finished_at) == (2.0, 2, attempt.deadline_at)
+    assert len(attempt.answers) == 2
+
+
+def test_answers_sent_after_the_deadline_are_ignored(db):
+    student, test, correct = build_test(db)
+    started = datetime(2026, 1, 1, 12, 0)
+    attempt = start_attempt(db, test, student.id, started)
+    finish_attempt(db, attempt, correct, started + timedelta(minutes=30))
+    db.commit()
+    assert attempt.score == 0.0
+    assert attempt.finished_at == attempt.deadline_at
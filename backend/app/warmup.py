@@ -0,0 +1,93 @@
+"""Startup warmup and readiness state.
+
+``preload`` does process-wide work that is safe to inherit across ``fork``
+(gunicorn master with ``preload_app``). ``warmup`` runs in every worker after
+fork: it opens pool connections and primes the caches, then flips readiness.
+"""
+
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from app.core.cache import cache, course_tag
+from app.core.config import settings
+from app.core.security import pwd_context
+from app.db.session import SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+
+class ReadinessState:
+    def __init__(self) -> None:
+        self._ready = threading.Event()
+        self.timings: Dict[str, float] = {}
+        self.error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def mark_ready(self) -> None:
+        self._ready.set()
+
+    def mark_draining(self) -> None:
+        self._ready.clear()
+
+
+readiness = ReadinessState()
+
+
+def preload() -> None:
+    """Fork-safe warmup: mapper configuration and the bcrypt backend."""
+    started = time.perf_counter()
+    configure_mappers()
+    # Loads and self-tests the bcrypt backend without a user-facing request paying for it.
+    pwd_context.dummy_verify()
+    readiness.timings["preload"] = time.perf_counter() - started
+
+
+def open_pool() -> None:
+    with ExitStack() as stack:
+        for _ in range(max(settings.warmup_connections, 1)):
+            connection = stack.enter_context(engine.connect())
+            connection.execute(text("SELECT 1"))
+
+
+def prime_caches() -> None:
+    # Imported lazily: the routers import this package's siblings.
+    from app.api.v1.courses import build_course_structure, published_catalog
+
+    db = SessionLocal()
+    try:
+        catalog = published_catalog(db)
+        for course in catalog[: settings.warmup_max_courses]:
+            cache.get_or_load(
+                f"course:{course.id}:structure",
+                lambda course_id=course.id: build_course_structure(db, course_id),
+                tags=[course_tag(course.id)],
+            )
+    finally:
+        db.close()
+
+
+def warmup() -> None:
+    """Per-worker warmup; readiness is reported even if priming fails."""
+    if not settings.warmup_enabled:
+        readiness.mark_ready()
+        return
+    for name, step in (("preload", preload), ("pool", open_pool), ("caches", prime_caches)):
+        if name in readiness.timings:
+            continue
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as exc:  # a cold cache is slower, not broken
+            logger.exception("Warmup step %s failed", name)
+            readiness.error = f"{name}: {exc}"
+        readiness.timings[name] = time.perf_counter() - started
+    readiness.mark_ready()
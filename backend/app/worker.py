@@ -0,0 +1,52 @@
+"""Background job worker, run next to the web workers::
+
+    python -m app.worker --concurrency 2
+
+SIGTERM/SIGINT stop claiming new jobs; running ones get ``--grace`` seconds
+to finish, after which their leases expire and another worker retries them.
+"""
+
+import argparse
+import logging
+import signal
+import threading
+from typing import Optional, Sequence
+
+from app.core.cache import start_cache, stop_cache
+from app.core.config import settings
+from app.db.session import engine
+from app.services import job_handlers, session_hooks  # noqa: F401  (register the job handlers and session hooks)
+from app.services.jobs import job_runner
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=settings.job_worker_concurrency)
+    parser.add_argument("--grace", type=float, default=30.0, help="seconds running jobs get to finish on shutdown")
+    parser.add_argument("--once", action="store_true", help="run the due jobs and exit")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    # cache invalidations from jobs must reach the web workers
+    start_cache(engine)
+    try:
+        if args.once:
+            logger.info("Ran %s jobs", job_runner.run_until_idle())
+            return
+        stopping = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: stopping.set())
+        job_runner.concurrency = args.concurrency
+        job_runner.start()
+        logger.info("Job worker %s started with %s threads", job_runner.name, args.concurrency)
+        stopping.wait()
+        logger.info("Stopping job worker %s", job_runner.name)
+        job_runner.stop(args.grace)
+    finally:
+        stop_cache()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""Endpoint benchmark: main student flows under a concurrent user mix.
+
+Boots the app against a seeded database (see ``python -m app.db.seed``), logs
+in a pool of seeded students and lets virtual users run a weighted mix of
+flows. Reports p50/p95/p99 latency, throughput, error rate and SQL queries
+per request for every endpoint, saves the result as JSON and optionally
+compares it against a stored baseline::
+
+    DATABASE_URL=... python -m benchmarks.bench_endpoints --users 32 --duration 60 \\
+        --output bench.json --baseline benchmarks/baseline.json --tolerance 0.15
+
+Exit code 1 means a regression beyond the tolerance.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from sqlalchemy import create_engine, text
+
+from benchmarks.cold_start import wait_until_ready
+
+DEFAULT_CMD = "uvicorn app.main:app --host 127.0.0.1 --port {port}"
+
+# flow name -> weight in the user mix
+FLOW_WEIGHTS = {
+    "dashboard": 30,
+    "course_structure": 15,
+    "lesson_view": 25,
+    "chat": 12,
+    "test_submit": 6,
+    "file_upload": 6,
+    "login": 6,
+}
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[Tuple[float, int, int]]] = {}
+
+    def add(self, endpoint: str, elapsed: float, status: int, queries: int) -> None:
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((elapsed, status, queries))
+
+
+class Client:
+    """Keep-alive HTTP client for one virtual user."""
+
+    def __init__(self, base_url: str, recorder: Recorder) -> None:
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.recorder = recorder
+        self.token: Optional[str] = None
+        self._connection: Optional[http.client.HTTPConnection] = None
+
+    def request(
+        self,
+        endpoint: str,
+        method: str,
+        path: str,
+        body: Optional[bytes] = None,
+        content_type: Optional[str] = None,
+    ) -> Tuple[int, Any]:
+        headers = {"Connection": "keep-alive"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if content_type:
+            headers["Content-Type"] = content_type
+        for retry in (False, True):
+            if self._connection is None:
+                self._connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            started = time.perf_counter()
+            try:
+                self._connection.request(method, path, body=body, headers=headers)
+                response = self._connection.getresponse()
+                payload = response.read()
+            except (http.client.HTTPException, ConnectionError):
+                self._connection.close()
+                self._connection = None
+                if retry:
+                    raise
+                continue
+            elapsed = time.perf_counter() - started
+            queries = int(response.getheader("x-query-count") or -1)
+            self.recorder.add(endpoint, elapsed, response.status, queries)
+            try:
+                return response.status, json.loads(payload) if payload else None
+            except ValueError:
+                return response.status, None
+        raise RuntimeError("unreachable")
+
+    def json(self, endpoint: str, method: str, path: str, data: Any) -> Tuple[int, Any]:
+        return self.request(endpoint, method, path, json.dumps(data).encode(), "application/json")
+
+
+class VirtualStudent:
+    def __init__(self, client: Client, email: str, password: str, rng: random.Random) -> None:
+        self.client = client
+        self.email = email
+        self.password = password
+        self.rng = rng
+        self.course_ids: List[int] = []
+        self.lessons: List[int] = []
+        self.assignments: List[int] = []
+        self.tests: List[int] = []
+
+    def login(self) -> None:
+        status, body = self.client.json(
+            "POST /auth/login-json", "POST", "/api/v1/auth/login-json", {"email": self.email, "password": self.password}
+        )
+        if status != 200:
+            raise RuntimeError(f"login failed for {self.email}: {status}")
+        self.client.token = body["access_token"]
+
+    def discover(self) -> None:
+        status, body = self.client.request("GET /courses", "GET", "/api/v1/courses")
+        self.course_ids = [course["id"] for course in (body or {}).get("enrolled", [])] if status == 200 else []
+        for course_id in self.course_ids[:3]:
+            status, body = self.client.request("GET /courses/{id}/structure", "GET", f"/api/v1/courses/{course_id}/structure")
+            if status == 200:
+                self.lessons += [lesson["id"] for module in body["modules"] for lesson in module["lessons"]]
+            status, body = self.client.request("GET /courses/{id}/tests", "GET", f"/api/v1/courses/{course_id}/tests")
+            if status == 200:
+                self.tests += [test["id"] for test in body["items"]]
+
+    # --- flows ---------------------------------------------------------------------------
+
+    def dashboard(self) -> None:
+        self.client.request("GET /me/dashboard", "GET", "/api/v1/me/dashboard")
+
+    def course_structure(self) -> None:
+        if self.course_ids:
+            course_id = self.rng.choice(self.course_ids)
+            self.client.request("GET /courses/{id}/structure", "GET", f"/api/v1/courses/{course_id}/structure")
+
+    def lesson_view(self) -> None:
+        if not self.lessons:
+            return
+        status, body = self.client.request("GET /lessons/{id}", "GET", f"/api/v1/lessons/{self.rng.choice(self.lessons)}")
+        if status == 200 and body.get("assignment"):
+            self.assignments.append(body["assignment"]["id"])
+
+    def chat(self) -> None:
+        if not self.course_ids:
+            return
+        course_id = self.rng.choice(self.course_ids)
+        self.client.request("GET /courses/{id}/chat/messages", "GET", f"/api/v1/courses/{course_id}/chat/messages")
+        if self.rng.random() < 0.3:
+            self.client.json(
+                "POST /courses/{id}/chat/messages",
+                "POST",
+                f"/api/v1/courses/{course_id}/chat/messages",
+                {"text": f"benchmark message {uuid.uuid4().hex[:8]}"},
+            )
+
+    def test_submit(self) -> None:
+        if not self.tests:
+            return
+        test_id = self.rng.choice(self.tests)
+        status, body = self.client.request("GET /tests/{id}", "GET", f"/api/v1/tests/{test_id}")
+        if status != 200:
+            return
+        answers = [
+            {"question_id": q["id"], "selected_option_ids": [self.rng.choice(q["options"])["id"]] if q["options"] else []}
+            for q in body["questions"]
+        ]
+        self.client.json("POST /tests/{id}/submit", "POST", f"/api/v1/tests/{test_id}/submit", {"answers": answers})
+
+    def file_upload(self) -> None:
+        if not self.assignments:
+            self.lesson_view()
+            if not self.assignments:
+                return
+        boundary = uuid.uuid4().hex
+        content = os.urandom(self.rng.randint(2_000, 200_000))
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"files\"; filename=\"solution.bin\"\r\n"
+            f"Content-Type: application/octet-stream\r\n\r\n"
+        ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+        query = urlencode({"assignment_id": self.rng.choice(self.assignments), "student_comment": "benchmark"})
+        self.client.request("POST /submissions", "POST", f"/api/v1/submissions?{query}", body, f"multipart/form-data; boundary={boundary}")
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def summarize(recorder: Recorder, duration: float) -> Dict[str, Dict[str, float]]:
+    report: Dict[str, Dict[str, float]] = {}
+    for endpoint, samples in sorted(recorder.samples.items()):
+        latencies = sorted(elapsed * 1000 for elapsed, _, _ in samples)
+        queries = [count for _, _, count in samples if count >= 0]
+        errors = sum(1 for _, status, _ in samples if status >= 400)
+        report[endpoint] = {
+            "count": len(samples),
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "throughput_rps": len(samples) / duration if duration else 0.0,
+            "error_rate": errors / len(samples),
+            "queries_per_request": sum(queries) / len(queries) if queries else -1,
+        }
+    return report
+
+
+def compare(current: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Return human readable regressions of ``current`` against ``baseline``."""
+    regressions: List[str] = []
+    for endpoint, base in baseline.items():
+        now = current.get(endpoint)
+        if now is None:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if base[metric] > 0 and now[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{endpoint}: {metric} {base[metric]:.1f} -> {now[metric]:.1f}")
+        if base["throughput_rps"] > 0 and now["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{endpoint}: throughput {base['throughput_rps']:.1f} -> {now['throughput_rps']:.1f} rps")
+        if base["queries_per_request"] >= 0 and now["queries_per_request"] > base["queries_per_request"] + 0.5:
+            regressions.append(
+                f"{endpoint}: queries/request {base['queries_per_request']:.1f} -> {now['queries_per_request']:.1f}"
+            )
+        if now["error_rate"] > base["error_rate"] + 0.01:
+            regressions.append(f"{endpoint}: error rate {base['error_rate']:.2%} -> {now['error_rate']:.2%}")
+    return regressions
+
+
+def load_students(database_url: str, count: int) -> List[str]:
+    engine = create_engine(database_url)
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text("SELECT email FROM users WHERE email LIKE 'student%@seed.example.com' ORDER BY id LIMIT :limit"),
+            {"limit": count},
+        ).fetchall()
+    engine.dispose()
+    return [row[0] for row in rows]
+
+
+def run_users(base_url: str, emails: List[str], password: str, args: argparse.Namespace) -> Recorder:
+    recorder = Recorder()
+    flows = list(FLOW_WEIGHTS)
+    weights = [FLOW_WEIGHTS[name] for name in flows]
+    deadline = time.perf_counter() + args.duration
+    errors: List[str] = []
+
+    def user_loop(index: int) -> None:
+        rng = random.Random(args.seed + index)
+        student = VirtualStudent(Client(base_url, recorder), emails[index % len(emails)], password, rng)
+        try:
+            student.login()
+            student.discover()
+            while time.perf_counter() < deadline:
+                flow: Callable[[], None] = getattr(student, rng.choices(flows, weights=weights)[0])
+                flow()
+                if args.think_ms:
+                    time.sleep(rng.uniform(0, args.think_ms) / 1000)
+        except Exception as exc:  # keep the other users going, report at the end
+            errors.append(f"user {index}: {exc}")
+
+    threads = [threading.Thread(target=user_loop, args=(i,), daemon=True) for i in range(args.users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for error in errors[:10]:
+        print(error, file=sys.stderr)
+    return recorder
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="benchmark an already running server instead of booting one")
+    parser.add_argument("--cmd", default=DEFAULT_CMD, help="server command, {port} is substituted")
+    parser.add_argument("--port", type=int, default=8012)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="max random pause between flows")
+    parser.add_argument("--password", default="password")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON from a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative regression")
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    emails = load_students(args.database_url, args.users)
+    if not emails:
+        parser.error("no seeded students found, run python -m app.db.seed first")
+
+    process = None
+    base_url = args.base_url
+    if not base_url:
+        base_url = f"http://127.0.0.1:{args.port}"
+        # admission control would turn the synthetic load away; the benchmark measures the endpoints
+        env = dict(os.environ, DATABASE_URL=args.database_url, EXPOSE_QUERY_COUNT="true", RATE_LIMIT_ENABLED="false", SHED_MAX_IN_FLIGHT="100000")
+        process = subprocess.Popen(shlex.split(args.cmd.format(port=args.port)), env=env, stdout=subprocess.DEVNULL)
+    try:
+        wait_until_ready(base_url, 60)
+        started = time.perf_counter()
+        recorder = run_users(base_url, emails, args.password, args)
+        elapsed = time.perf_counter() - started
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    result = {
+        "meta": {"users": args.users, "duration_s": elapsed, "flows": FLOW_WEIGHTS},
+        "endpoints": summarize(recorder, elapsed),
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, indent=2)
+
+    print(f"{'endpoint':<36} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>8} {'q/req':>6} {'err':>6}")
+    for endpoint, stats in result["endpoints"].items():
+        print(
+            f"{endpoint:<36} {stats['count']:>7} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+            f"{stats['p99_ms']:>8.1f} {stats['throughput_rps']:>8.1f} {stats['queries_per_request']:>6.1f} "
+            f"{stats['error_rate']:>6.1%}"
+        )
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)["endpoints"]
+        regressions = compare(result["endpoints"], baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Item analysis benchmark.
+
+Fills a scratch SQLite database with one test and many finished attempts,
+then times the single-query load, the vectorized statistics and, for
+comparison, the same statistics computed row by row in Python::
+
+    python -m benchmarks.bench_item_analysis --attempts 100000 --questions 30
+    python -m benchmarks.bench_item_analysis --database-url postgresql://... --test-id 12
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.models import Course, QuestionType, Test, TestAnswer, TestAttempt, TestOption, TestQuestion, User, UserRole
+from app.services.item_analysis import analyze, load_option_key, load_selections, selection_matrix
+
+BATCH = 50_000
+
+
+def build_dataset(engine, attempts: int, questions: int, options: int, seed: int) -> int:
+    rng = random.Random(seed)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        teacher = User(email="bench-teacher@example.com", full_name="T", role=UserRole.teacher, hashed_password="x")
+        student = User(email="bench-student@example.com", full_name="S", role=UserRole.student, hashed_password="x")
+        course = Course(title="Bench", short_description="s", long_description="l", level="beginner", owner=teacher)
+        test = Test(course=course, title="Bench exam")
+        for index in range(questions):
+            kind = QuestionType.multiple if index % 5 == 0 else QuestionType.single
+            question = TestQuestion(test=test, text=f"Q{index}", type=kind, order_index=index)
+            correct = {0, 1} if kind == QuestionType.multiple else {index % options}
+            question.options = [TestOption(text=str(o), is_correct=o in correct) for o in range(options)]
+        db.add_all([student, test])
+        db.commit()
+        test_id, student_id = test.id, student.id
+        ordered = sorted(test.questions, key=lambda q: q.id)
+        option_ids = [[o.id for o in q.options] for q in ordered]
+        correct_ids = [[o.id for o in q.options if o.is_correct] for q in ordered]
+        question_ids = [q.id for q in ordered]
+
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        connection.execute(
+            insert(TestAttempt),
+            [
+                {"id": i + 1, "test_id": test_id, "student_id": student_id, "started_at": now, "finished_at": now}
+                for i in range(attempts)
+            ],
+        )
+        rows: List[Dict[str, int]] = []
+        for attempt_id in range(1, attempts + 1):
+            ability = rng.random()
+            for index, ids in enumerate(option_ids):
+                if rng.random() < 0.03:
+                    continue
+                picked = correct_ids[index] if rng.random() < 0.3 + 0.6 * ability else [rng.choice(ids)]
+                rows.extend({"attempt_id": attempt_id, "question_id": question_ids[index], "option_id": o} for o in picked)
+            if len(rows) >= BATCH:
+                connection.execute(insert(TestAnswer), rows)
+                rows = []
+        if rows:
+            connection.execute(insert(TestAnswer), rows)
+    return test_id
+
+
+def python_baseline(db: Session, test_id: int) -> float:
+    """Difficulty and option rates computed row by row over the same loaded rows.
+
+    Only the cheapest statistics are included, so the gap to the vectorized
+    version is a lower bound.
+    """
+    started = time.perf_counter()
+    key = load_option_key(db, test_id)
+    attempt_ids, option_ids = load_selections(db, test_id)
+    chosen: Dict[int, set] = defaultdict(set)
+    for attempt_id, option_id in zip(attempt_ids.tolist(), option_ids.tolist()):
+        chosen[attempt_id].add(option_id)
+    by_question: Dict[int, List[int]] = defaultdict(list)
+    for option_id, index in zip(key.option_ids.tolist(), key.question_index.tolist()):
+        by_question[index].append(option_id)
+    correct = {o for o, flag in zip(key.option_ids.tolist(), key.is_correct.tolist()) if flag}
+    right = defaultdict(int)
+    picked_count = defaultdict(int)
+    for selected in chosen.values():
+        for index, ids in by_question.items():
+            picked = selected.intersection(ids)
+            if picked and picked == correct.intersection(ids):
+                right[index] += 1
+            for option_id in picked:
+                picked_count[option_id] += 1
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="existing database; a scratch SQLite file is built when omitted")
+    parser.add_argument("--test-id", type=int)
+    parser.add_argument("--attempts", type=int, default=100_000)
+    parser.add_argument("--questions", type=int, default=30)
+    parser.add_argument("--options", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--skip-baseline", action="store_true")
+    args = parser.parse_args()
+
+    scratch = None
+    if args.database_url:
+        engine = create_engine(args.database_url)
+        test_id = args.test_id
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        engine = create_engine(f"sqlite:///{scratch}")
+        started = time.perf_counter()
+        test_id = build_dataset(engine, args.attempts, args.questions, args.options, args.seed)
+        print(f"dataset built in {time.perf_counter() - started:.1f}s")
+
+    report = {}
+    try:
+        with Session(engine) as db:
+            started = time.perf_counter()
+            key = load_option_key(db, test_id)
+            attempt_ids, option_ids = load_selections(db, test_id)
+            report["load_seconds"] = time.perf_counter() - started
+            started = time.perf_counter()
+            selected = selection_matrix(key, attempt_ids, option_ids)
+            analyze(key, selected)
+            report["compute_seconds"] = time.perf_counter() - started
+            report["attempts"] = int(selected.shape[0])
+            report["answers"] = int((option_ids >= 0).sum())
+            if not args.skip_baseline:
+                report["python_baseline_seconds"] = python_baseline(db, test_id)
+    finally:
+        engine.dispose()
+        if scratch:
+            os.unlink(scratch)
+    print(json.dumps({k: round(v, 4) if isinstance(v, float) else v for k, v in report.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
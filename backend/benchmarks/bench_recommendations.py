@@ -0,0 +1,94 @@
+"""Course recommendations benchmark.
+
+Generates tags and Zipf-like enrollments in memory (5,000 courses and
+100,000 students by default), then times the vectorized similarity build,
+the snapshot size and load, and top-k lookups for random students::
+
+    python -m benchmarks.bench_recommendations --courses 5000 --students 100000
+    python -m benchmarks.bench_recommendations --database-url postgresql://...
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.services.recommendations import SimilarityIndex, build_index, load_index_inputs
+
+
+def synthetic_inputs(courses: int, students: int, tags: int, per_student: float, seed: int):
+    rng = np.random.default_rng(seed)
+    course_ids = np.arange(1, courses + 1, dtype=np.int64)
+    tags_per_course = rng.integers(1, 5, courses)
+    tag_courses = np.repeat(course_ids, tags_per_course)
+    tag_ids = rng.integers(1, tags + 1, len(tag_courses))
+    # a few courses get most of the students, as in app.db.seed
+    weights = 1.0 / np.arange(1, courses + 1) ** 0.8
+    counts = np.clip(rng.normal(per_student, per_student / 3, students).astype(np.int64), 1, None)
+    student_ids = np.repeat(np.arange(1, students + 1, dtype=np.int64), counts)
+    enrolled = rng.choice(course_ids, len(student_ids), p=weights / weights.sum())
+    popularity = np.bincount(enrolled, minlength=courses + 1)[1:]
+    return course_ids, (tag_courses, tag_ids), (student_ids, enrolled), popularity
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="read the published courses of this database instead")
+    parser.add_argument("--courses", type=int, default=5_000)
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--tags", type=int, default=200)
+    parser.add_argument("--per-student", type=float, default=5.0, help="mean enrollments per student")
+    parser.add_argument("--neighbours", type=int, default=50)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    report = {}
+    started = time.perf_counter()
+    if args.database_url:
+        engine = create_engine(args.database_url)
+        try:
+            with Session(engine) as db:
+                inputs = load_index_inputs(db)
+        finally:
+            engine.dispose()
+    else:
+        inputs = synthetic_inputs(args.courses, args.students, args.tags, args.per_student, args.seed)
+    report["inputs_seconds"] = time.perf_counter() - started
+    course_ids, _, (student_ids, enrolled), _ = inputs
+    report["courses"] = len(course_ids)
+    report["enrollments"] = len(student_ids)
+
+    started = time.perf_counter()
+    index = build_index(*inputs, k=args.neighbours)
+    report["build_seconds"] = time.perf_counter() - started
+    payload = index.to_bytes()
+    report["snapshot_bytes"] = len(payload)
+    report["dense_float32_bytes"] = len(course_ids) ** 2 * 4
+    started = time.perf_counter()
+    index = SimilarityIndex.from_bytes(payload, index.built_at)
+    report["load_seconds"] = time.perf_counter() - started
+
+    # enrollments of random students, grouped the way the endpoint reads them
+    rng = np.random.default_rng(args.seed)
+    order = np.argsort(student_ids, kind="stable")
+    bounds = np.searchsorted(student_ids[order], np.unique(student_ids))
+    ends = np.r_[bounds[1:], len(order)]
+    picks = rng.integers(0, len(bounds), args.lookups)
+    samples = [enrolled[order[bounds[p] : ends[p]]].tolist() for p in picks]
+    timings = np.empty(len(samples))
+    for position, courses in enumerate(samples):
+        started = time.perf_counter()
+        index.recommend(courses, args.limit)
+        timings[position] = time.perf_counter() - started
+    report["lookup_p50_us"] = float(np.percentile(timings, 50) * 1e6)
+    report["lookup_p99_us"] = float(np.percentile(timings, 99) * 1e6)
+    print(json.dumps({k: round(v, 4) if isinstance(v, float) else v for k, v in report.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
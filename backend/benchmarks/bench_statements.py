@@ -0,0 +1,216 @@
+"""Statement construction benchmark for the student hot paths.
+
+Compares building the grades, feed, deadlines and progress queries per call
+(as the routers used to) with the module-level statements they now execute.
+``construct`` times building a statement and computing its SQL cache key,
+which is all SQLAlchemy does in Python before it finds the compiled form in
+its cache; no database is involved. ``execute`` runs the current collectors
+against a small in-memory SQLite database for scale::
+
+    python -m benchmarks.bench_statements --iterations 5000
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.api.v1.deadlines import DEADLINES_STATEMENT, SUBMISSIONS_STATEMENT, collect_deadlines
+from app.api.v1.feed import GRADED_SUBMISSIONS_STATEMENT, NEW_ASSIGNMENTS_STATEMENT, collect_feed
+from app.api.v1.grades import GRADES_STATEMENT, collect_grades
+from app.api.v1.progress import (
+    AVG_SCORE_STATEMENT,
+    COMPLETED_LESSONS_STATEMENT,
+    SNAPSHOT_STATEMENT,
+    TOTAL_LESSONS_STATEMENT,
+    refresh_progress,
+)
+from app.db.base import Base
+from app.models import Assignment, Course, Enrollment, Lesson, Module, ProgressSnapshot, Submission, SubmissionStatus
+from app.models import User, UserRole
+
+
+def _key(query) -> None:
+    query._statement_20()._generate_cache_key()
+
+
+def per_call_grades(db: Session, student_id: int) -> None:
+    latest = (
+        db.query(Submission.assignment_id, func.max(Submission.attempt_number).label("max_attempt"))
+        .filter(Submission.student_id == student_id)
+        .group_by(Submission.assignment_id)
+        .subquery()
+    )
+    _key(
+        db.query(Submission, Assignment, Course)
+        .join(
+            latest,
+            (Submission.assignment_id == latest.c.assignment_id) & (Submission.attempt_number == latest.c.max_attempt),
+        )
+        .join(Assignment, Submission.assignment_id == Assignment.id)
+        .join(Lesson, Assignment.lesson_id == Lesson.id)
+        .join(Module, Lesson.module_id == Module.id)
+        .join(Course, Module.course_id == Course.id)
+        .filter(Submission.student_id == student_id)
+        .order_by(Submission.checked_at.desc().nullslast(), Submission.submitted_at.desc())
+    )
+
+
+def per_call_feed(db: Session, student_id: int) -> None:
+    window_start = datetime.utcnow() - timedelta(days=30)
+    _key(db.query(Enrollment.course_id).filter(Enrollment.student_id == student_id))
+    _key(
+        db.query(Assignment, Course)
+        .join(Lesson, Assignment.lesson_id == Lesson.id)
+        .join(Module, Lesson.module_id == Module.id)
+        .join(Course, Module.course_id == Course.id)
+        .filter(Course.id.in_([1, 2, 3]))
+        .filter(Assignment.created_at >= window_start)
+        .order_by(Assignment.created_at.desc())
+    )
+    _key(
+        db.query(Submission, Assignment, Course)
+        .join(Assignment, Submission.assignment_id == Assignment.id)
+        .join(Lesson, Assignment.lesson_id == Lesson.id)
+        .join(Module, Lesson.module_id == Module.id)
+        .join(Course, Module.course_id == Course.id)
+        .filter(Submission.student_id == student_id)
+        .filter(Submission.checked_at.isnot(None))
+        .filter(Submission.checked_at >= window_start)
+        .order_by(Submission.checked_at.desc())
+    )
+
+
+def per_call_deadlines(db: Session, student_id: int) -> None:
+    """The enrolled-assignments query plus one latest-submission query (built once per assignment before)."""
+    _key(
+        db.query(Assignment, Course, Lesson)
+        .join(Lesson, Assignment.lesson_id == Lesson.id)
+        .join(Module, Lesson.module_id == Module.id)
+        .join(Course, Module.course_id == Course.id)
+        .join(Enrollment, Enrollment.course_id == Course.id)
+        .filter(Enrollment.student_id == student_id)
+    )
+    _key(
+        db.query(Submission)
+        .filter(Submission.assignment_id == 1, Submission.student_id == student_id)
+        .order_by(Submission.attempt_number.desc(), Submission.submitted_at.desc().nullslast(), Submission.id.desc())
+        .limit(1)
+    )
+
+
+def per_call_progress(db: Session, student_id: int) -> None:
+    course_id = 1
+    _key(db.query(Lesson).join(Module, Lesson.module_id == Module.id).filter(Module.course_id == course_id))
+    _key(
+        db.query(func.count(func.distinct(Lesson.id)))
+        .join(Module, Lesson.module_id == Module.id)
+        .join(Assignment, Assignment.lesson_id == Lesson.id, isouter=True)
+        .join(Submission, Submission.assignment_id == Assignment.id, isouter=True)
+        .filter(Module.course_id == course_id)
+        .filter(Submission.student_id == student_id)
+        .filter(Submission.status.in_([SubmissionStatus.submitted, SubmissionStatus.checked]))
+    )
+    _key(
+        db.query(func.avg(Submission.score))
+        .join(Assignment, Submission.assignment_id == Assignment.id)
+        .join(Lesson, Assignment.lesson_id == Lesson.id)
+        .join(Module, Lesson.module_id == Module.id)
+        .filter(Module.course_id == course_id, Submission.student_id == student_id)
+    )
+    _key(
+        db.query(ProgressSnapshot).filter(
+            ProgressSnapshot.student_id == student_id, ProgressSnapshot.course_id == course_id
+        )
+    )
+
+
+def registry(*statements) -> Callable[[Session, int], None]:
+    def run(db: Session, student_id: int) -> None:
+        for statement in statements:
+            statement._generate_cache_key()
+
+    return run
+
+
+PATHS = {
+    "grades": (per_call_grades, registry(GRADES_STATEMENT)),
+    "feed": (per_call_feed, registry(NEW_ASSIGNMENTS_STATEMENT, GRADED_SUBMISSIONS_STATEMENT)),
+    "deadlines": (per_call_deadlines, registry(DEADLINES_STATEMENT, SUBMISSIONS_STATEMENT)),
+    "progress": (
+        per_call_progress,
+        registry(TOTAL_LESSONS_STATEMENT, COMPLETED_LESSONS_STATEMENT, AVG_SCORE_STATEMENT, SNAPSHOT_STATEMENT),
+    ),
+}
+
+
+def per_iteration_us(func: Callable[[], object], iterations: int) -> float:
+    func()  # warm SQLAlchemy's caches
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def build_dataset(db: Session, courses: int, assignments: int) -> int:
+    teacher = User(email="bench-teacher@example.com", full_name="T", role=UserRole.teacher, hashed_password="x")
+    student = User(email="bench-student@example.com", full_name="S", role=UserRole.student, hashed_password="x")
+    now = datetime.utcnow()
+    for c in range(courses):
+        course = Course(title=f"C{c}", short_description="s", long_description="l", level="beginner", owner=teacher)
+        db.add(Enrollment(student=student, course=course))
+        module = Module(course=course, title="M", order_index=1)
+        for a in range(assignments):
+            lesson = Lesson(module=module, title=f"L{a}", short_description="s", content_html="", order_index=a)
+            assignment = Assignment(lesson=lesson, title=f"A{a}", description="d", max_score=10, due_date=now)
+            for attempt in (1, 2):
+                db.add(
+                    Submission(
+                        assignment=assignment,
+                        student=student,
+                        attempt_number=attempt,
+                        status=SubmissionStatus.checked,
+                        score=attempt * 4,
+                        submitted_at=now,
+                        checked_at=now,
+                    )
+                )
+    db.commit()
+    return student.id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--courses", type=int, default=5)
+    parser.add_argument("--assignments", type=int, default=10, help="per course")
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    report: Dict[str, Dict[str, float]] = {}
+    with Session(engine) as db:
+        student_id = build_dataset(db, args.courses, args.assignments)
+        collectors = {
+            "grades": lambda: collect_grades(db, student_id),
+            "feed": lambda: collect_feed(db, student_id),
+            "deadlines": lambda: collect_deadlines(db, student_id),
+            "progress": lambda: (refresh_progress(db, student_id, 1), db.rollback()),
+        }
+        for name, (per_call, cached) in PATHS.items():
+            report[name] = {
+                "construct_per_call_us": per_iteration_us(lambda: per_call(db, student_id), args.iterations),
+                "construct_cached_us": per_iteration_us(lambda: cached(db, student_id), args.iterations),
+                "execute_us": per_iteration_us(collectors[name], max(args.iterations // 20, 1)),
+            }
+    engine.dispose()
+    print(json.dumps({name: {k: round(v, 1) for k, v in row.items()} for name, row in report.items()}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
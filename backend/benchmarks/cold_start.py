@@ -0,0 +1,115 @@
+"""Cold-start latency benchmark.
+
+Boots the server in a subprocess, measures how long it takes until ``/ready``
+answers 200 and how slow the first requests are compared to warmed-up ones.
+Runs with warmup enabled and disabled so the effect of the hook is visible::
+
+    python -m benchmarks.cold_start --runs 3
+    python -m benchmarks.cold_start --cmd "gunicorn -c gunicorn_conf.py app.main:app" --port 8000
+"""
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+DEFAULT_CMD = "uvicorn app.main:app --host 127.0.0.1 --port {port}"
+
+
+def request(url: str, data: Optional[bytes] = None, headers: Optional[Dict[str, str]] = None) -> tuple:
+    req = urllib.request.Request(url, data=data, headers=headers or {})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        body, status = exc.read(), exc.code
+    return status, body, time.perf_counter() - started
+
+
+def wait_until_ready(base_url: str, timeout: float) -> float:
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            status, _, _ = request(f"{base_url}/ready")
+            if status == 200:
+                return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"server not ready after {timeout}s")
+
+
+def first_requests(base_url: str, email: str, password: str, repeat: int) -> Dict[str, List[float]]:
+    timings: Dict[str, List[float]] = {"login": [], "courses": [], "structure": []}
+    for _ in range(repeat):
+        payload = json.dumps({"email": email, "password": password}).encode()
+        status, body, elapsed = request(
+            f"{base_url}/api/v1/auth/login-json", payload, {"Content-Type": "application/json"}
+        )
+        if status != 200:
+            raise RuntimeError(f"login failed with {status}: {body[:200]!r}")
+        timings["login"].append(elapsed)
+        auth = {"Authorization": f"Bearer {json.loads(body)['access_token']}"}
+        status, body, elapsed = request(f"{base_url}/api/v1/courses", headers=auth)
+        timings["courses"].append(elapsed)
+        enrolled = json.loads(body).get("enrolled", []) if status == 200 else []
+        if enrolled:
+            _, _, elapsed = request(f"{base_url}/api/v1/courses/{enrolled[0]['id']}/structure", headers=auth)
+            timings["structure"].append(elapsed)
+    return timings
+
+
+def run_once(cmd: str, port: int, warmup: bool, args: argparse.Namespace) -> Dict[str, object]:
+    env = dict(os.environ, WARMUP_ENABLED="true" if warmup else "false")
+    base_url = f"http://127.0.0.1:{port}"
+    spawned = time.perf_counter()
+    process = subprocess.Popen(shlex.split(cmd.format(port=port)), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    try:
+        ready_after = wait_until_ready(base_url, args.timeout)
+        timings = first_requests(base_url, args.email, args.password, args.repeat)
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {
+        "warmup": warmup,
+        "time_to_ready_s": ready_after,
+        "spawn_to_first_login_s": ready_after + (timings["login"][0] if timings["login"] else 0.0),
+        "first_ms": {name: values[0] * 1000 for name, values in timings.items() if values},
+        "steady_ms": {
+            name: statistics.median(values[1:]) * 1000 for name, values in timings.items() if len(values) > 1
+        },
+        "wall_s": time.perf_counter() - spawned,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cmd", default=DEFAULT_CMD, help="server command, {port} is substituted")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5, help="requests per endpoint after ready")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--email", default="student@example.com")
+    parser.add_argument("--password", default="student123")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = [run_once(args.cmd, args.port, warmup, args) for warmup in (False, True) for _ in range(args.runs)]
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(report)
+    print(report)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,208 @@
+"""Load test for timed attempts: many examinees autosaving at once.
+
+Prepares a timed test in an existing (seeded) database, enrolls the first
+``--examinees`` seeded students in its course and mints their tokens
+directly, so the run measures the attempt endpoints and not bcrypt. Every
+examinee starts an attempt, answers one question per autosave and finishes;
+``--abandon`` of them stop without finishing and are left to the expiry
+sweep::
+
+    DATABASE_URL=... python -m benchmarks.load_timed_attempts --examinees 1000 --exam-seconds 60
+
+The report has latency percentiles per endpoint and the number of attempts
+that ended up finished, with their scores checked against the answers sent.
+"""
+
+import argparse
+import os
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+
+from app.core.security import create_access_token
+from benchmarks.bench_endpoints import DEFAULT_CMD, Client, Recorder, summarize
+from benchmarks.cold_start import wait_until_ready
+
+
+def prepare(engine: Engine, examinees: int, questions: int, time_limit: int) -> Tuple[int, List[int], Dict[int, List[int]]]:
+    """Create the timed test and enrollments; returns (test_id, student_ids, {question_id: [option_ids]})."""
+    now = datetime.utcnow()
+    with engine.begin() as connection:
+        course_id = connection.execute(text("SELECT id FROM courses WHERE is_published ORDER BY id LIMIT 1")).scalar()
+        if course_id is None:
+            raise SystemExit("no published course found, run python -m app.db.seed first")
+        student_ids = list(
+            connection.execute(
+                text("SELECT id FROM users WHERE email LIKE 'student%@seed.example.com' ORDER BY id LIMIT :limit"),
+                {"limit": examinees},
+            ).scalars()
+        )
+        enrolled = set(
+            connection.execute(text("SELECT student_id FROM enrollments WHERE course_id = :c"), {"c": course_id}).scalars()
+        )
+        missing = [{"s": student_id, "c": course_id, "t": now} for student_id in student_ids if student_id not in enrolled]
+        if missing:
+            connection.execute(
+                text("INSERT INTO enrollments (student_id, course_id, enrolled_at) VALUES (:s, :c, :t)"), missing
+            )
+        test_id = connection.execute(
+            text(
+                "INSERT INTO tests (course_id, title, description, is_published, time_limit_minutes, created_at, updated_at) "
+                "VALUES (:c, 'Load test exam', NULL, :published, :limit, :t, :t) RETURNING id"
+            ),
+            {"c": course_id, "published": True, "limit": time_limit, "t": now},
+        ).scalar_one()
+        options: Dict[int, List[int]] = {}
+        for index in range(questions):
+            question_id = connection.execute(
+                text("INSERT INTO test_questions (test_id, text, type, order_index) VALUES (:t, :q, 'single', :o) RETURNING id"),
+                {"t": test_id, "q": f"Question {index + 1}", "o": index + 1},
+            ).scalar_one()
+            options[question_id] = [
+                connection.execute(
+                    text("INSERT INTO test_options (question_id, text, is_correct) VALUES (:q, :x, :c) RETURNING id"),
+                    {"q": question_id, "x": f"Option {o}", "c": o == 0},
+                ).scalar_one()
+                for o in range(4)
+            ]
+    return test_id, student_ids, options
+
+
+def examinee(
+    base_url: str,
+    recorder: Recorder,
+    student_id: int,
+    test_id: int,
+    options: Dict[int, List[int]],
+    args: argparse.Namespace,
+    expected: Dict[int, float],
+    errors: List[str],
+) -> None:
+    rng = random.Random(args.seed + student_id)
+    client = Client(base_url, recorder)
+    client.token = create_access_token(str(student_id))
+    try:
+        # Examinees do not all open the test in the same millisecond.
+        time.sleep(rng.uniform(0, args.ramp_seconds))
+        status, attempt = client.request("POST /tests/{id}/attempts", "POST", f"/api/v1/tests/{test_id}/attempts")
+        if status != 200:
+            raise RuntimeError(f"start failed: {status}")
+        answers: Dict[int, List[int]] = {}
+        body: Dict[str, list] = {"answers": []}
+        question_ids = list(options)
+        abandon = rng.random() < args.abandon
+        deadline = time.perf_counter() + args.exam_seconds
+        while time.perf_counter() < deadline:
+            time.sleep(rng.uniform(0.5, 1.5) * args.autosave_seconds)
+            unanswered = [q for q in question_ids if q not in answers]
+            if unanswered:
+                question_id = rng.choice(unanswered)
+                answers[question_id] = [rng.choice(options[question_id])]
+            body = {"answers": [{"question_id": q, "selected_option_ids": o} for q, o in answers.items()]}
+            status, _ = client.json("PUT /test-attempts/{id}/answers", "PUT", f"/api/v1/test-attempts/{attempt['id']}/answers", body)
+            if status != 200:
+                raise RuntimeError(f"autosave failed: {status}")
+        if abandon:
+            return
+        status, result = client.json("POST /test-attempts/{id}/finish", "POST", f"/api/v1/test-attempts/{attempt['id']}/finish", body)
+        if status != 200:
+            raise RuntimeError(f"finish failed: {status}")
+        expected[attempt["id"]] = float(sum(selected[0] == options[q][0] for q, selected in answers.items()))
+        if result["score"] != expected[attempt["id"]]:
+            errors.append(f"attempt {attempt['id']}: score {result['score']} != {expected[attempt['id']]}")
+    except Exception as exc:  # keep the other examinees going, report at the end
+        errors.append(f"student {student_id}: {exc}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", help="load an already running server instead of booting one")
+    parser.add_argument("--cmd", default=DEFAULT_CMD, help="server command, {port} is substituted")
+    parser.add_argument("--port", type=int, default=8013)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--examinees", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--exam-seconds", type=float, default=60.0)
+    parser.add_argument("--autosave-seconds", type=float, default=5.0, help="mean pause between autosaves")
+    parser.add_argument("--ramp-seconds", type=float, default=5.0)
+    parser.add_argument("--abandon", type=float, default=0.05, help="share of examinees that never finish")
+    parser.add_argument("--time-limit-minutes", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+    if not args.database_url:
+        parser.error("--database-url or DATABASE_URL is required")
+
+    engine = create_engine(args.database_url)
+    test_id, student_ids, options = prepare(engine, args.examinees, args.questions, args.time_limit_minutes)
+    if len(student_ids) < args.examinees:
+        print(f"only {len(student_ids)} seeded students available", file=sys.stderr)
+
+    process = None
+    base_url = args.base_url
+    if not base_url:
+        base_url = f"http://127.0.0.1:{args.port}"
+        # every examinee comes from 127.0.0.1, so the per-IP limit would reject the run
+        env = dict(os.environ, DATABASE_URL=args.database_url, EXPOSE_QUERY_COUNT="true", RATE_LIMIT_ENABLED="false", SHED_MAX_IN_FLIGHT="100000")
+        process = subprocess.Popen(shlex.split(args.cmd.format(port=args.port)), env=env, stdout=subprocess.DEVNULL)
+    recorder = Recorder()
+    expected: Dict[int, float] = {}
+    errors: List[str] = []
+    try:
+        wait_until_ready(base_url, 60)
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(
+                target=examinee,
+                args=(base_url, recorder, student_id, test_id, options, args, expected, errors),
+                daemon=True,
+            )
+            for student_id in student_ids
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:  # idle keep-alive connections can hold up a graceful exit
+                process.kill()
+                process.wait()
+
+    with engine.connect() as connection:
+        finished, open_attempts = connection.execute(
+            text(
+                "SELECT SUM(CASE WHEN finished_at IS NOT NULL THEN 1 ELSE 0 END), "
+                "SUM(CASE WHEN finished_at IS NULL THEN 1 ELSE 0 END) FROM test_attempts WHERE test_id = :t"
+            ),
+            {"t": test_id},
+        ).one()
+    engine.dispose()
+
+    print(f"{len(student_ids)} examinees, {elapsed:.1f}s, test {test_id}")
+    print(f"{'endpoint':<36} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>8} {'q/req':>6} {'err':>6}")
+    for endpoint, stats in summarize(recorder, elapsed).items():
+        print(
+            f"{endpoint:<36} {stats['count']:>7} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+            f"{stats['p99_ms']:>8.1f} {stats['throughput_rps']:>8.1f} {stats['queries_per_request']:>6.1f} "
+            f"{stats['error_rate']:>6.1%}"
+        )
+    print(f"finished attempts: {finished or 0}, still open (left to the sweep): {open_attempts or 0}")
+    for error in errors[:10]:
+        print(error, file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
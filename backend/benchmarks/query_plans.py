@@ -0,0 +1,86 @@
+"""Query plans of the student hot-path statements.
+
+Prints the database's plan (``EXPLAIN QUERY PLAN`` on SQLite, ``EXPLAIN`` on
+Postgres) for every module-level statement of the grades, feed, deadlines,
+progress and course routers. Without ``--database-url`` a scratch SQLite
+database is filled by ``app.db.seed`` first::
+
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --database-url postgresql://... --student-id 42 --course-id 7
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.engine import Connection
+
+from app.api.v1 import courses, deadlines, feed, grades, progress
+from app.db.seed import SeedConfig, seed
+from app.models import Enrollment
+
+
+def statements(student_id: int, course_id: int) -> Dict[str, Tuple[object, Dict[str, object]]]:
+    student = {"student_id": student_id}
+    scoped = {"student_id": student_id, "course_id": course_id}
+    window = {"student_id": student_id, "window_start": datetime.utcnow() - timedelta(days=30)}
+    return {
+        "grades": (grades.GRADES_STATEMENT, student),
+        "feed.new_assignments": (feed.NEW_ASSIGNMENTS_STATEMENT, window),
+        "feed.graded_submissions": (feed.GRADED_SUBMISSIONS_STATEMENT, window),
+        "deadlines.assignments": (deadlines.DEADLINES_STATEMENT, {**student, "from_dt": None, "to_dt": None}),
+        "deadlines.submissions": (deadlines.SUBMISSIONS_STATEMENT, student),
+        "progress.completed_lessons": (progress.COMPLETED_LESSONS_STATEMENT, scoped),
+        "progress.avg_score": (progress.AVG_SCORE_STATEMENT, scoped),
+        "courses.assignments_count": (courses.ASSIGNMENTS_COUNT_STATEMENT, {"course_id": course_id}),
+    }
+
+
+def explain(connection: Connection, statement, params: Dict[str, object]) -> List[str]:
+    compiled = statement.params(**params).compile(
+        dialect=connection.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    processors = compiled._bind_processors
+    values = {key: processors[key](value) if key in processors else value for key, value in compiled.params.items()}
+    prefix = "EXPLAIN QUERY PLAN " if connection.dialect.name == "sqlite" else "EXPLAIN "
+    arguments = tuple(values[name] for name in compiled.positiontup) if compiled.positiontup else values
+    rows = connection.exec_driver_sql(prefix + compiled.string, arguments).all()
+    return [row[-1] for row in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="existing database; a scratch SQLite file is seeded when omitted")
+    parser.add_argument("--student-id", type=int)
+    parser.add_argument("--course-id", type=int)
+    args = parser.parse_args()
+
+    scratch = None
+    if args.database_url:
+        engine = create_engine(args.database_url)
+    else:
+        scratch = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        engine = create_engine(f"sqlite:///{scratch}")
+        seed(engine, SeedConfig(students=2000, courses=100, submissions=50_000, test_answers=0, chat_messages=0))
+    try:
+        with engine.connect() as connection:
+            if connection.dialect.name == "sqlite":
+                connection.exec_driver_sql("ANALYZE")
+            student_id, course_id = args.student_id, args.course_id
+            if student_id is None or course_id is None:
+                student_id, course_id = connection.execute(select(Enrollment.student_id, Enrollment.course_id)).first()
+            for name, (statement, params) in statements(student_id, course_id).items():
+                print(name)
+                for line in explain(connection, statement, params):
+                    print(f"    {line}")
+    finally:
+        engine.dispose()
+        if scratch:
+            os.unlink(scratch)
+
+
+if __name__ == "__main__":
+    main()
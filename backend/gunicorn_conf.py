@@ -0,0 +1,38 @@
+"""Gunicorn settings for production: ``gunicorn -c gunicorn_conf.py app.main:app``."""
+
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Requests are mostly DB-bound sync handlers, so 2 x CPU + 1 workers is a good start.
+_cpu = multiprocessing.cpu_count()
+workers = int(os.getenv("WEB_CONCURRENCY") or min(2 * _cpu + 1, int(os.getenv("MAX_WORKERS", "8"))))
+
+# Import the app (and run process-wide warmup) once in the master, then fork.
+preload_app = True
+
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+# Time workers get to finish in-flight requests on SIGTERM/redeploy.
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+max_requests = int(os.getenv("MAX_REQUESTS", "0"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    from app.warmup import preload
+
+    preload()
+    server.log.info("Preloaded app: mappers configured, bcrypt backend loaded")
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with the children.
+    from app.db.session import engine
+
+    engine.dispose(close=False)